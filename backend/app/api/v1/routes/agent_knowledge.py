@@ -9,7 +9,7 @@ from app.core.exceptions.error_messages import ErrorKey
 from app.core.exceptions.exception_classes import AppException
 from app.core.utils.bi_utils import set_url_content_if_no_rag
 from app.modules.data.manager import AgentRAGServiceManager
-from app.modules.data.utils import FileExtractor, FileTextExtractor
+from app.modules.data.utils import FileExtractor, get_extraction_service
 import logging
 from uuid import UUID
 from app.modules.data.providers.legra import (
@@ -226,7 +226,7 @@ async def upload_file(
                 shutil.copyfileobj(file.file, buffer)
 
             # Extract text from the file
-            extracted_text = FileTextExtractor().extract_from_path(path=file_path)
+            extracted_text = await get_extraction_service().extract(path=file_path)
             if not extracted_text:
                 raise AppException(ErrorKey.ERROR_EXTRACTING_FROM_FILE)
 
@@ -288,14 +288,10 @@ async def upload_file_to_chat(
 
         # Extract text from the file
         try:
-            if file_extension.lower() == "pdf":
-                extracted_text = FileExtractor.extract_from_pdf(file_path)
-            elif file_extension.lower() == "docx":
-                extracted_text = FileExtractor.extract_from_docx(file_path)
-            elif file_extension.lower() in ["jpg", "jpeg", "png"]:
-                extracted_text = FileExtractor.extract_from_image(file_path)
-            else:  # Assume text file
-                extracted_text = FileExtractor.extract_from_txt(file_path)
+            if file_extension.lower() in ["jpg", "jpeg", "png"]:
+                extracted_text = await asyncio.to_thread(FileExtractor.extract_from_image, file_path)
+            else:  # PDF, DOCX or text file
+                extracted_text = (await get_extraction_service().extract(path=file_path)).strip()
             from app.dependencies.injector import injector
 
             thread_rag = injector.get(ThreadScopedRAG)
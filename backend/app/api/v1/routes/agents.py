@@ -1,15 +1,17 @@
+import json
 import logging
-from typing import Any, Dict, Optional
+from typing import Any, AsyncIterator, Dict, Optional
 from uuid import UUID
 
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 from fastapi_injector import Injected
 from app.core.permissions.constants import Permissions as P
 from app.auth.dependencies import auth, permissions
 from app.cache.redis_cache import invalidate_agent_cache
 from app.core.exceptions.error_messages import ErrorKey
 from app.core.exceptions.exception_classes import AppException
-from app.modules.workflow.registry import RegistryItem
+from app.modules.workflow.registry import get_compiled_agent
 from app.schemas.agent import QueryRequest
 from app.services.agent_config import AgentConfigService
 
@@ -62,6 +64,45 @@ async def query_agent(
                                                                                         request.metadata else {}), "thread_id": thread_id})
 
 
+@router.post("/{agent_id}/query/{thread_id}/stream", dependencies=[
+        Depends(auth),
+    ])
+async def stream_query_agent(
+        agent_id: UUID,
+        thread_id: str,
+        request: QueryRequest,
+        agent_service: AgentConfigService = Injected(AgentConfigService),
+):
+    """
+    Query an agent as Server-Sent Events: "token", "tool_start" and "tool_end"
+    events while the workflow runs, then "done" with the query response (or
+    "error").
+    """
+    events = stream_query_agent_logic(agent_service, str(agent_id), request.query, {**(request.metadata if
+                                                                                      request.metadata else {}), "thread_id": thread_id})
+    # Fail before the stream starts when the agent is missing or inactive
+    first_event = await events.__anext__()
+
+    async def event_stream():
+        try:
+            yield _sse(first_event)
+            async for event in events:
+                yield _sse(event)
+        except Exception as e:
+            logger.error(f"Streamed query of agent {agent_id} failed: {e}")
+            yield _sse({"type": "error", "message": str(e)})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def _sse(event: Dict[str, Any]) -> str:
+    return f"event: {event['type']}\ndata: {json.dumps(event, default=str)}\n\n"
+
+
 async def run_query_agent_logic(
         agent_service: AgentConfigService,
         agent_id: str,
@@ -74,12 +115,7 @@ async def run_query_agent_logic(
     Fetches agent from database on demand - always gets latest configuration.
     """
 
-    # Fetch agent from database and execute
-    agent = await agent_service.get_by_id_full(UUID(agent_id))
-    if not agent.is_active:
-        raise AppException(ErrorKey.AGENT_INACTIVE, status_code=400)
-
-    agent = RegistryItem(agent)
+    agent = await _get_active_agent(agent_service, agent_id)
 
     logger.info(f"Workflow Metadata: {metadata}")
 
@@ -88,17 +124,53 @@ async def run_query_agent_logic(
             metadata=metadata
             )
     logger.info(f"Workflow Final Result: {result}")
-    backward_compatibility_result = {
-
-                "status": result.get("status"),
-                "response": result.get("output"),
-                "agent_id": agent_id,
-                "thread_id": metadata.get("thread_id"),
-                "rag_used": False
-
-    }
+    backward_compatibility_result = _backward_compatibility_result(result, agent_id, metadata)
     logger.info(f"Result: {result}")
     logger.info(f"Backward compatibility result: {backward_compatibility_result}")
     if backward_compatibility_result.get("status") == "error":
         raise HTTPException(status_code=400, detail=result.get("message"))
-    return backward_compatibility_result
\ No newline at end of file
+    return backward_compatibility_result
+
+
+async def stream_query_agent_logic(
+        agent_service: AgentConfigService,
+        agent_id: str,
+        session_message: str,
+        metadata: Optional[Dict[str, Any]] = None,
+        ) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Run a query against an agent, yielding the tokens and tool calls of the
+    node feeding the chat output while the workflow runs. The last event is
+    "done", with the same response run_query_agent_logic returns.
+    """
+    agent = await _get_active_agent(agent_service, agent_id)
+    metadata = metadata or {}
+
+    async for event in agent.stream(session_message=session_message, metadata=metadata):
+        if event["type"] == "done":
+            result = event["response"]
+            logger.info(f"Workflow Final Result: {result}")
+            event = {
+                "type": "done",
+                "response": _backward_compatibility_result(result, agent_id, metadata),
+                "message": result.get("message"),
+            }
+        yield event
+
+
+async def _get_active_agent(agent_service: AgentConfigService, agent_id: str):
+    # Fetch agent from database, its workflow is built once per version
+    agent = await agent_service.get_by_id_full(UUID(agent_id))
+    if not agent.is_active:
+        raise AppException(ErrorKey.AGENT_INACTIVE, status_code=400)
+    return get_compiled_agent(agent)
+
+
+def _backward_compatibility_result(result: Dict[str, Any], agent_id: str, metadata: Optional[Dict[str, Any]]):
+    return {
+        "status": result.get("status"),
+        "response": result.get("output"),
+        "agent_id": agent_id,
+        "thread_id": metadata.get("thread_id"),
+        "rag_used": False
+    }
@@ -26,6 +26,7 @@ from app.schemas.filter import ConversationFilter
 from app.schemas.socket_principal import SocketPrincipal
 from app.services.agent_config import AgentConfigService
 from app.services.conversations import ConversationService
+from app.services.in_progress_analysis import InProgressAnalysisScheduler
 from app.services.transcript_message_service import TranscriptMessageService
 from app.core.tenant_scope import get_tenant_context
 from app.use_cases.chat_as_client_use_case import process_conversation_update_with_agent
@@ -350,6 +351,19 @@ async def get(
     return await conversations_service.count_conversations(conversation_filter)
 
 
+@router.get(
+    "/in-progress/analysis/stats",
+    dependencies=[Depends(auth), Depends(permissions(P.Conversation.READ))],
+)
+async def get_in_progress_analysis_stats(
+    scheduler: InProgressAnalysisScheduler = Injected(InProgressAnalysisScheduler),
+):
+    """
+    Queue depth and LLM calls made / saved by the background tone analysis of this process.
+    """
+    return scheduler.stats()
+
+
 @router.patch(
     "/message/add-feedback/{message_id}",
     dependencies=[
@@ -4,6 +4,7 @@ from fastapi import APIRouter, Depends
 from fastapi_injector import Injected
 from app.core.permissions.constants import Permissions as P
 from app.auth.dependencies import auth, permissions
+from app.modules.workflow.llm.gateway import get_llm_gateway
 from app.modules.workflow.llm.provider import LLMProvider
 from app.schemas.llm import LlmProviderCreate, LlmProviderRead, LlmProviderUpdate
 from app.services.llm_providers import LlmProviderService
@@ -31,6 +32,15 @@ async def get_form_schemas(llm_provider: LLMProvider = Injected(LLMProvider)):
     return await llm_provider.get_configuration_definitions()
 
 
+@router.get(
+    "/gateway/stats",
+    dependencies=[Depends(auth), Depends(permissions(P.LlmProvider.READ))],
+)
+async def get_gateway_stats():
+    """Queue depth, queue wait, tokens used, throttled and retried calls per provider"""
+    return get_llm_gateway().get_stats()
+
+
 @router.get(
     "/{llm_provider_id}",
     response_model=LlmProviderRead,
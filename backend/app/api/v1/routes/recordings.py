@@ -33,6 +33,8 @@ async def analyze_audio(
         llm_analyst_speaker_separator_id: Annotated[UUID|None, Form(...)] = None,
         llm_analyst_kpi_analyzer_id: Annotated[UUID|None, Form(...)] = None,
         customer_id: Annotated[Optional[UUID|None], Form()] = None,
+        # Room to connect to at /conversations/ws/{progress_id}?topics=recording_progress for progress
+        progress_id: Annotated[Optional[UUID|None], Form()] = None,
         file: UploadFile = File(...),
         service: AudioService = Injected(AudioService),
         ):
@@ -53,7 +55,7 @@ async def analyze_audio(
             customer_id=customer_id,
             )
 
-    return await service.process_recording(file, metadata)
+    return await service.process_recording(file, metadata, progress_id=progress_id)
 
 
 @router.post("/upload_transcript", dependencies=[
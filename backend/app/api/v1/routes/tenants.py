@@ -4,6 +4,11 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi_injector import Injected
 from app.core.permissions.constants import Permissions as P
 from app.auth.dependencies import auth, permissions
+from app.cache.bounded_cache import get_cache_stats as get_bounded_cache_stats
+from app.cache.embedding_cache import get_embedding_cache
+from app.cache.llm_response_cache import get_llm_response_cache
+from app.modules.data.utils.extraction_service import get_extraction_service
+from app.modules.workflow.registry import get_compiled_agent_stats
 from app.schemas.tenants import TenantCreate, TenantResponse, TenantUpdate
 from app.services.tenant import TenantService
 
@@ -52,6 +57,21 @@ async def list_tenants(
     return tenants
 
 
+@router.get(
+    "/cache/stats",
+    dependencies=[Depends(auth), Depends(permissions(P.Tenant.READ))],
+)
+async def get_cache_stats():
+    """Get hit/miss/eviction statistics of the in-process caches"""
+    return {
+        "caches": get_bounded_cache_stats(),
+        "embedding_cache": get_embedding_cache().stats(),
+        "llm_response_cache": get_llm_response_cache().stats(),
+        "document_extraction": get_extraction_service().stats(),
+        "compiled_agents": get_compiled_agent_stats(),
+    }
+
+
 @router.get(
     "/{tenant_id}",
     response_model=TenantResponse,
@@ -19,7 +19,7 @@ from twilio.twiml.voice_response import VoiceResponse, Connect, Say, Stream
 from dotenv import load_dotenv
 from app.api.v1.routes.voice import get_openai_session_key
 from app.auth.dependencies import auth
-from app.modules.workflow.registry import RegistryItem
+from app.modules.workflow.registry import get_compiled_agent
 from app.services.agent_config import AgentConfigService
 
 
@@ -68,7 +68,7 @@ async def process_with_agent(
 
     try:
         agent = await agent_service.get_by_id_full(UUID(agent_id))
-        agent = RegistryItem(agent)
+        agent = get_compiled_agent(agent)
         agent_response = await agent.execute(
             session_message=transcribed_text, metadata={"thread_id": thread_id}
         )
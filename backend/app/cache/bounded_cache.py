@@ -0,0 +1,285 @@
+"""
+Bounded, tenant-aware in-process cache for long-lived singletons.
+
+Registries of per-workflow, per-thread or per-knowledge-base objects use this
+instead of class-level dicts, which grow for the lifetime of the worker.
+
+  - Keys are scoped to the current tenant (``get_tenant_context()``), unless
+    the cache is created with ``tenant_aware=False``.
+  - Entries are evicted least recently used first, once the cache or the
+    tenant's share of it is full, or once idle for ``ttl_seconds``.
+  - ``on_evict`` is called with every evicted value (e.g. to close
+    connections); it may be a coroutine function.
+  - ``get_or_create_async`` constructs a missing value once, concurrent
+    callers for the same key wait for that construction.
+
+Statistics of every cache are available through ``get_cache_stats()``.
+"""
+
+import asyncio
+import inspect
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Generic, Hashable, List, Optional, Set, Tuple, TypeVar
+
+from app.core.tenant_scope import get_tenant_context
+
+logger = logging.getLogger(__name__)
+
+V = TypeVar("V")
+
+# Tenant of every entry in caches that are not tenant aware
+SHARED_SCOPE = "*"
+
+_caches: Dict[str, "BoundedCache"] = {}
+
+
+@dataclass
+class _Entry(Generic[V]):
+    value: V
+    last_access: float
+
+
+class BoundedCache(Generic[V]):
+    """LRU + idle TTL cache, bounded in total and per tenant"""
+
+    def __init__(
+        self,
+        name: str,
+        max_size: int,
+        max_size_per_tenant: Optional[int] = None,
+        ttl_seconds: Optional[float] = None,
+        on_evict: Optional[Callable[[V], Any]] = None,
+        tenant_aware: bool = True,
+    ):
+        self.name = name
+        self.max_size = max_size
+        self.max_size_per_tenant = max_size_per_tenant
+        self.ttl_seconds = ttl_seconds
+        self.on_evict = on_evict
+        self.tenant_aware = tenant_aware
+        # Least recently used first, so expired entries are always at the front
+        self._entries: "OrderedDict[Tuple[str, Hashable], _Entry[V]]" = OrderedDict()
+        self._tenant_sizes: Dict[str, int] = {}
+        self._loading: Dict[Tuple[str, Hashable], asyncio.Future] = {}
+        self._lock = threading.RLock()
+        self._hook_tasks: Set[asyncio.Task] = set()
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+        self.load_failures = 0
+        self.evictions: Dict[str, int] = {"lru": 0, "tenant": 0, "ttl": 0}
+        _caches[name] = self
+
+    # ------------------------------------------------------------------ #
+    # Lookup                                                              #
+    # ------------------------------------------------------------------ #
+    def get(self, key: Hashable) -> Optional[V]:
+        """Cached value for key in the current tenant, or None"""
+        with self._lock:
+            entry = self._lookup((self._tenant(), key))
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry.value
+
+    def put(self, key: Hashable, value: V) -> None:
+        """Cache value for key in the current tenant, evicting as needed"""
+        self._put((self._tenant(), key), value)
+
+    def get_or_create(self, key: Hashable, factory: Callable[[], V]) -> V:
+        """Cached value for key, built with factory on a miss"""
+        value = self.get(key)
+        if value is None:
+            value = factory()
+            self.loads += 1
+            self.put(key, value)
+        return value
+
+    async def get_or_create_async(
+        self, key: Hashable, factory: Callable[[], Awaitable[Optional[V]]]
+    ) -> Optional[V]:
+        """
+        Cached value for key, built with factory on a miss.
+
+        Concurrent callers for the same key share one factory call. A factory
+        returning None (or raising, for the callers that did not run it) is
+        not cached and yields None.
+        """
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        full_key = (self._tenant(), key)
+        loading = self._loading.get(full_key)
+        if loading is not None:
+            return await asyncio.shield(loading)
+
+        loading = asyncio.get_running_loop().create_future()
+        self._loading[full_key] = loading
+        value = None
+        try:
+            value = await factory()
+            if value is not None:
+                self.loads += 1
+                self._put(full_key, value)
+            else:
+                self.load_failures += 1
+            return value
+        except BaseException:
+            self.load_failures += 1
+            raise
+        finally:
+            self._loading.pop(full_key, None)
+            loading.set_result(value)
+
+    # ------------------------------------------------------------------ #
+    # Removal                                                             #
+    # ------------------------------------------------------------------ #
+    def pop(self, key: Hashable, close: bool = True) -> Optional[V]:
+        """Remove key from the current tenant, running on_evict unless close is False"""
+        with self._lock:
+            entry = self._remove((self._tenant(), key))
+        if entry is not None and close:
+            self._run_hook([entry.value])
+        return entry.value if entry is not None else None
+
+    def clear(self, tenant_id: Optional[str] = None) -> None:
+        """Remove all entries, or only those of one tenant"""
+        with self._lock:
+            keys = [key for key in self._entries if tenant_id is None or key[0] == tenant_id]
+            evicted = [self._remove(key).value for key in keys]
+        self._run_hook(evicted)
+
+    def keys(self) -> List[Hashable]:
+        """Keys of the current tenant, least recently used first"""
+        tenant_id = self._tenant()
+        with self._lock:
+            return [key for tenant, key in self._entries if tenant == tenant_id]
+
+    def values(self) -> List[V]:
+        """Values of the current tenant, least recently used first"""
+        tenant_id = self._tenant()
+        with self._lock:
+            return [entry.value for (tenant, _), entry in self._entries.items() if tenant == tenant_id]
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            return self._lookup((self._tenant(), key), touch=False) is not None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        with self._lock:
+            self._expire()
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "max_size_per_tenant": self.max_size_per_tenant,
+                "ttl_seconds": self.ttl_seconds,
+                "tenants": dict(self._tenant_sizes),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "loads": self.loads,
+                "load_failures": self.load_failures,
+                "evictions": dict(self.evictions),
+            }
+
+    # ------------------------------------------------------------------ #
+    # Internals                                                           #
+    # ------------------------------------------------------------------ #
+    def _tenant(self) -> str:
+        return get_tenant_context() if self.tenant_aware else SHARED_SCOPE
+
+    def _lookup(self, full_key: Tuple[str, Hashable], touch: bool = True) -> Optional[_Entry[V]]:
+        self._expire()
+        entry = self._entries.get(full_key)
+        if entry is not None and touch:
+            entry.last_access = time.monotonic()
+            self._entries.move_to_end(full_key)
+        return entry
+
+    def _put(self, full_key: Tuple[str, Hashable], value: V) -> None:
+        tenant_id = full_key[0]
+        evicted: List[V] = []
+        with self._lock:
+            previous = self._remove(full_key)
+            if previous is not None and previous.value is not value:
+                evicted.append(previous.value)
+            self._entries[full_key] = _Entry(value, time.monotonic())
+            self._tenant_sizes[tenant_id] = self._tenant_sizes.get(tenant_id, 0) + 1
+
+            evicted.extend(self._expire(run_hook=False))
+            if self.max_size_per_tenant is not None:
+                while self._tenant_sizes[tenant_id] > self.max_size_per_tenant:
+                    oldest = next(key for key in self._entries if key[0] == tenant_id)
+                    evicted.append(self._remove(oldest).value)
+                    self.evictions["tenant"] += 1
+            while len(self._entries) > self.max_size:
+                evicted.append(self._remove(next(iter(self._entries))).value)
+                self.evictions["lru"] += 1
+        self._run_hook(evicted)
+
+    def _remove(self, full_key: Tuple[str, Hashable]) -> Optional[_Entry[V]]:
+        entry = self._entries.pop(full_key, None)
+        if entry is not None:
+            tenant_id = full_key[0]
+            self._tenant_sizes[tenant_id] -= 1
+            if not self._tenant_sizes[tenant_id]:
+                del self._tenant_sizes[tenant_id]
+        return entry
+
+    def _expire(self, run_hook: bool = True) -> List[V]:
+        if self.ttl_seconds is None:
+            return []
+        deadline = time.monotonic() - self.ttl_seconds
+        expired: List[V] = []
+        while self._entries:
+            full_key, entry = next(iter(self._entries.items()))
+            if entry.last_access > deadline:
+                break
+            expired.append(self._remove(full_key).value)
+            self.evictions["ttl"] += 1
+        if run_hook and expired:
+            self._run_hook(expired)
+        return expired
+
+    def _run_hook(self, values: List[V]) -> None:
+        if self.on_evict is None:
+            return
+        for value in values:
+            try:
+                result = self.on_evict(value)
+                if inspect.isawaitable(result):
+                    self._schedule(self._await_hook(result))
+            except Exception as e:
+                logger.warning(f"Cache {self.name}: eviction hook failed: {e}")
+
+    async def _await_hook(self, result: Awaitable) -> None:
+        try:
+            await result
+        except Exception as e:
+            logger.warning(f"Cache {self.name}: eviction hook failed: {e}")
+
+    def _schedule(self, awaitable: Awaitable) -> None:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            asyncio.run(awaitable)
+            return
+        task = loop.create_task(awaitable)
+        # Keep a reference until done, the loop only holds weak ones
+        self._hook_tasks.add(task)
+        task.add_done_callback(self._hook_tasks.discard)
+
+
+def get_cache_stats() -> Dict[str, Dict[str, Any]]:
+    """Statistics of every bounded cache, by name"""
+    return {name: cache.stats() for name, cache in sorted(_caches.items())}
@@ -0,0 +1,127 @@
+"""
+Incremental state of in-progress conversations.
+
+Per conversation, Redis keeps the next transcript sequence number and a
+rolling window of the most recent messages (each serialized once, as JSON),
+so an update appends to the state instead of reloading the whole transcript.
+Missing state, e.g. on the first update after a restart or once expired, is
+rebuilt from the database through the loaders given by the caller, which are
+also used when Redis is unavailable.
+"""
+
+import logging
+from typing import Awaitable, Callable, List
+from uuid import UUID
+
+from injector import inject
+
+from app.cache.redis_connection_manager import RedisConnectionManager
+from app.core.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Reserve ARGV[1] sequence numbers, nil when the counter is not initialized
+_RESERVE_SEQUENCE = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return nil
+end
+local last = redis.call('INCRBY', KEYS[1], ARGV[1])
+redis.call('EXPIRE', KEYS[1], ARGV[2])
+return last
+"""
+
+# Append ARGV[3..] to the window, trim it to ARGV[1] entries and return it, nil when missing
+_APPEND_WINDOW = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return nil
+end
+redis.call('RPUSH', KEYS[1], unpack(ARGV, 3))
+redis.call('LTRIM', KEYS[1], -tonumber(ARGV[1]), -1)
+redis.call('EXPIRE', KEYS[1], ARGV[2])
+return redis.call('LRANGE', KEYS[1], 0, -1)
+"""
+
+
+@inject
+class ConversationStateCache:
+    """Running sequence counter and rolling transcript window per in-progress conversation"""
+
+    def __init__(self, redis_manager: RedisConnectionManager):
+        self.redis_manager = redis_manager
+
+    @property
+    def window_size(self) -> int:
+        return settings.IN_PROGRESS_TRANSCRIPT_WINDOW
+
+    def _key(self, conversation_id: UUID, name: str) -> str:
+        from app.core.tenant_scope import get_tenant_context
+
+        return f"tenant:{get_tenant_context()}:in_progress:{conversation_id}:{name}"
+
+    async def reserve_sequence(
+        self,
+        conversation_id: UUID,
+        count: int,
+        load_message_count: Callable[[], Awaitable[int]],
+    ) -> int:
+        """Reserve count consecutive sequence numbers, returns the first one"""
+        key = self._key(conversation_id, "sequence")
+        try:
+            redis = await self.redis_manager.get_redis()
+            last = await redis.eval(_RESERVE_SEQUENCE, 1, key, count, settings.IN_PROGRESS_STATE_TTL_SECONDS)
+            if last is None:
+                # Only the first concurrent caller initializes the counter
+                await redis.set(key, await load_message_count(), nx=True, ex=settings.IN_PROGRESS_STATE_TTL_SECONDS)
+                last = await redis.eval(_RESERVE_SEQUENCE, 1, key, count, settings.IN_PROGRESS_STATE_TTL_SECONDS)
+            return int(last) - count
+        except Exception as e:
+            logger.warning(f"Conversation state unavailable for {conversation_id}, counting messages: {e}")
+            return await load_message_count()
+
+    async def append_window(
+        self,
+        conversation_id: UUID,
+        messages: List[str],
+        load_window: Callable[[int], Awaitable[List[str]]],
+    ) -> List[str]:
+        """
+        Append serialized messages to the rolling window and return it, oldest first.
+        load_window(size) returns the latest size messages from the database,
+        including the appended ones.
+        """
+        key = self._key(conversation_id, "window")
+        ttl = settings.IN_PROGRESS_STATE_TTL_SECONDS
+        try:
+            redis = await self.redis_manager.get_redis()
+            if messages:
+                window = await redis.eval(_APPEND_WINDOW, 1, key, self.window_size, ttl, *messages)
+            else:
+                window = await redis.lrange(key, 0, -1) or None
+            if window is None:
+                window = await load_window(self.window_size)
+                async with redis.pipeline(transaction=True) as pipe:
+                    pipe.delete(key)
+                    if window:
+                        pipe.rpush(key, *window)
+                        pipe.expire(key, ttl)
+                    await pipe.execute()
+            return window
+        except Exception as e:
+            logger.warning(f"Conversation state unavailable for {conversation_id}, loading window: {e}")
+            return await load_window(self.window_size)
+
+    async def get_window(
+        self,
+        conversation_id: UUID,
+        load_window: Callable[[int], Awaitable[List[str]]],
+    ) -> List[str]:
+        """The rolling window, oldest first, see append_window"""
+        return await self.append_window(conversation_id, [], load_window)
+
+    async def clear(self, conversation_id: UUID) -> None:
+        """Drop the state, e.g. once the conversation is finalized"""
+        try:
+            redis = await self.redis_manager.get_redis()
+            await redis.delete(self._key(conversation_id, "sequence"), self._key(conversation_id, "window"))
+        except Exception as e:
+            logger.warning(f"Failed to clear conversation state for {conversation_id}: {e}")
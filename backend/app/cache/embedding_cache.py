@@ -0,0 +1,253 @@
+"""
+Shared embedding cache.
+
+Embeddings are content addressed: the key is the embedding model namespace
+(provider, model name, normalization, ...) plus the SHA-256 of the text, so
+re-uploaded documents, the delete-then-add update path and repeated queries
+reuse vectors instead of calling the model again.
+
+Two tiers:
+  - a bounded in-process LRU (by bytes), used by sync and async callers;
+  - an optional Redis tier shared by all workers (EMBEDDING_CACHE_REDIS).
+"""
+
+import base64
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from app.core.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+REDIS_KEY_PREFIX = "embedding"
+# Seconds the Redis tier is skipped after an error
+REDIS_RETRY_AFTER = 60
+
+
+class EmbeddingCache:
+    """Two-tier (in-process LRU + optional Redis) cache of embedding vectors"""
+
+    def __init__(
+        self,
+        max_bytes: int,
+        redis_enabled: bool = False,
+        redis_ttl: int = 7 * 86400,
+    ):
+        self.max_bytes = max_bytes
+        self.redis_enabled = redis_enabled
+        self.redis_ttl = redis_ttl
+        self._entries: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._redis = None
+        self._redis_disabled_until = 0.0
+        self.memory_hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(namespace: str, text: str) -> str:
+        return f"{namespace}:{hashlib.sha256(text.encode('utf-8')).hexdigest()}"
+
+    # ------------------------------------------------------------------ #
+    # In-process tier                                                     #
+    # ------------------------------------------------------------------ #
+    def get_local(self, keys: Sequence[str]) -> List[Optional[np.ndarray]]:
+        found: List[Optional[np.ndarray]] = []
+        with self._lock:
+            for key in keys:
+                vector = self._entries.get(key)
+                if vector is not None:
+                    self._entries.move_to_end(key)
+                found.append(vector)
+        return found
+
+    def put_local(self, keys: Sequence[str], vectors: Sequence[np.ndarray]) -> None:
+        with self._lock:
+            for key, vector in zip(keys, vectors):
+                previous = self._entries.pop(key, None)
+                if previous is not None:
+                    self._bytes -= previous.nbytes
+                self._entries[key] = vector
+                self._bytes += vector.nbytes
+            while self._bytes > self.max_bytes and self._entries:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.nbytes
+                self.evictions += 1
+
+    # ------------------------------------------------------------------ #
+    # Redis tier                                                          #
+    # ------------------------------------------------------------------ #
+    async def _get_redis(self):
+        if not self.redis_enabled or time.monotonic() < self._redis_disabled_until:
+            return None
+        if self._redis is None:
+            from app.cache.redis_connection_manager import RedisConnectionManager
+            from app.dependencies.injector import injector
+
+            manager = injector.get(RedisConnectionManager)
+            self._redis = await manager.get_redis()
+        return self._redis
+
+    def _redis_failed(self, e: Exception) -> None:
+        logger.warning(f"Embedding cache Redis tier unavailable, retrying in {REDIS_RETRY_AFTER}s: {e}")
+        self._redis = None
+        self._redis_disabled_until = time.monotonic() + REDIS_RETRY_AFTER
+
+    async def _get_remote(self, keys: List[str]) -> List[Optional[np.ndarray]]:
+        try:
+            redis = await self._get_redis()
+            if redis is None:
+                return [None] * len(keys)
+            values = await redis.mget([f"{REDIS_KEY_PREFIX}:{key}" for key in keys])
+        except Exception as e:
+            self._redis_failed(e)
+            return [None] * len(keys)
+        return [
+            np.frombuffer(base64.b64decode(value), dtype=np.float32) if value else None
+            for value in values
+        ]
+
+    async def _put_remote(self, keys: List[str], vectors: List[np.ndarray]) -> None:
+        try:
+            redis = await self._get_redis()
+            if redis is None:
+                return
+            async with redis.pipeline(transaction=False) as pipe:
+                for key, vector in zip(keys, vectors):
+                    pipe.set(
+                        f"{REDIS_KEY_PREFIX}:{key}",
+                        base64.b64encode(vector.tobytes()).decode("ascii"),
+                        ex=self.redis_ttl,
+                    )
+                await pipe.execute()
+        except Exception as e:
+            self._redis_failed(e)
+
+    # ------------------------------------------------------------------ #
+    # Embedding helpers                                                   #
+    # ------------------------------------------------------------------ #
+    async def embed(
+        self,
+        namespace: str,
+        texts: List[str],
+        embed: Callable[[List[str]], Awaitable[List[List[float]]]],
+    ) -> List[List[float]]:
+        """
+        Embed texts, calling ``embed`` only for the distinct texts not cached.
+
+        Returns an empty list if ``embed`` does not return one vector per text,
+        like the embedders do on failure.
+        """
+        if not texts:
+            return []
+        keys = [self.make_key(namespace, text) for text in texts]
+        vectors = self.get_local(keys)
+        hits = sum(vector is not None for vector in vectors)
+        self.memory_hits += hits
+
+        missing = self._missing(keys, vectors)
+        if missing:
+            remote = await self._get_remote(list(missing))
+            found_keys, found_vectors = [], []
+            for key, vector in zip(list(missing), remote):
+                if vector is not None:
+                    found_keys.append(key)
+                    found_vectors.append(vector)
+                    for index in missing.pop(key):
+                        vectors[index] = vector
+            self.redis_hits += len(found_keys)
+            self.put_local(found_keys, found_vectors)
+
+        if missing:
+            self.misses += len(missing)
+            missing_keys = list(missing)
+            computed = await embed([texts[missing[key][0]] for key in missing_keys])
+            if len(computed) != len(missing_keys):
+                return []
+            computed_vectors = [np.asarray(vector, dtype=np.float32) for vector in computed]
+            for key, vector in zip(missing_keys, computed_vectors):
+                for index in missing[key]:
+                    vectors[index] = vector
+            self.put_local(missing_keys, computed_vectors)
+            await self._put_remote(missing_keys, computed_vectors)
+
+        # Cached vectors are float32, return computed ones the same way
+        return [vector.tolist() for vector in vectors]
+
+    def encode_sync(
+        self,
+        namespace: str,
+        texts: List[str],
+        encode: Callable[[List[str]], np.ndarray],
+    ) -> np.ndarray:
+        """Sync variant of :meth:`embed` for numpy encoders, in-process tier only."""
+        keys = [self.make_key(namespace, text) for text in texts]
+        vectors = self.get_local(keys)
+        missing = self._missing(keys, vectors)
+        self.memory_hits += len(texts) - sum(len(indexes) for indexes in missing.values())
+
+        if missing:
+            self.misses += len(missing)
+            missing_keys = list(missing)
+            computed = np.asarray(
+                encode([texts[missing[key][0]] for key in missing_keys]), dtype=np.float32
+            )
+            for key, vector in zip(missing_keys, computed):
+                for index in missing[key]:
+                    vectors[index] = vector
+            self.put_local(missing_keys, list(computed))
+
+        if not vectors:
+            return np.zeros((0, 0), dtype=np.float32)
+        return np.vstack(vectors)
+
+    @staticmethod
+    def _missing(keys: List[str], vectors: List[Optional[np.ndarray]]) -> Dict[str, List[int]]:
+        """Positions of each missing key, in first-occurrence order."""
+        missing: Dict[str, List[int]] = {}
+        for index, (key, vector) in enumerate(zip(keys, vectors)):
+            if vector is None:
+                missing.setdefault(key, []).append(index)
+        return missing
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.memory_hits + self.redis_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "memory_hits": self.memory_hits,
+            "redis_hits": self.redis_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": (self.memory_hits + self.redis_hits) / lookups if lookups else 0.0,
+            "redis_enabled": self.redis_enabled,
+        }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+
+_embedding_cache: Optional[EmbeddingCache] = None
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    """Process-wide embedding cache configured from settings"""
+    global _embedding_cache
+    if _embedding_cache is None:
+        _embedding_cache = EmbeddingCache(
+            max_bytes=settings.EMBEDDING_CACHE_MAX_MB * 1024 * 1024,
+            redis_enabled=settings.EMBEDDING_CACHE_REDIS,
+            redis_ttl=settings.EMBEDDING_CACHE_REDIS_TTL_SECONDS,
+        )
+    return _embedding_cache
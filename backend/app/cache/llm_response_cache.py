@@ -0,0 +1,345 @@
+"""
+Response cache of the LLM calls made by the analysis services.
+
+Re-running an analysis on the same transcript (retries, Zendesk re-syncs,
+reprocessing jobs) sends the same prompt again. Two levels:
+  - exact: keyed by the hash of the model configuration, of the prompt and
+    of the temperature; in-process (per tenant) and optionally shared by
+    all workers through Redis (LLM_RESPONSE_CACHE_REDIS);
+  - semantic (LLM_RESPONSE_CACHE_SEMANTIC): prompts are embedded with the
+    configured embedder, a prompt at least LLM_RESPONSE_CACHE_SIMILARITY
+    similar (cosine) to a cached prompt of the same model configuration
+    gets its response. Embedding models only read the start of long texts,
+    so only prompts up to LLM_RESPONSE_CACHE_SEMANTIC_MAX_CHARS take part.
+
+Entries expire LLM_RESPONSE_CACHE_TTL_SECONDS after being stored. Callers
+store a response once they have validated it (parsed its JSON...), so a
+malformed answer is not served again. Analysts with cache_responses = 0
+bypass the cache.
+"""
+
+import hashlib
+import json
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from app.cache.bounded_cache import BoundedCache
+from app.core.config.settings import settings
+from app.core.tenant_scope import get_tenant_context
+
+logger = logging.getLogger(__name__)
+
+REDIS_KEY_PREFIX = "llm_response"
+# Seconds the Redis tier is skipped after an error
+REDIS_RETRY_AFTER = 60
+# Connection data that does not change the model's answers
+_IGNORED_CONNECTION_KEYS = {"api_key", "masked_api_key", "organization"}
+
+
+def model_namespace(provider: str, model: str, connection_data: Optional[Dict[str, Any]] = None) -> str:
+    """Hash of a model configuration, secrets excluded"""
+    config = {
+        "provider": (provider or "").lower(),
+        "model": model,
+        "connection_data": {
+            key: value for key, value in (connection_data or {}).items() if key not in _IGNORED_CONNECTION_KEYS
+        },
+    }
+    return hashlib.sha256(json.dumps(config, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:16]
+
+
+def prompt_text(messages: Sequence[Any]) -> str:
+    """Prompt messages (LangChain messages or plain strings) as one text"""
+    return "\n".join(
+        f"{getattr(message, 'type', 'human')}: {getattr(message, 'content', message)}" for message in messages
+    )
+
+
+@dataclass(frozen=True)
+class LlmCacheKey:
+    namespace: str  # model_namespace()
+    prompt: str
+    temperature: float = 0.0
+
+    @property
+    def digest(self) -> str:
+        return hashlib.sha256(f"{self.namespace}:{self.temperature}:{self.prompt}".encode("utf-8")).hexdigest()
+
+
+def analyst_cache_key(llm_analyst: Any, messages: Sequence[Any]) -> Optional[LlmCacheKey]:
+    """Cache key of a call made for an LLM analyst, None when its responses are not cached"""
+    if not settings.LLM_RESPONSE_CACHE_ENABLED or getattr(llm_analyst, "cache_responses", 1) == 0:
+        return None
+    provider = llm_analyst.llm_provider
+    connection_data = provider.connection_data or {}
+    return LlmCacheKey(
+        namespace=model_namespace(provider.llm_model_provider, provider.llm_model, connection_data),
+        prompt=prompt_text(messages),
+        temperature=float(connection_data.get("temperature", 0) or 0),
+    )
+
+
+class _SemanticIndex:
+    """Normalized prompt embeddings of one model configuration and their responses"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.vectors: Optional[np.ndarray] = None
+        self.responses: List[str] = []
+        self.stored_at: List[float] = []
+
+    def add(self, vector: np.ndarray, response: str, now: float) -> None:
+        row = vector.reshape(1, -1)
+        self.vectors = row if self.vectors is None else np.vstack([self.vectors, row])
+        self.responses.append(response)
+        self.stored_at.append(now)
+        if len(self.responses) > self.max_entries:
+            # Oldest first
+            drop = len(self.responses) - self.max_entries
+            self.vectors = self.vectors[drop:]
+            self.responses = self.responses[drop:]
+            self.stored_at = self.stored_at[drop:]
+
+    def search(self, vector: np.ndarray, threshold: float, not_before: float) -> Optional[str]:
+        if self.vectors is None or self.vectors.shape[1] != vector.shape[0]:
+            return None
+        scores = self.vectors @ vector
+        scores[np.asarray(self.stored_at) < not_before] = -1.0
+        best = int(np.argmax(scores))
+        return self.responses[best] if scores[best] >= threshold else None
+
+
+def _normalized(vector: Sequence[float]) -> Optional[np.ndarray]:
+    array = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(array)
+    return array / norm if array.size and norm else None
+
+
+class LlmResponseCache:
+    """Exact (in-process + optional Redis) and optional semantic cache of LLM responses"""
+
+    def __init__(
+        self,
+        ttl_seconds: float,
+        max_entries: int,
+        max_entries_per_tenant: Optional[int] = None,
+        redis_enabled: bool = False,
+        semantic_enabled: bool = False,
+        similarity: float = 0.97,
+        semantic_max_chars: int = 500,
+        semantic_max_entries: int = 1000,
+        embedder: Any = None,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.redis_enabled = redis_enabled
+        self.semantic_enabled = semantic_enabled
+        self.similarity = similarity
+        self.semantic_max_chars = semantic_max_chars
+        self.semantic_max_entries = semantic_max_entries
+        self._embedder = embedder
+        # (response, stored at)
+        self._exact: BoundedCache[tuple] = BoundedCache(
+            "llm_responses", max_size=max_entries, max_size_per_tenant=max_entries_per_tenant
+        )
+        self._semantic: BoundedCache[_SemanticIndex] = BoundedCache("llm_response_index", max_size=1000)
+        self._redis = None
+        self._redis_disabled_until = 0.0
+        self.memory_hits = 0
+        self.redis_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.stores = 0
+
+    # ------------------------------------------------------------------ #
+    # Exact level, in-process                                             #
+    # ------------------------------------------------------------------ #
+    def get_local(self, key: LlmCacheKey) -> Optional[str]:
+        entry = self._exact.get(key.digest)
+        if entry is None:
+            return None
+        response, stored_at = entry
+        if time.time() - stored_at > self.ttl_seconds:
+            self._exact.pop(key.digest)
+            return None
+        return response
+
+    def put_local(self, key: LlmCacheKey, response: str, stored_at: Optional[float] = None) -> None:
+        self._exact.put(key.digest, (response, stored_at or time.time()))
+
+    def lookup_sync(self, key: Optional[LlmCacheKey]) -> Optional[str]:
+        """Sync lookup for sync callers, in-process exact level only"""
+        if key is None:
+            return None
+        response = self.get_local(key)
+        if response is not None:
+            self.memory_hits += 1
+        else:
+            self.misses += 1
+        return response
+
+    def store_sync(self, key: Optional[LlmCacheKey], response: str) -> None:
+        if key is not None:
+            self.stores += 1
+            self.put_local(key, response)
+
+    # ------------------------------------------------------------------ #
+    # Exact level, Redis                                                  #
+    # ------------------------------------------------------------------ #
+    async def _get_redis(self):
+        if not self.redis_enabled or time.monotonic() < self._redis_disabled_until:
+            return None
+        if self._redis is None:
+            from app.cache.redis_connection_manager import RedisConnectionManager
+            from app.dependencies.injector import injector
+
+            manager = injector.get(RedisConnectionManager)
+            self._redis = await manager.get_redis()
+        return self._redis
+
+    def _redis_failed(self, e: Exception) -> None:
+        logger.warning(f"LLM response cache Redis tier unavailable, retrying in {REDIS_RETRY_AFTER}s: {e}")
+        self._redis = None
+        self._redis_disabled_until = time.monotonic() + REDIS_RETRY_AFTER
+
+    @staticmethod
+    def _redis_key(key: LlmCacheKey) -> str:
+        return f"{REDIS_KEY_PREFIX}:{get_tenant_context()}:{key.digest}"
+
+    async def _get_remote(self, key: LlmCacheKey) -> Optional[str]:
+        try:
+            redis = await self._get_redis()
+            if redis is None:
+                return None
+            value = await redis.get(self._redis_key(key))
+        except Exception as e:
+            self._redis_failed(e)
+            return None
+        if value is None:
+            return None
+        return value.decode("utf-8") if isinstance(value, bytes) else value
+
+    async def _put_remote(self, key: LlmCacheKey, response: str) -> None:
+        try:
+            redis = await self._get_redis()
+            if redis is not None:
+                await redis.set(self._redis_key(key), response, ex=int(self.ttl_seconds))
+        except Exception as e:
+            self._redis_failed(e)
+
+    # ------------------------------------------------------------------ #
+    # Semantic level                                                      #
+    # ------------------------------------------------------------------ #
+    async def _get_embedder(self):
+        if self._embedder is None:
+            from app.modules.data.providers.vector.embedding import EmbeddingConfig
+
+            embedder = EmbeddingConfig().get()
+            await embedder.initialize()
+            self._embedder = embedder
+        return self._embedder
+
+    def _semantic_applies(self, key: LlmCacheKey) -> bool:
+        return self.semantic_enabled and len(key.prompt) <= self.semantic_max_chars
+
+    async def _embed(self, key: LlmCacheKey) -> Optional[np.ndarray]:
+        try:
+            embedder = await self._get_embedder()
+            return _normalized(await embedder.embed_query(key.prompt))
+        except Exception as e:
+            logger.warning(f"LLM response cache could not embed the prompt, semantic level skipped: {e}")
+            return None
+
+    async def _get_semantic(self, key: LlmCacheKey) -> Optional[str]:
+        index = self._semantic.get(key.namespace)
+        if index is None:
+            return None
+        vector = await self._embed(key)
+        if vector is None:
+            return None
+        return index.search(vector, self.similarity, time.time() - self.ttl_seconds)
+
+    async def _put_semantic(self, key: LlmCacheKey, response: str) -> None:
+        vector = await self._embed(key)
+        if vector is None:
+            return
+        index = self._semantic.get(key.namespace)
+        if index is None:
+            index = _SemanticIndex(self.semantic_max_entries)
+            self._semantic.put(key.namespace, index)
+        index.add(vector, response, time.time())
+
+    # ------------------------------------------------------------------ #
+    # Lookup and store                                                    #
+    # ------------------------------------------------------------------ #
+    async def lookup(self, key: Optional[LlmCacheKey]) -> Optional[str]:
+        """Cached response of the prompt, or of a near-duplicate one, None on a miss (or no key)"""
+        if key is None:
+            return None
+        response = self.get_local(key)
+        if response is not None:
+            self.memory_hits += 1
+            return response
+
+        response = await self._get_remote(key)
+        if response is not None:
+            self.redis_hits += 1
+            self.put_local(key, response)
+            return response
+
+        if self._semantic_applies(key):
+            response = await self._get_semantic(key)
+            if response is not None:
+                self.semantic_hits += 1
+                return response
+
+        self.misses += 1
+        return None
+
+    async def store(self, key: Optional[LlmCacheKey], response: str) -> None:
+        """Cache a validated response"""
+        if key is None:
+            return
+        self.stores += 1
+        self.put_local(key, response)
+        await self._put_remote(key, response)
+        if self._semantic_applies(key):
+            await self._put_semantic(key, response)
+
+    def stats(self) -> Dict[str, Any]:
+        hits = self.memory_hits + self.redis_hits + self.semantic_hits
+        lookups = hits + self.misses
+        return {
+            "entries": len(self._exact),
+            "memory_hits": self.memory_hits,
+            "redis_hits": self.redis_hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "stores": self.stores,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "ttl_seconds": self.ttl_seconds,
+            "redis_enabled": self.redis_enabled,
+            "semantic_enabled": self.semantic_enabled,
+        }
+
+
+_llm_response_cache: Optional[LlmResponseCache] = None
+
+
+def get_llm_response_cache() -> LlmResponseCache:
+    """Process-wide LLM response cache configured from settings"""
+    global _llm_response_cache
+    if _llm_response_cache is None:
+        _llm_response_cache = LlmResponseCache(
+            ttl_seconds=settings.LLM_RESPONSE_CACHE_TTL_SECONDS,
+            max_entries=settings.LLM_RESPONSE_CACHE_MAX_ENTRIES,
+            max_entries_per_tenant=settings.LLM_RESPONSE_CACHE_MAX_ENTRIES_PER_TENANT,
+            redis_enabled=settings.LLM_RESPONSE_CACHE_REDIS,
+            semantic_enabled=settings.LLM_RESPONSE_CACHE_SEMANTIC,
+            similarity=settings.LLM_RESPONSE_CACHE_SIMILARITY,
+            semantic_max_chars=settings.LLM_RESPONSE_CACHE_SEMANTIC_MAX_CHARS,
+        )
+    return _llm_response_cache
@@ -1,6 +1,6 @@
 import logging
 from inspect import signature
-from typing import Any, Callable, cast
+from typing import Any, Callable, Dict, List, cast
 from uuid import UUID
 
 from redis.asyncio import Redis
@@ -10,6 +10,9 @@ from starlette.datastructures import State
 
 logger = logging.getLogger(__name__)
 
+# In-process caches derived from a Redis cached value, dropped along with it
+_invalidation_listeners: Dict[str, List[Callable[[Any], None]]] = {}
+
 
 async def init_fastapi_cache_with_redis(app, settings):
     # ── Redis pool & cache initialisation ─────────────────
@@ -77,6 +80,14 @@ def make_key_builder(param: str | int = 1) -> Callable[[Any, str, Any], str]:
     return _builder
 
 
+def on_invalidate(namespace: str, listener: Callable[[Any], None]) -> None:
+    """
+    Call listener with the value whenever an entry of namespace is invalidated,
+    e.g. to drop in-process objects built from the cached value.
+    """
+    _invalidation_listeners.setdefault(namespace, []).append(listener)
+
+
 async def invalidate_cache(namespace: str, value: Any) -> bool:
     """
     Invalidate a specific cache entry for the current tenant.
@@ -113,6 +124,12 @@ async def invalidate_cache(namespace: str, value: Any) -> bool:
     # The prefix "auth" is set in init_fastapi_cache_with_redis
     cache_key = f"auth:{namespace}:{tenant_id}:{value}"
 
+    for listener in _invalidation_listeners.get(namespace, []):
+        try:
+            listener(value)
+        except Exception as e:
+            logger.error(f"Invalidation listener for {namespace} failed: {e}")
+
     try:
         # Get the Redis backend from FastAPICache
         backend = FastAPICache.get_backend()
@@ -20,6 +20,9 @@ class ProjectSettings(BaseSettings):
     # Memory efficiency settings for Redis conversations
     CONVERSATION_MAX_MEMORY_MESSAGES: int = 50  # Max messages kept in memory
     CONVERSATION_REDIS_EXPIRY_DAYS: int = 30  # Redis data expiration
+    CONVERSATION_REDIS_MAX_MESSAGES: int = 500  # Redis message lists are trimmed to this length
+    CONVERSATION_HISTORY_TOKEN_BUDGET: Optional[int] = None  # Summarize older turns to fit LLM history in this budget
+    CONVERSATION_SUMMARY_MAX_TOKENS: int = 500  # Cap of the rolling summary of older turns
     # Redis connection pool settings
     REDIS_MAX_CONNECTIONS: int = 20  # Max connections in pool
     REDIS_SOCKET_TIMEOUT: int = 5  # Socket timeout in seconds
@@ -44,6 +47,111 @@ class ProjectSettings(BaseSettings):
     )
     WHISPER_TRANSCRIBE_SERVICE: str = "http://localhost:8001/transcribe"
 
+    # === Workflow Engine ===
+    WORKFLOW_MAX_CONCURRENCY: int = 16  # Max nodes executed in parallel per workflow run
+
+    # === WebSockets ===
+    WEBSOCKET_SEND_QUEUE_SIZE: int = 256  # Outbound messages buffered per connection
+    # Full queue policy: "drop_oldest", "coalesce" (replace the queued message of the same type) or "disconnect"
+    WEBSOCKET_SLOW_CONSUMER_POLICY: str = "drop_oldest"
+    WEBSOCKET_SEND_TIMEOUT_SECONDS: float = 10.0  # A send stuck longer disconnects the client
+    WEBSOCKET_PUBLISH_BATCH_MS: int = 5  # Redis publishes are batched over this window
+
+    # === In-progress Conversations ===
+    IN_PROGRESS_TRANSCRIPT_WINDOW: int = 40  # Recent messages kept for incremental hostility analysis
+    IN_PROGRESS_STATE_TTL_SECONDS: int = 86400  # Expiry of the cached conversation state in Redis
+    IN_PROGRESS_ANALYSIS_BACKGROUND: bool = True  # Debounced background tone analysis, off runs it per update
+    IN_PROGRESS_ANALYSIS_DEBOUNCE_SECONDS: float = 3.0  # Wait for more messages before analysing
+    IN_PROGRESS_ANALYSIS_MAX_MESSAGES: int = 5  # ...unless this many new messages are pending
+    IN_PROGRESS_ANALYSIS_CONCURRENCY: int = 4  # Analyses running at once per process
+    IN_PROGRESS_STREAM_AGENT_TOKENS: bool = True  # Broadcast "message_delta" events while the agent answers
+
+    # === Embedding Cache ===
+    EMBEDDING_CACHE_MAX_MB: int = 256  # In-process LRU size
+    EMBEDDING_CACHE_REDIS: bool = False  # Share cached embeddings across workers through Redis
+    EMBEDDING_CACHE_REDIS_TTL_SECONDS: int = 7 * 86400
+
+    # === In-process Caches ===
+    # Registries of long-lived objects, bounded in total and per tenant, evicted LRU and after idling
+    WORKFLOW_ENGINE_CACHE_SIZE: int = 64
+    CONVERSATION_MEMORY_CACHE_SIZE: int = 10000
+    CONVERSATION_MEMORY_CACHE_PER_TENANT: int = 2000
+    CONVERSATION_MEMORY_CACHE_TTL_SECONDS: int = 3600
+    RAG_SERVICE_CACHE_SIZE: int = 256
+    RAG_SERVICE_CACHE_PER_TENANT: int = 64
+    RAG_SERVICE_CACHE_TTL_SECONDS: int = 6 * 3600
+    THREAD_RAG_CACHE_SIZE: int = 1000
+    THREAD_RAG_CACHE_PER_TENANT: int = 200
+    THREAD_RAG_CACHE_TTL_SECONDS: int = 3600
+    COMPILED_AGENT_CACHE_SIZE: int = 500  # Agents with their workflow built, ready to execute
+    COMPILED_AGENT_CACHE_PER_TENANT: int = 100
+
+    # === Tenant Tasks ===
+    # Periodic tasks run for the master database and every tenant
+    TENANT_TASK_CONCURRENCY: int = 4  # Tenants processed at once, 1 runs them one after another
+    TENANT_TASK_TIMEOUT_SECONDS: Optional[float] = 180.0  # Per tenant, None disables it
+    TENANT_TASK_FAN_OUT: bool = False  # Run each tenant as its own Celery subtask instead
+
+    # === Ingestion Pipeline ===
+    INGEST_QUEUE_SIZE: int = 64  # Bounded queue between pipeline stages (documents or batches)
+    INGEST_EXTRACT_WORKERS: int = 4  # Concurrent download/text extraction workers
+    INGEST_CHUNK_WORKERS: int = 2  # Chunking processes, 0 chunks in a thread instead
+    INGEST_EMBED_THREADS: int = 1  # Threads dedicated to local embedding models
+    INGEST_UPSERT_BATCH_SIZE: int = 1000  # Vectors per bulk upsert
+    INGEST_BATCH_FLUSH_MS: int = 50  # Wait for more chunks before embedding a partial batch
+
+    # === Document Extraction ===
+    EXTRACTION_WORKERS: int = 2  # Extraction processes, 0 extracts in a thread instead
+    EXTRACTION_PDF_PAGES_PER_TASK: int = 20  # Longer PDFs are split into page ranges extracted in parallel
+    EXTRACTION_CACHE_MAX_MB: int = 128  # In-process cache of extracted text, by content hash
+    EXTRACTION_CACHE_REDIS: bool = False  # Share extracted text across workers through Redis
+    EXTRACTION_CACHE_REDIS_TTL_SECONDS: int = 7 * 86400
+
+    # === Audio Recordings ===
+    AUDIO_CHUNK_SECONDS: int = 600  # Longer recordings are transcribed in chunks cut at silences
+    AUDIO_MIN_SILENCE_MS: int = 700
+    AUDIO_SILENCE_THRESH_OFFSET_DB: int = 16  # Silence is this far below the average loudness
+    AUDIO_DIARIZATION_BOUNDARIES: bool = False  # Cut at speaker turns (pyannote) instead of silences
+    AUDIO_TRANSCRIBE_CONCURRENCY: int = 4  # Chunks transcribed at once
+    AUDIO_SEPARATION_WINDOW_SEGMENTS: int = 80  # Transcript segments per speaker separation call
+    AUDIO_SEPARATION_OVERLAP_SEGMENTS: int = 10  # ...repeated from the previous window as context
+    AUDIO_SEPARATION_CONCURRENCY: int = 4
+    AUDIO_KPI_ANALYSIS_BACKGROUND: bool = False  # Return once the transcript is saved, analyse afterwards
+
+    # === ML Inference ===
+    ML_INFERENCE_EXECUTOR: str = "thread"  # "thread" or "process" (workers load the model from its pickle file)
+    ML_INFERENCE_WORKERS: int = 4
+    ML_INFERENCE_BATCH_WAIT_MS: float = 5  # Wait for concurrent requests to join a batch
+    ML_INFERENCE_MAX_BATCH_ROWS: int = 256
+    ML_INFERENCE_MODEL_CONCURRENCY: int = 2  # Batches of one model predicted at once
+
+    # === LLM Gateway ===
+    LLM_GATEWAY_ENABLED: bool = True  # Route LLM calls through the gateway (admission, deduplication, retries)
+    LLM_GATEWAY_REQUESTS_PER_MINUTE: int = 0  # Per provider, 0 = unlimited
+    LLM_GATEWAY_TOKENS_PER_MINUTE: int = 0
+    LLM_GATEWAY_TENANT_REQUESTS_PER_MINUTE: int = 0  # Per tenant and provider
+    LLM_GATEWAY_TENANT_TOKENS_PER_MINUTE: int = 0
+    LLM_GATEWAY_MAX_CONCURRENCY: int = 16  # Calls in flight per provider
+    LLM_GATEWAY_DEDUPLICATE: bool = True  # Identical in-flight prompts share one call
+    LLM_GATEWAY_MAX_RETRIES: int = 4
+    LLM_GATEWAY_BACKOFF_BASE_SECONDS: float = 1.0
+    LLM_GATEWAY_BACKOFF_MAX_SECONDS: float = 30.0
+
+    # === LLM Response Cache ===
+    LLM_RESPONSE_CACHE_ENABLED: bool = True  # Reuse validated responses of the analysis services
+    LLM_RESPONSE_CACHE_TTL_SECONDS: int = 7 * 86400
+    LLM_RESPONSE_CACHE_MAX_ENTRIES: int = 5000  # In-process entries
+    LLM_RESPONSE_CACHE_MAX_ENTRIES_PER_TENANT: int = 1000
+    LLM_RESPONSE_CACHE_REDIS: bool = False  # Share cached responses across workers through Redis
+    LLM_RESPONSE_CACHE_SEMANTIC: bool = False  # Also reuse responses of near-duplicate prompts
+    LLM_RESPONSE_CACHE_SIMILARITY: float = 0.97  # Cosine similarity of near-duplicate prompts
+    LLM_RESPONSE_CACHE_SEMANTIC_MAX_CHARS: int = 500  # Longer prompts (transcripts) are only matched exactly
+
+    # === KB Batch Summaries ===
+    KB_BATCH_PAGE_SIZE: int = 500  # Blobs listed per page, the checkpoint advances page by page
+    KB_BATCH_DOWNLOAD_CONCURRENCY: int = 8
+    KB_BATCH_SUMMARY_CONCURRENCY: int = 4  # Concurrent LLM summaries
+
     # === File Storage ===
     UPLOAD_FOLDER: str = str(DATA_VOLUME / "uploads")
     AGENT_FOLDER: str = str(DATA_VOLUME / "uploads/agents")
@@ -71,6 +179,10 @@ class ProjectSettings(BaseSettings):
     DB_MAX_OVERFLOW: int = 20
     DB_POOL_TIMEOUT: int = 30  # seconds
     DB_POOL_RECYCLE: int = 1800  # seconds
+    # Pools of background task engines, per tenant and worker process, kept small as
+    # a worker runs a few tenants at once (TENANT_TASK_CONCURRENCY)
+    BACKGROUND_DB_POOL_SIZE: int = 2
+    BACKGROUND_DB_MAX_OVERFLOW: int = 4
 
     # === Multi-Tenancy ===
     MULTI_TENANT_ENABLED: bool = False
@@ -15,6 +15,23 @@ def transcript_messages_to_json(
     """
     Convert TranscriptMessageModel instances to JSON string (for backward compatibility)
 
+    Args:
+        messages: List of TranscriptMessageModel instances
+        exclude_fields: Set of field names to exclude from the message level
+        exclude_feedback_fields: Set of field names to exclude from feedback objects
+    """
+    transcript_data = transcript_messages_to_segments(messages, exclude_fields, exclude_feedback_fields)
+    return json.dumps(transcript_data, ensure_ascii=False)
+
+
+def transcript_messages_to_segments(
+        messages: List[TranscriptMessageModel],
+        exclude_fields: Optional[Set[str]] = None,
+        exclude_feedback_fields: Optional[Set[str]] = None
+        ) -> List[dict]:
+    """
+    Convert TranscriptMessageModel instances to transcript segment dicts
+
     Args:
         messages: List of TranscriptMessageModel instances
         exclude_fields: Set of field names to exclude from the message level
@@ -65,7 +82,7 @@ def transcript_messages_to_json(
 
         transcript_data.append(segment)
 
-    return json.dumps(transcript_data, ensure_ascii=False)
+    return transcript_data
 
 
 def schema_to_transcript_message(
@@ -5,7 +5,7 @@ from sqlalchemy.ext.asyncio import (
     create_async_engine,
     AsyncEngine,
 )
-from sqlalchemy import NullPool, create_engine, text
+from sqlalchemy import create_engine, text
 from app.core.config.settings import settings
 from app.db.base import Base
 
@@ -41,12 +41,15 @@ class MultiTenantSessionManager:
                     )
 
             if settings.BACKGROUND_TASK:
-                # Use NullPool for Celery - no connection pooling
-                logger.info(f"🔧 Creating NullPool engine for Celery, tenant: {tenant}")
+                # Pooled per worker process, tasks share the process' event loop (app.tasks.runner)
+                logger.info(f"🔧 Creating pooled engine for Celery, tenant: {tenant}")
                 self._engines[ktenant] = create_async_engine(
                         tenant_url,
                         echo=False,
-                        poolclass=NullPool,  # Creates fresh connection each time
+                        pool_size=settings.BACKGROUND_DB_POOL_SIZE,
+                        max_overflow=settings.BACKGROUND_DB_MAX_OVERFLOW,
+                        pool_timeout=settings.DB_POOL_TIMEOUT,
+                        pool_recycle=settings.DB_POOL_RECYCLE,
                         pool_pre_ping=True,
                         )
 
@@ -81,16 +84,18 @@ class MultiTenantSessionManager:
     def get_tenant_session_factory(self, tenant: str = "master") -> async_sessionmaker:
         """Get or create session factory for a specific tenant"""
         logger.debug(f"get_tenant_session_factory called with tenant: {tenant}")
+        # Keyed like the engines, so background tasks get sessions of the background engine
+        ktenant = tenant if not settings.BACKGROUND_TASK else tenant + "_background"
 
-        if tenant not in self._session_factories:
+        if ktenant not in self._session_factories:
             engine = self.get_tenant_engine(tenant)
-            self._session_factories[tenant] = async_sessionmaker(
+            self._session_factories[ktenant] = async_sessionmaker(
                 bind=engine,
                 expire_on_commit=False,
             )
             logger.info(f"Created session factory for tenant: {tenant}")
 
-        return self._session_factories[tenant]
+        return self._session_factories[ktenant]
 
     async def create_tenant_database(self, tenant: str = "master") -> bool:
         """Create a new tenant database with the same schema as master using Alembic (async version)"""
@@ -210,9 +215,21 @@ class MultiTenantSessionManager:
         """Close all database connections"""
         for engine in self._engines.values():
             await engine.dispose()
+        self._engines.clear()
+        self._session_factories.clear()
 
         logger.info("All database connections closed")
 
+    def reset_after_fork(self):
+        """
+        Forget the engines inherited from the parent process, without closing
+        their connections, which the parent still uses.
+        """
+        for engine in self._engines.values():
+            engine.sync_engine.dispose(close=False)
+        self._engines.clear()
+        self._session_factories.clear()
+
     async def cold_start_db(
         self,
         tenant: str = "master",
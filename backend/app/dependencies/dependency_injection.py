@@ -26,6 +26,7 @@ from app.services.gpt_kpi_analyzer import GptKpiAnalyzer
 from app.services.feature_flag import FeatureFlagService
 from app.services.datasources import DataSourceService
 from app.services.conversations import ConversationService
+from app.services.in_progress_analysis import InProgressAnalysisScheduler
 from app.services.conversation_analysis import ConversationAnalysisService
 from app.services.auth import AuthService
 from app.services.audit_logs import AuditLogService
@@ -59,6 +60,7 @@ from app.repositories.agent import AgentRepository
 from app.db.multi_tenant_session import multi_tenant_manager
 from app.modules.websockets.socket_connection_manager import SocketConnectionManager
 from app.modules.workflow.llm.provider import LLMProvider
+from app.cache.conversation_state import ConversationStateCache
 from app.cache.redis_connection_manager import RedisConnectionManager
 from app.modules.data.manager import AgentRAGServiceManager
 from app.core.config.settings import settings
@@ -227,6 +229,8 @@ class Dependencies(Module):
         # Note: SocketConnectionManager and RedisConnectionManager use @provider methods (lines 82-104)
         # so they don't need binder.bind() here - providers handle the singleton scope automatically
         binder.bind(RequestScopeFactory, scope=singleton)
+        binder.bind(ConversationStateCache, scope=singleton)
+        binder.bind(InProgressAnalysisScheduler, scope=singleton)
 
         binder.bind(logging.Logger, to=lambda: logging.getLogger(), scope=request_scope)
 
@@ -18,6 +18,9 @@ from .providers.models import DataProviderInterface
 
 from .service import AgentRAGService
 
+# Bulk ingestion
+from .ingestion import IngestDocument, IngestionPipeline
+
 # Singleton manager
 from .manager import AgentRAGServiceManager
 
@@ -27,6 +30,9 @@ __all__ = [
     "AgentRAGService",
     # Tenant-aware singleton manager
     "AgentRAGServiceManager",
+    # Bulk ingestion
+    "IngestionPipeline",
+    "IngestDocument",
 
     # Provider interfaces
     "BaseDataProvider",
@@ -0,0 +1,440 @@
+"""
+Streaming ingestion pipeline for bulk knowledge base loads
+
+Documents flow through bounded queues, so a slow stage applies backpressure to
+the stages before it instead of buffering a whole import in memory:
+
+    extract  ->  chunk  ->  embed  ->  upsert
+    threads      processes  micro-batches of the embedder's batch_size
+                            (embedding runs in a dedicated thread)
+                                       bulk add_vectors
+
+The embed stage batches chunks across documents, so the model receives full
+batches even when documents are small. Providers other than the vector provider
+(LEGRA, LightRAG, plain) receive each extracted document as before.
+"""
+
+import asyncio
+import dataclasses
+import logging
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterable, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+from app.core.config.settings import settings
+
+from .providers import VectorProvider
+from .providers.vector.chunking.base import BaseChunker, Chunk, ChunkConfig
+from .service import AgentRAGService
+
+logger = logging.getLogger(__name__)
+
+STAGES = ("extract", "chunk", "embed", "upsert")
+
+# End of input marker passed down the stage queues
+_DONE = object()
+
+
+@dataclass
+class IngestDocument:
+    """A document to ingest, given either its content or a blocking extractor"""
+    doc_id: str
+    content: Optional[str] = None
+    metadata: Dict[str, Any] = field(default_factory=dict)
+    # Called in an extraction thread when content is None (download, parsing, OCR...)
+    extract: Optional[Callable[[], str]] = None
+
+
+@dataclass
+class StageStats:
+    """Throughput counters of a pipeline stage"""
+    items: int = 0
+    batches: int = 0
+    errors: int = 0
+    busy_seconds: float = 0.0
+    max_queue_depth: int = 0
+
+    def as_dict(self, elapsed: float) -> Dict[str, Any]:
+        return {
+            "items": self.items,
+            "batches": self.batches,
+            "errors": self.errors,
+            "busy_seconds": round(self.busy_seconds, 3),
+            "items_per_second": round(self.items / elapsed, 2) if elapsed else 0.0,
+            "utilization": round(min(self.busy_seconds / elapsed, 1.0), 3) if elapsed else 0.0,
+            "max_queue_depth": self.max_queue_depth,
+        }
+
+
+@dataclass
+class _DocState:
+    document: IngestDocument
+    # Extracted text, only held between extraction and chunking
+    content: str = ""
+    results: Dict[str, bool] = field(default_factory=dict)
+    # Chunks embedded but not yet written to the vector database
+    pending: int = 0
+    skipped: bool = False
+    error: Optional[str] = None
+
+
+# ---------------------------------------------------------------------- #
+# Chunking processes                                                      #
+# ---------------------------------------------------------------------- #
+_chunk_pool: Optional[ProcessPoolExecutor] = None
+# Chunkers built in a chunking process, by configuration
+_chunkers: Dict[str, BaseChunker] = {}
+
+
+def _chunk_text(config: ChunkConfig, text: str, metadata: Dict[str, Any]) -> List[Chunk]:
+    """Runs in a chunking process"""
+    key = config.model_dump_json()
+    chunker = _chunkers.get(key)
+    if chunker is None:
+        chunker = _chunkers[key] = config.get()
+    return chunker.chunk_text(text, metadata)
+
+
+def _get_chunk_pool(workers: int) -> Optional[ProcessPoolExecutor]:
+    """Process pool for chunking, None when chunking must stay in-process"""
+    global _chunk_pool
+    # Celery prefork workers are daemonic and may not start child processes
+    if workers <= 0 or multiprocessing.current_process().daemon:
+        return None
+    if _chunk_pool is None:
+        _chunk_pool = ProcessPoolExecutor(max_workers=workers)
+    return _chunk_pool
+
+
+def _reset_chunk_pool() -> None:
+    global _chunk_pool
+    if _chunk_pool is not None:
+        _chunk_pool.shutdown(wait=False, cancel_futures=True)
+    _chunk_pool = None
+
+
+class IngestionPipeline:
+    """
+    Loads many documents into one knowledge base through the staged pipeline.
+
+    A pipeline instance runs once; create one per bulk load.
+    """
+
+    def __init__(
+        self,
+        service: AgentRAGService,
+        queue_size: Optional[int] = None,
+        extract_workers: Optional[int] = None,
+        chunk_workers: Optional[int] = None,
+        upsert_batch_size: Optional[int] = None,
+        flush_ms: Optional[int] = None,
+    ):
+        self.service = service
+        self.vector: Optional[VectorProvider] = next(
+            (provider for provider in service.data_provider if isinstance(provider, VectorProvider)), None)
+        self.providers = [provider for provider in service.data_provider if provider is not self.vector]
+
+        self.queue_size = max(queue_size or settings.INGEST_QUEUE_SIZE, 1)
+        self.extract_workers = max(extract_workers or settings.INGEST_EXTRACT_WORKERS, 1)
+        self.chunk_workers = settings.INGEST_CHUNK_WORKERS if chunk_workers is None else chunk_workers
+        self.upsert_batch_size = max(upsert_batch_size or settings.INGEST_UPSERT_BATCH_SIZE, 1)
+        self.flush_seconds = (settings.INGEST_BATCH_FLUSH_MS if flush_ms is None else flush_ms) / 1000
+
+        self.stats: Dict[str, StageStats] = {stage: StageStats() for stage in STAGES}
+        self._started = 0.0
+        self._finished = 0.0
+
+    async def run(
+        self,
+        documents: Union[Iterable[IngestDocument], AsyncIterable[IngestDocument]],
+        legra_finalize: bool = False,
+    ) -> Dict[str, Any]:
+        """
+        Ingest documents
+
+        Args:
+            documents: Documents to ingest, consumed lazily
+            legra_finalize: Whether to finalize LEGRA once all documents are added
+
+        Returns:
+            Summary of operations with per document results and stage statistics
+        """
+        if not self.service.is_initialized():
+            logger.error("Service not initialized")
+            return {"error": "Service not initialized"}
+
+        self._started = time.perf_counter()
+        queues = {stage: asyncio.Queue(self.queue_size) for stage in STAGES}
+        workers = {
+            "extract": [self._extract_worker(queues["extract"], queues["chunk"])
+                        for _ in range(self.extract_workers)],
+            "chunk": [self._chunk_worker(queues["chunk"], queues["embed"])
+                      for _ in range(max(self.chunk_workers, 1))],
+            "embed": [self._embed_stage(queues["embed"], queues["upsert"])],
+            "upsert": [self._upsert_stage(queues["upsert"])],
+        }
+        tasks = {stage: [asyncio.create_task(worker) for worker in stage_workers]
+                 for stage, stage_workers in workers.items()}
+        states: List[_DocState] = []
+
+        try:
+            if isinstance(documents, AsyncIterable):
+                async for document in documents:
+                    states.append(_DocState(document))
+                    await self._put("extract", queues["extract"], states[-1])
+            else:
+                for document in documents:
+                    states.append(_DocState(document))
+                    await self._put("extract", queues["extract"], states[-1])
+
+            # Drain stage by stage, each worker stops at its own end marker
+            for stage in STAGES:
+                for _ in tasks[stage]:
+                    await queues[stage].put(_DONE)
+                await asyncio.gather(*tasks[stage])
+        finally:
+            for stage_tasks in tasks.values():
+                for task in stage_tasks:
+                    task.cancel()
+        self._finished = time.perf_counter()
+
+        return await self._summarize(states, legra_finalize)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Per stage throughput counters"""
+        elapsed = (self._finished or time.perf_counter()) - self._started if self._started else 0.0
+        return {
+            "elapsed_seconds": round(elapsed, 3),
+            **{stage: stats.as_dict(elapsed) for stage, stats in self.stats.items()},
+        }
+
+    # ------------------------------------------------------------------ #
+    # Stages                                                              #
+    # ------------------------------------------------------------------ #
+    async def _extract_worker(self, inbox: asyncio.Queue, outbox: asyncio.Queue):
+        stats = self.stats["extract"]
+        while (state := await inbox.get()) is not _DONE:
+            document = state.document
+            started = time.perf_counter()
+            try:
+                if document.content is None and document.extract is not None:
+                    state.content = await asyncio.to_thread(document.extract) or ""
+                else:
+                    state.content = document.content or ""
+                # States live until the summary, only state.content holds the text and only until chunking
+                state.document = dataclasses.replace(document, content=None, extract=None)
+                stats.items += 1
+            except Exception as e:
+                stats.errors += 1
+                state.error = f"Error extracting document {document.doc_id}: {e}"
+                logger.error(state.error)
+            finally:
+                stats.busy_seconds += time.perf_counter() - started
+
+            if state.error is None and not state.content.strip():
+                logger.warning(f"Empty content for document {document.doc_id}")
+                state.skipped = True
+            if state.error is None and not state.skipped:
+                await self._put("chunk", outbox, state)
+            else:
+                state.content = ""
+
+    async def _chunk_worker(self, inbox: asyncio.Queue, outbox: asyncio.Queue):
+        stats = self.stats["chunk"]
+        while (state := await inbox.get()) is not _DONE:
+            doc_id = state.document.doc_id
+            await self._add_to_providers(state)
+            if self.vector is None:
+                state.content = ""
+                continue
+
+            started = time.perf_counter()
+            try:
+                # Replace the document, as VectorProvider.add_document does
+                await self.vector.delete_document(doc_id)
+                metadata = self.vector.document_metadata(doc_id, dict(state.document.metadata))
+                chunks = await self._chunk(state.content, metadata)
+            except Exception as e:
+                chunks = []
+                stats.errors += 1
+                logger.error(f"Failed to chunk document {doc_id}: {e}")
+            finally:
+                stats.busy_seconds += time.perf_counter() - started
+                # From here on only the chunks in the queues hold the text
+                state.content = ""
+
+            if not chunks:
+                logger.warning(f"No chunks created for document {doc_id}")
+                state.results[self.vector.name] = False
+                continue
+            stats.items += len(chunks)
+            stats.batches += 1
+            state.pending = len(chunks)
+            await self._put("embed", outbox, (state, chunks))
+
+    async def _embed_stage(self, inbox: asyncio.Queue, outbox: asyncio.Queue):
+        """Micro-batches chunks across documents up to the embedder's batch size"""
+        batch_size = self.vector.embedder.config.batch_size if self.vector else 1
+        buffer: List[Tuple[_DocState, Chunk]] = []
+        finished = False
+        while not finished:
+            flush = False
+            try:
+                # With a partial batch, wait only briefly for more chunks
+                item = await asyncio.wait_for(inbox.get(), self.flush_seconds if buffer else None)
+            except asyncio.TimeoutError:
+                item, flush = None, True
+            if item is _DONE:
+                finished = flush = True
+            elif item is not None:
+                state, chunks = item
+                buffer.extend((state, chunk) for chunk in chunks)
+
+            while len(buffer) >= batch_size or (flush and buffer):
+                batch, buffer = buffer[:batch_size], buffer[batch_size:]
+                await self._embed_batch(batch, outbox)
+
+    async def _embed_batch(self, batch: List[Tuple[_DocState, Chunk]], outbox: asyncio.Queue):
+        stats = self.stats["embed"]
+        batch = [(state, chunk) for state, chunk in batch if state.error is None]
+        if not batch:
+            return
+        texts = [chunk.content for _, chunk in batch]
+        started = time.perf_counter()
+        try:
+            embeddings = await self.vector.embedder.embed_texts(texts)
+        except Exception as e:
+            logger.error(f"Failed to embed batch of {len(texts)} chunks: {e}")
+            embeddings = []
+        finally:
+            stats.busy_seconds += time.perf_counter() - started
+
+        if len(embeddings) != len(texts):
+            stats.errors += 1
+            for state, _ in batch:
+                state.error = state.error or f"Embedding failed for document {state.document.doc_id}"
+            return
+        stats.items += len(texts)
+        stats.batches += 1
+        await self._put("upsert", outbox, list(zip(batch, embeddings)))
+
+    async def _upsert_stage(self, inbox: asyncio.Queue):
+        buffer: List[Tuple[Tuple[_DocState, Chunk], List[float]]] = []
+        while (item := await inbox.get()) is not _DONE:
+            buffer.extend(item)
+            # Write as soon as the embedder falls behind, or once a full batch is ready
+            while len(buffer) >= self.upsert_batch_size or (buffer and inbox.empty()):
+                batch, buffer = buffer[:self.upsert_batch_size], buffer[self.upsert_batch_size:]
+                await self._upsert_batch(batch)
+        if buffer:
+            await self._upsert_batch(buffer)
+
+    async def _upsert_batch(self, batch: List[Tuple[Tuple[_DocState, Chunk], List[float]]]):
+        stats = self.stats["upsert"]
+        batch = [entry for entry in batch if entry[0][0].error is None]
+        if not batch:
+            return
+        started = time.perf_counter()
+        try:
+            success = await self.vector.vector_db.add_vectors(
+                ids=[self.vector.chunk_id(state.document.doc_id, chunk.index) for (state, chunk), _ in batch],
+                vectors=[embedding for _, embedding in batch],
+                metadatas=[chunk.metadata for (_, chunk), _ in batch],
+                contents=[chunk.content for (_, chunk), _ in batch],
+            )
+        except Exception as e:
+            logger.error(f"Failed to upsert batch of {len(batch)} vectors: {e}")
+            success = False
+        finally:
+            stats.busy_seconds += time.perf_counter() - started
+
+        if not success:
+            stats.errors += 1
+        else:
+            stats.items += len(batch)
+            stats.batches += 1
+        for (state, _), _ in batch:
+            if success:
+                state.pending -= 1
+            else:
+                state.error = state.error or f"Failed to add document {state.document.doc_id} to vector database"
+
+    # ------------------------------------------------------------------ #
+    # Helpers                                                             #
+    # ------------------------------------------------------------------ #
+    async def _put(self, stage: str, queue: asyncio.Queue, item: Any):
+        await queue.put(item)
+        stats = self.stats[stage]
+        stats.max_queue_depth = max(stats.max_queue_depth, queue.qsize())
+
+    async def _chunk(self, text: str, metadata: Dict[str, Any]) -> List[Chunk]:
+        pool = _get_chunk_pool(self.chunk_workers)
+        if pool is not None:
+            try:
+                return await asyncio.get_running_loop().run_in_executor(
+                    pool, _chunk_text, self.vector.chunker.config, text, metadata)
+            except BrokenProcessPool:
+                logger.warning("Chunking process pool broke, chunking in-process")
+                _reset_chunk_pool()
+        return await asyncio.to_thread(self.vector.chunker.chunk_text, text, metadata)
+
+    async def _add_to_providers(self, state: _DocState):
+        """Add the document to the non vector providers"""
+        doc_id = state.document.doc_id
+        for provider in self.providers:
+            metadata = dict(state.document.metadata)
+            if provider.name == "legra":
+                # Finalized once at the end of the load
+                metadata["finalize"] = False
+            try:
+                state.results[provider.name] = await provider.add_document(doc_id, state.content, metadata)
+            except Exception as e:
+                logger.error(f"{provider.name} add_document failed: {e}")
+                state.results[provider.name] = False
+
+    async def _summarize(self, states: List[_DocState], legra_finalize: bool) -> Dict[str, Any]:
+        documents = []
+        errors = []
+        successful = failed = skipped = 0
+        for state in states:
+            doc_id = state.document.doc_id
+            if self.vector is not None and not state.skipped and self.vector.name not in state.results:
+                state.results[self.vector.name] = state.error is None and state.pending == 0
+                if state.error is not None and state.pending:
+                    # Drop the chunks written before the failure
+                    await self.vector.delete_document(doc_id)
+
+            entry: Dict[str, Any] = {"id": doc_id, "result": state.results}
+            if state.skipped:
+                skipped += 1
+            elif any(state.results.values()):
+                successful += 1
+            else:
+                failed += 1
+                state.error = state.error or f"Failed to add document {doc_id}"
+            if state.error is not None:
+                entry["error"] = state.error
+                errors.append(state.error)
+            documents.append(entry)
+
+        legra_finalized = False
+        if legra_finalize and successful and self.service.has_legra_provider():
+            legra_finalized = await self.service.finalize_legra()
+
+        stats = self.get_stats()
+        logger.info(
+            f"Ingested {successful}/{len(states)} documents into KB {self.service.knowledge_base_id} "
+            f"in {stats['elapsed_seconds']}s: {stats}")
+        return {
+            "total": len(states),
+            "successful": successful,
+            "failed": failed,
+            "skipped": skipped,
+            "errors": errors,
+            "legra_finalized": legra_finalized,
+            "documents": documents,
+            "stats": stats,
+        }
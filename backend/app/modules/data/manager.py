@@ -8,10 +8,15 @@ and connection overhead.
 
 import asyncio
 import logging
-from typing import Dict, Optional, List, Any
+from functools import partial
+from typing import AsyncIterable, Dict, Iterable, Optional, List, Any, Union
 
+from app.cache.bounded_cache import BoundedCache
+from app.core.config.settings import settings
+from app.core.tenant_scope import get_tenant_context
 from app.schemas.agent_knowledge import KBRead
 
+from .ingestion import IngestDocument, IngestionPipeline
 from .service import AgentRAGService
 from .providers import SearchResult
 from .utils.doc import bulk_delete_documents, format_search_results
@@ -19,6 +24,21 @@ from .utils.doc import bulk_delete_documents, format_search_results
 logger = logging.getLogger(__name__)
 
 
+async def _close_service(service: AgentRAGService) -> None:
+    """Close an evicted service off the event loop (FAISS checkpoints on close)"""
+    await asyncio.to_thread(service.close)
+
+
+# Shared by the per-tenant managers, so the limits hold across tenants
+_service_cache: BoundedCache[AgentRAGService] = BoundedCache(
+    "rag_services",
+    max_size=settings.RAG_SERVICE_CACHE_SIZE,
+    max_size_per_tenant=settings.RAG_SERVICE_CACHE_PER_TENANT,
+    ttl_seconds=settings.RAG_SERVICE_CACHE_TTL_SECONDS,
+    on_evict=_close_service,
+)
+
+
 class AgentRAGServiceManager:
     """
     Tenant-aware singleton manager for AgentRAGService instances.
@@ -32,8 +52,7 @@ class AgentRAGServiceManager:
     """
 
     def __init__(self):
-        self._services: Dict[str, AgentRAGService] = {}
-        self._initialization_locks: Dict[str, asyncio.Lock] = {}
+        self._services = _service_cache
         self._lock = asyncio.Lock()
         logger.info("AgentRAGServiceManager initialized")
 
@@ -50,54 +69,44 @@ class AgentRAGServiceManager:
         """
         kb_id = str(kb_obj.id)
 
-        # Return existing service if available and initialized
-        if kb_id in self._services:
-            service = self._services[kb_id]
-            if service.is_initialized():
-                return service
-            else:
-                # Remove failed service
-                logger.warning(
-                    f"Removing uninitialized service for KB {kb_id}")
-                await self._remove_service(kb_id)
-
-        # Ensure we have a lock for this KB
-        if kb_id not in self._initialization_locks:
-            self._initialization_locks[kb_id] = asyncio.Lock()
-
-        # Use lock to prevent concurrent initialization
-        async with self._initialization_locks[kb_id]:
-            # Double-check pattern - service might have been created while waiting
-            if kb_id in self._services and self._services[kb_id].is_initialized():
-                return self._services[kb_id]
-
-            try:
-                # Create service
-                service = AgentRAGService.from_kb_config(
-                    kb_id, kb_obj.rag_config)
-                if not service:
-                    logger.error(
-                        f"Failed to create AgentRAGService for KB {kb_id}")
-                    return None
-
-                # Initialize service
-                success = await service.initialize()
-                if not success:
-                    logger.error(
-                        f"Failed to initialize AgentRAGService for KB {kb_id}")
-                    return None
-
-                # Cache the service
-                self._services[kb_id] = service
-                logger.info(
-                    f"Created and cached AgentRAGService for KB {kb_id}")
-                return service
-
-            except Exception as e:
+        # Concurrent callers share a single initialization
+        service = await self._services.get_or_create_async(
+            kb_id, lambda: self._create_service(kb_id, kb_obj.rag_config))
+        if service is not None and not service.is_initialized():
+            # Remove failed service
+            logger.warning(
+                f"Removing uninitialized service for KB {kb_id}")
+            await self._remove_service(kb_id)
+            service = await self._services.get_or_create_async(
+                kb_id, lambda: self._create_service(kb_id, kb_obj.rag_config))
+        return service
+
+    async def _create_service(self, kb_id: str, rag_config: Dict[str, Any]) -> Optional[AgentRAGService]:
+        """Create and initialize a service, None on failure"""
+        try:
+            # Create service
+            service = AgentRAGService.from_kb_config(kb_id, rag_config)
+            if not service:
+                logger.error(
+                    f"Failed to create AgentRAGService for KB {kb_id}")
+                return None
+
+            # Initialize service
+            success = await service.initialize()
+            if not success:
                 logger.error(
-                    f"Error creating AgentRAGService for KB {kb_id}: {e}")
+                    f"Failed to initialize AgentRAGService for KB {kb_id}")
                 return None
 
+            logger.info(
+                f"Created and cached AgentRAGService for KB {kb_id}")
+            return service
+
+        except Exception as e:
+            logger.error(
+                f"Error creating AgentRAGService for KB {kb_id}: {e}")
+            return None
+
     async def add_document(
         self,
         kb_obj: KBRead,
@@ -126,6 +135,30 @@ class AgentRAGServiceManager:
 
         return await service.add_document(doc_id, content, metadata, legra_finalize)
 
+    async def add_documents(
+        self,
+        kb_obj: KBRead,
+        documents: Union[Iterable[IngestDocument], AsyncIterable[IngestDocument]],
+        legra_finalize: bool = False,
+    ) -> Dict[str, Any]:
+        """
+        Add many documents to a knowledge base through the ingestion pipeline
+
+        Args:
+            kb_obj: Knowledge base object
+            documents: Documents to add, with their content or an extractor
+            legra_finalize: Whether to finalize LEGRA once all documents are added
+
+        Returns:
+            Summary of operations (see IngestionPipeline.run)
+        """
+        service = await self.get_service(kb_obj)
+        if not service:
+            logger.error(f"Could not get service for KB {kb_obj.id}")
+            return {}
+
+        return await IngestionPipeline(service).run(documents, legra_finalize)
+
     async def delete_document(self, kb_obj: KBRead, doc_id: str) -> Dict[str, bool]:
         """
         Delete a document from a knowledge base
@@ -262,71 +295,64 @@ class AgentRAGServiceManager:
                     logger.debug(
                         f"KB document deletion results: {delete_result}")
 
-            # Process all items for this KB
+            # Process all items for this KB in one pipeline run
+            documents: List[IngestDocument] = []
             for item in items:
                 try:
-                    doc_ids = [f"KB:{kb_id}#content"]
-                    contents = [getattr(item, "content", "")]
+                    metadata = {
+                        "name": getattr(item, "name", ""),
+                        "description": getattr(item, "description", ""),
+                        "kb_id": kb_id,
+                    }
 
-                    # Handle file content
+                    # Handle file content, extracted by the pipeline
                     if (
                         getattr(item, "type", "") == "file"
                         and hasattr(item, "files")
                         and item.files
                     ):
-                        from app.modules.data.utils import FileTextExtractor
-
-                        doc_ids = []
-                        contents = []
+                        from app.modules.data.utils import get_extraction_service
 
                         for idx, file_path in enumerate(item.files):
-                            try:
-                                doc_ids.append(
-                                    f"KB:{kb_id}#file_{idx}:{file_path}")
-                                contents.append(
-                                    FileTextExtractor().extract(path=file_path))
-                            except Exception as e:
-                                logger.error(
-                                    f"Error extracting file {file_path}: {e}")
+                            doc_id = f"KB:{kb_id}#file_{idx}:{file_path}"
+                            documents.append(IngestDocument(
+                                doc_id=doc_id,
+                                metadata={**metadata, "id": doc_id},
+                                extract=partial(get_extraction_service().extract_sync, path=file_path),
+                            ))
+                        continue
 
                     # Handle URL content
-                    elif getattr(item, "type", "") == "url":
+                    if getattr(item, "type", "") == "url":
                         from app.core.utils.bi_utils import set_url_content_if_has_rag
 
                         await set_url_content_if_has_rag(item)
-                        contents = [getattr(item, "content", "")]
-
-                    for doc_id, content in zip(doc_ids, contents):
-
-                        metadata = {
-                            "name": getattr(item, "name", ""),
-                            "description": getattr(item, "description", ""),
-                            "id": doc_id,
-                            "kb_id": kb_id,
-                        }
-
-                        result = await service.add_document(
-                            doc_id,
-                            content,
-                            metadata,
-                            legra_finalize=getattr(
-                                item, "legra_finalize", False),
-                        )
-                        results.append({"id": doc_id, "result": result})
+
+                    doc_id = f"KB:{kb_id}#content"
+                    documents.append(IngestDocument(
+                        doc_id=doc_id,
+                        content=getattr(item, "content", ""),
+                        metadata={**metadata, "id": doc_id},
+                    ))
 
                 except Exception as e:
                     logger.error(f"Error loading item {item.id}: {e}")
                     results.append(
-                        {"id": doc_id, "result": {}, "error": str(e)})
+                        {"id": f"KB:{kb_id}", "result": {}, "error": str(e)})
+
+            summary = await IngestionPipeline(service).run(
+                documents,
+                legra_finalize=any(getattr(item, "legra_finalize", False) for item in items),
+            )
+            results.extend(summary.get("documents", []))
 
         return results
 
     async def _remove_service(self, kb_id: str):
-        """Remove a service from cache"""
-        if kb_id in self._services:
-            del self._services[kb_id]
-        if kb_id in self._initialization_locks:
-            del self._initialization_locks[kb_id]
+        """Remove a service from cache and close it"""
+        service = self._services.pop(kb_id, close=False)
+        if service is not None:
+            await _close_service(service)
 
     async def cleanup_service(self, kb_id: str):
         """
@@ -340,18 +366,19 @@ class AgentRAGServiceManager:
             logger.info(f"Cleaned up service for KB {kb_id}")
 
     async def cleanup_all(self):
-        """Clean up all services"""
+        """Clean up all services of the current tenant"""
         async with self._lock:
-            self._services.clear()
-            self._initialization_locks.clear()
+            self._services.clear(tenant_id=get_tenant_context())
             logger.info("Cleaned up all AgentRAGService instances")
 
     def get_stats(self) -> Dict[str, Any]:
         """Get statistics about cached services"""
+        services = self._services.values()
         return {
-            "total_services": len(self._services),
+            "total_services": len(services),
             "initialized_services": sum(
-                1 for s in self._services.values() if s.is_initialized()
+                1 for s in services if s.is_initialized()
             ),
-            "service_ids": list(self._services.keys()),
+            "service_ids": self._services.keys(),
+            "cache": self._services.stats(),
         }
@@ -1,18 +1,20 @@
 import json
 import os
+import shutil
 from collections import defaultdict
 from pathlib import Path
 from typing import Any, Dict, List, Optional, cast
 
 import faiss
 import igraph as ig
-import numpy as np
 import numpy.typing as npt
 from fastapi import UploadFile
 from nltk.tokenize import sent_tokenize
 from tqdm.auto import tqdm
 from transformers import AutoTokenizer
 
+from app.cache.embedding_cache import get_embedding_cache
+
 from . import embedding
 from .chunking.base import Chunker
 from .clustering.base import Clusterer
@@ -22,6 +24,7 @@ from .generation.base import Generator
 from .graph.knn_graph import KNNGraphBuilder
 from .index.base import Indexer
 from .retrieval.base import Retriever
+from .storage import SegmentedStore
 from .utils import get_logger
 
 _logger = get_logger(__name__)
@@ -30,6 +33,11 @@ __all__ = [
     'Legra',
 ]
 
+LEGRA_DATA_DIR = Path("legra_data")
+
+# Derived from the live rows; stale as soon as rows are deleted
+STALE_ON_DELETE = ("faiss_index.bin", "graph.graphml", "community_summaries.json")
+
 
 class Legra:
     """
@@ -75,7 +83,9 @@ class Legra:
         self.generator = generator
         self.extension = extension
 
-        # Internal storage
+        # Internal storage. When backed by a SegmentedStore, docs_meta and
+        # emb_matrix are read from the store on first access.
+        self._store: SegmentedStore | None = None
         self.docs_meta: List[Dict[str, Any]] = []
         self.emb_matrix: npt.NDArray | None = None
 
@@ -120,14 +130,55 @@ class Legra:
         return docs
 
 
+    @property
+    def docs_meta(self) -> List[Dict[str, Any]]:
+        if self._docs_meta is None and self._store is not None:
+            self._docs_meta = self._store.docs_meta()
+            community_labels = getattr(self, "community_labels", None)
+            if community_labels is not None:
+                for meta, label in zip(self._docs_meta, community_labels):
+                    meta["community"] = label
+        return self._docs_meta if self._docs_meta is not None else []
+
+    @docs_meta.setter
+    def docs_meta(self, value: List[Dict[str, Any]] | None) -> None:
+        self._docs_meta = value
+
+    @property
+    def emb_matrix(self) -> npt.NDArray | None:
+        if self._emb_matrix is None and self._store is not None:
+            return self._store.embeddings()
+        return self._emb_matrix
+
+    @emb_matrix.setter
+    def emb_matrix(self, value: npt.NDArray | None) -> None:
+        self._emb_matrix = value
+
+    def _encode(self, texts: List[str]) -> npt.NDArray:
+        """Embed chunks, reusing cached embeddings of unchanged chunks."""
+        namespace = f"legra:{type(self.embedder).__name__}:{self.embedder.model_name}"
+        return get_embedding_cache().encode_sync(namespace, texts, self.embedder.encode)
+
+    def _get_store(self, kb_id: str) -> SegmentedStore:
+        """Open (or refresh) the segmented store of `kb_id` and make it the backing store."""
+        kb_dir = LEGRA_DATA_DIR / kb_id
+        if self._store is None or self._store.path != kb_dir:
+            dim = getattr(self.embedder, "dimension", None) if self.embedder else None
+            self._store = SegmentedStore(kb_dir, dim=dim)
+        else:
+            self._store.refresh()
+        return self._store
+
+    def _use_store_view(self) -> None:
+        """Drop in-memory copies so docs_meta / emb_matrix are read from the store."""
+        self._docs_meta = None
+        self._emb_matrix = None
+
     def add_document(self, doc_id: str, extracted_text: str, metadata: dict) -> None:
         """
         Append `doc_id` to the knowledge-base identified by metadata['kb_id'].
-        Only embeddings & docs_meta are updated.  Index/graph will be rebuilt later.
+        The chunks are written as a new segment, index/graph will be rebuilt later.
         """
-        # Handle updates
-        self.delete_document(doc_id)
-
         kb_id = metadata.get("kb_id")
         if kb_id is None:
             raise ValueError("metadata must contain 'kb_id'")
@@ -135,17 +186,12 @@ class Legra:
         _logger.info(f"Adding document {doc_id} to KB {kb_id} …")
 
         # ------------------------------------------------------------------ #
-        # 0. Load existing embeddings & meta for this KB (if they exist)     #
+        # 0. Open the KB store, handle updates by tombstoning the old rows   #
         # ------------------------------------------------------------------ #
-        kb_dir = Path("legra_data").joinpath(kb_id)
-        if kb_dir.exists():
-            with open(kb_dir / "docs_meta.json", encoding="utf-8") as f:
-                existing_meta: list[dict] = json.load(f)
-            existing_embs: np.ndarray = np.load(kb_dir / "emb_matrix.npy")
-        else:
-            existing_meta = []
-            existing_embs = np.empty((0, self.embedder.dimension), dtype=np.float32)
-            kb_dir.mkdir(parents=True, exist_ok=True)
+        kb_dir = LEGRA_DATA_DIR / kb_id
+        store = self._get_store(kb_id)
+        if store.delete_document(doc_id):
+            self._remove_stale_files(kb_dir)
 
         # ------------------------------------------------------------------ #
         # 1. Chunk the new document                                          #
@@ -154,7 +200,7 @@ class Legra:
         _logger.info(f"Chunked into {len(chunks)} pieces.")
 
         # 2. Embed
-        new_embs = self.embedder.encode(chunks)
+        new_embs = self._encode(chunks)
         _logger.info("Embedding completed.")
 
         # 3. Build per-chunk metadata
@@ -164,24 +210,21 @@ class Legra:
                 "doc_id": doc_id,
                 "chunk_ix": ix,
                 "text": txt,
-                "embedding": emb,  # kept in RAM, stripped before save()
                 }
-            for ix, (txt, emb) in enumerate(zip(chunks, new_embs))
+            for ix, txt in enumerate(chunks)
             ]
 
         # ------------------------------------------------------------------ #
-        # 4. Concatenate with previous corpus                                #
+        # 4. Append to the corpus as a new segment                           #
         # ------------------------------------------------------------------ #
-        self.docs_meta = existing_meta + new_meta
-        self.emb_matrix = (
-            new_embs if existing_embs.size == 0
-            else np.vstack([existing_embs, new_embs])
-        )
+        store.append(new_meta, new_embs)
+        self._use_store_view()
 
-        _logger.info(f"KB {kb_id} now has {len(self.docs_meta)} chunks total.")
+        _logger.info(f"KB {kb_id} now has {store.num_rows} chunks total "
+                     f"in {store.num_segments} segments.")
 
         # ------------------------------------------------------------------ #
-        # 5. Persist embeddings + meta         #
+        # 5. Persist configs (embeddings + meta are already on disk)         #
         # ------------------------------------------------------------------ #
         if metadata.get("finalize", False):
             # index / graph
@@ -190,14 +233,14 @@ class Legra:
             self.complete_index_graph(kb_id)
             self.save(kb_id, full=True)
         else :
-            self.save(kb_id, full=False)  # writes docs_meta.json + emb_matrix.npy
+            self.save(kb_id, full=False)
             _logger.info("Embeddings saved.")
 
 
     def delete_document(self, doc_id: str) -> bool:
         """
         Delete all chunks belonging to `doc_id` from the knowledge base `kb_id`.
-        • Only docs_meta.json and emb_matrix.npy are rewritten.
+        • The rows are tombstoned; compaction drops them from disk later.
         • The FAISS index / graph / community files are deleted because they are
           now stale; your separate “re-index” endpoint will recreate them later.
         Returns
@@ -207,67 +250,31 @@ class Legra:
         """
         kb_id = (doc_id.split("#", 1)[0])[3:] # remove part after # and remove 'KB:' to extract kb_id
 
-        kb_dir = Path("legra_data") / kb_id
-        if not kb_dir.exists():
+        kb_dir = LEGRA_DATA_DIR / kb_id
+        if not SegmentedStore.exists(kb_dir):
             _logger.warning(f"delete_document: KB {kb_id} does not exist.")
             return False
 
         try:
-            # -----------------------------------------------------------------
-            # 1. Load current meta + embeddings
-            # -----------------------------------------------------------------
-            with open(kb_dir / "docs_meta.json", encoding="utf-8") as f:
-                meta: List[Dict[str, Any]] = json.load(f)
-
-            emb = np.load(kb_dir / "emb_matrix.npy")
-
-            # -----------------------------------------------------------------
-            # 2. Build mask of rows to *keep*
-            # -----------------------------------------------------------------
-            keep_mask = [m["doc_id"] != doc_id for m in meta]
-            if all(keep_mask):
+            store = self._get_store(kb_id)
+            if not store.delete_document(doc_id):
                 _logger.info(f"delete_document: {doc_id} not found in KB {kb_id}.")
                 return True  # nothing to delete
 
-            # Filter metadata and embeddings
-            new_meta = [m for m, keep in zip(meta, keep_mask) if keep]
-            new_emb = emb[keep_mask]
-
             # If KB becomes empty, wipe directory entirely
-            if not new_meta:
-                import shutil
-
+            if store.num_rows == 0:
                 shutil.rmtree(kb_dir)
+                self._store = None
+                self.docs_meta = []
+                self.emb_matrix = None
                 _logger.info(f"delete_document: removed last document; "
                              f"KB {kb_id} directory deleted.")
                 return True
 
-            # -----------------------------------------------------------------
-            # 3. Save stripped corpus back to disk
-            # -----------------------------------------------------------------
-            # Strip embeddings before saving docs_meta.json
-            meta_for_save = [{k: v for k, v in m.items() if k != "embedding"}
-                             for m in new_meta]
-
-            with open(kb_dir / "docs_meta.json", "w", encoding="utf-8") as f:
-                json.dump(meta_for_save, f, ensure_ascii=False, indent=2)
-
-            np.save(kb_dir / "emb_matrix.npy", new_emb)
-
-            # -----------------------------------------------------------------
-            # 4. Remove stale index / graph files
-            # -----------------------------------------------------------------
-            for stale in ("faiss_index.bin", "graph.graphml",
-                          "community_summaries.json"):
-                p = kb_dir / stale
-                if p.exists():
-                    p.unlink()
-
-            # -----------------------------------------------------------------
-            # 5. Refresh in-memory state of *this* instance
-            # -----------------------------------------------------------------
-            self.docs_meta = new_meta
-            self.emb_matrix = new_emb
+            self._remove_stale_files(kb_dir)
+
+            # Refresh in-memory state of *this* instance
+            self._use_store_view()
 
             # the index / graph / labels are now invalid; clear them
             if hasattr(self, "indexer"):
@@ -276,15 +283,26 @@ class Legra:
             self.community_labels = None
 
             _logger.info(f"delete_document: removed {doc_id} from KB {kb_id}. "
-                         f"{len(new_meta)} chunks remain.")
+                         f"{store.num_rows} chunks remain.")
             return True
 
         except Exception as e:
             _logger.exception(f"delete_document failed: {e}")
             return False
 
+    @staticmethod
+    def _remove_stale_files(kb_dir: Path) -> None:
+        for stale in STALE_ON_DELETE:
+            p = kb_dir / stale
+            if p.exists():
+                p.unlink()
 
     def complete_index_graph(self, kb_id: str):
+        # 0. Merge all segments so the index is built over one memory-mapped matrix
+        if self._store is not None and self._emb_matrix is None:
+            self._store.compact()
+            self._use_store_view()
+
         # 1. Build index
         _logger.info("Building vector index...")
         self.indexer.build_index(self.emb_matrix)
@@ -344,7 +362,7 @@ class Legra:
 
         # 3. Embed
         _logger.info("Embedding all chunks...")
-        embeddings = self.embedder.encode(flattened_chunks)
+        embeddings = self._encode(flattened_chunks)
 
         # Attach embeddings to meta
         for i, emb in enumerate(embeddings):
@@ -498,33 +516,24 @@ class Legra:
     def save(self, path: str | Path, full: bool) -> None:
         """
         Save the current state to disk. Writes:
-          - docs_meta.json (without embeddings)
-          - emb_matrix.npy
+          - segments/ (only if the corpus was built in memory, e.g. by index())
           - faiss_index.bin (if using FaissFlatIndexer)
           - graph.graphml
-          - community_summaries.json (if any)
+          - communities.npy + community_summaries.json (if any)
         """
-        base = Path("legra_data")
-        path = base.joinpath(path)
+        kb_id = str(path)
+        path = LEGRA_DATA_DIR.joinpath(path)
         path.mkdir(parents=True, exist_ok=True)
 
-        # Save docs_meta without embeddings
-        docs_meta_to_save: List[Dict[str, Any]] = []
-
-        for meta in self.docs_meta:
-            meta_copy = meta.copy()
-            meta_copy.pop("embedding", None)
-            docs_meta_to_save.append(meta_copy)
-
-        with open(path / "docs_meta.json", "w", encoding="utf-8") as f:
-            json.dump(docs_meta_to_save, f, ensure_ascii=False, indent=2)
+        store = self._get_store(kb_id)
+        if self._emb_matrix is not None:
+            # Corpus lives in memory only, replace the stored one with it
+            store.rewrite(self.docs_meta, self._emb_matrix)
+            self._use_store_view()
 
         with open(path / "legra.json", "w", encoding="utf-8") as f:
             json.dump({"max_tokens": self.max_tokens}, f)
 
-        # Save embeddings matrix
-        np.save(path / "emb_matrix.npy", self.emb_matrix)
-
         with open(path / "embedder.json", "w", encoding="utf-8") as f:
             json.dump(
                 {"class": self.embedder.__class__.__name__,
@@ -563,6 +572,10 @@ class Legra:
             # Save graph to GraphML
             self.graph.write_graphml(str(path / "graph.graphml"))
 
+            community_labels = getattr(self, "community_labels", None)
+            if community_labels is not None:
+                store.write_communities(community_labels)
+
             # Save community summaries if exist
             if self.community_summaries:
                 with open(path / "community_summaries.json", "w", encoding="utf-8") as f:
@@ -575,21 +588,23 @@ class Legra:
         Load a knowledge-base snapshot from disk.
 
         Directory layout (some files may be missing):
-            docs_meta.json                # REQUIRED
-            emb_matrix.npy                # REQUIRED
+            segments/                     # REQUIRED (docs_meta.json + emb_matrix.npy
+                                          #   snapshots are migrated on first load)
+            tombstones.jsonl              # OPTIONAL
+            communities.npy               # OPTIONAL
             faiss_index.bin               # OPTIONAL
             graph.graphml                 # OPTIONAL
             community_summaries.json      # OPTIONAL
             embedder.json                 # REQUIRED
             legra.json                    # REQUIRED  (contains max_tokens)
         """
-        kb_path = Path("legra_data").joinpath(path)
-
-        # 1. docs_meta + embeddings  ------------------------------------
-        with open(kb_path / "docs_meta.json", encoding="utf-8") as f:
-            docs_meta: List[Dict[str, Any]] = json.load(f)
+        kb_path = LEGRA_DATA_DIR.joinpath(path)
 
-        emb_matrix: npt.NDArray = np.load(kb_path / "emb_matrix.npy")
+        # 1. docs_meta + embeddings (memory-mapped segments) -------------
+        if not SegmentedStore.exists(kb_path):
+            raise FileNotFoundError(f"Knowledge base {path} has no stored documents.")
+        store = SegmentedStore(kb_path)
+        docs_meta: List[Dict[str, Any]] = store.docs_meta()
 
         # 2. (optional) graph  ------------------------------------------
         graph_file = kb_path / "graph.graphml"
@@ -621,7 +636,7 @@ class Legra:
         # 5. indexer  (reuse if stored, else build) ----------------------
         from .index.faiss_index import FaissFlatIndexer as _FFI
 
-        dim = emb_matrix.shape[1]
+        dim = store.dim
         indexer = _FFI(dim=dim, use_gpu=False)
 
         faiss_file = kb_path / "faiss_index.bin"
@@ -649,9 +664,10 @@ class Legra:
             retriever = None
 
         # 7. communities & summaries  -----------------------------------
-        community_labels: Optional[List[int]] = None
-        if docs_meta and "community" in docs_meta[0]:
-            community_labels = [m.get("community") for m in docs_meta]
+        community_labels: Optional[List[int]] = store.read_communities()
+        if community_labels is not None:
+            for meta, label in zip(docs_meta, community_labels):
+                meta["community"] = label
 
         summaries_file = kb_path / "community_summaries.json"
         community_summaries: Dict[int, str] = {}
@@ -676,7 +692,8 @@ class Legra:
                 generator=generator,
                 )._finalize_load(
                 docs_meta=docs_meta,
-                emb_matrix=emb_matrix,
+                emb_matrix=None,  # read lazily from the store
+                store=store,
                 graph=graph,  # may be None
                 community_labels=community_labels,
                 community_summaries=community_summaries,
@@ -686,11 +703,13 @@ class Legra:
     def _finalize_load(
         self,
         docs_meta: List[Dict[str, Any]],
-        emb_matrix: npt.NDArray,
+        emb_matrix: npt.NDArray | None,
         graph: Optional[ig.Graph],
         community_labels: Optional[List[int]],
         community_summaries: Dict[int, str],
+        store: SegmentedStore | None = None,
     ) -> "Legra":
+        self._store               = store
         self.docs_meta            = docs_meta
         self.emb_matrix           = emb_matrix
         self.graph                = graph
@@ -0,0 +1,422 @@
+import json
+import os
+import re
+import shutil
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+import numpy.typing as npt
+
+from .utils import get_logger
+
+_logger = get_logger(__name__)
+
+__all__ = [
+    'SegmentedStore',
+]
+
+SEGMENTS_DIR = "segments"
+TOMBSTONES_FILE = "tombstones.jsonl"
+COMMUNITIES_FILE = "communities.npy"
+LEGACY_META_FILE = "docs_meta.json"
+LEGACY_EMB_FILE = "emb_matrix.npy"
+
+# seg_<first>_<last>: the append ids a segment covers, merged segments span several
+_SEGMENT_RE = re.compile(r"^seg_(\d{8})_(\d{8})\.npy$")
+
+
+@dataclass
+class _Segment:
+    first: int
+    last: int
+    rows: int
+    meta: List[Dict[str, Any]]
+    deleted: Set[int] = field(default_factory=set)
+    _embeddings: npt.NDArray | None = None
+
+    @property
+    def name(self) -> str:
+        return f"seg_{self.first:08d}_{self.last:08d}"
+
+    @property
+    def live_rows(self) -> int:
+        return self.rows - len(self.deleted)
+
+    def live_mask(self) -> npt.NDArray:
+        mask = np.ones(self.rows, dtype=bool)
+        if self.deleted:
+            mask[list(self.deleted)] = False
+        return mask
+
+
+class SegmentedStore:
+    """
+    Append-only on-disk storage for the chunks of one knowledge base.
+
+    Layout of the KB directory:
+        segments/seg_<first>_<last>.npy    # float32 embeddings, memory-mapped on read
+        segments/seg_<first>_<last>.jsonl  # one metadata line per embedding row
+        tombstones.jsonl                   # deleted rows, {"segment": ..., "rows": [...]}
+        communities.npy                    # OPTIONAL community label per live row
+
+    Adding a document writes one new segment; deleting one appends a tombstone.
+    Tail segments are merged like a binary counter (a segment is merged into
+    its predecessor once it grows as large), so every row is rewritten
+    O(log N) times and ingesting N documents costs O(N log N) disk I/O instead
+    of rewriting the whole corpus per document. ``compact`` merges everything
+    into a single segment and drops tombstoned rows.
+
+    Live rows keep their relative order through merges and compaction, so an
+    index built over ``embeddings()`` stays aligned with ``docs_meta()`` until
+    documents are deleted.
+    """
+
+    def __init__(self, path: str | Path, dim: int | None = None) -> None:
+        self.path = Path(path)
+        self.segments_dir = self.path / SEGMENTS_DIR
+        self.dim = dim
+        self._segments: List[_Segment] = []
+        self._doc_rows: Dict[str, List[Tuple[_Segment, int]]] = {}
+        self._tombstones_offset = 0
+        self._embeddings_cache: npt.NDArray | None = None
+        self._meta_cache: List[Dict[str, Any]] | None = None
+        self.refresh()
+
+    # ------------------------------------------------------------------ #
+    # Loading                                                             #
+    # ------------------------------------------------------------------ #
+    @staticmethod
+    def exists(path: str | Path) -> bool:
+        path = Path(path)
+        return (path / SEGMENTS_DIR).is_dir() or (path / LEGACY_META_FILE).exists()
+
+    def refresh(self) -> None:
+        """
+        Pick up segments and tombstones written since the last call, e.g. by
+        another worker. Only new segments are read.
+        """
+        self._migrate_legacy()
+        if not self.segments_dir.is_dir():
+            return
+
+        on_disk = self._list_segment_files()
+        known = {(s.first, s.last) for s in self._segments}
+        changed = False
+        if not known.issubset(on_disk):
+            # Segments were merged elsewhere, start over
+            self._segments = []
+            self._tombstones_offset = 0
+            known = set()
+            changed = True
+
+        for first, last in sorted(on_disk - known):
+            segment = self._read_segment(first, last)
+            if segment is not None:
+                self._segments.append(segment)
+                changed = True
+        self._segments.sort(key=lambda s: s.first)
+        if self._read_tombstones() or changed:
+            self._rebuild_doc_index()
+
+    def _list_segment_files(self) -> Set[Tuple[int, int]]:
+        spans: List[Tuple[int, int]] = []
+        for entry in os.listdir(self.segments_dir):
+            match = _SEGMENT_RE.match(entry)
+            if match and (self.segments_dir / entry.replace(".npy", ".jsonl")).exists():
+                spans.append((int(match.group(1)), int(match.group(2))))
+
+        # A crash between writing a merged segment and removing its sources leaves
+        # both behind; the widest span wins.
+        live: Set[Tuple[int, int]] = set()
+        for span in spans:
+            covered = any(
+                other != span and other[0] <= span[0] and span[1] <= other[1]
+                for other in spans
+            )
+            if covered:
+                self._remove_segment_files(*span)
+            else:
+                live.add(span)
+        return live
+
+    def _read_segment(self, first: int, last: int) -> Optional[_Segment]:
+        name = f"seg_{first:08d}_{last:08d}"
+        with open(self.segments_dir / f"{name}.jsonl", encoding="utf-8") as f:
+            meta = [json.loads(line) for line in f if line.strip()]
+        embeddings = np.load(self.segments_dir / f"{name}.npy", mmap_mode="r")
+        if embeddings.shape[0] != len(meta):
+            _logger.error(f"Segment {name} is inconsistent, skipping it.")
+            return None
+        if self.dim is None and embeddings.ndim == 2:
+            self.dim = int(embeddings.shape[1])
+        return _Segment(first=first, last=last, rows=len(meta), meta=meta, _embeddings=embeddings)
+
+    def _read_tombstones(self) -> bool:
+        """Apply tombstones appended since the last read. Returns True if any were."""
+        tombstones = self.path / TOMBSTONES_FILE
+        if not tombstones.exists() or tombstones.stat().st_size == self._tombstones_offset:
+            return False
+        by_name = {s.name: s for s in self._segments}
+        if self._tombstones_offset == 0:
+            for segment in self._segments:
+                segment.deleted.clear()
+        with open(tombstones, encoding="utf-8") as f:
+            f.seek(self._tombstones_offset)
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                segment = by_name.get(record["segment"])
+                if segment is not None:
+                    segment.deleted.update(record["rows"])
+            self._tombstones_offset = f.tell()
+        return True
+
+    def _rebuild_doc_index(self) -> None:
+        self._doc_rows = {}
+        for segment in self._segments:
+            for row, meta in enumerate(segment.meta):
+                if row not in segment.deleted:
+                    self._doc_rows.setdefault(meta["doc_id"], []).append((segment, row))
+        self._invalidate_views()
+
+    def _migrate_legacy(self) -> None:
+        """Convert a docs_meta.json + emb_matrix.npy snapshot into a first segment."""
+        legacy_meta = self.path / LEGACY_META_FILE
+        legacy_emb = self.path / LEGACY_EMB_FILE
+        if self.segments_dir.is_dir() or not legacy_meta.exists() or not legacy_emb.exists():
+            return
+
+        _logger.info(f"Migrating {self.path} to segmented storage …")
+        with open(legacy_meta, encoding="utf-8") as f:
+            meta: List[Dict[str, Any]] = json.load(f)
+        embeddings = np.load(legacy_emb)
+        communities = [m.pop("community", None) for m in meta]
+
+        self.segments_dir.mkdir(parents=True, exist_ok=True)
+        if meta:
+            self._write_segment(0, 0, meta, embeddings)
+        if meta and all(c is not None for c in communities):
+            np.save(self.path / COMMUNITIES_FILE, np.asarray(communities))
+        legacy_meta.unlink()
+        legacy_emb.unlink()
+
+    # ------------------------------------------------------------------ #
+    # Reading                                                             #
+    # ------------------------------------------------------------------ #
+    @property
+    def num_rows(self) -> int:
+        return sum(s.live_rows for s in self._segments)
+
+    @property
+    def num_segments(self) -> int:
+        return len(self._segments)
+
+    def has_document(self, doc_id: str) -> bool:
+        return doc_id in self._doc_rows
+
+    def document_ids(self) -> List[str]:
+        return list(self._doc_rows)
+
+    def docs_meta(self) -> List[Dict[str, Any]]:
+        """Metadata of the live rows, in row order."""
+        if self._meta_cache is None:
+            self._meta_cache = [
+                meta
+                for segment in self._segments
+                for row, meta in enumerate(segment.meta)
+                if row not in segment.deleted
+            ]
+        return self._meta_cache
+
+    def embeddings(self) -> npt.NDArray:
+        """
+        Embeddings of the live rows, in row order. A single segment without
+        tombstones is returned as the read-only memory map itself.
+        """
+        if self._embeddings_cache is None:
+            parts = []
+            for segment in self._segments:
+                embeddings = self._segment_embeddings(segment)
+                parts.append(embeddings[segment.live_mask()] if segment.deleted else embeddings)
+            if not parts:
+                self._embeddings_cache = np.empty((0, self.dim or 0), dtype=np.float32)
+            elif len(parts) == 1:
+                self._embeddings_cache = parts[0]
+            else:
+                self._embeddings_cache = np.concatenate(parts, axis=0)
+        return self._embeddings_cache
+
+    def _segment_embeddings(self, segment: _Segment) -> npt.NDArray:
+        if segment._embeddings is None:
+            segment._embeddings = np.load(self.segments_dir / f"{segment.name}.npy", mmap_mode="r")
+        return segment._embeddings
+
+    def read_communities(self) -> Optional[List[int]]:
+        path = self.path / COMMUNITIES_FILE
+        if not path.exists():
+            return None
+        labels = np.load(path)
+        if len(labels) != self.num_rows:
+            return None
+        return labels.tolist()
+
+    # ------------------------------------------------------------------ #
+    # Writing                                                             #
+    # ------------------------------------------------------------------ #
+    def append(self, meta: List[Dict[str, Any]], embeddings: npt.NDArray) -> None:
+        """Append rows as a new segment, then merge tail segments if due."""
+        if len(meta) != len(embeddings):
+            raise ValueError("meta and embeddings must have the same length")
+        if not meta:
+            return
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        if self.dim is None:
+            self.dim = int(embeddings.shape[1])
+
+        self.segments_dir.mkdir(parents=True, exist_ok=True)
+        next_id = self._segments[-1].last + 1 if self._segments else 0
+        segment = self._write_segment(next_id, next_id, meta, embeddings)
+        self._segments.append(segment)
+        for row, m in enumerate(segment.meta):
+            self._doc_rows.setdefault(m["doc_id"], []).append((segment, row))
+        self._invalidate_views()
+
+        while len(self._segments) >= 2 and (
+            self._segments[-2].live_rows <= self._segments[-1].live_rows
+        ):
+            self._merge(self._segments[-2:])
+
+    def delete_document(self, doc_id: str) -> int:
+        """Tombstone all rows of `doc_id`. Returns the number of rows deleted."""
+        rows = self._doc_rows.pop(doc_id, [])
+        if not rows:
+            return 0
+
+        by_segment: Dict[str, List[int]] = {}
+        for segment, row in rows:
+            segment.deleted.add(row)
+            by_segment.setdefault(segment.name, []).append(row)
+
+        with open(self.path / TOMBSTONES_FILE, "a", encoding="utf-8") as f:
+            for name, seg_rows in by_segment.items():
+                f.write(json.dumps({"segment": name, "rows": seg_rows}) + "\n")
+            self._tombstones_offset = f.tell()
+
+        # Community labels are aligned to live rows, they are stale now
+        (self.path / COMMUNITIES_FILE).unlink(missing_ok=True)
+        self._invalidate_views()
+        return len(rows)
+
+    def compact(self) -> None:
+        """Merge all segments into one and drop tombstoned rows."""
+        if len(self._segments) > 1 or any(s.deleted for s in self._segments):
+            self._merge(list(self._segments))
+
+    def rewrite(self, meta: List[Dict[str, Any]], embeddings: npt.NDArray) -> None:
+        """Replace the whole content of the store."""
+        self.clear()
+        self.append(meta, embeddings)
+
+    def write_communities(self, labels: Iterable[int]) -> None:
+        labels = np.asarray(list(labels))
+        if len(labels) != self.num_rows:
+            raise ValueError("one community label per live row is required")
+        np.save(self.path / COMMUNITIES_FILE, labels)
+
+    def clear(self) -> None:
+        if self.segments_dir.exists():
+            shutil.rmtree(self.segments_dir)
+        for name in (TOMBSTONES_FILE, COMMUNITIES_FILE):
+            (self.path / name).unlink(missing_ok=True)
+        self._segments = []
+        self._doc_rows = {}
+        self._tombstones_offset = 0
+        self._invalidate_views()
+
+    def _merge(self, segments: List[_Segment]) -> None:
+        first, last = segments[0].first, segments[-1].last
+        meta: List[Dict[str, Any]] = []
+        parts: List[npt.NDArray] = []
+        for segment in segments:
+            mask = segment.live_mask()
+            meta.extend(m for m, keep in zip(segment.meta, mask) if keep)
+            parts.append(np.asarray(self._segment_embeddings(segment)[mask]))
+
+        embeddings = np.concatenate(parts, axis=0) if parts else np.empty((0, self.dim or 0), np.float32)
+        merged = self._write_segment(first, last, meta, embeddings)
+        # Drop the memory maps before removing the files they point to
+        for segment in segments:
+            segment._embeddings = None
+            if (segment.first, segment.last) != (first, last):
+                self._remove_segment_files(segment.first, segment.last)
+
+        index = self._segments.index(segments[0])
+        self._segments[index:index + len(segments)] = [merged]
+        self._prune_tombstones()
+
+        # Only documents of the merged segments move, keep the merge cost local
+        merged_away = {id(segment) for segment in segments}
+        for doc_id in {m["doc_id"] for m in merged.meta}:
+            self._doc_rows[doc_id] = [
+                (segment, row) for segment, row in self._doc_rows.get(doc_id, [])
+                if id(segment) not in merged_away
+            ]
+        for row, m in enumerate(merged.meta):
+            self._doc_rows[m["doc_id"]].append((merged, row))
+        self._invalidate_views()
+
+    def _prune_tombstones(self) -> None:
+        """Rewrite the tombstone log without entries for merged-away segments."""
+        tombstones = self.path / TOMBSTONES_FILE
+        if not tombstones.exists():
+            return
+        records = [
+            {"segment": s.name, "rows": sorted(s.deleted)}
+            for s in self._segments if s.deleted
+        ]
+        if not records:
+            tombstones.unlink()
+            self._tombstones_offset = 0
+            return
+        tmp = tombstones.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+            self._tombstones_offset = f.tell()
+        os.replace(tmp, tombstones)
+
+    def _write_segment(
+        self,
+        first: int,
+        last: int,
+        meta: List[Dict[str, Any]],
+        embeddings: npt.NDArray,
+    ) -> _Segment:
+        """Write meta first and the embeddings last; the .npy rename commits the segment."""
+        name = f"seg_{first:08d}_{last:08d}"
+        # Embeddings live in the .npy file and community labels in communities.npy
+        meta = [{k: v for k, v in m.items() if k not in ("embedding", "community")} for m in meta]
+
+        meta_tmp = self.segments_dir / f"{name}.jsonl.tmp"
+        with open(meta_tmp, "w", encoding="utf-8") as f:
+            for m in meta:
+                f.write(json.dumps(m, ensure_ascii=False, default=str) + "\n")
+        os.replace(meta_tmp, self.segments_dir / f"{name}.jsonl")
+
+        emb_tmp = self.segments_dir / f"{name}.tmp.npy"
+        np.save(emb_tmp, np.asarray(embeddings, dtype=np.float32))
+        os.replace(emb_tmp, self.segments_dir / f"{name}.npy")
+
+        return _Segment(first=first, last=last, rows=len(meta), meta=meta)
+
+    def _remove_segment_files(self, first: int, last: int) -> None:
+        name = f"seg_{first:08d}_{last:08d}"
+        for suffix in (".npy", ".jsonl"):
+            (self.segments_dir / f"{name}{suffix}").unlink(missing_ok=True)
+
+    def _invalidate_views(self) -> None:
+        self._embeddings_cache = None
+        self._meta_cache = None
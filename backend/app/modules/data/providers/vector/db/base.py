@@ -27,7 +27,7 @@ class VectorDBConfig(BaseModel):
     distance_metric: str = Field(
         default="cosine", description="Distance metric (cosine, euclidean, dot_product)")
     index_type: str = Field(
-        default="hnsw", description="Index type (hnsw, flat, ivf)")
+        default="hnsw", description="Index type (hnsw, flat, ivf, ivf_flat, ivf_pq)")
 
     # HNSW specific parameters
     hnsw_m: int = Field(default=16, description="HNSW M parameter")
@@ -36,6 +36,28 @@ class VectorDBConfig(BaseModel):
     hnsw_ef_search: int = Field(
         default=100, description="HNSW ef_search parameter")
 
+    # IVF specific parameters (FAISS)
+    ivf_nlist: Optional[int] = Field(
+        default=None, description="IVF number of lists (default 4 * sqrt(vectors))")
+    ivf_nprobe: int = Field(
+        default=16, description="IVF lists probed per query")
+    ivf_pq_m: int = Field(
+        default=16, description="IVF-PQ sub-quantizers (rounded down to a divisor of the dimension)")
+    ivf_pq_nbits: int = Field(
+        default=8, description="IVF-PQ bits per sub-quantizer code")
+    ivf_train_min_vectors: int = Field(
+        default=10000, description="Vectors needed before the IVF index is trained, searches are exact until then")
+    ivf_retrain_growth: float = Field(
+        default=2.0, description="Retrain the IVF index once the corpus grows by this factor")
+
+    # FAISS specific parameters
+    checkpoint_interval: int = Field(
+        default=10000, description="Vectors written to the FAISS write-ahead log between index checkpoints")
+    subindex_max_vectors: int = Field(
+        default=50000, description="Knowledge bases up to this size get an exact FAISS sub-index for filtered search")
+    subindex_cache_size: int = Field(
+        default=64, description="Number of per knowledge base FAISS sub-indexes kept in memory")
+
     # Additional database-specific parameters
     extra_params: Optional[Dict[str, Any]] = Field(
         default_factory=dict, description="Additional database-specific parameters")
@@ -65,7 +87,7 @@ class VectorDBConfig(BaseModel):
     @field_validator('index_type')
     @classmethod
     def validate_index_type(cls, v):
-        allowed_types = ['hnsw', 'flat', 'ivf']
+        allowed_types = ['hnsw', 'flat', 'ivf', 'ivf_flat', 'ivf_pq']
         if v not in allowed_types:
             raise ValueError(f'index_type must be one of {allowed_types}')
         return v
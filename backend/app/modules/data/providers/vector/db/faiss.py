@@ -3,392 +3,805 @@ FAISS vector database implementation
 """
 
 import logging
+import math
 import os
 import pickle
-from typing import List, Dict, Any
+import threading
+from collections import OrderedDict
+from typing import Callable, List, Dict, Any, Optional, Tuple
 import numpy as np
 
 from .base import BaseVectorDB, VectorDBConfig, SearchResult
+from .faiss_store import ChunkStore, VectorFile, WriteAheadLog, posting_value
 
 logger = logging.getLogger(__name__)
 
+# Rebuild indexes without native removal once this share of their vectors is deleted
+STALE_REBUILD_RATIO = 0.2
+
+# Index types that have to be trained before vectors can be added
+IVF_INDEX_TYPES = ("ivf", "ivf_flat", "ivf_pq")
+
+# FAISS k-means warns below 39 training points per centroid
+MIN_POINTS_PER_CENTROID = 39
+TRAIN_POINTS_PER_CENTROID = 64
+ADD_BATCH_SIZE = 65536
+
+# Filtered searches score candidate sets up to this size exactly
+EXACT_SEARCH_MAX_CANDIDATES = 4096
+# Times k / nprobe / efSearch are doubled until enough filtered hits survive
+MAX_WIDENING_ROUNDS = 8
+# Metadata key that gets per-value sub-indexes (set by VectorProvider)
+SUBINDEX_KEY = "kb_id"
+
 
 class FaissVectorDB(BaseVectorDB):
-    """FAISS vector database provider"""
-    
+    """
+    FAISS vector database provider
+
+    Vectors are stored in an ``IndexIDMap2`` under stable int64 ids, chunk
+    contents and metadata in a SQLite sidecar. With a persist directory the
+    collection is laid out as::
+
+        <collection>.sqlite            # chunks + state (dimension, seq, checkpoint)
+        <collection>.wal               # index mutations since the last checkpoint
+        <collection>-<seq>.index       # last index checkpoint
+        <collection>.vectors           # raw vectors, IVF index types only
+
+    Filtered searches resolve scalar metadata conditions through an inverted
+    index in the sidecar and hand the matching ids to FAISS as an
+    ``IDSelector``. Small candidate sets are scored exactly, small knowledge
+    bases get a cached exact sub-index, and ``k`` (and ``nprobe`` /
+    ``efSearch``) is widened until enough hits survive.
+
+    IVF indexes are searched exactly until ``ivf_train_min_vectors`` vectors
+    exist, then trained in a background thread and retrained whenever the
+    corpus has grown by ``ivf_retrain_growth``. IVF indexes store the int64
+    ids natively since ``IndexIDMap2`` cannot remove ids from them.
+    """
+
     def __init__(self, config: VectorDBConfig):
         super().__init__(config)
+        self.faiss = None
         self.index = None
-        self.id_map = {}  # Maps internal index to document ID
-        self.metadata_map = {}  # Maps document ID to metadata
-        self.content_map = {}  # Maps document ID to content
+        self.store: Optional[ChunkStore] = None
+        self.wal: Optional[WriteAheadLog] = None
         self.dimension = None
         self.next_id = 0
-    
+        self.seq = 0  # sequence number of the last logged index mutation
+        self.checkpoint_seq = 0
+        self._pending_writes = 0  # vectors written since the last checkpoint
+        self._stale_vectors = 0  # deleted vectors still held by the index
+        self.vectors: Optional[VectorFile] = None
+        self._trained_size = 0  # vectors the IVF index was last trained with
+        self._index_lock = threading.RLock()
+        self._build_thread: Optional[threading.Thread] = None
+        self._build_ops: Optional[list] = None  # writes made while a build runs
+        self._generation = 0  # bumped when the collection is reset or closed
+        # Exact sub-indexes of small knowledge bases, keyed by the encoded kb_id
+        self._subindexes: "OrderedDict[str, Any]" = OrderedDict()
+        self._large_kbs = set()  # encoded kb_ids too large for a sub-index
+
     async def initialize(self) -> bool:
         """Initialize the FAISS index"""
         try:
             import faiss
             self.faiss = faiss
-            
-            # Load existing index if it exists
-            if self.config.persist_directory:
-                self._load_index()
-            
+
+            if self.store is None:
+                self._open()
+
             logger.info("Initialized FAISS vector database")
             return True
-            
+
         except ImportError:
             logger.error("FAISS not installed. Install with: pip install faiss-cpu or faiss-gpu")
             return False
         except Exception as e:
             logger.error(f"Failed to initialize FAISS: {e}")
             return False
-    
+
     async def create_collection(self, dimension: int) -> bool:
-        """Create a new FAISS index"""
+        """Create the FAISS index, reusing the persisted one if it has the same dimension"""
         try:
             if not self.faiss:
                 if not await self.initialize():
                     return False
-            
+
+            if self.index is not None and self.dimension == dimension:
+                logger.info(
+                    f"Using existing FAISS index {self.config.collection_name} with {self.index.ntotal} vectors")
+                return True
+
+            if self.index is not None:
+                logger.warning(
+                    f"FAISS index {self.config.collection_name} has dimension {self.dimension}, "
+                    f"recreating it with dimension {dimension}")
+                self._reset()
+
             self.dimension = dimension
-            
-            # Create index based on configuration
-            if self.config.index_type == "flat":
-                if self.config.distance_metric == "cosine":
-                    # Normalize vectors for cosine similarity
-                    self.index = self.faiss.IndexFlatIP(dimension)
-                elif self.config.distance_metric == "euclidean":
-                    self.index = self.faiss.IndexFlatL2(dimension)
-                else:
-                    self.index = self.faiss.IndexFlatIP(dimension)  # Default to inner product
-            
-            elif self.config.index_type == "hnsw":
-                # HNSW index for faster search
-                if self.config.distance_metric == "cosine":
-                    self.index = self.faiss.IndexHNSWFlat(dimension, self.config.hnsw_m)
-                    self.index.hnsw.efConstruction = self.config.hnsw_ef_construction
-                    self.index.hnsw.efSearch = self.config.hnsw_ef_search
-                elif self.config.distance_metric == "euclidean":
-                    self.index = self.faiss.IndexHNSWFlat(dimension, self.config.hnsw_m, self.faiss.METRIC_L2)
-                    self.index.hnsw.efConstruction = self.config.hnsw_ef_construction
-                    self.index.hnsw.efSearch = self.config.hnsw_ef_search
-                else:
-                    self.index = self.faiss.IndexHNSWFlat(dimension, self.config.hnsw_m)
-            
-            else:
-                # Default to flat index
-                self.index = self.faiss.IndexFlatIP(dimension)
-            
-            # Reset mappings
-            self.id_map = {}
-            self.metadata_map = {}
-            self.content_map = {}
-            self.next_id = 0
-            
+            self.index = self._new_index(dimension)
+            self._open_vectors()
+            self.store.set_state({"dimension": dimension})
+
             logger.info(f"Created FAISS index with dimension {dimension}")
             return True
-            
+
         except Exception as e:
             logger.error(f"Failed to create FAISS index: {e}")
             return False
-    
+
     async def delete_collection(self) -> bool:
         """Delete the collection"""
         try:
             self.index = None
-            self.id_map = {}
-            self.metadata_map = {}
-            self.content_map = {}
-            self.next_id = 0
-            
-            # Delete persisted files
-            if self.config.persist_directory:
-                index_file = os.path.join(self.config.persist_directory, f"{self.config.collection_name}.index")
-                metadata_file = os.path.join(self.config.persist_directory, f"{self.config.collection_name}_metadata.pkl")
-                
-                for file_path in [index_file, metadata_file]:
-                    if os.path.exists(file_path):
-                        os.remove(file_path)
-            
+            self.dimension = None
+            if self.store is not None:
+                self._reset()
+
             logger.info("Deleted FAISS collection")
             return True
-            
+
         except Exception as e:
             logger.error(f"Failed to delete FAISS collection: {e}")
             return False
-    
+
     async def add_vectors(
-        self, 
-        ids: List[str], 
-        vectors: List[List[float]], 
+        self,
+        ids: List[str],
+        vectors: List[List[float]],
         metadatas: List[Dict[str, Any]],
         contents: List[str]
     ) -> bool:
-        """Add vectors to the index"""
+        """Add vectors to the index, replacing any vectors stored under the same IDs"""
         try:
             if not self.index:
                 logger.error("Index not initialized")
                 return False
-            
-            # Convert to numpy array
-            vectors_np = np.array(vectors, dtype=np.float32)
-            
-            # Normalize vectors if using cosine similarity
-            if self.config.distance_metric == "cosine":
-                norms = np.linalg.norm(vectors_np, axis=1, keepdims=True)
-                norms = np.where(norms == 0, 1, norms)  # Avoid division by zero
-                vectors_np = vectors_np / norms
-            
-            # Add vectors to index
-            start_idx = self.index.ntotal
-            self.index.add(vectors_np)
-            
-            # Update mappings
-            for i, doc_id in enumerate(ids):
-                internal_id = start_idx + i
-                self.id_map[internal_id] = doc_id
-                self.metadata_map[doc_id] = metadatas[i]
-                self.content_map[doc_id] = contents[i]
-            
-            self.next_id = self.index.ntotal
-            
-            # Persist if configured
-            if self.config.persist_directory:
-                self._save_index()
-            
+            if not ids:
+                return True
+
+            vectors_np = self._prepare_vectors(vectors)
+
+            with self._index_lock:
+                # Re-added chunks replace their previous vectors
+                existing = self.store.int_ids_for(ids)
+                if existing:
+                    self._remove_int_ids(np.fromiter(existing.values(), dtype=np.int64))
+
+                int_ids = np.arange(self.next_id, self.next_id + len(ids), dtype=np.int64)
+                self.seq += 1
+                self.wal.append_add(self.seq, int_ids, vectors_np)
+                self._apply_add(int_ids, vectors_np)
+                self.next_id += len(ids)
+
+                self.store.insert(
+                    int_ids, ids, contents, metadatas,
+                    state={"next_id": self.next_id, "seq": self.seq},
+                )
+                self._update_subindexes(int_ids, vectors_np, metadatas)
+                self._after_write(len(ids))
+
             logger.info(f"Added {len(ids)} vectors to FAISS index")
             return True
-            
+
         except Exception as e:
             logger.error(f"Failed to add vectors to FAISS: {e}")
             return False
-    
+
     async def delete_vectors(self, ids: List[str]) -> bool:
-        """Delete vectors by IDs (FAISS doesn't support deletion, so we rebuild)"""
+        """Delete vectors by IDs"""
         try:
             if not self.index:
                 logger.error("Index not initialized")
                 return False
-            
-            # Remove from mappings
-            internal_ids_to_remove = []
-            for internal_id, doc_id in self.id_map.items():
-                if doc_id in ids:
-                    internal_ids_to_remove.append(internal_id)
-            
-            for internal_id in internal_ids_to_remove:
-                doc_id = self.id_map[internal_id]
-                del self.id_map[internal_id]
-                if doc_id in self.metadata_map:
-                    del self.metadata_map[doc_id]
-                if doc_id in self.content_map:
-                    del self.content_map[doc_id]
-            
-            # For FAISS, we need to rebuild the index without deleted vectors
-            # This is expensive but necessary since FAISS doesn't support deletion
-            if internal_ids_to_remove:
-                self._rebuild_index()
-            
-            logger.info(f"Deleted {len(ids)} vectors from FAISS index")
+
+            with self._index_lock:
+                int_ids = self.store.int_ids_for(ids)
+                if int_ids:
+                    self._remove_int_ids(np.fromiter(int_ids.values(), dtype=np.int64))
+                    self._after_write(len(int_ids))
+
+            logger.info(f"Deleted {len(int_ids)} vectors from FAISS index")
             return True
-            
+
         except Exception as e:
             logger.error(f"Failed to delete vectors from FAISS: {e}")
             return False
-    
+
     async def search(
-        self, 
-        query_vector: List[float], 
+        self,
+        query_vector: List[float],
         limit: int = 5,
-        filter_dict: Dict[str, Any] = None
+        filter_dict: Dict[str, Any] = None,
+        nprobe: Optional[int] = None,
+        ef_search: Optional[int] = None
     ) -> List[SearchResult]:
-        """Search for similar vectors"""
+        """
+        Search for similar vectors
+
+        ``nprobe`` (IVF) and ``ef_search`` (HNSW) override the configured
+        speed/recall trade-off for this query.
+        """
         try:
             if not self.index or self.index.ntotal == 0:
                 return []
-            
-            # Convert query to numpy array
-            query_np = np.array([query_vector], dtype=np.float32)
-            
-            # Normalize if using cosine similarity
-            if self.config.distance_metric == "cosine":
-                norm = np.linalg.norm(query_np)
-                if norm > 0:
-                    query_np = query_np / norm
-            
-            # Search the index
-            distances, indices = self.index.search(query_np, min(limit * 2, self.index.ntotal))
-            
-            # Convert results
-            search_results = []
-            for i, (distance, internal_id) in enumerate(zip(distances[0], indices[0])):
-                if internal_id == -1:  # Invalid result
-                    continue
-                
-                doc_id = self.id_map.get(internal_id)
-                if not doc_id:
-                    continue
-                
-                # Apply filters if provided
-                if filter_dict:
-                    metadata = self.metadata_map.get(doc_id, {})
-                    if not self._matches_filter(metadata, filter_dict):
-                        continue
-                
-                # Convert distance to score
-                if self.config.distance_metric == "cosine":
-                    score = distance  # Inner product for cosine (higher is better)
-                else:
-                    score = 1.0 / (1.0 + distance)  # Convert L2 distance to similarity
-                
-                result = SearchResult(
+
+            query_np = self._prepare_vectors([query_vector])
+
+            with self._index_lock:
+                hits = self._search_hits(query_np, limit, filter_dict or {}, nprobe, ef_search)
+
+            return [
+                SearchResult(
                     id=doc_id,
-                    content=self.content_map.get(doc_id, ""),
-                    metadata=self.metadata_map.get(doc_id, {}),
-                    score=score,
-                    distance=distance
+                    content=content,
+                    metadata=metadata,
+                    score=self._score(distance),
+                    distance=max(distance, 0.0)
                 )
-                search_results.append(result)
-                
-                if len(search_results) >= limit:
-                    break
-            
-            return search_results
-            
+                for distance, (doc_id, content, metadata) in hits
+            ]
+
         except Exception as e:
             logger.error(f"Failed to search FAISS index: {e}")
             return []
-    
+
     async def get_by_ids(self, ids: List[str]) -> List[SearchResult]:
         """Get vectors by their IDs"""
         try:
-            search_results = []
-            for doc_id in ids:
-                if doc_id in self.metadata_map:
-                    result = SearchResult(
-                        id=doc_id,
-                        content=self.content_map.get(doc_id, ""),
-                        metadata=self.metadata_map.get(doc_id, {}),
-                        score=1.0,
-                        distance=0.0
-                    )
-                    search_results.append(result)
-            
-            return search_results
-            
+            rows = self.store.fetch_by_doc_ids(ids)
+            return [
+                SearchResult(
+                    id=doc_id,
+                    content=rows[doc_id][0],
+                    metadata=rows[doc_id][1],
+                    score=1.0,
+                    distance=0.0
+                )
+                for doc_id in ids
+                if doc_id in rows
+            ]
+
         except Exception as e:
             logger.error(f"Failed to get vectors by IDs from FAISS: {e}")
             return []
-    
+
     async def get_all_ids(self, filter_dict: Dict[str, Any] = None) -> List[str]:
         """Get all document IDs in the collection"""
         try:
-            if filter_dict:
-                # Apply filter
-                filtered_ids = []
-                for doc_id, metadata in self.metadata_map.items():
-                    if self._matches_filter(metadata, filter_dict):
-                        filtered_ids.append(doc_id)
-                return filtered_ids
-            else:
-                return list(self.metadata_map.keys())
-            
+            return [doc_id for _, doc_id, _ in self.store.iter_rows(filter_dict)]
+
         except Exception as e:
             logger.error(f"Failed to get all IDs from FAISS: {e}")
             return []
-    
+
     async def count(self, filter_dict: Dict[str, Any] = None) -> int:
         """Count documents in the collection"""
+        if not filter_dict and self.store is not None:
+            return self.store.count()
         ids = await self.get_all_ids(filter_dict)
         return len(ids)
-    
+
+    def close(self):
+        """Checkpoint the index and close the sidecar files"""
+        with self._index_lock:
+            # A running background build is discarded
+            self._generation += 1
+            self._build_ops = None
+            self._build_thread = None
+            try:
+                if self.index is not None and self._pending_writes:
+                    self.checkpoint()
+            except Exception as e:
+                logger.error(f"Failed to checkpoint FAISS index on close: {e}")
+            self._close_files()
+            self._subindexes.clear()
+            self.index = None
+
+    def _close_files(self):
+        if self.vectors is not None:
+            self.vectors.close()
+            self.vectors = None
+        if self.wal is not None:
+            self.wal.close()
+            self.wal = None
+        if self.store is not None:
+            self.store.close()
+            self.store = None
+
+    def _search_hits(
+        self,
+        query_np: np.ndarray,
+        limit: int,
+        filter_dict: Dict[str, Any],
+        nprobe: Optional[int],
+        ef_search: Optional[int],
+    ) -> List[Tuple[float, Tuple[str, str, Dict[str, Any]]]]:
+        """Top ``limit`` (distance, row) pairs matching the filter"""
+        scalar, remaining = ChunkStore.split_filter(filter_dict)
+        index, selector, candidates = self.index, None, None
+        if scalar:
+            candidates = self.store.int_ids_matching(scalar)
+            if not len(candidates):
+                return []
+            subindex = self._kb_subindex(scalar[SUBINDEX_KEY]) if SUBINDEX_KEY in scalar else None
+            if subindex is not None:
+                index = subindex
+                if len(scalar) > 1:
+                    selector = self.faiss.IDSelectorBatch(candidates)
+            elif len(candidates) <= EXACT_SEARCH_MAX_CANDIDATES:
+                distances, indices = self._exact_search(query_np, candidates)
+                return self._collect_hits(distances, indices, limit, remaining)
+            else:
+                selector = self.faiss.IDSelectorBatch(candidates)
+
+        # Deleted vectors an index could not drop natively only show up without a selector
+        stale = self._stale_vectors if index is self.index and selector is None else 0
+        max_k = index.ntotal if candidates is None else min(len(candidates) + stale, index.ntotal)
+        k = min(limit * (2 if remaining else 1) + stale, max_k)
+        approximate = index is self.index and self.config.index_type in ("hnsw",) + IVF_INDEX_TYPES
+        nprobe = nprobe or self.config.ivf_nprobe
+        ef_search = ef_search or self.config.hnsw_ef_search
+
+        for _ in range(MAX_WIDENING_ROUNDS):
+            params = self._search_params(nprobe, max(ef_search, k), selector, index)
+            distances, indices = index.search(query_np, k, params=params)
+            hits = self._collect_hits(distances[0], indices[0], limit, remaining)
+            if len(hits) >= limit or (k >= max_k and (not approximate or candidates is None)):
+                break
+            # Not enough hits survived the filters, widen the search
+            k = min(k * 2, max_k)
+            nprobe *= 2
+            ef_search *= 2
+        return hits
+
+    def _collect_hits(self, distances, indices, limit: int, remaining: Dict[str, Any]):
+        rows = self.store.fetch([int(i) for i in indices if i != -1])
+        hits = []
+        for distance, internal_id in zip(distances, indices):
+            row = rows.get(int(internal_id))
+            if row is None:  # Invalid or deleted result
+                continue
+            # Non-scalar filters are checked here
+            if remaining and not self._matches_filter(row[2], remaining):
+                continue
+            hits.append((float(distance), row))
+            if len(hits) >= limit:
+                break
+        return hits
+
+    def _exact_search(self, query_np: np.ndarray, int_ids: np.ndarray):
+        """Rank a small candidate set by brute force, best first"""
+        vectors = self._read_vectors(int_ids)
+        if self._metric == self.faiss.METRIC_L2:
+            distances = ((vectors - query_np[0]) ** 2).sum(axis=1)
+            order = np.argsort(distances, kind="stable")
+        else:
+            distances = vectors @ query_np[0]
+            order = np.argsort(-distances, kind="stable")
+        return distances[order], int_ids[order]
+
+    def _read_vectors(self, int_ids: np.ndarray) -> np.ndarray:
+        if self.vectors is not None:
+            return self.vectors.read(int_ids)
+        return self.index.reconstruct_batch(int_ids)
+
+    def _kb_subindex(self, kb_key: str):
+        """Cached exact index over one knowledge base, None if it is too large"""
+        subindex = self._subindexes.get(kb_key)
+        if subindex is not None:
+            self._subindexes.move_to_end(kb_key)
+            return subindex
+        if kb_key in self._large_kbs:
+            return None
+
+        int_ids = self.store.int_ids_matching({SUBINDEX_KEY: kb_key})
+        if len(int_ids) > self.config.subindex_max_vectors:
+            self._large_kbs.add(kb_key)
+            return None
+        subindex = self._new_flat_index(self.dimension)
+        subindex.add_with_ids(np.ascontiguousarray(self._read_vectors(int_ids)), int_ids)
+        self._subindexes[kb_key] = subindex
+        while len(self._subindexes) > self.config.subindex_cache_size:
+            self._subindexes.popitem(last=False)
+        return subindex
+
+    def _update_subindexes(self, int_ids: np.ndarray, vectors: np.ndarray, metadatas: List[Dict[str, Any]]):
+        if not self._subindexes:
+            return
+        kb_keys = np.array([posting_value((m or {}).get(SUBINDEX_KEY)) for m in metadatas], dtype=object)
+        for kb_key in set(kb_keys) & set(self._subindexes):
+            mask = kb_keys == kb_key
+            subindex = self._subindexes[kb_key]
+            subindex.add_with_ids(np.ascontiguousarray(vectors[mask]), int_ids[mask])
+            if subindex.ntotal > self.config.subindex_max_vectors:
+                del self._subindexes[kb_key]
+                self._large_kbs.add(kb_key)
+
     def _matches_filter(self, metadata: Dict[str, Any], filter_dict: Dict[str, Any]) -> bool:
         """Check if metadata matches filter criteria"""
         for key, value in filter_dict.items():
             if key not in metadata or metadata[key] != value:
                 return False
         return True
-    
-    def _rebuild_index(self):
-        """Rebuild the index without deleted vectors"""
-        if not self.index or self.index.ntotal == 0:
+
+    def checkpoint(self):
+        """Write the index to disk and truncate the write-ahead log"""
+        if self.index is None:
             return
-        
-        # Get all remaining vectors
-        remaining_vectors = []
-        remaining_ids = []
-        remaining_metadatas = []
-        remaining_contents = []
-        
-        for internal_id, doc_id in self.id_map.items():
-            if doc_id in self.metadata_map:
-                # Get vector from index
-                vector = self.index.reconstruct(internal_id)
-                remaining_vectors.append(vector)
-                remaining_ids.append(doc_id)
-                remaining_metadatas.append(self.metadata_map[doc_id])
-                remaining_contents.append(self.content_map[doc_id])
-        
-        # Recreate index
-        if remaining_vectors:
-            self.create_collection(self.dimension)
-            self.add_vectors(remaining_ids, remaining_vectors, remaining_metadatas, remaining_contents)
-    
-    def _save_index(self):
-        """Save the index and metadata to disk"""
-        if not self.config.persist_directory:
+        if self._stale_vectors > STALE_REBUILD_RATIO * max(self.index.ntotal, 1):
+            self._rebuild_index()
+        if self.vectors is not None:
+            self.vectors.sync()
+        if self.config.persist_directory:
+            index_file = f"{self._base_path}-{self.seq:012d}.index"
+            tmp_file = f"{index_file}.tmp"
+            self.faiss.write_index(self.index, tmp_file)
+            os.replace(tmp_file, index_file)
+
+            previous = self.store.get_state("checkpoint_file")
+            self.store.set_state({
+                "checkpoint_file": os.path.basename(index_file),
+                "checkpoint_seq": self.seq,
+                "stale_vectors": self._stale_vectors,
+                "trained_size": self._trained_size,
+            })
+            if previous and previous != os.path.basename(index_file):
+                self._remove_file(os.path.join(self.config.persist_directory, previous))
+            self.wal.truncate()
+        self.checkpoint_seq = self.seq
+        self._pending_writes = 0
+        logger.info(f"Checkpointed FAISS index {self.config.collection_name} at seq {self.seq}")
+
+    @property
+    def _base_path(self) -> str:
+        return os.path.join(self.config.persist_directory, self.config.collection_name)
+
+    @property
+    def _metric(self) -> int:
+        if self.config.distance_metric == "euclidean":
+            return self.faiss.METRIC_L2
+        # Inner product, on normalized vectors for cosine similarity
+        return self.faiss.METRIC_INNER_PRODUCT
+
+    def _new_index(self, dimension: int):
+        """Create an empty ID-mapped index based on configuration (exact until IVF training)"""
+        if self.config.index_type != "hnsw":
+            return self._new_flat_index(dimension)
+        # HNSW index for faster search
+        base = self.faiss.IndexHNSWFlat(dimension, self.config.hnsw_m, self._metric)
+        base.hnsw.efConstruction = self.config.hnsw_ef_construction
+        base.hnsw.efSearch = self.config.hnsw_ef_search
+        return self.faiss.IndexIDMap2(base)
+
+    def _new_flat_index(self, dimension: int):
+        if self._metric == self.faiss.METRIC_L2:
+            return self.faiss.IndexIDMap2(self.faiss.IndexFlatL2(dimension))
+        return self.faiss.IndexIDMap2(self.faiss.IndexFlatIP(dimension))
+
+    def _new_ivf_index(self, dimension: int, count: int, sample: Callable[[int], np.ndarray]):
+        """
+        Create an IVF-Flat or IVF-PQ index sized for ``count`` vectors, trained
+        on ``sample(size)``, which returns up to ``size`` of them
+        """
+        metric = self._metric
+        nlist = self._nlist(count)
+        if metric == self.faiss.METRIC_L2:
+            quantizer = self.faiss.IndexFlatL2(dimension)
+        else:
+            quantizer = self.faiss.IndexFlatIP(dimension)
+
+        sample_size = TRAIN_POINTS_PER_CENTROID * nlist
+        if self.config.index_type == "ivf_pq":
+            pq_m = self._pq_m(dimension)
+            index = self.faiss.IndexIVFPQ(
+                quantizer, dimension, nlist, pq_m, self.config.ivf_pq_nbits, metric)
+            sample_size = max(sample_size, TRAIN_POINTS_PER_CENTROID * 2 ** self.config.ivf_pq_nbits)
+        else:
+            index = self.faiss.IndexIVFFlat(quantizer, dimension, nlist, metric)
+
+        index.train(np.ascontiguousarray(sample(min(sample_size, count)), dtype=np.float32))
+        index.nprobe = self.config.ivf_nprobe
+        return index
+
+    def _nlist(self, count: int) -> int:
+        nlist = self.config.ivf_nlist or int(4 * math.sqrt(count))
+        return max(1, min(nlist, count // MIN_POINTS_PER_CENTROID))
+
+    def _pq_m(self, dimension: int) -> int:
+        """Largest number of PQ sub-quantizers <= ivf_pq_m that divides the dimension"""
+        for pq_m in range(min(self.config.ivf_pq_m, dimension), 0, -1):
+            if dimension % pq_m == 0:
+                return pq_m
+        return 1
+
+    def _search_params(self, nprobe: int, ef_search: int, selector=None, index=None):
+        index = index if index is not None else self.index
+        if isinstance(index, self.faiss.IndexIVF):
+            params = self.faiss.SearchParametersIVF()
+            params.nprobe = min(nprobe, index.nlist)
+        elif index is self.index and self.config.index_type == "hnsw":
+            params = self.faiss.SearchParametersHNSW()
+            params.efSearch = ef_search
+        elif selector is not None:
+            params = self.faiss.SearchParameters()
+        else:
+            return None
+        if selector is not None:
+            params.sel = selector
+        return params
+
+    def _prepare_vectors(self, vectors) -> np.ndarray:
+        vectors_np = np.ascontiguousarray(vectors, dtype=np.float32)
+        # Normalize vectors if using cosine similarity
+        if self.config.distance_metric == "cosine":
+            self.faiss.normalize_L2(vectors_np)
+        return vectors_np
+
+    def _score(self, distance: float) -> float:
+        """Convert a FAISS distance to a similarity score in [0, 1]"""
+        if self.config.distance_metric == "cosine":
+            return min(max(distance, 0.0), 1.0)  # Inner product for cosine (higher is better)
+        return 1.0 / (1.0 + max(distance, 0.0))
+
+    def _remove_int_ids(self, int_ids: np.ndarray) -> None:
+        """Log and apply the removal of vectors, then drop their sidecar rows"""
+        self.seq += 1
+        self.wal.append_remove(self.seq, int_ids)
+        self._apply_remove(int_ids)
+        self.store.delete(int_ids.tolist(), state={"seq": self.seq})
+
+    def _apply_add(self, int_ids: np.ndarray, vectors: np.ndarray) -> None:
+        if self.vectors is not None:
+            self.vectors.write(int_ids, vectors)
+        self.index.add_with_ids(vectors, int_ids)
+        if self._build_ops is not None:
+            self._build_ops.append((WriteAheadLog.OP_ADD, int_ids, vectors))
+
+    def _apply_remove(self, int_ids: np.ndarray) -> None:
+        if self._build_ops is not None:
+            self._build_ops.append((WriteAheadLog.OP_REMOVE, int_ids, None))
+        for subindex in self._subindexes.values():
+            subindex.remove_ids(self.faiss.IDSelectorBatch(int_ids))
+        # Knowledge bases may have shrunk below the sub-index size
+        self._large_kbs.clear()
+        try:
+            self.index.remove_ids(self.faiss.IDSelectorBatch(int_ids))
+        except RuntimeError:
+            # e.g. HNSW: the vectors stay in the index until the next rebuild,
+            # searches skip them because their sidecar rows are gone
+            self._stale_vectors += len(int_ids)
+
+    def _after_write(self, count: int) -> None:
+        self._pending_writes += count
+        if self._pending_writes >= self.config.checkpoint_interval:
+            self.checkpoint()
+        self._maybe_start_build()
+
+    def _maybe_start_build(self) -> None:
+        """Start (re)training the IVF index in the background once the corpus is large enough"""
+        if self.config.index_type not in IVF_INDEX_TYPES or self._build_thread is not None:
             return
-        
-        os.makedirs(self.config.persist_directory, exist_ok=True)
-        
-        # Save FAISS index
-        index_file = os.path.join(self.config.persist_directory, f"{self.config.collection_name}.index")
-        self.faiss.write_index(self.index, index_file)
-        
-        # Save metadata
-        metadata_file = os.path.join(self.config.persist_directory, f"{self.config.collection_name}_metadata.pkl")
-        metadata = {
-            "id_map": self.id_map,
-            "metadata_map": self.metadata_map,
-            "content_map": self.content_map,
-            "next_id": self.next_id,
-            "dimension": self.dimension
-        }
-        with open(metadata_file, "wb") as f:
-            pickle.dump(metadata, f)
-    
-    def _load_index(self):
-        """Load the index and metadata from disk"""
-        if not self.config.persist_directory:
+        count = self.store.count()
+        if self._trained_size:
+            due = count >= self._trained_size * self.config.ivf_retrain_growth
+        else:
+            due = count >= self.config.ivf_train_min_vectors
+        if not due:
             return
-        
-        index_file = os.path.join(self.config.persist_directory, f"{self.config.collection_name}.index")
-        metadata_file = os.path.join(self.config.persist_directory, f"{self.config.collection_name}_metadata.pkl")
-        
-        if os.path.exists(index_file) and os.path.exists(metadata_file):
-            try:
-                # Load FAISS index
-                self.index = self.faiss.read_index(index_file)
-                
-                # Load metadata
-                with open(metadata_file, "rb") as f:
-                    metadata = pickle.load(f)
-                
-                self.id_map = metadata["id_map"]
-                self.metadata_map = metadata["metadata_map"]
-                self.content_map = metadata["content_map"]
-                self.next_id = metadata["next_id"]
-                self.dimension = metadata["dimension"]
-                
-                logger.info(f"Loaded FAISS index with {self.index.ntotal} vectors")
-                
-            except Exception as e:
-                logger.error(f"Failed to load FAISS index: {e}")
-                # Reset on load failure
-                self.index = None
-                self.id_map = {}
-                self.metadata_map = {}
-                self.content_map = {}
-                self.next_id = 0
+
+        self._build_thread = threading.Thread(
+            target=self._build_ivf_index,
+            args=(self._generation,),
+            name=f"faiss-train-{self.config.collection_name}",
+            daemon=True,
+        )
+        self._build_thread.start()
+
+    def _build_ivf_index(self, generation: int) -> None:
+        """Train a new IVF index on the live vectors, then swap it in"""
+        try:
+            with self._index_lock:
+                if generation != self._generation:
+                    return
+                # Later writes get higher ids and are replayed from _build_ops
+                below = self.next_id
+                self._build_ops = []
+
+            # Only a training sample and one batch of vectors are in memory at a time
+            count = self.store.count(below=below)
+            logger.info(f"Training {self.config.index_type} index for {self.config.collection_name} "
+                        f"on {count} vectors")
+            index = self._new_ivf_index(
+                self.dimension, count, lambda size: self.vectors.read(self.store.sample_int_ids(size, below)))
+            for int_ids in self.store.iter_int_ids(below, ADD_BATCH_SIZE):
+                index.add_with_ids(np.ascontiguousarray(self.vectors.read(int_ids)), int_ids)
+
+            with self._index_lock:
+                if generation != self._generation:
+                    return
+                # Catch up with the writes made while training
+                for op, op_ids, op_vectors in self._build_ops:
+                    if op == WriteAheadLog.OP_ADD:
+                        index.add_with_ids(op_vectors, op_ids)
+                    else:
+                        index.remove_ids(self.faiss.IDSelectorBatch(op_ids))
+                self.index = index
+                self._trained_size = count
+                self._stale_vectors = 0
+                self.checkpoint()
+            logger.info(f"Swapped in {self.config.index_type} index for {self.config.collection_name} "
+                        f"with {index.nlist} lists")
+
+        except Exception as e:
+            logger.error(f"Failed to train FAISS index: {e}")
+        finally:
+            with self._index_lock:
+                if generation == self._generation:
+                    self._build_ops = None
+                    self._build_thread = None
+
+    def _rebuild_index(self) -> None:
+        """Rebuild the index from the vectors that still have sidecar rows"""
+        if not hasattr(self.index, "id_map"):
+            return  # IVF indexes remove ids natively
+        ntotal = self.index.ntotal
+        stored_ids = self.faiss.vector_to_array(self.index.id_map).astype(np.int64)
+        vectors = self.index.index.reconstruct_n(0, ntotal) if ntotal else None
+        live = np.isin(stored_ids, self.store.live_int_ids())
+
+        index = self._new_index(self.dimension)
+        if live.any():
+            index.add_with_ids(np.ascontiguousarray(vectors[live]), stored_ids[live])
+        self.index = index
+        self._stale_vectors = 0
+        logger.info(f"Rebuilt FAISS index {self.config.collection_name}, dropped {ntotal - index.ntotal} vectors")
+
+    def _open(self) -> None:
+        """Open the sidecar files, then load the checkpoint and replay the WAL"""
+        persist = self.config.persist_directory
+        if not persist:
+            self.store = ChunkStore()
+            self.wal = WriteAheadLog(None)
+            return
+
+        os.makedirs(persist, exist_ok=True)
+        legacy = os.path.exists(f"{self._base_path}_metadata.pkl") and not os.path.exists(
+            f"{self._base_path}.sqlite")
+        self.wal = WriteAheadLog(f"{self._base_path}.wal")
+        if legacy:
+            self._migrate_legacy()
+            return
+        self.store = ChunkStore(f"{self._base_path}.sqlite")
+
+        dimension = self.store.get_state("dimension")
+        if dimension is None:
+            return
+        self.dimension = int(dimension)
+        self.next_id = int(self.store.get_state("next_id", "0"))
+        self.seq = int(self.store.get_state("seq", "0"))
+        self.checkpoint_seq = int(self.store.get_state("checkpoint_seq", "0"))
+        self._stale_vectors = int(self.store.get_state("stale_vectors", "0"))
+        self._trained_size = int(self.store.get_state("trained_size", "0"))
+        self._open_vectors()
+
+        checkpoint_file = self.store.get_state("checkpoint_file")
+        if checkpoint_file:
+            self.index = self.faiss.read_index(os.path.join(persist, checkpoint_file))
+        else:
+            self.index = self._new_index(self.dimension)
+
+        replayed = 0
+        for seq, op, int_ids, vectors in self.wal.replay(self.checkpoint_seq, self.dimension):
+            if op == WriteAheadLog.OP_ADD:
+                self._apply_add(int_ids, vectors)
+                # Never hand out ids logged by a write whose sidecar commit was lost
+                self.next_id = max(self.next_id, int(int_ids.max()) + 1)
+            else:
+                self._apply_remove(int_ids)
+            self.seq = max(self.seq, seq)
+            replayed += len(int_ids)
+        self._pending_writes = replayed
+
+        logger.info(
+            f"Loaded FAISS index with {self.index.ntotal} vectors ({replayed} replayed from the WAL)")
+        self._maybe_start_build()
+
+    def _open_vectors(self) -> None:
+        if self.config.index_type not in IVF_INDEX_TYPES or self.vectors is not None:
+            return
+        path = f"{self._base_path}.vectors" if self.config.persist_directory else None
+        self.vectors = VectorFile(path, self.dimension)
+
+    def _migrate_legacy(self) -> None:
+        """
+        Convert a pickled <collection>_metadata.pkl snapshot to the sidecar layout.
+
+        The sidecar is filled under a temporary name and renamed once the
+        migration is complete, so a failed migration leaves no sidecar behind
+        and is retried on the next start instead of opening an empty store.
+        """
+        index_file = f"{self._base_path}.index"
+        metadata_file = f"{self._base_path}_metadata.pkl"
+        sidecar_file = f"{self._base_path}.sqlite"
+        tmp_sidecar = f"{sidecar_file}.migrating"
+        self._remove_sqlite_files(tmp_sidecar)
+        self.store = ChunkStore(tmp_sidecar)
+        try:
+            with open(metadata_file, "rb") as f:
+                metadata = pickle.load(f)
+            old_index = self.faiss.read_index(index_file)
+
+            self.dimension = metadata["dimension"]
+            self.index = self._new_index(self.dimension)
+            self._open_vectors()
+            id_map = metadata["id_map"]
+            if id_map:
+                int_ids = np.sort(np.fromiter(id_map.keys(), dtype=np.int64))
+                vectors = old_index.reconstruct_n(0, old_index.ntotal)[int_ids]
+                self._apply_add(int_ids, np.ascontiguousarray(vectors))
+                doc_ids = [id_map[int(int_id)] for int_id in int_ids]
+                self.next_id = int(int_ids.max()) + 1
+                self.store.insert(
+                    int_ids,
+                    doc_ids,
+                    [metadata["content_map"].get(doc_id, "") for doc_id in doc_ids],
+                    [metadata["metadata_map"].get(doc_id, {}) for doc_id in doc_ids],
+                )
+            self.store.set_state({"dimension": self.dimension, "next_id": self.next_id})
+            self.checkpoint()
+            self.store.close()
+            os.replace(tmp_sidecar, sidecar_file)
+            self.store = ChunkStore(sidecar_file)
+
+        except Exception as e:
+            logger.error(
+                f"Failed to migrate FAISS index {self.config.collection_name}, "
+                f"keeping the legacy files to retry on the next start: {e}")
+            self._reset()
+            self.store.close()
+            self.wal.close()
+            self.store = self.wal = None
+            self._remove_sqlite_files(tmp_sidecar)
+            self.dimension = None
+            raise
+
+        self._maybe_start_build()
+        for file_path in [index_file, metadata_file]:
+            self._remove_file(file_path)
+        logger.info(f"Migrated FAISS index {self.config.collection_name} with {self.index.ntotal} vectors")
+
+    def _reset(self) -> None:
+        """Drop all vectors, sidecar rows and persisted files"""
+        self._generation += 1
+        self._build_ops = None
+        self._build_thread = None
+        self._trained_size = 0
+        self._subindexes.clear()
+        self._large_kbs.clear()
+        self.index = None
+        self.next_id = 0
+        self.seq = 0
+        self.checkpoint_seq = 0
+        self._pending_writes = 0
+        self._stale_vectors = 0
+        checkpoint_file = self.store.get_state("checkpoint_file")
+        self.store.clear()
+        self.wal.truncate()
+        if self.vectors is not None:
+            self.vectors.clear()
+            self.vectors.close()
+            self.vectors = None
+        if self.config.persist_directory and checkpoint_file:
+            self._remove_file(os.path.join(self.config.persist_directory, checkpoint_file))
+
+    @classmethod
+    def _remove_sqlite_files(cls, path: str) -> None:
+        for file_path in [path, f"{path}-wal", f"{path}-shm"]:
+            cls._remove_file(file_path)
+
+    @staticmethod
+    def _remove_file(file_path: str) -> None:
+        if os.path.exists(file_path):
+            os.remove(file_path)
@@ -0,0 +1,455 @@
+"""
+Persistence helpers for the FAISS vector database.
+
+The FAISS index only holds vectors keyed by stable int64 ids. Chunk ids,
+contents and metadata live in a SQLite sidecar (:class:`ChunkStore`) so they
+are not kept in RAM, and index mutations made since the last checkpoint are
+appended to a :class:`WriteAheadLog` that is replayed on load. Indexes that
+have to be trained keep the raw vectors in a :class:`VectorFile`.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import struct
+import threading
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# SQLite limits the number of host parameters per statement
+_SQL_BATCH = 500
+
+
+def _batched(values: List[Any], size: int = _SQL_BATCH) -> Iterator[List[Any]]:
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def posting_value(value: Any) -> Optional[str]:
+    """
+    Encode a scalar metadata value for the postings table, None if not scalar.
+
+    Booleans and integral floats are folded into ints so that matches agree
+    with Python equality (``True == 1 == 1.0``).
+    """
+    if isinstance(value, bool):
+        value = int(value)
+    elif isinstance(value, float) and value.is_integer():
+        value = int(value)
+    if isinstance(value, (str, int, float)):
+        return json.dumps(value)
+    return None
+
+
+class ChunkStore:
+    """
+    SQLite sidecar mapping FAISS int ids to chunk ids, contents and metadata.
+
+    Scalar metadata values are also indexed in a ``postings`` table, an
+    inverted index from (key, value) to int ids used to push filters down.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path or ":memory:", check_same_thread=False)
+        if path:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS chunks (
+                int_id INTEGER PRIMARY KEY,
+                doc_id TEXT NOT NULL UNIQUE,
+                content TEXT NOT NULL,
+                metadata TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS state (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS postings (
+                key TEXT NOT NULL,
+                value TEXT NOT NULL,
+                int_id INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS postings_key_value ON postings (key, value, int_id);
+            CREATE INDEX IF NOT EXISTS postings_int_id ON postings (int_id);
+            """
+        )
+        self._conn.commit()
+        if self.get_state("postings") is None:
+            self._backfill_postings()
+
+    def _backfill_postings(self) -> None:
+        """Index the metadata of sidecars created before the postings table existed."""
+        with self._lock, self._conn:
+            rows = self._conn.execute("SELECT int_id, metadata FROM chunks").fetchall()
+            self._conn.execute("DELETE FROM postings")
+            self._conn.executemany(
+                "INSERT INTO postings (key, value, int_id) VALUES (?, ?, ?)",
+                [
+                    posting
+                    for int_id, metadata in rows
+                    for posting in self._postings(int_id, json.loads(metadata))
+                ],
+            )
+            self._set_state({"postings": 1})
+
+    @staticmethod
+    def _postings(int_id: int, metadata: Dict[str, Any]) -> Iterator[Tuple[str, str, int]]:
+        for key, value in metadata.items():
+            encoded = posting_value(value)
+            if encoded is not None:
+                yield key, encoded, int_id
+
+    # ------------------------------------------------------------------ #
+    # State                                                               #
+    # ------------------------------------------------------------------ #
+    def get_state(self, key: str, default: Optional[str] = None) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM state WHERE key = ?", (key,)
+            ).fetchone()
+        return row[0] if row else default
+
+    def set_state(self, values: Dict[str, Any]) -> None:
+        with self._lock, self._conn:
+            self._set_state(values)
+
+    def _set_state(self, values: Dict[str, Any]) -> None:
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO state (key, value) VALUES (?, ?)",
+            [(key, str(value)) for key, value in values.items()],
+        )
+
+    # ------------------------------------------------------------------ #
+    # Chunks                                                              #
+    # ------------------------------------------------------------------ #
+    def insert(
+        self,
+        int_ids: Iterable[int],
+        doc_ids: List[str],
+        contents: List[str],
+        metadatas: List[Dict[str, Any]],
+        state: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        """Insert chunks (and update state) in a single transaction."""
+        rows = [
+            (int(int_id), doc_id, content or "", json.dumps(metadata or {}, default=str))
+            for int_id, doc_id, content, metadata in zip(int_ids, doc_ids, contents, metadatas)
+        ]
+        postings = [
+            posting
+            for int_id, metadata in zip(int_ids, metadatas)
+            for posting in self._postings(int(int_id), metadata or {})
+        ]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO chunks (int_id, doc_id, content, metadata) VALUES (?, ?, ?, ?)",
+                rows,
+            )
+            self._conn.executemany(
+                "INSERT INTO postings (key, value, int_id) VALUES (?, ?, ?)", postings
+            )
+            if state:
+                self._set_state(state)
+
+    def delete(self, int_ids: List[int], state: Optional[Dict[str, Any]] = None) -> None:
+        with self._lock, self._conn:
+            for batch in _batched([int(i) for i in int_ids]):
+                placeholders = ",".join("?" * len(batch))
+                self._conn.execute(f"DELETE FROM chunks WHERE int_id IN ({placeholders})", batch)
+                self._conn.execute(f"DELETE FROM postings WHERE int_id IN ({placeholders})", batch)
+            if state:
+                self._set_state(state)
+
+    def int_ids_for(self, doc_ids: List[str]) -> Dict[str, int]:
+        """Map chunk ids to FAISS int ids (unknown ids are left out)."""
+        found: Dict[str, int] = {}
+        with self._lock:
+            for batch in _batched(list(doc_ids)):
+                rows = self._conn.execute(
+                    f"SELECT doc_id, int_id FROM chunks WHERE doc_id IN ({','.join('?' * len(batch))})",
+                    batch,
+                )
+                found.update(rows)
+        return found
+
+    def fetch(self, int_ids: List[int]) -> Dict[int, Tuple[str, str, Dict[str, Any]]]:
+        """Fetch (doc_id, content, metadata) by FAISS int id."""
+        found: Dict[int, Tuple[str, str, Dict[str, Any]]] = {}
+        with self._lock:
+            for batch in _batched([int(i) for i in int_ids]):
+                rows = self._conn.execute(
+                    f"SELECT int_id, doc_id, content, metadata FROM chunks WHERE int_id IN ({','.join('?' * len(batch))})",
+                    batch,
+                )
+                for int_id, doc_id, content, metadata in rows:
+                    found[int_id] = (doc_id, content, json.loads(metadata))
+        return found
+
+    def fetch_by_doc_ids(self, doc_ids: List[str]) -> Dict[str, Tuple[str, Dict[str, Any]]]:
+        """Fetch (content, metadata) by chunk id."""
+        found: Dict[str, Tuple[str, Dict[str, Any]]] = {}
+        with self._lock:
+            for batch in _batched(list(doc_ids)):
+                rows = self._conn.execute(
+                    f"SELECT doc_id, content, metadata FROM chunks WHERE doc_id IN ({','.join('?' * len(batch))})",
+                    batch,
+                )
+                for doc_id, content, metadata in rows:
+                    found[doc_id] = (content, json.loads(metadata))
+        return found
+
+    @staticmethod
+    def split_filter(
+        filter_dict: Optional[Dict[str, Any]]
+    ) -> Tuple[Dict[str, str], Dict[str, Any]]:
+        """Split a filter into scalar conditions (as postings) and the remaining ones."""
+        scalar, remaining = {}, {}
+        for key, value in (filter_dict or {}).items():
+            encoded = posting_value(value)
+            if encoded is None:
+                remaining[key] = value
+            else:
+                scalar[key] = encoded
+        return scalar, remaining
+
+    @staticmethod
+    def _postings_query(scalar: Dict[str, str]) -> Tuple[str, List[str]]:
+        query = " INTERSECT ".join(
+            "SELECT int_id FROM postings WHERE key = ? AND value = ?" for _ in scalar
+        )
+        params = [part for item in scalar.items() for part in item]
+        return query, params
+
+    def int_ids_matching(self, scalar: Dict[str, str]) -> np.ndarray:
+        """Int ids of the chunks matching all scalar conditions (see split_filter)."""
+        query, params = self._postings_query(scalar)
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+
+    def count_matching(self, scalar: Dict[str, str]) -> int:
+        query, params = self._postings_query(scalar)
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM ({query})", params).fetchone()[0]
+
+    def iter_rows(
+        self, filter_dict: Optional[Dict[str, Any]] = None
+    ) -> Iterator[Tuple[int, str, Dict[str, Any]]]:
+        """
+        Iterate (int_id, doc_id, metadata) of the chunks matching ``filter_dict``.
+
+        Scalar filter values are resolved through the postings table, anything
+        else is compared in Python.
+        """
+        scalar, remaining = self.split_filter(filter_dict)
+        query = "SELECT int_id, doc_id, metadata FROM chunks"
+        params: List[str] = []
+        if scalar:
+            postings_query, params = self._postings_query(scalar)
+            query += f" WHERE int_id IN ({postings_query})"
+
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        for int_id, doc_id, metadata in rows:
+            metadata = json.loads(metadata)
+            if all(key in metadata and metadata[key] == value for key, value in remaining.items()):
+                yield int_id, doc_id, metadata
+
+    def live_int_ids(self) -> np.ndarray:
+        with self._lock:
+            rows = self._conn.execute("SELECT int_id FROM chunks").fetchall()
+        return np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+
+    def iter_int_ids(self, below: int, batch_size: int) -> Iterator[np.ndarray]:
+        """Sorted int ids lower than ``below``, one page of ``batch_size`` at a time."""
+        last = -1
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT int_id FROM chunks WHERE int_id > ? AND int_id < ? ORDER BY int_id LIMIT ?",
+                    (last, below, batch_size),
+                ).fetchall()
+            if not rows:
+                return
+            int_ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+            last = int(int_ids[-1])
+            yield int_ids
+
+    def sample_int_ids(self, size: int, below: int) -> np.ndarray:
+        """Sorted random sample of up to ``size`` int ids lower than ``below``."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT int_id FROM chunks WHERE int_id < ? ORDER BY random() LIMIT ?", (below, size)
+            ).fetchall()
+        return np.sort(np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows)))
+
+    def count(self, below: Optional[int] = None) -> int:
+        with self._lock:
+            if below is None:
+                return self._conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+            return self._conn.execute("SELECT COUNT(*) FROM chunks WHERE int_id < ?", (below,)).fetchone()[0]
+
+    def clear(self) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM chunks")
+            self._conn.execute("DELETE FROM postings")
+            self._conn.execute("DELETE FROM state")
+            self._set_state({"postings": 1})
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class WriteAheadLog:
+    """
+    Append-only log of index mutations made since the last checkpoint.
+
+    Each record is a ``(seq, op, count)`` header followed by ``count`` int64
+    ids and, for additions, ``count * dim`` float32 values. A record cut short
+    by a crash ends the replay.
+    """
+
+    OP_ADD = 1
+    OP_REMOVE = 2
+    _HEADER = struct.Struct("<QBI")
+
+    def __init__(self, path: Optional[str], fsync: bool = True):
+        self.path = path
+        self.fsync = fsync
+        self._file = open(path, "ab") if path else None
+
+    def append_add(self, seq: int, ids: np.ndarray, vectors: np.ndarray) -> None:
+        self._append(seq, self.OP_ADD, ids, vectors)
+
+    def append_remove(self, seq: int, ids: np.ndarray) -> None:
+        self._append(seq, self.OP_REMOVE, ids, None)
+
+    def _append(self, seq: int, op: int, ids: np.ndarray, vectors: Optional[np.ndarray]) -> None:
+        if self._file is None:
+            return
+        payload = self._HEADER.pack(seq, op, len(ids)) + np.asarray(ids, dtype="<i8").tobytes()
+        if vectors is not None:
+            payload += np.asarray(vectors, dtype="<f4").tobytes()
+        self._file.write(payload)
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+
+    def replay(
+        self, after_seq: int, dimension: int
+    ) -> Iterator[Tuple[int, int, np.ndarray, Optional[np.ndarray]]]:
+        """Yield (seq, op, ids, vectors) for every complete record after ``after_seq``."""
+        if not self.path or not os.path.exists(self.path):
+            return
+        with open(self.path, "rb") as f:
+            data = f.read()
+
+        offset = 0
+        while offset + self._HEADER.size <= len(data):
+            seq, op, count = self._HEADER.unpack_from(data, offset)
+            body = count * 8 + (count * dimension * 4 if op == self.OP_ADD else 0)
+            start = offset + self._HEADER.size
+            if start + body > len(data):
+                logger.warning(f"Ignoring truncated FAISS WAL record {seq} in {self.path}")
+                break
+            offset = start + body
+            if seq <= after_seq:
+                continue
+            ids = np.frombuffer(data, dtype="<i8", count=count, offset=start).astype(np.int64)
+            vectors = None
+            if op == self.OP_ADD:
+                vectors = np.frombuffer(
+                    data, dtype="<f4", count=count * dimension, offset=start + count * 8
+                ).reshape(count, dimension).astype(np.float32)
+            yield seq, op, ids, vectors
+
+    def truncate(self) -> None:
+        if self._file is None:
+            return
+        self._file.truncate(0)
+        self._file.seek(0)
+        self._file.flush()
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class VectorFile:
+    """
+    Raw float32 vectors stored at the row of their FAISS int id.
+
+    Quantized indexes (IVF-PQ) cannot reconstruct the original vectors, so
+    the vectors are kept here to (re)train the index from. Without a path
+    they are kept in memory.
+    """
+
+    def __init__(self, path: Optional[str], dimension: int):
+        self.path = path
+        self.dimension = dimension
+        self._row_bytes = dimension * 4
+        self._memory = np.zeros((0, dimension), dtype=np.float32)
+        self._rows = 0
+        self._file = None
+        if path:
+            if not os.path.exists(path):
+                open(path, "wb").close()
+            self._file = open(path, "r+b")
+            self._rows = os.path.getsize(path) // self._row_bytes
+
+    def write(self, int_ids: np.ndarray, vectors: np.ndarray) -> None:
+        """Write vectors at the rows of their int ids."""
+        if not len(int_ids):
+            return
+        first = int(int_ids[0])
+        end = first + len(int_ids)
+        vectors = np.ascontiguousarray(vectors, dtype="<f4")
+        if int(int_ids[-1]) != end - 1:
+            for int_id, vector in zip(int_ids, vectors):
+                self.write(np.asarray([int_id]), vector[None, :])
+            return
+        if self._file is None:
+            if end > len(self._memory):
+                grown = np.zeros((max(end, 2 * len(self._memory)), self.dimension), dtype=np.float32)
+                grown[:self._rows] = self._memory[:self._rows]
+                self._memory = grown
+            self._memory[first:end] = vectors
+        else:
+            # Seeking past the end leaves zero-filled rows for ids that were never written
+            self._file.seek(first * self._row_bytes)
+            self._file.write(vectors.tobytes())
+            self._file.flush()
+        self._rows = max(self._rows, end)
+
+    def read(self, int_ids: np.ndarray) -> np.ndarray:
+        if self._file is None:
+            return self._memory[int_ids]
+        if not self._rows:
+            return np.zeros((0, self.dimension), dtype=np.float32)
+        matrix = np.memmap(self.path, dtype="<f4", mode="r", shape=(self._rows, self.dimension))
+        return np.asarray(matrix[int_ids], dtype=np.float32)
+
+    def sync(self) -> None:
+        if self._file is not None:
+            os.fsync(self._file.fileno())
+
+    def clear(self) -> None:
+        self._memory = np.zeros((0, self.dimension), dtype=np.float32)
+        self._rows = 0
+        if self._file is not None:
+            self._file.truncate(0)
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
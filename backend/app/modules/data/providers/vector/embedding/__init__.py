@@ -5,7 +5,8 @@ Provides different text embedding providers for vector generation.
 """
 
 from .base import BaseEmbedder, EmbeddingConfig
+from .cached import CachedEmbedder
 from .huggingface import HuggingFaceEmbedder
 from .openai import OpenAIEmbedder
 
-__all__ = ["BaseEmbedder", "EmbeddingConfig", "HuggingFaceEmbedder", "OpenAIEmbedder"]
+__all__ = ["BaseEmbedder", "CachedEmbedder", "EmbeddingConfig", "HuggingFaceEmbedder", "OpenAIEmbedder"]
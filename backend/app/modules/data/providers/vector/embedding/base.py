@@ -28,6 +28,8 @@ class EmbeddingConfig(BaseModel):
         default=None, description="API key for external services")
     base_url: Optional[str] = Field(
         default=None, description="Base URL for API endpoints")
+    cache_enabled: bool = Field(
+        default=True, description="Serve repeated texts from the shared embedding cache")
 
     @field_validator('batch_size')
     @classmethod
@@ -54,12 +56,16 @@ class EmbeddingConfig(BaseModel):
     def get(self):
         if self.type == "huggingface":
             from .huggingface import HuggingFaceEmbedder
-            return HuggingFaceEmbedder(self.model_copy())
+            embedder = HuggingFaceEmbedder(self.model_copy())
         elif self.type == "openai":
             from .openai import OpenAIEmbedder
-            return OpenAIEmbedder(self.model_copy())
+            embedder = OpenAIEmbedder(self.model_copy())
         else:
             raise ValueError(f"Invalid embedding type: {self.type}")
+        if self.cache_enabled:
+            from .cached import CachedEmbedder
+            return CachedEmbedder(embedder)
+        return embedder
 
     class Config:
         extra = "allow"
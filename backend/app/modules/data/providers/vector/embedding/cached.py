@@ -0,0 +1,73 @@
+"""
+Cached embedding provider wrapper
+"""
+
+import logging
+from typing import List
+
+from app.cache.embedding_cache import EmbeddingCache, get_embedding_cache
+
+from .base import BaseEmbedder
+
+logger = logging.getLogger(__name__)
+
+
+class CachedEmbedder(BaseEmbedder):
+    """
+    Serves embeddings from the shared embedding cache, delegating misses to
+    the wrapped embedder. Documents and queries are cached separately since
+    providers may preprocess them differently.
+    """
+
+    def __init__(self, embedder: BaseEmbedder, cache: EmbeddingCache | None = None):
+        super().__init__(embedder.config)
+        self.embedder = embedder
+        self.cache = cache or get_embedding_cache()
+        config = embedder.config
+        self.namespace = (
+            f"{config.type}:{config.model_name}:"
+            f"norm={int(config.normalize_embeddings)}:max_len={config.max_length}"
+        )
+
+    def __getattr__(self, name):
+        # Expose provider specific attributes (e.g. the LangChain client)
+        if name == "embedder":
+            raise AttributeError(name)
+        return getattr(self.embedder, name)
+
+    async def get_dimension(self) -> int:
+        """Get the dimension of the embeddings"""
+        return await self.embedder.get_dimension()
+
+    async def initialize(self) -> bool:
+        """Initialize the wrapped embedding model"""
+        return await self.embedder.initialize()
+
+    async def embed_texts(self, texts: List[str]) -> List[List[float]]:
+        """
+        Generate embeddings for a list of texts, embedding only uncached ones
+
+        Args:
+            texts: List of texts to embed
+
+        Returns:
+            List of embedding vectors
+        """
+        return await self.cache.embed(f"{self.namespace}:doc", texts, self.embedder.embed_texts)
+
+    async def embed_query(self, query: str) -> List[float]:
+        """
+        Generate embedding for a query, reusing the cached one for repeated queries
+
+        Args:
+            query: Query text to embed
+
+        Returns:
+            Embedding vector
+        """
+        async def embed_queries(queries: List[str]) -> List[List[float]]:
+            embedding = await self.embedder.embed_query(queries[0])
+            return [embedding] if embedding else []
+
+        embeddings = await self.cache.embed(f"{self.namespace}:query", [query], embed_queries)
+        return embeddings[0] if embeddings else []
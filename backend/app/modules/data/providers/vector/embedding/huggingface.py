@@ -2,15 +2,31 @@
 HuggingFace embedding provider implementation
 """
 
+import asyncio
 import logging
-from typing import List
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
 
 from langchain_huggingface import HuggingFaceEmbeddings
 
+from app.core.config.settings import settings
+
 from .base import BaseEmbedder, EmbeddingConfig
 
 logger = logging.getLogger(__name__)
 
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def _embedding_executor() -> ThreadPoolExecutor:
+    """Threads dedicated to model inference, so embedding never queues behind
+    (or starves) other work on the event loop's default executor"""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=max(settings.INGEST_EMBED_THREADS, 1), thread_name_prefix="embedding")
+    return _executor
+
 
 class HuggingFaceEmbedder(BaseEmbedder):
     """HuggingFace embedding provider using LangChain"""
@@ -90,7 +106,9 @@ class HuggingFaceEmbedder(BaseEmbedder):
         
         try:
             # Use LangChain's embed_documents method for batch processing
-            embeddings = await self.embeddings.aembed_documents(texts)
+            loop = asyncio.get_running_loop()
+            embeddings = await loop.run_in_executor(
+                _embedding_executor(), self.embeddings.embed_documents, texts)
             return embeddings
             
         except Exception as e:
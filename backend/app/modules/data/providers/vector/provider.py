@@ -103,10 +103,7 @@ class VectorProvider(BaseDataProvider):
                 return False
 
             # Add knowledge base ID to metadata
-            if metadata is None:
-                metadata = {}
-            metadata["kb_id"] = self.knowledge_base_id
-            metadata["doc_id"] = doc_id
+            metadata = self.document_metadata(doc_id, metadata)
 
             # Delete existing document first
             await self.delete_document(doc_id)
@@ -126,7 +123,7 @@ class VectorProvider(BaseDataProvider):
                 return False
 
             # Prepare data for vector database
-            chunk_ids = [f"{doc_id}_chunk_{chunk.index}" for chunk in chunks]
+            chunk_ids = [self.chunk_id(doc_id, chunk.index) for chunk in chunks]
             chunk_metadatas = [chunk.metadata for chunk in chunks]
 
             # Add to vector database
@@ -150,6 +147,19 @@ class VectorProvider(BaseDataProvider):
             logger.error(f"Failed to add document {doc_id}: {e}")
             return False
 
+    def document_metadata(self, doc_id: str, metadata: Union[Dict[str, Any], None] = None) -> Dict[str, Any]:
+        """Add the knowledge base and document IDs stored with every chunk"""
+        if metadata is None:
+            metadata = {}
+        metadata["kb_id"] = self.knowledge_base_id
+        metadata["doc_id"] = doc_id
+        return metadata
+
+    @staticmethod
+    def chunk_id(doc_id: str, index: int) -> str:
+        """Vector ID of a document chunk"""
+        return f"{doc_id}_chunk_{index}"
+
     async def delete_document(self, doc_id: str) -> bool:
         """
         Delete a document from the vector store
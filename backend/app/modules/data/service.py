@@ -263,6 +263,14 @@ class AgentRAGService:
             logger.error(f"LEGRA finalization failed: {e}")
             return False
 
+    def close(self):
+        """Close all providers"""
+        for provider in self.data_provider:
+            try:
+                provider.close()
+            except Exception as e:
+                logger.error(f"{provider.name} close failed: {e}")
+
     def get_provider_stats(self) -> Dict[str, Any]:
         """Get statistics from all providers"""
         stats = {
@@ -1,4 +1,5 @@
 from .file_extractor import FileTextExtractor, FileExtractor
+from .extraction_service import ExtractionService, get_extraction_service
 from .doc import format_search_results
 
-__all__ = ["FileTextExtractor", "format_search_results", "FileExtractor"]
\ No newline at end of file
+__all__ = ["ExtractionService", "FileTextExtractor", "format_search_results", "FileExtractor", "get_extraction_service"]
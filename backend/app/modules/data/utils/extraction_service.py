@@ -0,0 +1,375 @@
+"""
+Document text extraction off the event loop, with a content-addressed cache.
+
+FileTextExtractor parses PDFs, Office documents and OCRs scans synchronously,
+for seconds per document. The extraction service runs it in a bounded
+process pool (EXTRACTION_WORKERS) instead:
+
+  - PDFs longer than EXTRACTION_PDF_PAGES_PER_TASK pages are split into page
+    ranges extracted in parallel, so a long scan uses every worker;
+  - results are cached by SHA-256 of the content, the file type and the
+    extractor options, so re-uploads and re-syncs are not parsed again. The
+    cache is an in-process LRU (by bytes) with an optional Redis tier shared
+    by all workers (EXTRACTION_CACHE_REDIS).
+
+Async callers use ``extract``; code already running in a worker thread (the
+ingestion pipeline's extraction stage) uses ``extract_sync``, which waits
+for the pool from that thread and only uses the in-process cache. Where
+child processes cannot be started (Celery prefork workers are daemonic) or
+EXTRACTION_WORKERS is 0, extraction runs in the calling thread.
+"""
+
+import asyncio
+import base64
+import dataclasses
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.config.settings import settings
+from app.core.exceptions.error_messages import ErrorKey
+from app.core.exceptions.exception_classes import AppException
+
+from .file_extractor import ExtractorOptions, FileTextExtractor
+
+logger = logging.getLogger(__name__)
+
+REDIS_KEY_PREFIX = "extraction"
+# Seconds the Redis tier is skipped after an error
+REDIS_RETRY_AFTER = 60
+
+
+# ---------------------------------------------------------------------- #
+# Extraction processes                                                    #
+# ---------------------------------------------------------------------- #
+def _extract_file(path: str, options: ExtractorOptions, pages: Optional[Tuple[int, int]] = None) -> str:
+    """Runs in an extraction process"""
+    extractor = FileTextExtractor(options)
+    if pages is not None:
+        return extractor.extract_pdf_pages(path, *pages)
+    return extractor.extract_from_path(path)
+
+
+def _pdf_page_count(path: str) -> int:
+    """Runs in an extraction process, 0 when the PDF cannot be read"""
+    try:
+        import pypdf
+
+        return len(pypdf.PdfReader(path).pages)
+    except Exception as e:
+        logger.info(f"[extractor] could not count PDF pages: {e}")
+        return 0
+
+
+def page_ranges(page_count: int, pages_per_task: int) -> List[Tuple[int, int]]:
+    """1-based inclusive page ranges of at most pages_per_task pages"""
+    return [
+        (first, min(first + pages_per_task - 1, page_count))
+        for first in range(1, page_count + 1, pages_per_task)
+    ]
+
+
+def _join_pages(texts: List[str]) -> str:
+    """Texts of consecutive page ranges, kept on separate lines"""
+    joined = ""
+    for text in texts:
+        if joined and text and not joined.endswith(("\n", "\x0c")):
+            joined += "\n"
+        joined += text
+    return joined
+
+
+class ExtractionService:
+    """Extracts document text in a process pool, caching results by content hash"""
+
+    def __init__(
+        self,
+        workers: int,
+        pdf_pages_per_task: int,
+        cache_max_bytes: int,
+        redis_enabled: bool = False,
+        redis_ttl: int = 7 * 86400,
+    ):
+        self.workers = workers
+        self.pdf_pages_per_task = max(pdf_pages_per_task, 1)
+        self.cache_max_bytes = cache_max_bytes
+        self.redis_enabled = redis_enabled
+        self.redis_ttl = redis_ttl
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._redis = None
+        self._redis_disabled_until = 0.0
+        self.memory_hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+        self.documents = 0
+        self.pdf_pages = 0
+        self.split_documents = 0
+        self.failures = 0
+        self.extract_seconds = 0.0
+
+    # ------------------------------------------------------------------ #
+    # Public API                                                          #
+    # ------------------------------------------------------------------ #
+    async def extract(
+        self,
+        *,
+        filename: Optional[str] = None,
+        content: Optional[bytes] = None,
+        path: Optional[str | Path] = None,
+        options: Optional[ExtractorOptions] = None,
+    ) -> str:
+        """Text of a file given its path, or its name and content, without blocking the event loop"""
+        if content is None:
+            if path is None:
+                raise AppException(ErrorKey.FILE_EXTRACT_USAGE)
+            content = await asyncio.to_thread(Path(path).read_bytes)
+        filename = filename or str(path)
+        options = options or ExtractorOptions()
+        if not content:
+            logger.warning(f"No content provided for {filename}, returning empty string")
+            return ""
+
+        key = self.make_key(filename, content, options)
+        text = self._get_local(key)
+        if text is not None:
+            self.memory_hits += 1
+            return text
+        text = await self._get_remote(key)
+        if text is not None:
+            self.redis_hits += 1
+            self._put_local(key, text)
+            return text
+
+        self.misses += 1
+        text = await asyncio.to_thread(self._extract, filename, content, options)
+        self._put_local(key, text)
+        await self._put_remote(key, text)
+        return text
+
+    def extract_sync(
+        self,
+        *,
+        filename: Optional[str] = None,
+        content: Optional[bytes] = None,
+        path: Optional[str | Path] = None,
+        options: Optional[ExtractorOptions] = None,
+    ) -> str:
+        """Blocking variant of :meth:`extract` for worker threads, in-process cache only"""
+        if content is None:
+            if path is None:
+                raise AppException(ErrorKey.FILE_EXTRACT_USAGE)
+            content = Path(path).read_bytes()
+        filename = filename or str(path)
+        options = options or ExtractorOptions()
+        if not content:
+            logger.warning(f"No content provided for {filename}, returning empty string")
+            return ""
+
+        key = self.make_key(filename, content, options)
+        text = self._get_local(key)
+        if text is not None:
+            self.memory_hits += 1
+            return text
+
+        self.misses += 1
+        text = self._extract(filename, content, options)
+        self._put_local(key, text)
+        return text
+
+    @staticmethod
+    def make_key(filename: str, content: bytes, options: ExtractorOptions) -> str:
+        suffix = (Path(filename).suffix or ".bin").lower()
+        options_hash = hashlib.sha256(
+            json.dumps(dataclasses.asdict(options), sort_keys=True).encode("utf-8")
+        ).hexdigest()[:16]
+        return f"{suffix}:{options_hash}:{hashlib.sha256(content).hexdigest()}"
+
+    # ------------------------------------------------------------------ #
+    # Extraction                                                          #
+    # ------------------------------------------------------------------ #
+    def _get_pool(self) -> Optional[ProcessPoolExecutor]:
+        """Extraction processes, None when extraction must stay in-process"""
+        if self.workers <= 0 or multiprocessing.current_process().daemon:
+            return None
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers)
+            return self._pool
+
+    def _reset_pool(self) -> None:
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def _run(self, fn, *args) -> Future:
+        pool = self._get_pool()
+        if pool is not None:
+            try:
+                return pool.submit(fn, *args)
+            except BrokenProcessPool:
+                logger.warning("Extraction process pool broke, extracting in-process")
+                self._reset_pool()
+        future: Future = Future()
+        try:
+            future.set_result(fn(*args))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def _extract(self, filename: str, content: bytes, options: ExtractorOptions) -> str:
+        """Blocking, runs in a thread: writes the file once and waits for the workers"""
+        suffix = (Path(filename).suffix or ".bin").lower()
+        if suffix == ".pdf" and options.strict_pdf_header_check and not content.startswith(b"%PDF-"):
+            logger.warning(f"[extractor] Not a real PDF for {filename} (head={content[:8]!r}); decoding as text.")
+            return content.decode("utf-8", errors="replace")
+
+        started = time.perf_counter()
+        with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
+            tmp.write(content)
+            tmp_path = tmp.name
+        try:
+            if suffix != ".pdf" or self._get_pool() is None:
+                # Splitting only pays off when the ranges are extracted in parallel
+                return self._run(_extract_file, tmp_path, options).result()
+
+            page_count = self._run(_pdf_page_count, tmp_path).result()
+            self.pdf_pages += page_count
+            if page_count <= self.pdf_pages_per_task:
+                return self._run(_extract_file, tmp_path, options).result()
+            self.split_documents += 1
+            futures = [
+                self._run(_extract_file, tmp_path, options, pages)
+                for pages in page_ranges(page_count, self.pdf_pages_per_task)
+            ]
+            return _join_pages([future.result() for future in futures])
+        except BrokenProcessPool:
+            logger.warning("Extraction process pool broke, extracting in-process")
+            self._reset_pool()
+            return _extract_file(tmp_path, options)
+        except Exception:
+            self.failures += 1
+            raise
+        finally:
+            self.documents += 1
+            self.extract_seconds += time.perf_counter() - started
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+
+    # ------------------------------------------------------------------ #
+    # In-process cache                                                    #
+    # ------------------------------------------------------------------ #
+    def _get_local(self, key: str) -> Optional[str]:
+        with self._lock:
+            text = self._entries.get(key)
+            if text is not None:
+                self._entries.move_to_end(key)
+            return text
+
+    def _put_local(self, key: str, text: str) -> None:
+        size = len(text)
+        if size > self.cache_max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= len(previous)
+            self._entries[key] = text
+            self._bytes += size
+            while self._bytes > self.cache_max_bytes and self._entries:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+
+    # ------------------------------------------------------------------ #
+    # Redis tier                                                          #
+    # ------------------------------------------------------------------ #
+    async def _get_redis(self):
+        if not self.redis_enabled or time.monotonic() < self._redis_disabled_until:
+            return None
+        if self._redis is None:
+            from app.cache.redis_connection_manager import RedisConnectionManager
+            from app.dependencies.injector import injector
+
+            manager = injector.get(RedisConnectionManager)
+            self._redis = await manager.get_redis()
+        return self._redis
+
+    def _redis_failed(self, e: Exception) -> None:
+        logger.warning(f"Extraction cache Redis tier unavailable, retrying in {REDIS_RETRY_AFTER}s: {e}")
+        self._redis = None
+        self._redis_disabled_until = time.monotonic() + REDIS_RETRY_AFTER
+
+    async def _get_remote(self, key: str) -> Optional[str]:
+        try:
+            redis = await self._get_redis()
+            if redis is None:
+                return None
+            value = await redis.get(f"{REDIS_KEY_PREFIX}:{key}")
+        except Exception as e:
+            self._redis_failed(e)
+            return None
+        if value is None:
+            return None
+        return zlib.decompress(base64.b64decode(value)).decode("utf-8")
+
+    async def _put_remote(self, key: str, text: str) -> None:
+        try:
+            redis = await self._get_redis()
+            if redis is not None:
+                # The shared client decodes responses, so the compressed text is stored as base64
+                value = base64.b64encode(zlib.compress(text.encode("utf-8"))).decode("ascii")
+                await redis.set(f"{REDIS_KEY_PREFIX}:{key}", value, ex=self.redis_ttl)
+        except Exception as e:
+            self._redis_failed(e)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.memory_hits + self.redis_hits + self.misses
+        return {
+            "workers": self.workers,
+            "documents": self.documents,
+            "pdf_pages": self.pdf_pages,
+            "split_documents": self.split_documents,
+            "failures": self.failures,
+            "extract_seconds": round(self.extract_seconds, 3),
+            "cache_entries": len(self._entries),
+            "cache_bytes": self._bytes,
+            "memory_hits": self.memory_hits,
+            "redis_hits": self.redis_hits,
+            "misses": self.misses,
+            "hit_rate": (self.memory_hits + self.redis_hits) / lookups if lookups else 0.0,
+            "redis_enabled": self.redis_enabled,
+        }
+
+
+_extraction_service: Optional[ExtractionService] = None
+
+
+def get_extraction_service() -> ExtractionService:
+    """Process-wide extraction service configured from settings"""
+    global _extraction_service
+    if _extraction_service is None:
+        _extraction_service = ExtractionService(
+            workers=settings.EXTRACTION_WORKERS,
+            pdf_pages_per_task=settings.EXTRACTION_PDF_PAGES_PER_TASK,
+            cache_max_bytes=settings.EXTRACTION_CACHE_MAX_MB * 1024 * 1024,
+            redis_enabled=settings.EXTRACTION_CACHE_REDIS,
+            redis_ttl=settings.EXTRACTION_CACHE_REDIS_TTL_SECONDS,
+        )
+    return _extraction_service
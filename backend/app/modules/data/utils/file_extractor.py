@@ -7,7 +7,7 @@ import tempfile
 from dataclasses import dataclass, field
 from datetime import datetime, date
 from pathlib import Path
-from typing import Optional
+from typing import Optional, Tuple
 from fastapi import UploadFile
 from app.core.exceptions.error_messages import ErrorKey
 from app.core.exceptions.exception_classes import AppException
@@ -141,6 +141,11 @@ class FileTextExtractor:
         return self._extract_by_suffix(Path(path))
 
 
+    def extract_pdf_pages(self, path: str | Path, first_page: int, last_page: int) -> str:
+        """Text of the pages first_page..last_page (1-based, inclusive) of a PDF"""
+        return self._extract_pdf(Path(path), pages=(first_page, last_page))
+
+
     # ---------- Routing ----------
 
     def _extract_by_suffix(self, path: Path) -> str:
@@ -170,12 +175,13 @@ class FileTextExtractor:
 
     # ---------- Concrete extractors ----------
 
-    def _extract_pdf(self, path: Path) -> str:
+    def _extract_pdf(self, path: Path, pages: Optional[Tuple[int, int]] = None) -> str:
         txt = ""
         try:
             from pdfminer.high_level import extract_text as pdfminer_extract_text
 
-            txt = pdfminer_extract_text(str(path)) or ""
+            page_numbers = range(pages[0] - 1, pages[1]) if pages else None
+            txt = pdfminer_extract_text(str(path), page_numbers=page_numbers) or ""
             logger.info("[extractor] pdf used=pdfminer.six")
         except Exception as e:
             logger.info(f"[extractor] pdfminer failed: {e}")
@@ -186,7 +192,7 @@ class FileTextExtractor:
                     f"[extractor] pdf empty; OCR fallback (tesseract={has_tesseract})")
             if has_tesseract:
                 try:
-                    ocr_txt = self._ocr_pdf(path)
+                    ocr_txt = self._ocr_pdf(path, pages)
                     if ocr_txt.strip():
                         logger.info("[extractor] pdf used=OCR(pytesseract)")
                         return ocr_txt
@@ -196,8 +202,9 @@ class FileTextExtractor:
             # Try pdftotext command-line tool
             if shutil.which("pdftotext"):
                 try:
+                    page_args = ["-f", str(pages[0]), "-l", str(pages[1])] if pages else []
                     result = subprocess.run(
-                            ["pdftotext", "-layout", str(path), "-"],
+                            ["pdftotext", "-layout", *page_args, str(path), "-"],
                             capture_output=True,
                             text=True,
                             check=True,
@@ -215,7 +222,7 @@ class FileTextExtractor:
 
                 reader = pypdf.PdfReader(str(path))
                 pages_text = []
-                for page in reader.pages:
+                for page in (reader.pages[pages[0] - 1:pages[1]] if pages else reader.pages):
                     pages_text.append(page.extract_text() or "")
                 extracted = "\n".join(pages_text)
                 if extracted.strip():
@@ -561,15 +568,21 @@ class FileTextExtractor:
         return len(s.strip().replace("\x0c", "")) < 10
 
 
-    def _ocr_pdf(self, pdf_path: Path) -> str:
+    def _ocr_pdf(self, pdf_path: Path, pages: Optional[Tuple[int, int]] = None) -> str:
         from pdf2image import convert_from_path
         import pytesseract
 
-        imgs = convert_from_path(str(pdf_path), dpi=self.options.ocr.dpi)
+        first_page, last_page = pages or (1, None)
+        max_pages = self.options.ocr.max_pages
+        if max_pages is not None:
+            # max_pages counts from the start of the document
+            if first_page > max_pages:
+                return ""
+            last_page = max_pages if last_page is None else min(last_page, max_pages)
+        imgs = convert_from_path(str(pdf_path), dpi=self.options.ocr.dpi,
+                                 first_page=first_page, last_page=last_page)
         texts: list[str] = []
-        for i, img in enumerate(imgs):
-            if self.options.ocr.max_pages is not None and i >= self.options.ocr.max_pages:
-                break
+        for img in imgs:
             texts.append(pytesseract.image_to_string(
                     img, lang=self.options.ocr.lang))
         return "\n".join(texts)
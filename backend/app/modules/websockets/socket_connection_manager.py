@@ -2,16 +2,67 @@ from __future__ import annotations
 import asyncio
 import json
 import logging
+from collections import deque
 from contextvars import copy_context, Context
 from dataclasses import dataclass, field
-from typing import Dict, Hashable, List, Sequence, Set
+from typing import Deque, Dict, Hashable, List, Sequence, Set, Tuple
 from uuid import UUID
 from fastapi.websockets import WebSocket
 
+from app.core.config.settings import settings
+
 
 logger = logging.getLogger(__name__)
 
 
+class SendQueue:
+    """
+    Bounded outbound queue of one connection.
+
+    Enqueueing never waits: when the queue is full the slow consumer policy
+    either drops the oldest message, replaces the queued message of the same
+    type ("coalesce") or asks for the connection to be closed ("disconnect").
+    """
+
+    def __init__(self, max_size: int, policy: str = "drop_oldest") -> None:
+        self.max_size = max_size
+        self.policy = policy
+        self._items: Deque[Tuple[str, str]] = deque()
+        self._ready = asyncio.Event()
+        self.dropped = 0
+        self.coalesced = 0
+
+    def put(self, msg_type: str, message: str) -> bool:
+        """Enqueue a serialized message, False if the consumer should be disconnected"""
+        if len(self._items) >= self.max_size:
+            if self.policy == "disconnect":
+                return False
+            if self.policy == "coalesce" and self._remove_type(msg_type):
+                self.coalesced += 1
+            else:
+                self._items.popleft()
+                self.dropped += 1
+        self._items.append((msg_type, message))
+        self._ready.set()
+        return True
+
+    async def get(self) -> str:
+        while not self._items:
+            self._ready.clear()
+            await self._ready.wait()
+        return self._items.popleft()[1]
+
+    def _remove_type(self, msg_type: str) -> bool:
+        for index, (queued_type, _) in enumerate(self._items):
+            if queued_type == msg_type:
+                del self._items[index]
+                return True
+        return False
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
 @dataclass(slots=True)
 class Connection:
     websocket: WebSocket
@@ -21,6 +72,11 @@ class Connection:
     topics: Set[str] = field(default_factory=set)
     # Captured context from connection time (includes starlette_context, tenant context, etc.)
     context: Context | None = field(default=None, repr=False)
+    # Outbound messages, drained by the connection's writer task
+    queue: SendQueue | None = field(default=None, repr=False)
+    writer: asyncio.Task | None = field(default=None, repr=False)
+    # Tenant-aware ID of the room the connection joined
+    room_id: Hashable | None = None
 
 class SocketConnectionManager:
     """
@@ -28,21 +84,38 @@ class SocketConnectionManager:
     for horizontal scaling across multiple server instances.
 
     When Redis is available:
-    - Messages are published to Redis Pub/Sub channels
-    - Each server subscribes to Redis and delivers messages to its local WebSocket connections
+    - Messages are published to Redis Pub/Sub channels, batched per short window
+    - Each server subscribes only to the channels of rooms it has local connections
+      for, and delivers their messages to its local WebSocket connections
     - Supports multiple server instances (horizontal scaling)
 
     When Redis is not available:
     - Falls back to local-only broadcasting (single server mode)
     - Maintains backward compatibility with existing deployments
+
+    Local delivery only enqueues: every connection has its own bounded send
+    queue and writer task, so a slow client never delays the others. Rooms
+    are indexed by topic, and websockets map back to their connections, so
+    routing and disconnects do not scan other rooms.
     """
 
     def __init__(self, redis_manager=None) -> None:
+        # Room and topic lists are replaced on change, never mutated, so they can be iterated without the lock
         self._rooms: Dict[Hashable, List[Connection]] = {}
+        self._topic_index: Dict[Hashable, Dict[str, List[Connection]]] = {}
+        # Connections by id() of their websocket, websockets are unhashable mappings
+        self._connections: Dict[int, List[Connection]] = {}
         self._lock = asyncio.Lock()
         self._redis_manager = redis_manager
         self._redis_subscriber_task: asyncio.Task | None = None
         self._shutdown_event = asyncio.Event()
+        # Redis channels subscribed to, by tenant-aware room ID
+        self._pubsub = None
+        self._channels: Dict[str, Hashable] = {}
+        self._subscription_lock = asyncio.Lock()
+        # Messages waiting for the next batched publish
+        self._publish_buffer: List[Tuple[str, dict]] = []
+        self._flush_task: asyncio.Task | None = None
 
     def _get_tenant_aware_room_id(self, room_id: Hashable, tenant_id: str | None) -> Hashable:
         """
@@ -89,16 +162,36 @@ class SocketConnectionManager:
         captured_context = copy_context()
         logger.debug(f"[CONNECT] Captured context for user {user_id}")
 
+        conn = Connection(
+            raw_websocket,
+            user_id,
+            permissions,
+            tenant_id,
+            set(topics),
+            captured_context,
+            SendQueue(settings.WEBSOCKET_SEND_QUEUE_SIZE, settings.WEBSOCKET_SLOW_CONSUMER_POLICY),
+            room_id=tenant_aware_room_id,
+        )
+        # The writer runs in the captured context, so do all its sends
+        conn.writer = captured_context.run(asyncio.create_task, self._write_loop(conn))
+
         async with self._lock:
-            self._rooms.setdefault(tenant_aware_room_id, []).append(
-                Connection(raw_websocket, user_id, permissions, tenant_id, set(topics), captured_context)
-            )
+            self._rooms[tenant_aware_room_id] = self._rooms.get(tenant_aware_room_id, []) + [conn]
+            room_topics = self._topic_index.setdefault(tenant_aware_room_id, {})
+            for topic in conn.topics:
+                room_topics[topic] = room_topics.get(topic, []) + [conn]
+            # Disconnects may pass the wrapper or the raw websocket
+            for key in {id(websocket), id(raw_websocket)}:
+                self._connections.setdefault(key, []).append(conn)
             logger.info(
                 f"[CONNECT] Added to room {tenant_aware_room_id} "
                 f"(raw_room_id={room_id}, user_id={user_id}, tenant_id={tenant_id}, topics={topics})"
             )
             logger.info(f"[CONNECT] Total rooms: {len(self._rooms)}, Connections in this room: {len(self._rooms[tenant_aware_room_id])}")
 
+        # Subscribed before returning, so the client misses nothing published afterwards
+        await self._sync_subscription(tenant_aware_room_id)
+
     async def disconnect(
         self,
         websocket: WebSocket,
@@ -109,39 +202,74 @@ class SocketConnectionManager:
         Disconnect a WebSocket connection.
 
         If room_id and tenant_id are provided, disconnects from that specific room.
-        If room_id is None, searches all rooms to find and remove the websocket.
+        If room_id is None, disconnects the websocket from every room it joined.
         This is useful for unexpected disconnections where we don't know which room/tenant.
         """
+        tenant_aware_room_id = (
+            self._get_tenant_aware_room_id(room_id, tenant_id) if room_id is not None else None
+        )
         async with self._lock:
-            if room_id is not None:
-                # Direct disconnect from known room
-                tenant_aware_room_id = self._get_tenant_aware_room_id(room_id, tenant_id)
-                conns = self._rooms.get(tenant_aware_room_id, [])
-                self._rooms[tenant_aware_room_id] = [c for c in conns if c.websocket is not websocket]
-                if not self._rooms[tenant_aware_room_id]:
-                    del self._rooms[tenant_aware_room_id]
-                    logger.debug(f"Room {tenant_aware_room_id} removed (no connections)")
+            removed = [
+                conn for conn in self._connections.get(id(websocket), ())
+                if tenant_aware_room_id is None or conn.room_id == tenant_aware_room_id
+            ]
+            for conn in removed:
+                self._remove_connection(conn, websocket)
+
+        for conn in removed:
+            self._stop_writer(conn)
+        for room in {conn.room_id for conn in removed}:
+            await self._sync_subscription(room)
+
+    def _remove_connection(self, conn: Connection, websocket: WebSocket) -> None:
+        """Drop a connection from the room, topic and websocket indexes, under the lock"""
+        for key in {id(websocket), id(conn.websocket)}:
+            remaining = [c for c in self._connections.get(key, ()) if c is not conn]
+            if remaining:
+                self._connections[key] = remaining
+            else:
+                self._connections.pop(key, None)
+
+        room = conn.room_id
+        room_topics = self._topic_index.get(room, {})
+        for topic in conn.topics:
+            subscribers = [c for c in room_topics.get(topic, ()) if c is not conn]
+            if subscribers:
+                room_topics[topic] = subscribers
             else:
-                # Search all rooms for this websocket (for unexpected disconnects)
-                rooms_to_remove = []
-                for room_id_key, conns in self._rooms.items():
-                    filtered_conns = [c for c in conns if c.websocket is not websocket]
-                    if len(filtered_conns) < len(conns):
-                        # Found the connection in this room
-                        found_conn = next((c for c in conns if c.websocket is websocket), None)
-                        if found_conn:
-                            logger.debug(
-                                f"Disconnecting websocket from room {room_id_key} "
-                                f"(tenant_id={found_conn.tenant_id}, user_id={found_conn.user_id})"
-                            )
-                        if filtered_conns:
-                            self._rooms[room_id_key] = filtered_conns
-                        else:
-                            rooms_to_remove.append(room_id_key)
-
-                for room_id_key in rooms_to_remove:
-                    del self._rooms[room_id_key]
-                    logger.debug(f"Room {room_id_key} removed (no connections)")
+                room_topics.pop(topic, None)
+
+        conns = [c for c in self._rooms.get(room, ()) if c is not conn]
+        logger.debug(
+            f"Disconnecting websocket from room {room} "
+            f"(tenant_id={conn.tenant_id}, user_id={conn.user_id})"
+        )
+        if conns:
+            self._rooms[room] = conns
+        else:
+            self._rooms.pop(room, None)
+            self._topic_index.pop(room, None)
+            logger.debug(f"Room {room} removed (no connections)")
+
+    # ------------ outbound queues -------------------------------------------
+
+    async def _write_loop(self, conn: Connection) -> None:
+        """Send the connection's queued messages in order, until it fails or is disconnected"""
+        while True:
+            message = await conn.queue.get()
+            try:
+                await asyncio.wait_for(
+                    conn.websocket.send_text(message), settings.WEBSOCKET_SEND_TIMEOUT_SECONDS
+                )
+            except Exception as exc:
+                logger.warning(f"[SEND] ❌ Failed to send to user {conn.user_id}: {exc!r}")
+                await self.disconnect(conn.websocket)
+                return
+
+    @staticmethod
+    def _stop_writer(conn: Connection) -> None:
+        if conn.writer and conn.writer is not asyncio.current_task():
+            conn.writer.cancel()
 
     async def get_connection_stats(self) -> dict:
         """
@@ -152,11 +280,14 @@ class SocketConnectionManager:
         - rooms_count: number of active rooms
         - connections_by_tenant: dict mapping tenant_id to connection count
         - connections_by_user: dict mapping user_id to connection count
+        - queued_messages, dropped_messages, coalesced_messages: send queue totals
+        - subscribed_channels: number of Redis channels this server listens to
         """
         async with self._lock:
             connections_by_tenant: Dict[str, int] = {}
             connections_by_user: Dict[UUID, int] = {}
             total = 0
+            queued = dropped = coalesced = 0
 
             for room_id_key, conns in self._rooms.items():
                 for conn in conns:
@@ -164,12 +295,20 @@ class SocketConnectionManager:
                     tenant = conn.tenant_id or "none"
                     connections_by_tenant[tenant] = connections_by_tenant.get(tenant, 0) + 1
                     connections_by_user[conn.user_id] = connections_by_user.get(conn.user_id, 0) + 1
+                    if conn.queue:
+                        queued += len(conn.queue)
+                        dropped += conn.queue.dropped
+                        coalesced += conn.queue.coalesced
 
             return {
                 "total_connections": total,
                 "rooms_count": len(self._rooms),
                 "connections_by_tenant": connections_by_tenant,
                 "connections_by_user": {str(k): v for k, v in connections_by_user.items()},
+                "queued_messages": queued,
+                "dropped_messages": dropped,
+                "coalesced_messages": coalesced,
+                "subscribed_channels": len(self._channels),
             }
 
     async def broadcast(
@@ -184,8 +323,9 @@ class SocketConnectionManager:
         """
         Broadcast a message to all connections in a room.
 
-        If Redis is available, publishes the message to Redis Pub/Sub for delivery
-        across all server instances. Otherwise, delivers only to local connections.
+        If Redis is available, queues the message for the next batched publish to
+        Redis Pub/Sub, for delivery across all server instances. Otherwise, delivers
+        only to local connections.
         """
         payload = payload or {}
         if msg_type == "takeover":
@@ -195,32 +335,20 @@ class SocketConnectionManager:
 
         # Publish to Redis for multi-server broadcasting (if available)
         if self._redis_manager:
-            try:
-                redis_channel = self._get_redis_channel(tenant_aware_room_id)
-                message_data = {
-                    "type": msg_type,
-                    "payload": payload,
-                    "required_topic": required_topic,
-                    "room_id": str(room_id),
-                    "tenant_id": tenant_id,
-                }
-                redis_client = await self._redis_manager.get_redis()
-                await redis_client.publish(
-                    redis_channel,
-                    json.dumps(message_data, default=str)
-                )
-                logger.info(
-                    f"[BROADCAST] Published to Redis channel: {redis_channel} | "
-                    f"Room: {tenant_aware_room_id} | Type: {msg_type} | Topic: {required_topic}"
-                )
-                # Message will be delivered via Redis subscriber
-                return
-            except Exception as exc:
-                logger.warning(
-                    f"Failed to publish to Redis, falling back to local broadcast: {exc}"
-                )
+            message_data = {
+                "type": msg_type,
+                "payload": payload,
+                "required_topic": required_topic,
+                "room_id": str(room_id),
+                "tenant_id": tenant_id,
+            }
+            self._publish_buffer.append((self._get_redis_channel(tenant_aware_room_id), message_data))
+            if self._flush_task is None or self._flush_task.done():
+                self._flush_task = asyncio.create_task(self._flush_publishes())
+            # Message will be delivered via Redis subscriber
+            return
 
-        # Fallback to local-only broadcasting (single server mode or Redis failure)
+        # Local-only broadcasting (single server mode)
         await self._broadcast_local(
             tenant_aware_room_id=tenant_aware_room_id,
             msg_type=msg_type,
@@ -230,6 +358,42 @@ class SocketConnectionManager:
             tenant_id=tenant_id,
         )
 
+    async def _flush_publishes(self) -> None:
+        """
+        Publish the messages buffered during one batch window in a single round trip,
+        one Redis message per channel. Falls back to local delivery if Redis fails.
+
+        Broadcasts made while a batch is being published see this task running and
+        do not start another one, so it keeps flushing until the buffer is empty.
+        """
+        while True:
+            await asyncio.sleep(settings.WEBSOCKET_PUBLISH_BATCH_MS / 1000)
+            buffered, self._publish_buffer = self._publish_buffer, []
+            if not buffered:
+                return
+            await self._publish_batch(buffered)
+
+    async def _publish_batch(self, buffered: List[Tuple[str, dict]]) -> None:
+        by_channel: Dict[str, List[dict]] = {}
+        for channel, message_data in buffered:
+            by_channel.setdefault(channel, []).append(message_data)
+
+        try:
+            redis_client = await self._redis_manager.get_redis()
+            async with redis_client.pipeline(transaction=False) as pipe:
+                for channel, messages in by_channel.items():
+                    pipe.publish(channel, json.dumps(messages, default=str))
+                await pipe.execute()
+            logger.debug(
+                f"[BROADCAST] Published {len(buffered)} messages to {len(by_channel)} Redis channels"
+            )
+        except Exception as exc:
+            logger.warning(
+                f"Failed to publish to Redis, falling back to local broadcast: {exc}"
+            )
+            for channel, message_data in buffered:
+                await self._broadcast_message_data(message_data)
+
     async def _broadcast_local(
         self,
         tenant_aware_room_id: Hashable,
@@ -242,44 +406,46 @@ class SocketConnectionManager:
         """
         Broadcast a message to local WebSocket connections only.
         Used for single-server mode or as fallback when Redis is unavailable.
+
+        The message is serialized once and enqueued on every target connection,
+        its writer task delivers it.
         """
+        if required_topic:
+            targets = self._topic_index.get(tenant_aware_room_id, {}).get(required_topic, ())
+        else:
+            targets = self._rooms.get(tenant_aware_room_id, ())
+        if not targets:
+            return
+
         message = json.dumps({"type": msg_type, "payload": payload}, default=str)
-        targets = list(self._rooms.get(tenant_aware_room_id, []))
+        slow_consumers: List[Connection] = []
+        for conn in targets:
+            if not conn.queue.put(msg_type, message):
+                slow_consumers.append(conn)
 
-        logger.info(
+        logger.debug(
             f"[BROADCAST_LOCAL] Room: {tenant_aware_room_id} | "
             f"Targets: {len(targets)} | Type: {msg_type} | Topic: {required_topic}"
         )
-        logger.info(f"[BROADCAST_LOCAL] Current _rooms keys: {list(self._rooms.keys())}")
-        logger.info(f"[BROADCAST_LOCAL] Total rooms: {len(self._rooms)}")
 
-        for conn in targets:
-            if required_topic and required_topic not in conn.topics:
-                continue
-            try:
-                # Run the send within the captured context from connection time
-                # This makes starlette_context and tenant context available to the WebSocket
-                if conn.context:
-                    def _send_sync():
-                        """Sync wrapper to run async send in context"""
-                        return asyncio.create_task(conn.websocket.send_text(message))
-
-                    # Run in the captured context
-                    task = conn.context.run(_send_sync)
-                    await task
-                    logger.debug(f"[BROADCAST_LOCAL] ✅ Sent within captured context to user {conn.user_id}")
-                else:
-                    # Fallback: send without context (might fail)
-                    await conn.websocket.send_text(message)
-                    logger.debug(f"[BROADCAST_LOCAL] ✅ Sent without context to user {conn.user_id}")
+        for conn in slow_consumers:
+            logger.warning(f"[BROADCAST_LOCAL] Send queue full, disconnecting user {conn.user_id}")
+            await self.disconnect(conn.websocket)
 
-            except Exception as exc:
-                logger.warning(
-                    f"[BROADCAST_LOCAL] ❌ Failed to send to user {conn.user_id}: {exc}"
-                )
-                # Disconnect from the specific room if we know it, otherwise search all rooms
-                if "context" not in str(exc).lower():
-                    await self.disconnect(conn.websocket, room_id, conn.tenant_id)
+    async def _broadcast_message_data(self, data: dict, tenant_aware_room_id: Hashable | None = None) -> None:
+        """Deliver a message published through Redis to the local connections of its room"""
+        room_id = data.get("room_id")
+        tenant_id = data.get("tenant_id")
+        if tenant_aware_room_id is None:
+            tenant_aware_room_id = self._get_tenant_aware_room_id(room_id, tenant_id)
+        await self._broadcast_local(
+            tenant_aware_room_id=tenant_aware_room_id,
+            msg_type=data.get("type"),
+            payload=data.get("payload", {}),
+            required_topic=data.get("required_topic"),
+            room_id=room_id,
+            tenant_id=tenant_id,
+        )
 
     # ------------ Redis Pub/Sub methods -------------------------------------------------
 
@@ -287,6 +453,26 @@ class SocketConnectionManager:
         """Get Redis Pub/Sub channel name for a room."""
         return f"websocket:{tenant_aware_room_id}"
 
+    async def _sync_subscription(self, tenant_aware_room_id: Hashable) -> None:
+        """Subscribe to a room's channel while it has local connections, unsubscribe once empty"""
+        if self._pubsub is None:
+            return
+        channel = self._get_redis_channel(tenant_aware_room_id)
+        # Serialized and re-checked, so a join racing a leave ends in the right state
+        async with self._subscription_lock:
+            wanted = tenant_aware_room_id in self._rooms
+            try:
+                if wanted and channel not in self._channels:
+                    await self._pubsub.subscribe(channel)
+                    self._channels[channel] = tenant_aware_room_id
+                    logger.debug(f"Subscribed to Redis channel: {channel}")
+                elif not wanted and channel in self._channels:
+                    await self._pubsub.unsubscribe(channel)
+                    del self._channels[channel]
+                    logger.debug(f"Unsubscribed from Redis channel: {channel}")
+            except Exception as exc:
+                logger.error(f"Failed to update Redis subscription for {channel}: {exc}")
+
     async def initialize_redis_subscriber(self) -> None:
         """
         Initialize Redis Pub/Sub subscriber for receiving messages from other server instances.
@@ -300,30 +486,35 @@ class SocketConnectionManager:
             logger.warning("Redis subscriber already running")
             return
 
+        redis_client = await self._redis_manager.get_redis()
+        self._pubsub = redis_client.pubsub()
+        # Rooms connected before startup completed
+        for tenant_aware_room_id in list(self._rooms):
+            await self._sync_subscription(tenant_aware_room_id)
+
         self._redis_subscriber_task = asyncio.create_task(self._redis_subscriber_loop())
         logger.info("Redis subscriber initialized for WebSocket message distribution")
 
     async def _redis_subscriber_loop(self) -> None:
         """
-        Background task that subscribes to Redis Pub/Sub channels and delivers messages
-        to local WebSocket connections.
+        Background task that receives messages of the subscribed Redis channels and
+        delivers them to local WebSocket connections.
         """
+        pubsub = self._pubsub
         try:
-            redis_client = await self._redis_manager.get_redis()
-            pubsub = redis_client.pubsub()
-
-            # Subscribe to pattern that matches all websocket channels
-            await pubsub.psubscribe("websocket:*")
-            logger.info("Subscribed to Redis pattern: websocket:*")
-
             while not self._shutdown_event.is_set():
                 try:
+                    if not pubsub.subscribed:
+                        # No local rooms, nothing to read
+                        await asyncio.sleep(0.1)
+                        continue
+
                     message = await pubsub.get_message(
                         ignore_subscribe_messages=True,
                         timeout=1.0
                     )
 
-                    if message and message["type"] == "pmessage":
+                    if message and message["type"] == "message":
                         await self._handle_redis_message(message)
 
                 except asyncio.TimeoutError:
@@ -336,7 +527,9 @@ class SocketConnectionManager:
             logger.error(f"Redis subscriber loop error: {exc}")
         finally:
             try:
-                await pubsub.punsubscribe("websocket:*")
+                self._pubsub = None
+                self._channels.clear()
+                await pubsub.unsubscribe()
                 await pubsub.close()
             except Exception as exc:
                 logger.error(f"Error closing Redis pubsub: {exc}")
@@ -345,34 +538,22 @@ class SocketConnectionManager:
     async def _handle_redis_message(self, message: dict) -> None:
         """
         Handle incoming Redis Pub/Sub message and deliver to local WebSocket connections.
+        A message carries the batch of one channel; single messages are accepted too.
         """
         try:
             channel = message["channel"]
+            tenant_aware_room_id = self._channels.get(channel)
+            if tenant_aware_room_id is None:
+                # Unsubscribed meanwhile, no local connections left
+                return
             data = json.loads(message["data"])
+            batch = data if isinstance(data, list) else [data]
 
-            msg_type = data.get("type")
-            payload = data.get("payload", {})
-            required_topic = data.get("required_topic")
-            room_id = data.get("room_id")
-            tenant_id = data.get("tenant_id")
-
-            tenant_aware_room_id = self._get_tenant_aware_room_id(room_id, tenant_id)
-
-            logger.debug(
-                f"[REDIS_RECEIVED] Channel: {channel} | "
-                f"Room ID from data: {room_id} | Tenant ID: {tenant_id} | "
-                f"Reconstructed room: {tenant_aware_room_id} | Type: {msg_type} | Topic: {required_topic}"
-            )
+            logger.debug(f"[REDIS_RECEIVED] Channel: {channel} | Room: {tenant_aware_room_id} | Messages: {len(batch)}")
 
             # Deliver to local connections
-            await self._broadcast_local(
-                tenant_aware_room_id=tenant_aware_room_id,
-                msg_type=msg_type,
-                payload=payload,
-                required_topic=required_topic,
-                room_id=room_id,
-                tenant_id=tenant_id,
-            )
+            for message_data in batch:
+                await self._broadcast_message_data(message_data, tenant_aware_room_id)
 
         except Exception as exc:
             logger.error(f"Error handling Redis message: {exc}")
@@ -397,4 +578,11 @@ class SocketConnectionManager:
             except Exception as exc:
                 logger.error(f"Error waiting for subscriber task: {exc}")
 
+        # Stop the writers, undelivered messages are dropped
+        async with self._lock:
+            writers = [conn.writer for conns in self._rooms.values() for conn in conns if conn.writer]
+        for writer in writers:
+            writer.cancel()
+        await asyncio.gather(*writers, return_exceptions=True)
+
         logger.info("SocketConnectionManager cleanup complete")
@@ -1,14 +1,56 @@
-from typing import Dict, Any, List, Union
+from typing import Awaitable, Callable, Dict, Any, List, Optional, Tuple, Union
 import logging
 from datetime import datetime
 import json
+from langchain_core.messages import HumanMessage, SystemMessage
 from redis.asyncio import Redis
+from app.cache.bounded_cache import BoundedCache
 from app.cache.redis_connection_manager import RedisConnectionManager
 from app.core.config.settings import settings
 
 
 logger = logging.getLogger(__name__)
 
+# Rough token estimate used for history budgets
+CHARS_PER_TOKEN = 4
+
+# (previous summary, messages to fold in, max tokens) -> new summary
+Summarizer = Callable[[str, List[Dict[str, Any]], int], Awaitable[str]]
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the token count of a text"""
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def format_message(message: Dict[str, Any]) -> str:
+    """Format a message dict as a history line"""
+    return f"{message['role'].capitalize()}: {message['content']}"
+
+
+async def truncating_summarizer(summary: str, messages: List[Dict[str, Any]], max_tokens: int) -> str:
+    """Summarizer without a model: keeps the most recent max_tokens of the transcript"""
+    lines = [summary] if summary else []
+    lines.extend(format_message(message) for message in messages)
+    return "\n".join(lines)[-max_tokens * CHARS_PER_TOKEN:]
+
+
+def llm_summarizer(llm) -> Summarizer:
+    """Summarizer folding messages into the summary with a chat model"""
+    async def summarize(summary: str, messages: List[Dict[str, Any]], max_tokens: int) -> str:
+        transcript = "\n".join(format_message(message) for message in messages)
+        response = await llm.ainvoke([
+            SystemMessage(content=(
+                "You maintain a running summary of a conversation. Update the summary with the new "
+                "messages, keeping facts, decisions and open questions. Answer with the summary only, "
+                f"in at most {max_tokens * 3 // 4} words."
+            )),
+            HumanMessage(content=f"Current summary:\n{summary or '(empty)'}\n\nNew messages:\n{transcript}"),
+        ])
+        return str(response.content).strip()
+
+    return summarize
+
 
 class Message:
     """Message class"""
@@ -40,6 +82,8 @@ class BaseConversationMemory:
         self.created_at = datetime.now().isoformat()
         self.last_updated = self.created_at
         self.executions_count = 0
+        self._summary = ""
+        self._summarized_count = 0
 
     async def add_message(self, message: Message) -> None:
         """Add a message to the conversation"""
@@ -77,11 +121,69 @@ class BaseConversationMemory:
         raise NotImplementedError
 
     async def get_chat_history(
-        self, as_string: bool = False, max_messages: int = 10
+        self,
+        as_string: bool = False,
+        max_messages: int = 10,
+        token_budget: Optional[int] = None,
+        summarize: Optional[Summarizer] = None,
     ) -> Union[List[Message], str]:
-        """Get the chat history in a format suitable for LLM context"""
+        """
+        Get the chat history in a format suitable for LLM context.
+
+        With a token_budget, returns a rolling summary of the older turns plus
+        the most recent turns (of the last max_messages) that fit in the budget.
+        The summary is updated incrementally with summarize (a truncated
+        transcript by default) as turns leave the recent window.
+        """
         raise NotImplementedError
 
+    async def _load_history(self, max_messages: int) -> Tuple[List[Dict[str, Any]], int, str, int]:
+        """
+        Recent messages (oldest first), absolute index of the first one, the
+        rolling summary and the number of messages folded into it
+        """
+        raise NotImplementedError
+
+    async def _save_summary(self, summary: str, summarized_count: int) -> None:
+        """Store the rolling summary and the number of messages folded into it"""
+        raise NotImplementedError
+
+    async def _get_budgeted_history(
+        self,
+        as_string: bool,
+        max_messages: int,
+        token_budget: int,
+        summarize: Optional[Summarizer],
+    ) -> Union[List[Dict[str, Any]], str]:
+        messages, first_index, summary, summarized_count = await self._load_history(max_messages)
+        summary_budget = min(settings.CONVERSATION_SUMMARY_MAX_TOKENS, token_budget // 2)
+
+        # Keep the most recent messages that fit next to the summary, at least the last one
+        start = len(messages)
+        used = 0
+        while start > 0:
+            used += estimate_tokens(format_message(messages[start - 1]))
+            if used > token_budget - summary_budget and start < len(messages):
+                break
+            start -= 1
+        # Messages already in the summary are not repeated
+        start = max(start, min(summarized_count - first_index, len(messages) - 1))
+
+        to_fold = messages[max(summarized_count - first_index, 0):start]
+        if to_fold:
+            summary = await (summarize or truncating_summarizer)(summary, to_fold, summary_budget)
+            await self._save_summary(summary, first_index + start)
+
+        recent = messages[start:]
+        if as_string:
+            history_parts = [f"Summary of the earlier conversation: {summary}"] if summary else []
+            history_parts.extend(format_message(message) for message in recent)
+            return "\n".join(history_parts)
+        if summary:
+            return [{"role": "system", "content": f"Summary of the earlier conversation: {summary}",
+                     "message_type": "summary"}] + recent
+        return recent
+
 
 class InMemoryConversationMemory(BaseConversationMemory):
     """In-memory implementation of conversation memory"""
@@ -116,6 +218,8 @@ class InMemoryConversationMemory(BaseConversationMemory):
         self.messages = []
         self.last_updated = datetime.now().isoformat()
         self.executions_count = 0
+        self._summary = ""
+        self._summarized_count = 0
 
     async def set_metadata(self, key: str, value: Any) -> None:
         """Set metadata for the conversation"""
@@ -126,9 +230,16 @@ class InMemoryConversationMemory(BaseConversationMemory):
         return self.metadata.get(key, default)
 
     async def get_chat_history(
-        self, as_string: bool = False, max_messages: int = 10
+        self,
+        as_string: bool = False,
+        max_messages: int = 10,
+        token_budget: Optional[int] = None,
+        summarize: Optional[Summarizer] = None,
     ) -> Union[List[Message], str]:
         """Get the chat history in a format suitable for LLM context"""
+        if token_budget:
+            return await self._get_budgeted_history(as_string, max_messages, token_budget, summarize)
+
         if as_string:
             history_parts = []
             for message in self.messages[-max_messages:]:
@@ -139,9 +250,28 @@ class InMemoryConversationMemory(BaseConversationMemory):
 
         return self.messages[-max_messages:]
 
+    async def _load_history(self, max_messages: int) -> Tuple[List[Dict[str, Any]], int, str, int]:
+        window = self.messages[-max_messages:]
+        return (
+            [message.to_dict() for message in window],
+            len(self.messages) - len(window),
+            self._summary,
+            self._summarized_count,
+        )
+
+    async def _save_summary(self, summary: str, summarized_count: int) -> None:
+        self._summary = summary
+        self._summarized_count = summarized_count
+
 
 class RedisConversationMemory(BaseConversationMemory):
-    """Redis-based implementation of conversation memory with tenant isolation"""
+    """
+    Redis-based implementation of conversation memory with tenant isolation.
+
+    Every write is a single MULTI/EXEC round trip. The message list is
+    trimmed to CONVERSATION_REDIS_MAX_MESSAGES on write, and the info hash
+    counts all messages ever written so summarized turns keep stable indexes.
+    """
 
     def __init__(self, thread_id: str):
         super().__init__(thread_id)
@@ -151,7 +281,14 @@ class RedisConversationMemory(BaseConversationMemory):
         self._message_key = f"{tenant_prefix}:conversation:{self.thread_id}:messages"
         self._metadata_key = f"{tenant_prefix}:conversation:{self.thread_id}:metadata"
         self._conversation_key = f"{tenant_prefix}:conversation:{self.thread_id}:info"
+        self._summary_key = f"{tenant_prefix}:conversation:{self.thread_id}:summary"
         self.initialized = False
+        # Decoded messages of the last window read, by raw JSON
+        self._decoded: Dict[str, Dict[str, Any]] = {}
+
+    @property
+    def _ttl(self) -> int:
+        return settings.CONVERSATION_REDIS_EXPIRY_DAYS * 86400
 
     def _get_tenant_prefix(self) -> str:
         """Get tenant-aware key prefix"""
@@ -171,50 +308,43 @@ class RedisConversationMemory(BaseConversationMemory):
             self.redis_client = await manager.get_redis()
         return self.redis_client
 
-    async def _initialize_conversation(self) -> None:
-        """Initialize conversation data in Redis if it doesn't exist"""
-        redis = await self._get_redis()
-
-        # Check if conversation exists
+    def _initialize_conversation(self, pipe) -> None:
+        """Queue creation of the conversation info, a no-op for existing fields"""
         if self.initialized:
             return
-        exists = await redis.exists(self._conversation_key)
-        if not exists:
-            # Initialize conversation metadata
-            conversation_data = {
-                "thread_id": self.thread_id,
-                "created_at": self.created_at,
-                "last_updated": self.last_updated,
-                "executions_count": self.executions_count,
-            }
-            # type: ignore
-            await redis.hset(self._conversation_key, mapping=conversation_data)
-            # type: ignore
-            await redis.expire(self._conversation_key, 86400 * 30)
-        self.initialized = True
+        conversation_data = {
+            "thread_id": self.thread_id,
+            "created_at": self.created_at,
+            "executions_count": self.executions_count,
+        }
+        for field, value in conversation_data.items():
+            pipe.hsetnx(self._conversation_key, field, value)
 
     async def add_message(self, message: Message) -> None:
         """Add a message to the conversation in Redis"""
+        await self.add_messages([message])
+
+    async def add_messages(self, messages: List[Message]) -> None:
+        """Add messages to the conversation in Redis, in one round trip"""
+        if not messages:
+            return
         try:
-            await self._initialize_conversation()
             redis = await self._get_redis()
-
-            # Create message data
-            message_data = message.to_dict()
-            message_json = json.dumps(message_data)
-
-            # Add message to Redis list
-            await redis.lpush(self._message_key, message_json)  # type: ignore
-
-            # Update last_updated timestamp
-            self.last_updated = message.timestamp
-            # type: ignore
-            await redis.hset(self._conversation_key, "last_updated", self.last_updated)
-
-            # Set TTL for message list (30 days)
-            await redis.expire(self._message_key, 86400 * 30)  # type: ignore
-
-            logger.debug(f"Added message to Redis for thread {self.thread_id}")
+            self.last_updated = messages[-1].timestamp
+
+            async with redis.pipeline(transaction=True) as pipe:
+                self._initialize_conversation(pipe)
+                # Most recent first
+                pipe.lpush(self._message_key, *[json.dumps(message.to_dict()) for message in messages])
+                pipe.ltrim(self._message_key, 0, settings.CONVERSATION_REDIS_MAX_MESSAGES - 1)
+                pipe.hincrby(self._conversation_key, "message_count", len(messages))
+                pipe.hset(self._conversation_key, "last_updated", self.last_updated)
+                pipe.expire(self._message_key, self._ttl)
+                pipe.expire(self._conversation_key, self._ttl)
+                await pipe.execute()
+            self.initialized = True
+
+            logger.debug(f"Added {len(messages)} messages to Redis for thread {self.thread_id}")
 
         except Exception as e:
             logger.error(
@@ -230,6 +360,34 @@ class RedisConversationMemory(BaseConversationMemory):
         """Add an assistant message to the conversation"""
         await self.add_message(Message("assistant", content))
 
+    async def add_input_output(self, input: str, output: str) -> None:
+        """Add an input and output to the conversation"""
+        await self.add_messages([Message("user", input), Message("assistant", output)])
+
+    def _decode_messages(self, message_jsons: List[str]) -> List[Dict[str, Any]]:
+        """Decode messages (most recent first) to dicts, oldest first"""
+        decoded: Dict[str, Dict[str, Any]] = {}
+        messages: List[Dict[str, Any]] = []
+        for message_json in reversed(message_jsons):
+            message = self._decoded.get(message_json)
+            if message is None:
+                try:
+                    message_data = json.loads(message_json)
+                    message = {
+                        "role": message_data["role"],
+                        "content": message_data["content"],
+                        "message_type": message_data.get("message_type", "text"),
+                        "timestamp": message_data["timestamp"],
+                    }
+                except (json.JSONDecodeError, KeyError) as e:
+                    logger.warning(f"Failed to parse message from Redis: {e}")
+                    continue
+            decoded[message_json] = message
+            messages.append(dict(message))
+        # Entries are immutable, keep only the current window
+        self._decoded = decoded
+        return messages
+
     async def get_messages(
         self, max_messages: int = 10, roles: List[str] | None = None
     ) -> List[Union[Message, dict[str, Any]]]:
@@ -240,34 +398,13 @@ class RedisConversationMemory(BaseConversationMemory):
             # Get messages from Redis (most recent first due to lpush)
             # type: ignore
             message_jsons = await redis.lrange(self._message_key, 0, max_messages - 1)
+            messages = self._decode_messages(message_jsons)
 
-            messages: List[Message] = []
-            for message_json in message_jsons:
-                try:
-                    message_data = json.loads(message_json)
-                    message = Message(
-                        role=message_data["role"],
-                        content=message_data["content"],
-                        message_type=message_data.get("message_type", "text"),
-                    )
-                    message.timestamp = message_data["timestamp"]
-
-                    # Filter by roles if specified
-                    if roles is None or message.role in roles:
-                        messages.append(message)
+            # Filter by roles if specified
+            if roles is not None:
+                messages = [message for message in messages if message["role"] in roles]
 
-                except (json.JSONDecodeError, KeyError) as e:
-                    logger.warning(f"Failed to parse message from Redis: {e}")
-                    continue
-
-            # Reverse to get chronological order (oldest first)
-            messages.reverse()
-
-            # Apply max_messages limit after filtering
-            if max_messages and len(messages) > max_messages:
-                messages = messages[-max_messages:]
-
-            return [messages.to_dict() for messages in messages]
+            return messages
 
         except Exception as e:
             logger.error(
@@ -280,10 +417,6 @@ class RedisConversationMemory(BaseConversationMemory):
         try:
             redis = await self._get_redis()
 
-            # Delete all conversation data
-            await redis.delete(self._message_key)
-            await redis.delete(self._metadata_key)
-
             # Reset conversation info
             self.last_updated = datetime.now().isoformat()
             self.executions_count = 0
@@ -293,11 +426,16 @@ class RedisConversationMemory(BaseConversationMemory):
                 "created_at": self.created_at,
                 "last_updated": self.last_updated,
                 "executions_count": self.executions_count,
+                "message_count": 0,
             }
-            # type: ignore
-            await redis.hset(self._conversation_key, mapping=conversation_data)
-            # type: ignore
-            await redis.expire(self._conversation_key, 86400 * 30)
+            async with redis.pipeline(transaction=True) as pipe:
+                # Delete all conversation data
+                pipe.delete(self._message_key, self._metadata_key, self._summary_key)
+                pipe.hset(self._conversation_key, mapping=conversation_data)
+                pipe.expire(self._conversation_key, self._ttl)
+                await pipe.execute()
+            self.initialized = True
+            self._decoded = {}
 
             logger.debug(f"Cleared conversation data for thread {self.thread_id}")
 
@@ -310,14 +448,15 @@ class RedisConversationMemory(BaseConversationMemory):
     async def set_metadata(self, key: str, value: Any) -> None:
         """Set metadata for the conversation in Redis"""
         try:
-            await self._initialize_conversation()
             redis = await self._get_redis()
 
-            # Store metadata as JSON
-            metadata_json = json.dumps(value)
-            # type: ignore
-            await redis.hset(self._metadata_key, key, metadata_json)
-            await redis.expire(self._metadata_key, 86400 * 30)  # type: ignore
+            async with redis.pipeline(transaction=True) as pipe:
+                self._initialize_conversation(pipe)
+                # Store metadata as JSON
+                pipe.hset(self._metadata_key, key, json.dumps(value))
+                pipe.expire(self._metadata_key, self._ttl)
+                await pipe.execute()
+            self.initialized = True
 
             logger.debug(f"Set metadata {key} for thread {self.thread_id}")
 
@@ -346,19 +485,21 @@ class RedisConversationMemory(BaseConversationMemory):
             return default
 
     async def get_chat_history(
-        self, as_string: bool = False, max_messages: int = 10
+        self,
+        as_string: bool = False,
+        max_messages: int = 10,
+        token_budget: Optional[int] = None,
+        summarize: Optional[Summarizer] = None,
     ) -> Union[List[Message], str]:
         """Get the chat history in a format suitable for LLM context"""
         try:
+            if token_budget:
+                return await self._get_budgeted_history(as_string, max_messages, token_budget, summarize)
+
             messages = await self.get_messages(max_messages=max_messages)
 
             if as_string:
-                history_parts = []
-                for message in messages:
-                    prefix = f"{message['role'].capitalize()}: "
-                    content = message["content"]
-                    history_parts.append(f"{prefix}{content}")
-                return "\n".join(history_parts)
+                return "\n".join(format_message(message) for message in messages)
 
             return messages
 
@@ -368,6 +509,26 @@ class RedisConversationMemory(BaseConversationMemory):
             )
             return [] if not as_string else ""
 
+    async def _load_history(self, max_messages: int) -> Tuple[List[Dict[str, Any]], int, str, int]:
+        redis = await self._get_redis()
+        async with redis.pipeline(transaction=False) as pipe:
+            pipe.lrange(self._message_key, 0, max_messages - 1)
+            pipe.hget(self._conversation_key, "message_count")
+            pipe.hmget(self._summary_key, ["summary", "summarized_count"])
+            message_jsons, message_count, (summary, summarized_count) = await pipe.execute()
+
+        messages = self._decode_messages(message_jsons)
+        # Conversations written before message_count existed count from 0
+        first_index = max(int(message_count or 0) - len(message_jsons), 0)
+        return messages, first_index, summary or "", int(summarized_count or 0)
+
+    async def _save_summary(self, summary: str, summarized_count: int) -> None:
+        redis = await self._get_redis()
+        async with redis.pipeline(transaction=True) as pipe:
+            pipe.hset(self._summary_key, mapping={"summary": summary, "summarized_count": summarized_count})
+            pipe.expire(self._summary_key, self._ttl)
+            await pipe.execute()
+
     async def get_conversation_info(self) -> Dict[str, Any]:
         """Get conversation metadata from Redis"""
         try:
@@ -380,7 +541,7 @@ class RedisConversationMemory(BaseConversationMemory):
             # Convert string values back to appropriate types
             result = {}
             for key, value in info.items():
-                if key in ["executions_count"]:
+                if key in ["executions_count", "message_count"]:
                     result[key] = int(value)
                 else:
                     result[key] = value
@@ -397,12 +558,10 @@ class RedisConversationMemory(BaseConversationMemory):
         """Increment the execution count for this conversation"""
         try:
             redis = await self._get_redis()
-            # type: ignore
-            await redis.hincrby(self._conversation_key, "executions_count", 1)
-            # type: ignore
-            await redis.hset(
-                self._conversation_key, "last_updated", datetime.now().isoformat()
-            )
+            async with redis.pipeline(transaction=True) as pipe:
+                pipe.hincrby(self._conversation_key, "executions_count", 1)
+                pipe.hset(self._conversation_key, "last_updated", datetime.now().isoformat())
+                await pipe.execute()
 
         except Exception as e:
             logger.error(
@@ -416,9 +575,11 @@ class RedisConversationMemory(BaseConversationMemory):
             redis = await self._get_redis()
 
             # Delete all keys related to this conversation
-            await redis.delete(self._message_key)
-            await redis.delete(self._metadata_key)
-            await redis.delete(self._conversation_key)
+            await redis.delete(
+                self._message_key, self._metadata_key, self._conversation_key, self._summary_key
+            )
+            self.initialized = False
+            self._decoded = {}
 
             logger.info(f"Deleted conversation data for thread {self.thread_id}")
 
@@ -432,20 +593,26 @@ class RedisConversationMemory(BaseConversationMemory):
 class ConversationMemory:
     """Class to maintain conversation history across workflow executions"""
 
-    _instances: Dict[str, "BaseConversationMemory"] = {}
+    # Idle threads are evicted; with the in-memory backend their history goes with them
+    _instances: BoundedCache["BaseConversationMemory"] = BoundedCache(
+        "conversation_memories",
+        max_size=settings.CONVERSATION_MEMORY_CACHE_SIZE,
+        max_size_per_tenant=settings.CONVERSATION_MEMORY_CACHE_PER_TENANT,
+        ttl_seconds=settings.CONVERSATION_MEMORY_CACHE_TTL_SECONDS,
+    )
 
     @classmethod
     def get_instance(cls, thread_id: str) -> "BaseConversationMemory":
         """Get or create a conversation memory instance for a thread ID"""
-        if thread_id not in cls._instances:
+        def create() -> "BaseConversationMemory":
             logger.info(
                 f"Creating new conversation memory instance for thread ID: {thread_id}"
             )
             if settings.REDIS_FOR_CONVERSATION:
-                cls._instances[thread_id] = RedisConversationMemory(thread_id)
-            else:
-                cls._instances[thread_id] = InMemoryConversationMemory(thread_id)
-        return cls._instances[thread_id]
+                return RedisConversationMemory(thread_id)
+            return InMemoryConversationMemory(thread_id)
+
+        return cls._instances.get_or_create(thread_id, create)
 
     @classmethod
     def clear_all(cls) -> None:
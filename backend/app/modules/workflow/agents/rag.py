@@ -17,6 +17,7 @@ import uuid
 
 from injector import inject
 
+from app.cache.bounded_cache import BoundedCache
 from app.core.config.settings import settings
 from app.modules.data.service import AgentRAGService
 from app.modules.data.config import AgentRAGConfig
@@ -85,6 +86,21 @@ def _create_default_config(chat_id: str) -> AgentRAGConfig:
     )
 
 
+async def _close_service(service: AgentRAGService) -> None:
+    """Close an evicted chat service off the event loop"""
+    await asyncio.to_thread(service.close)
+
+
+# Shared by the per-tenant instances, so the limits hold across tenants
+_chat_service_cache: BoundedCache[AgentRAGService] = BoundedCache(
+    "thread_rag_services",
+    max_size=settings.THREAD_RAG_CACHE_SIZE,
+    max_size_per_tenant=settings.THREAD_RAG_CACHE_PER_TENANT,
+    ttl_seconds=settings.THREAD_RAG_CACHE_TTL_SECONDS,
+    on_evict=_close_service,
+)
+
+
 @inject
 class ThreadScopedRAG:
     """
@@ -94,9 +110,7 @@ class ThreadScopedRAG:
     """
 
     def __init__(self):
-        self._services: Dict[str, AgentRAGService] = {}
-        self._initialization_locks: Dict[str, asyncio.Lock] = {}
-        self._lock = asyncio.Lock()
+        self._services = _chat_service_cache
         logger.info("ThreadScopedRAG initialized (tenant-scoped)")
 
     async def _get_service(self, chat_id: str) -> Optional[AgentRAGService]:
@@ -109,49 +123,37 @@ class ThreadScopedRAG:
         Returns:
             AgentRAGService instance or None if creation fails
         """
-        # Return existing service if available and initialized
-        if chat_id in self._services:
-            service = self._services[chat_id]
-            if service.is_initialized():
-                return service
-            else:
-                # Remove failed service
-                logger.warning(f"Removing uninitialized service for chat {chat_id}")
-                if chat_id in self._services:
-                    del self._services[chat_id]
-
-        # Ensure we have a lock for this chat
-        if chat_id not in self._initialization_locks:
-            async with self._lock:
-                if chat_id not in self._initialization_locks:
-                    self._initialization_locks[chat_id] = asyncio.Lock()
-
-        # Use lock to prevent concurrent initialization
-        async with self._initialization_locks[chat_id]:
-            # Double-check pattern - service might have been created while waiting
-            if chat_id in self._services and self._services[chat_id].is_initialized():
-                return self._services[chat_id]
-
-            try:
-                # Create service with default config
-                config = _create_default_config(chat_id)
-                service = AgentRAGService(config)
-
-                # Initialize service
-                success = await service.initialize()
-                if not success:
-                    logger.error(f"Failed to initialize AgentRAGService for chat {chat_id}")
-                    return None
-
-                # Cache the service
-                self._services[chat_id] = service
-                logger.info(f"Created and cached AgentRAGService for chat {chat_id}")
-                return service
-
-            except Exception as e:
-                logger.error(f"Error creating AgentRAGService for chat {chat_id}: {e}")
+        # Concurrent callers share a single initialization
+        service = await self._services.get_or_create_async(
+            chat_id, lambda: self._create_service(chat_id))
+        if service is not None and not service.is_initialized():
+            # Remove failed service
+            logger.warning(f"Removing uninitialized service for chat {chat_id}")
+            self._services.pop(chat_id)
+            service = await self._services.get_or_create_async(
+                chat_id, lambda: self._create_service(chat_id))
+        return service
+
+    async def _create_service(self, chat_id: str) -> Optional[AgentRAGService]:
+        """Create and initialize the service of a chat, None on failure"""
+        try:
+            # Create service with default config
+            config = _create_default_config(chat_id)
+            service = AgentRAGService(config)
+
+            # Initialize service
+            success = await service.initialize()
+            if not success:
+                logger.error(f"Failed to initialize AgentRAGService for chat {chat_id}")
                 return None
 
+            logger.info(f"Created and cached AgentRAGService for chat {chat_id}")
+            return service
+
+        except Exception as e:
+            logger.error(f"Error creating AgentRAGService for chat {chat_id}: {e}")
+            return None
+
     async def add_message(self, chat_id: str, message: str, message_id: str):
         """
         Add a message to the chat's vector store.
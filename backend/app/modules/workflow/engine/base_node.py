@@ -6,6 +6,7 @@ from abc import ABC, abstractmethod
 from typing import Dict, Any, Literal, Optional, List
 import logging
 import time
+from app.modules.workflow.engine.config_template import ConfigTemplate
 from app.modules.workflow.engine.utils import replace_config_vars
 from app.modules.workflow.engine.workflow_state import WorkflowState
 
@@ -72,12 +73,17 @@ class BaseNode(ABC):
 
     def get_node_config(self, node_id: str):
         """Get the node config and type."""
-        workflow = self.state.workflow
-        node_config = next(
-            node for node in workflow["nodes"] if node["id"] == node_id)
+        node_config = self.state.get_node_config(node_id)
         node_type = node_config.get("type", "")
         return node_config, node_type
 
+    def get_config_template(self) -> Optional[ConfigTemplate]:
+        """Get the config template precompiled in the workflow execution plan."""
+        plan = self.state.workflow.get("plan") if self.state.workflow else None
+        if plan is None:
+            return None
+        return plan.get_template(self.node_id, self.node_config)
+
     def get_handlers(self) -> list:
         """Get the node handlers from configuration."""
         return self.node_data.get("handlers", [])
@@ -114,6 +120,14 @@ class BaseNode(ABC):
         """Get the current output data."""
         return self.output_data
 
+    def is_streaming(self) -> bool:
+        """Whether this node's events are streamed to the caller"""
+        return self.state.is_streaming(self.node_id)
+
+    def emit_event(self, event_type: str, **data: Any) -> None:
+        """Stream an event (token, tool call) of this node, if the execution is streamed"""
+        self.state.emit_event(self.node_id, event_type, **data)
+
     def get_memory(self):
         """Get the conversation memory."""
         return self.state.get_memory()
@@ -306,8 +320,13 @@ class BaseNode(ABC):
 
             # Resolve configuration template variables
             source_output = self.get_input_from_source()
-            resolved_config, replacements = replace_config_vars(
-                config=self.node_config, state=self.state, source_output=source_output, direct_input=direct_input)
+            template = self.get_config_template()
+            if template is not None:
+                resolved_config, replacements = template.render(
+                    state=self.state, source_output=source_output, direct_input=direct_input)
+            else:
+                resolved_config, replacements = replace_config_vars(
+                    config=self.node_config, state=self.state, source_output=source_output, direct_input=direct_input)
 
             node_config = resolved_config.get(
                 "data", None) or resolved_config or {}
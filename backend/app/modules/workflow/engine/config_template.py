@@ -0,0 +1,306 @@
+"""
+Precompiled node configuration templates.
+
+``replace_config_vars`` serializes the whole node config to JSON, scans it for
+``{{var}}`` patterns and parses it back on every execution. A
+:class:`ConfigTemplate` parses a config once into a tree of literal and
+placeholder slots, so rendering only resolves the variables and rebuilds the
+containers on the path to a placeholder. Subtrees without placeholders are
+pickled at compile time and unpickled on render, so like the legacy path every
+render returns a fresh config that nodes may mutate without touching the cached
+template, at a fraction of the cost of a deepcopy.
+
+Values are encoded with the same rules as ``_encode_replacement_value``:
+strings are inserted verbatim, other values as their JSON text (with the
+escape handling for ``code`` fields). Whenever the legacy path would produce
+something other than a straightforward substitution, rendering falls back to
+``replace_config_vars`` so results stay identical.
+"""
+
+from collections import OrderedDict
+import copy
+import hashlib
+import json
+import logging
+import pickle
+import re
+import threading
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from app.modules.workflow.engine.utils import (
+    _convert_json_escapes_for_code_context,
+    _resolve_variable_value,
+    replace_config_vars,
+)
+from app.modules.workflow.engine.workflow_state import WorkflowState
+
+logger = logging.getLogger(__name__)
+
+# Same pattern as find_all_vars; DOTALL because the raw strings are not JSON escaped
+_VAR_PATTERN = re.compile(r"{{.*?}}", re.DOTALL)
+
+# Max number of compiled templates kept in the process-wide cache
+TEMPLATE_CACHE_SIZE = 2048
+
+
+class _Slot:
+    """A placeholder inside a string."""
+
+    __slots__ = ("var_name", "code_context")
+
+    def __init__(self, var_name: str, code_context: bool):
+        self.var_name = var_name
+        self.code_context = code_context
+
+
+class _Text:
+    """A string made of literal parts and placeholder slots."""
+
+    __slots__ = ("parts",)
+
+    def __init__(self, parts: List[Union[str, _Slot]]):
+        self.parts = parts
+
+
+class _Dict:
+    """A dict with at least one templated key or value."""
+
+    __slots__ = ("items",)
+
+    def __init__(self, items: List[Tuple[Any, Any]]):
+        self.items = items
+
+
+class _List:
+    """A list with at least one templated item."""
+
+    __slots__ = ("items",)
+
+    def __init__(self, items: List[Any]):
+        self.items = items
+
+
+class _Literal:
+    """A container without placeholders, rebuilt from a snapshot on every render."""
+
+    __slots__ = ("value", "payload")
+
+    def __init__(self, value: Any):
+        self.value = value
+        try:
+            self.payload: Optional[bytes] = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception:
+            self.payload = None
+
+    def copy(self) -> Any:
+        if self.payload is None:
+            return copy.deepcopy(self.value)
+        return pickle.loads(self.payload)
+
+
+class _TemplateFallback(Exception):
+    """Raised when a value cannot be substituted without the legacy JSON path."""
+
+
+class ConfigTemplate:
+    """A node configuration parsed once into literal and placeholder slots."""
+
+    def __init__(self, config: dict):
+        self.config = config
+        self.var_names: List[str] = []
+        # Like the legacy path, the context of the first occurrence of a pattern
+        # decides how every occurrence of it is encoded
+        self._code_contexts: Dict[str, bool] = {}
+        # Key of the last ``"key":`` emitted in JSON order, None after a string
+        self._last_key: Optional[str] = None
+        self._root = self._freeze(self._compile(config))
+
+    @property
+    def has_placeholders(self) -> bool:
+        """Whether the config contains any ``{{var}}`` placeholder."""
+        return bool(self.var_names)
+
+    def _compile(self, value: Any) -> Any:
+        """
+        Compile a value, walking it in the order ``json.dumps`` would emit it.
+
+        ``_is_in_code_field_context`` treats a string as code when the nearest
+        preceding quote or colon in the JSON text is the colon after a "code"
+        key, which is tracked here through ``_last_key``.
+        """
+        if isinstance(value, str):
+            compiled = self._compile_text(value, self._last_key == "code")
+            self._last_key = None
+            return compiled
+        if isinstance(value, dict):
+            items = []
+            templated = False
+            for key, item in value.items():
+                if isinstance(key, str):
+                    compiled_key = self._compile(key)
+                else:
+                    compiled_key = key
+                self._last_key = str(key)
+                compiled_item = self._compile(item)
+                templated = templated or compiled_key is not key or compiled_item is not item
+                items.append((compiled_key, compiled_item))
+            return _Dict(items) if templated else value
+        if isinstance(value, (list, tuple)):
+            items = [self._compile(item) for item in value]
+            if any(compiled is not item for compiled, item in zip(items, value)):
+                return _List(items)
+            return value
+        return value
+
+    def _freeze(self, node: Any) -> Any:
+        """Snapshot the literal containers of a compiled tree."""
+        if isinstance(node, _Dict):
+            return _Dict([(key, self._freeze(item)) for key, item in node.items])
+        if isinstance(node, _List):
+            return _List([self._freeze(item) for item in node.items])
+        if isinstance(node, (_Text, str, int, float, bool, type(None))):
+            return node
+        return _Literal(node)
+
+    def _compile_text(self, text: str, in_code_field: bool) -> Any:
+        if "{{" not in text:
+            return text
+        parts: List[Union[str, _Slot]] = []
+        position = 0
+        for match in _VAR_PATTERN.finditer(text):
+            if match.start() > position:
+                parts.append(text[position:match.start()])
+            var_pattern = match.group(0)
+            var_name = var_pattern.replace("{{", "").replace("}}", "")
+            if var_pattern not in self._code_contexts:
+                self._code_contexts[var_pattern] = in_code_field
+                if var_name not in self.var_names:
+                    self.var_names.append(var_name)
+            parts.append(_Slot(var_name, self._code_contexts[var_pattern]))
+            position = match.end()
+        if not parts:
+            return text
+        if position < len(text):
+            parts.append(text[position:])
+        return _Text(parts)
+
+    def render(
+        self,
+        state: WorkflowState,
+        source_output: Any,
+        direct_input: Optional[dict] = None,
+    ) -> tuple[dict, dict]:
+        """
+        Fill the placeholders from the state, the source output or the direct input.
+
+        Args:
+            state: The workflow state object
+            source_output: The source node's output
+            direct_input: Optional direct input dictionary
+
+        Returns:
+            tuple: (resolved_config, replacements_made), as from replace_config_vars
+        """
+        if not self.config or not self.var_names:
+            return self._render(self._root, {}), {}
+
+        if direct_input is None:
+            direct_input = {}
+
+        replacements_made = {}
+        for var_name in self.var_names:
+            replacement_value, _ = _resolve_variable_value(
+                var_name, state, source_output, direct_input
+            )
+            replacements_made[var_name] = replacement_value
+
+        try:
+            return self._render(self._root, replacements_made), replacements_made
+        except _TemplateFallback:
+            return replace_config_vars(
+                config=self.config,
+                state=state,
+                source_output=source_output,
+                direct_input=direct_input,
+            )
+
+    def _render(self, node: Any, values: Dict[str, Any]) -> Any:
+        if isinstance(node, _Text):
+            parts = node.parts
+            if len(parts) == 1:
+                return _encode_slot_value(values[parts[0].var_name], parts[0])
+            return "".join(
+                part if isinstance(part, str) else _encode_slot_value(values[part.var_name], part)
+                for part in parts
+            )
+        if isinstance(node, _Dict):
+            return {
+                self._render(key, values): self._render(item, values)
+                for key, item in node.items
+            }
+        if isinstance(node, _List):
+            return [self._render(item, values) for item in node.items]
+        if isinstance(node, _Literal):
+            return node.copy()
+        return node
+
+
+def _encode_slot_value(value: Any, slot: _Slot) -> str:
+    """
+    Encode a value the way it reads after the legacy JSON substitution round trip.
+
+    Placeholders always sit inside JSON strings, so strings come back verbatim and
+    other values as their JSON text with quotes escaped.
+    """
+    if isinstance(value, str):
+        return value
+    try:
+        json_encoded = json.dumps(value)
+    except (TypeError, ValueError) as e:
+        logger.warning(
+            f"Failed to JSON encode replacement value for {slot.var_name}: {e}. Using string representation."
+        )
+        return str(value)
+
+    json_replacement = json_encoded.replace('"', '\\"')
+    if slot.code_context:
+        json_replacement = _convert_json_escapes_for_code_context(json_replacement)
+    if "\\" not in json_replacement:
+        return json_replacement
+    try:
+        return json.loads(f'"{json_replacement}"')
+    except json.JSONDecodeError as e:
+        raise _TemplateFallback() from e
+
+
+_template_cache: "OrderedDict[str, ConfigTemplate]" = OrderedDict()
+_template_cache_lock = threading.Lock()
+
+
+def config_hash(config: dict) -> str:
+    """Stable hash of a node configuration."""
+    payload = json.dumps(config, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def get_config_template(config: dict) -> ConfigTemplate:
+    """Get the compiled template for a config, compiling it on a cache miss."""
+    key = config_hash(config)
+    with _template_cache_lock:
+        template = _template_cache.get(key)
+        if template is not None:
+            _template_cache.move_to_end(key)
+            return template
+
+    template = ConfigTemplate(config)
+    with _template_cache_lock:
+        _template_cache[key] = template
+        while len(_template_cache) > TEMPLATE_CACHE_SIZE:
+            _template_cache.popitem(last=False)
+    return template
+
+
+def clear_template_cache() -> None:
+    """Drop all compiled templates."""
+    with _template_cache_lock:
+        _template_cache.clear()
@@ -0,0 +1,194 @@
+"""
+Compiled execution plans for workflows.
+
+A workflow configuration is compiled once (at ``build_workflow`` time) into an
+immutable :class:`ExecutionPlan` holding a node-id index, the successor and
+predecessor tables, the resolved node classes and the precompiled config
+templates. Per start node the plan derives a :class:`StartSchedule` with the
+dependency table and in-degrees the engine's ready-queue scheduler needs, so
+no graph bookkeeping is repeated on each execution.
+"""
+
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import Any, Dict, List, Mapping, Optional, Tuple, FrozenSet
+import logging
+
+from app.modules.workflow.engine.config_template import (
+    ConfigTemplate,
+    get_config_template,
+)
+
+logger = logging.getLogger(__name__)
+
+OUTPUT_NODE_TYPE = "chatOutputNode"
+
+
+@dataclass(frozen=True)
+class StartSchedule:
+    """Dependency information for executing a plan from a given start node.
+
+    Only nodes reachable from the start node take part in scheduling, so tool
+    nodes that merely feed an agent (and are never on the execution path) do
+    not hold back their targets. Edges closing a cycle are dropped; nodes on a
+    cycle execute once, as with the former recursive ``visited`` check.
+    """
+
+    start_node_id: str
+    reachable: FrozenSet[str]
+    successors: Mapping[str, Tuple[str, ...]]
+    dependencies: Mapping[str, Tuple[str, ...]]
+    in_degree: Mapping[str, int]
+
+
+@dataclass(frozen=True)
+class ExecutionPlan:
+    """Immutable, precompiled view of a workflow graph."""
+
+    workflow_id: str
+    node_index: Mapping[str, Dict[str, Any]]
+    node_classes: Mapping[str, Optional[type]]
+    successors: Mapping[str, Tuple[str, ...]]
+    predecessors: Mapping[str, Tuple[str, ...]]
+    templates: Mapping[str, ConfigTemplate]
+    # Nodes feeding a chat output node, whose events are streamed to the caller
+    output_sources: FrozenSet[str] = frozenset()
+    _schedules: Dict[str, StartSchedule] = field(
+        default_factory=dict, repr=False, compare=False
+    )
+
+    def has_node(self, node_id: str) -> bool:
+        """Check whether the node belongs to the workflow."""
+        return node_id in self.node_index
+
+    def get_node_config(self, node_id: str) -> Dict[str, Any]:
+        """Get the raw node configuration by ID."""
+        return self.node_index[node_id]
+
+    def get_node_class(self, node_id: str) -> Optional[type]:
+        """Get the resolved node class, or None if the node type is unknown."""
+        return self.node_classes.get(node_id)
+
+    def get_template(self, node_id: str, node_config: Dict[str, Any]) -> Optional[ConfigTemplate]:
+        """Get the compiled config template, if ``node_config`` is the planned one."""
+        if self.node_index.get(node_id) is not node_config:
+            return None
+        return self.templates.get(node_id)
+
+    def schedule_for(self, start_node_id: str) -> StartSchedule:
+        """Get (and memoize) the schedule for executing from ``start_node_id``."""
+        schedule = self._schedules.get(start_node_id)
+        if schedule is None:
+            schedule = _compile_schedule(self, start_node_id)
+            self._schedules[start_node_id] = schedule
+        return schedule
+
+
+def compile_execution_plan(
+    workflow_id: str,
+    nodes: List[Dict[str, Any]],
+    edges: List[Dict[str, Any]],
+    node_registry: Mapping[str, type],
+) -> ExecutionPlan:
+    """
+    Compile a workflow definition into an execution plan.
+
+    Args:
+        workflow_id: ID of the workflow
+        nodes: Node configurations of the workflow
+        edges: Edge configurations of the workflow
+        node_registry: Mapping of node type to node class
+
+    Returns:
+        The compiled ExecutionPlan
+    """
+    node_index: Dict[str, Dict[str, Any]] = {}
+    node_classes: Dict[str, Optional[type]] = {}
+    templates: Dict[str, ConfigTemplate] = {}
+    for node in nodes:
+        node_id = node["id"]
+        node_index[node_id] = node
+        node_classes[node_id] = node_registry.get(node.get("type", ""))
+        templates[node_id] = get_config_template(node)
+
+    successors: Dict[str, List[str]] = {node_id: [] for node_id in node_index}
+    predecessors: Dict[str, List[str]] = {node_id: [] for node_id in node_index}
+    for edge in edges:
+        source_id = edge["source"]
+        target_id = edge["target"]
+        if source_id not in node_index or target_id not in node_index:
+            logger.warning(
+                f"Workflow {workflow_id} has a dangling edge {source_id} -> {target_id}, ignoring it"
+            )
+            continue
+        # Several edges (different handles) may join the same pair of nodes
+        if target_id not in successors[source_id]:
+            successors[source_id].append(target_id)
+            predecessors[target_id].append(source_id)
+
+    output_sources = frozenset(
+        source_id
+        for node_id, node in node_index.items()
+        if node.get("type") == OUTPUT_NODE_TYPE
+        for source_id in predecessors[node_id]
+    )
+
+    return ExecutionPlan(
+        workflow_id=workflow_id,
+        node_index=MappingProxyType(node_index),
+        node_classes=MappingProxyType(node_classes),
+        successors=MappingProxyType(
+            {node_id: tuple(targets) for node_id, targets in successors.items()}
+        ),
+        predecessors=MappingProxyType(
+            {node_id: tuple(sources) for node_id, sources in predecessors.items()}
+        ),
+        templates=MappingProxyType(templates),
+        output_sources=output_sources,
+    )
+
+
+def _compile_schedule(plan: ExecutionPlan, start_node_id: str) -> StartSchedule:
+    """Build the dependency table for the subgraph reachable from the start node."""
+    # Iterative DFS, recording edges that point back into the current path
+    back_edges = set()
+    order: List[str] = [start_node_id]
+    visited = {start_node_id}
+    on_path = {start_node_id}
+    stack = [(start_node_id, iter(plan.successors.get(start_node_id, ())))]
+    while stack:
+        node_id, children = stack[-1]
+        child = next(children, None)
+        if child is None:
+            stack.pop()
+            on_path.discard(node_id)
+            continue
+        if child in on_path:
+            back_edges.add((node_id, child))
+        elif child not in visited:
+            visited.add(child)
+            on_path.add(child)
+            order.append(child)
+            stack.append((child, iter(plan.successors.get(child, ()))))
+
+    successors: Dict[str, Tuple[str, ...]] = {}
+    dependencies: Dict[str, Tuple[str, ...]] = {}
+    for node_id in order:
+        successors[node_id] = tuple(
+            target for target in plan.successors.get(node_id, ())
+            if (node_id, target) not in back_edges
+        )
+        dependencies[node_id] = tuple(
+            source for source in plan.predecessors.get(node_id, ())
+            if source in visited and (source, node_id) not in back_edges
+        )
+
+    return StartSchedule(
+        start_node_id=start_node_id,
+        reachable=frozenset(visited),
+        successors=MappingProxyType(successors),
+        dependencies=MappingProxyType(dependencies),
+        in_degree=MappingProxyType(
+            {node_id: len(sources) for node_id, sources in dependencies.items()}
+        ),
+    )
@@ -3,6 +3,7 @@ Agent node implementation using the BaseNode class.
 """
 
 import datetime
+import inspect
 from typing import Dict, Any
 import logging
 
@@ -15,6 +16,9 @@ from app.modules.workflow.agents.tool_agent import ToolAgent
 
 logger = logging.getLogger(__name__)
 
+# Tool results in streamed events are truncated, the full result stays in the agent's steps
+TOOL_EVENT_RESULT_CHARS = 2000
+
 
 class AgentNode(BaseNode):
     """Agent node that can select and execute tools using the BaseNode approach"""
@@ -44,6 +48,9 @@ class AgentNode(BaseNode):
 
         # Get tools from connected nodes using the new generic method
         tools = self.get_connected_nodes("tools")
+        if self.is_streaming():
+            for tool in tools:
+                self._emit_tool_events(tool)
 
         # Add current time to system prompt
         system_prompt += f" Current time: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
@@ -102,6 +109,10 @@ class AgentNode(BaseNode):
             result = await agent.invoke(prompt, chat_history=chat_history)
             logger.info("Agent result: %s", result)
 
+            # Agents answer in structured (JSON) responses, the answer is streamed once parsed
+            if result.get("response"):
+                self.emit_event("token", text=str(result["response"]))
+
             # Prepare output
             output = {
                 "message": result.get("response", "Something went wrong"),
@@ -114,3 +125,17 @@ class AgentNode(BaseNode):
             logger.error("Error processing agent node: %s", str(e))
             error_message = f"Error: {str(e)}"
             return {"error": error_message}
+
+    def _emit_tool_events(self, tool: Any) -> None:
+        """Stream tool_start/tool_end events around the tool's invocations"""
+        invoke = tool.invoke
+
+        async def invoke_with_events(**kwargs):
+            self.emit_event("tool_start", tool=tool.name, args=kwargs)
+            result = invoke(**kwargs)
+            if inspect.isawaitable(result):
+                result = await result
+            self.emit_event("tool_end", tool=tool.name, result=str(result)[:TOOL_EVENT_RESULT_CHARS])
+            return result
+
+        tool.invoke = invoke_with_events
@@ -6,11 +6,14 @@ from typing import Any, Dict
 import logging
 from langchain_core.messages import HumanMessage, SystemMessage
 
+from app.core.config.settings import settings
 from app.core.exceptions.error_messages import ErrorKey
 from app.core.exceptions.exception_classes import AppException
 from app.modules.workflow.engine.base_node import BaseNode
+from app.modules.workflow.engine.workflow_events import chunk_text
 from app.modules.workflow.llm.provider import LLMProvider
 from app.modules.workflow.agents.cot_agent import ChainOfThoughtAgent
+from app.modules.workflow.agents.memory import llm_summarizer
 
 logger = logging.getLogger(__name__)
 
@@ -63,14 +66,34 @@ class LLMModelNode(BaseNode):
 
                 return result
 
-            if memory:
+            if memory and settings.CONVERSATION_HISTORY_TOKEN_BUDGET:
+                # Rolling summary of older turns plus the recent ones that fit the budget
+                chat_history = await memory.get_chat_history(
+                    as_string=True,
+                    max_messages=settings.CONVERSATION_MAX_MEMORY_MESSAGES,
+                    token_budget=settings.CONVERSATION_HISTORY_TOKEN_BUDGET,
+                    summarize=llm_summarizer(llm),
+                )
+                system_prompt = system_prompt + "\n\n" + chat_history
+            elif memory:
                 chat_history = await memory.get_chat_history(
                     as_string=True, max_messages=10)
                 system_prompt = system_prompt + "\n\n" + chat_history
 
+            messages = [SystemMessage(content=system_prompt), HumanMessage(content=prompt)]
+
+            # Feeding the chat output of a streamed execution: forward tokens as they arrive
+            if self.is_streaming():
+                parts = []
+                async for chunk in llm.astream(messages):
+                    text = chunk_text(chunk)
+                    if text:
+                        parts.append(text)
+                        self.emit_event("token", text=text)
+                return "".join(parts)
+
             # Process the input through the model
-            response = await llm.ainvoke(
-                [SystemMessage(content=system_prompt), HumanMessage(content=prompt)])
+            response = await llm.ainvoke(messages)
             result = response.content
 
             return result
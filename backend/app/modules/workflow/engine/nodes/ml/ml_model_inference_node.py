@@ -15,6 +15,7 @@ from app.core.exceptions.exception_classes import AppException
 from app.dependencies.injector import injector
 from app.services.ml_models import MLModelsService
 from app.services.ml_model_manager import get_ml_model_manager
+from app.services.ml_inference import get_inference_executor
 
 logger = logging.getLogger(__name__)
 
@@ -219,23 +220,21 @@ class MLModelInferenceNode(BaseNode):
 
             # Make prediction (always returns batch format)
             try:
-                predictions = model.predict(input_data)
-                
+                # Batched with concurrent requests for the same model, off the event loop
+                predictions, probabilities = await get_inference_executor().predict(
+                    model_id,
+                    model,
+                    input_data,
+                    pkl_file=ml_model.pkl_file,
+                    updated_at=ml_model.updated_at
+                )
+
                 # Get class labels
                 if hasattr(model, 'classes_'):
                     class_labels = model.classes_
                 else:
                     class_labels = [0, 1]
 
-                # Try to get prediction probabilities if available (for classifiers)
-                probabilities = None
-                if hasattr(model, 'predict_proba'):
-                    try:
-                        probabilities = model.predict_proba(input_data)
-                    except Exception as prob_error:
-                        logger.warning(
-                            f"Could not get prediction probabilities: {prob_error}")
-
                 # Build response (always batch format)
                 # Convert input_data to column-wise dictionary
                 input_data_by_column = {}
@@ -11,7 +11,7 @@ from app.core.exceptions.error_messages import ErrorKey
 from app.core.exceptions.exception_classes import AppException
 from app.dependencies.injector import injector
 from app.modules.workflow.llm.provider import LLMProvider
-from app.modules.data.utils.file_extractor import FileTextExtractor
+from app.modules.data.utils.extraction_service import get_extraction_service
 
 
 logger = logging.getLogger(__name__)
@@ -45,8 +45,7 @@ class OpenAPINode(BaseNode):
             raise AppException(error_key=ErrorKey.MISSING_PARAMETER)
 
         try:
-            extractor = FileTextExtractor()
-            spec_content = extractor.extract(path=server_file_path)
+            spec_content = await get_extraction_service().extract(path=server_file_path)
 
             if not spec_content:
                 logger.error(
@@ -68,6 +68,7 @@ class ToolBuilderNode(BaseNode):
             input_data={**template, **source_input, **temp_data},
             thread_id=self.get_state().get_thread_id(),
             persist=False,
+            workflow=self.get_state().workflow,
         )
         self.get_state().update_nodes_from_another_state(state)
         return state.get_last_node_output()
@@ -37,7 +37,7 @@ class ParallelWorkflowEngine(WorkflowEngine):
             raise ValueError(f"Workflow not found: {workflow_id}")
 
         if not start_node_id:
-            start_node_ids = self._find_starting_nodes(workflow_id)
+            start_node_ids = self._find_starting_nodes(workflow)
             if len(start_node_ids) == 1:
                 start_node_id = start_node_ids[0]
             else:
@@ -130,10 +130,7 @@ class ParallelWorkflowEngine(WorkflowEngine):
         if node_id in executed_nodes:
             return None
 
-        workflow = self.workflows[workflow_id]
-        node_config = next(
-            node for node in workflow["nodes"] if node["id"] == node_id)
-        node_type = node_config.get("type", "")
+        _, node_type = self.get_node_config(workflow_id, node_id)
 
         # Check if this is an aggregator node
         if "aggregator" in node_type.lower():
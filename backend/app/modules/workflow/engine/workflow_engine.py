@@ -4,6 +4,11 @@ Workflow engine for building and executing workflows with state management.
 
 from app.modules.workflow.utils import process_path_based_input_data
 from app.modules.workflow.engine.base_node import BaseNode
+from app.modules.workflow.engine.execution_plan import (
+    ExecutionPlan,
+    compile_execution_plan,
+)
+from app.modules.workflow.engine.workflow_events import WorkflowEventChannel
 from app.modules.workflow.engine.workflow_state import WorkflowState
 from app.modules.workflow.engine.nodes import (
     ChatInputNode,
@@ -34,18 +39,23 @@ from app.modules.workflow.engine.nodes import (
     ThreadRAGNode,
     MCPNode,
 )
-from typing import Dict, Any, List, Optional, Set
+from typing import AsyncIterator, Dict, Any, List, Optional, Set
 import logging
 import asyncio
-from collections import defaultdict
+from collections import defaultdict, deque
 import uuid
 from fastapi_injector import RequestScopeFactory
+from app.cache.bounded_cache import BoundedCache
+from app.core.config.settings import settings
 from app.dependencies.injector import injector
 from app.core.tenant_scope import get_tenant_context, set_tenant_context
 
 
 logger = logging.getLogger(__name__)
 
+# Engine shared by agents and nodes that do not ask for a dedicated one
+DEFAULT_ENGINE_ID = "default"
+
 
 class WorkflowEngine:
     """
@@ -59,17 +69,23 @@ class WorkflowEngine:
     - Parallel execution support
     """
 
-    _instances: Dict[str, "WorkflowEngine"] = {}
+    # Workflow IDs are globally unique, engines are shared across tenants
+    _instances: BoundedCache["WorkflowEngine"] = BoundedCache(
+        "workflow_engines",
+        max_size=settings.WORKFLOW_ENGINE_CACHE_SIZE,
+        tenant_aware=False,
+    )
 
     @classmethod
-    def get_instance(cls, workflow_id: str = str(uuid.uuid4())) -> "WorkflowEngine":
+    def get_instance(cls, workflow_id: str = DEFAULT_ENGINE_ID) -> "WorkflowEngine":
         """Get or create a workflow engine instance for a workflow ID"""
-        if workflow_id not in cls._instances:
+        def create() -> "WorkflowEngine":
             logger.info(
                 f"Creating new workflow engine instance for workflow ID: {workflow_id}"
             )
-            cls._instances[workflow_id] = WorkflowEngine()
-        return cls._instances[workflow_id]
+            return WorkflowEngine()
+
+        return cls._instances.get_or_create(workflow_id, create)
 
     def initialize_workflow_engine(self):
         """
@@ -77,6 +93,7 @@ class WorkflowEngine:
         """
         self.node_registry: Dict[str, type] = {}
         self.workflows: Dict[str, Dict[str, Any]] = {}
+        self.plans: Dict[str, ExecutionPlan] = {}
         # Initialize the new workflow engine
 
         self.register_node_type("chatInputNode", ChatInputNode)
@@ -107,8 +124,16 @@ class WorkflowEngine:
         self.register_node_type("threadRAGNode", ThreadRAGNode)
         self.register_node_type("mcpNode", MCPNode)
 
-    def __init__(self):
-        """Initialize the workflow engine."""
+    def __init__(self, max_concurrency: Optional[int] = None):
+        """
+        Initialize the workflow engine.
+
+        Args:
+            max_concurrency: Maximum number of nodes executed at the same time,
+                defaults to ``settings.WORKFLOW_MAX_CONCURRENCY``
+        """
+        self.max_concurrency = max(
+            1, max_concurrency or settings.WORKFLOW_MAX_CONCURRENCY)
         self.initialize_workflow_engine()
 
     def register_node_type(self, node_type: str, node_class: type) -> None:
@@ -160,6 +185,16 @@ class WorkflowEngine:
         # Build edge mappings for efficient lookup
         self._build_edge_mappings(workflow_id)
 
+        # Compile the execution plan once, so executions skip graph bookkeeping
+        plan = compile_execution_plan(
+            workflow_id,
+            self.workflows[workflow_id]["nodes"],
+            self.workflows[workflow_id]["edges"],
+            self.node_registry,
+        )
+        self.workflows[workflow_id]["plan"] = plan
+        self.plans[workflow_id] = plan
+
         logger.info(
             f"Built workflow: {workflow_id} ({self.workflows[workflow_id]['metadata']['name']})"
         )
@@ -185,10 +220,24 @@ class WorkflowEngine:
         workflow["source_edges"] = dict(source_edges)
         workflow["target_edges"] = dict(target_edges)
 
+    def remove_workflow(self, workflow_id: str, workflow: Optional[Dict[str, Any]] = None) -> None:
+        """Remove a workflow, only if it is still the given built workflow when one is passed."""
+        if workflow is not None and self.workflows.get(workflow_id) is not workflow:
+            return
+        self.workflows.pop(workflow_id, None)
+        self.plans.pop(workflow_id, None)
+
     def get_workflow(self, workflow_id: str) -> Optional[Dict[str, Any]]:
         """Get workflow by ID."""
         return self.workflows.get(workflow_id)
 
+    def get_plan(self, workflow_id: str) -> ExecutionPlan:
+        """Get the compiled execution plan of a workflow."""
+        plan = self.plans.get(workflow_id)
+        if plan is None:
+            raise ValueError(f"Workflow not found: {workflow_id}")
+        return plan
+
     def list_workflows(self) -> List[str]:
         """List all workflow IDs."""
         return list(self.workflows.keys())
@@ -200,6 +249,8 @@ class WorkflowEngine:
         input_data: Optional[Dict[str, Any]] = None,
         thread_id: str = str(uuid.uuid4()),
         persist: Optional[bool] = True,
+        events: Optional[WorkflowEventChannel] = None,
+        workflow: Optional[Dict[str, Any]] = None,
     ) -> WorkflowState:
         """
         Execute workflow starting from a specific node.
@@ -209,11 +260,14 @@ class WorkflowEngine:
             start_node_id: Optional ID of the starting node
             input_data: Input data for the workflow
             thread_id: Thread ID for this execution
+            events: Channel receiving the events of the nodes feeding the chat output
+            workflow: Workflow built by build_workflow to run, instead of the one
+                currently registered under workflow_id
 
         Returns:
             WorkflowState with execution results
         """
-        workflow = self.get_workflow(workflow_id)
+        workflow = workflow or self.get_workflow(workflow_id)
         if not workflow:
             raise ValueError(f"Workflow not found: {workflow_id}")
         if not input_data:
@@ -222,15 +276,17 @@ class WorkflowEngine:
 
         if not start_node_id:
 
-            start_node_ids = self._find_starting_nodes(workflow_id)
+            start_node_ids = self._find_starting_nodes(workflow)
             if len(start_node_ids) == 1:
                 start_node_id = start_node_ids[0]
             else:
                 raise ValueError(
                     f"Multiple starting nodes found: {start_node_ids}")
 
-        # Verify start node exists
-        if start_node_id not in [node["id"] for node in workflow["nodes"]]:
+        # Verify start node exists. The run keeps this plan (also through the
+        # state) even if the workflow is rebuilt or removed while it runs.
+        plan = workflow["plan"]
+        if not plan.has_node(start_node_id):
             raise ValueError(f"Start node not found: {start_node_id}")
 
         initial_values = process_path_based_input_data(input_data)
@@ -241,6 +297,9 @@ class WorkflowEngine:
             thread_id=thread_id or str(uuid.uuid4()),
             initial_values=initial_values,
         )
+        if events is not None:
+            state.events = events
+            state.stream_node_ids = plan.output_sources
 
         try:
             state.start_execution()
@@ -248,9 +307,7 @@ class WorkflowEngine:
 
             # Execute from the specified node
             try:
-                await self._execute_from_node_recursive(
-                    start_node_id, state, workflow_id, set()
-                )
+                await self._execute_plan(plan, start_node_id, state)
 
                 state.complete_execution()
             except ValueError as e:
@@ -272,9 +329,51 @@ class WorkflowEngine:
             logger.error(f"Error adding message to memory: {e}")
         return state
 
-    def _find_starting_nodes(self, workflow_id: str) -> List[str]:
+    async def stream_from_node(
+        self,
+        workflow_id: str,
+        start_node_id: Optional[str] = None,
+        input_data: Optional[Dict[str, Any]] = None,
+        thread_id: Optional[str] = None,
+        persist: Optional[bool] = True,
+        workflow: Optional[Dict[str, Any]] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Execute workflow like execute_from_node, yielding the tokens and tool
+        calls of the nodes feeding the chat output as they happen, then a
+        "done" event with the formatted response.
+
+        Raises whatever execute_from_node raises, after the events emitted so far.
+        """
+        events = WorkflowEventChannel()
+
+        async def run() -> WorkflowState:
+            try:
+                return await self.execute_from_node(
+                    workflow_id,
+                    start_node_id=start_node_id,
+                    input_data=input_data,
+                    thread_id=thread_id,
+                    persist=persist,
+                    events=events,
+                    workflow=workflow,
+                )
+            finally:
+                events.close()
+
+        execution = asyncio.create_task(run())
+        try:
+            async for event in events:
+                yield event
+            state = await execution
+            yield {"type": "done", "response": state.format_state_as_response()}
+        finally:
+            # The reader went away (e.g. client disconnected)
+            if not execution.done():
+                execution.cancel()
+
+    def _find_starting_nodes(self, workflow: Dict[str, Any]) -> List[str]:
         """Find nodes with no incoming edges (starting nodes)."""
-        workflow = self.workflows[workflow_id]
         target_edges = workflow["target_edges"]
 
         input_node = None
@@ -294,113 +393,122 @@ class WorkflowEngine:
 
         return starting_nodes
 
-    async def _execute_from_node_recursive(
-        self, node_id: str, state: WorkflowState, workflow_id: str, visited: Set[str]
+    async def _execute_plan(
+        self, plan: ExecutionPlan, start_node_id: str, state: WorkflowState
     ) -> None:
-        """Recursively execute nodes starting from a specific node."""
-        if node_id in visited:
-            return  # Avoid cycles
-
-        visited.add(node_id)
-
-        # _, node_type = self.get_node_config(workflow_id, node_id=node_id)
-
-        node_output: Optional[dict] = None
-
-        # if "aggregator" in node_type.lower():
-        # Check if aggregator requirements are satisfied
-        node = self.executable_node(node_id, state, workflow_id)
-        executable_node = node.check_if_requirement_satisfied()
-        if executable_node:
-            # All sources are ready, execute the aggregator
-            node_output = await self._execute_single_node(node_id, state, workflow_id)
-        else:
-            # Requirements not satisfied, skip execution and continue flow
-            logger.debug(
-                f"Aggregator {node_id} requirements not satisfied, skipping execution"
-            )
-            return
-        # else:
-        #     # Execute regular nodes normally
-        #     node_output = await self._execute_single_node(node_id, state, workflow_id)
-
-        # Handle next nodes based on execution result
-        if node_output and "next_nodes" in node_output:
-            next_nodes = node_output.get("next_nodes", [])
-        else:
-            next_nodes = self._find_next_nodes(node_id, workflow_id)
-
-        # Find and execute next nodes in parallel
-        if next_nodes:
-            # Get request scope factory for creating separate scopes for parallel tasks
-            request_scope_factory = injector.get(RequestScopeFactory)
-            # Capture tenant context from the main request scope
-            tenant_id = get_tenant_context()
-
-            # Create tasks for all next nodes
-            next_tasks = []
-            for next_node_id in next_nodes:
-                # Create a copy of visited set for each task to avoid conflicts
-                task_visited = visited.copy()
-
-                # Create a wrapper function that runs in its own request scope
-                async def execute_node_with_scope(
-                    node_id: str, visited_set: Set[str], tenant: str
-                ):
-                    """Execute a node in its own request scope to avoid session conflicts."""
-                    async with request_scope_factory.create_scope():
-                        # Set tenant context in the new scope to match the main request
-                        set_tenant_context(tenant)
-                        return await self._execute_from_node_recursive(
-                            node_id, state, workflow_id, visited_set
-                        )
+        """
+        Execute the plan with a ready-queue scheduler.
 
+        A node is started exactly once, when all of its predecessors on the
+        execution path have finished. Nodes whose predecessors were all skipped
+        (e.g. the branch a router did not take) or failed are skipped as well.
+        At most ``max_concurrency`` nodes run at the same time.
+        """
+        schedule = plan.schedule_for(start_node_id)
+        remaining = dict(schedule.in_degree)
+        activated: Set[str] = set()
+        ready = deque([start_node_id])
+        running: Dict[asyncio.Task, str] = {}
+        tenant_id = get_tenant_context()
+
+        def resolve(node_id: str, output: Any, executed: bool) -> None:
+            """Release the successors of a finished (or skipped) node."""
+            pending = [(node_id, output, executed)]
+            while pending:
+                current_id, current_output, current_executed = pending.pop()
+                successors = schedule.successors.get(current_id, ())
+                chosen = successors
+                if (
+                    current_executed
+                    and isinstance(current_output, dict)
+                    and "next_nodes" in current_output
+                ):
+                    chosen = [
+                        next_id
+                        for next_id in current_output.get("next_nodes") or []
+                        if next_id in successors
+                    ]
+                for next_id in successors:
+                    if current_executed and next_id in chosen:
+                        activated.add(next_id)
+                    remaining[next_id] -= 1
+                    if remaining[next_id] == 0:
+                        if next_id in activated:
+                            ready.append(next_id)
+                        else:
+                            logger.debug(f"Skipping node {next_id}, no active predecessor")
+                            pending.append((next_id, None, False))
+
+        while ready or running:
+            while ready and len(running) < self.max_concurrency:
+                node_id = ready.popleft()
+                # A node started while nothing else is in flight stays alone until it
+                # finishes, so it can share the caller's request scope.
+                isolated = bool(running) or (bool(ready) and self.max_concurrency > 1)
                 task = asyncio.create_task(
-                    execute_node_with_scope(next_node_id, task_visited, tenant_id)
+                    self._execute_scheduled_node(
+                        node_id, state, plan.workflow_id, isolated, tenant_id
+                    )
                 )
-                next_tasks.append(task)
-
-            # Execute all next nodes in parallel
-            # Use return_exceptions=True to handle any individual task failures gracefully
-            results = await asyncio.gather(*next_tasks, return_exceptions=True)
+                running[task] = node_id
 
-            # Log any exceptions that occurred during parallel execution
-            for i, result in enumerate(results):
-                if isinstance(result, Exception):
+            done, _ = await asyncio.wait(
+                running.keys(), return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                node_id = running.pop(task)
+                try:
+                    output = task.result()
+                except Exception as e:
+                    if node_id == start_node_id:
+                        raise
                     logger.error(
-                        f"Error in parallel execution of node {next_nodes[i]}: {result}"
-                    )
+                        f"Error in parallel execution of node {node_id}: {e}")
+                    resolve(node_id, None, False)
+                    continue
+                resolve(node_id, output, True)
 
-    def _find_next_nodes(self, node_id: str, workflow_id: str) -> List[str]:
-        """Find next nodes connected to the current node."""
-        workflow = self.workflows[workflow_id]
-        source_edges = workflow["source_edges"]
+    async def _execute_scheduled_node(
+        self,
+        node_id: str,
+        state: WorkflowState,
+        workflow_id: str,
+        isolated: bool,
+        tenant_id: Optional[str],
+    ) -> Any:
+        """Execute a node, in its own request scope if it runs next to others."""
+        if not isolated:
+            return await self._execute_single_node(node_id, state, workflow_id)
 
-        next_nodes = []
-        for edge in source_edges.get(node_id, []):
-            next_nodes.append(edge["target"])
+        # Separate scopes avoid session conflicts between concurrent nodes
+        request_scope_factory = injector.get(RequestScopeFactory)
+        async with request_scope_factory.create_scope():
+            # Set tenant context in the new scope to match the main request
+            set_tenant_context(tenant_id)
+            return await self._execute_single_node(node_id, state, workflow_id)
 
-        return next_nodes
+    def _find_next_nodes(self, node_id: str, workflow_id: str) -> List[str]:
+        """Find next nodes connected to the current node."""
+        return list(self.get_plan(workflow_id).successors.get(node_id, ()))
 
     def get_node_config(self, workflow_id: str, node_id: str):
         """Get the node config and type."""
-        workflow = self.workflows[workflow_id]
-        node_config = next(
-            node for node in workflow["nodes"] if node["id"] == node_id)
+        node_config = self.get_plan(workflow_id).get_node_config(node_id)
         node_type = node_config.get("type", "")
         return node_config, node_type
 
     def executable_node(
         self, node_id: str, state: WorkflowState, workflow_id: str
     ) -> BaseNode:
-        """Executable node."""
-        node_config, node_type = self.get_node_config(
-            workflow_id=workflow_id, node_id=node_id
-        )
-        node_class = self.node_registry.get(node_type)
+        """Executable node, from the plan the state's execution runs."""
+        plan = state.workflow.get("plan") if state is not None else None
+        if plan is None:
+            plan = self.get_plan(workflow_id)
+        node_config = plan.get_node_config(node_id)
+        node_class = plan.get_node_class(node_id)
         if not node_class:
             raise ValueError(
-                f"Unknown node type: {node_type}, skipping node {node_id}")
+                f"Unknown node type: {node_config.get('type', '')}, skipping node {node_id}")
         node = node_class(node_id, node_config, state)
         return node
 
@@ -0,0 +1,54 @@
+"""
+Event channel of a streamed workflow execution.
+
+Nodes feeding a chat output node emit events (LLM tokens, tool calls) into
+the channel attached to their WorkflowState; the caller of
+``WorkflowEngine.stream_from_node`` reads them while the workflow runs:
+
+    {"type": "token", "node_id": ..., "text": "Hel"}
+    {"type": "tool_start", "node_id": ..., "tool": "search", "args": {...}}
+    {"type": "tool_end", "node_id": ..., "tool": "search", "result": "..."}
+    {"type": "done", "response": {...}}  # state.format_state_as_response()
+"""
+
+import asyncio
+from typing import Any, AsyncIterator, Dict, Optional
+
+
+class WorkflowEventChannel:
+    """Unbounded queue of events with a single reader, closed when the execution ends"""
+
+    def __init__(self):
+        self._queue: "asyncio.Queue[Optional[Dict[str, Any]]]" = asyncio.Queue()
+        self.closed = False
+
+    def emit(self, event: Dict[str, Any]) -> None:
+        """Add an event, never blocks the emitting node"""
+        if not self.closed:
+            self._queue.put_nowait(event)
+
+    def close(self) -> None:
+        if not self.closed:
+            self.closed = True
+            self._queue.put_nowait(None)
+
+    async def __aiter__(self) -> AsyncIterator[Dict[str, Any]]:
+        while True:
+            event = await self._queue.get()
+            if event is None:
+                return
+            yield event
+
+
+def chunk_text(chunk: Any) -> str:
+    """Text of a streamed LLM message chunk, whose content may be a list of blocks"""
+    content = getattr(chunk, "content", chunk)
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return "".join(
+            block if isinstance(block, str) else block.get("text", "")
+            for block in content
+            if isinstance(block, str) or (isinstance(block, dict) and block.get("type") == "text")
+        )
+    return ""
@@ -2,7 +2,7 @@
 Enhanced workflow state management for execution tracking and performance metrics.
 """
 
-from typing import Dict, Any, Union
+from typing import Dict, Any, FrozenSet, Optional, Union
 import logging
 import uuid
 from datetime import datetime
@@ -12,6 +12,7 @@ from app.modules.workflow.agents.memory import (
     BaseConversationMemory,
     ConversationMemory,
 )
+from app.modules.workflow.engine.workflow_events import WorkflowEventChannel
 
 logger = logging.getLogger(__name__)
 
@@ -74,6 +75,10 @@ class WorkflowState:
         # Error tracking
         self.errors = []
 
+        # Streamed executions: events of the nodes feeding the chat output
+        self.events: Optional[WorkflowEventChannel] = None
+        self.stream_node_ids: FrozenSet[str] = frozenset()
+
         # Edge data and execution context
         self.source_edges = workflow.get("source_edges", {}) if workflow else {}
         self.target_edges = workflow.get("target_edges", {}) if workflow else {}
@@ -164,8 +169,26 @@ class WorkflowState:
         # if node_id not in self.execution_path:
         self.execution_path.append(node_id)
 
+    def is_streaming(self, node_id: str) -> bool:
+        """Whether the node's events are streamed to the caller of the execution"""
+        return self.events is not None and node_id in self.stream_node_ids
+
+    def emit_event(self, node_id: str, event_type: str, **data: Any) -> None:
+        """Stream an event of the node, if the execution is streamed and the node feeds the output
+
+        Args:
+            node_id: ID of the emitting node
+            event_type: Event type, e.g. "token", "tool_start", "tool_end"
+            **data: Event payload
+        """
+        if self.is_streaming(node_id):
+            self.events.emit({"type": event_type, "node_id": node_id, **data})
+
     def get_node_config(self, node_id: str) -> dict:
         """Get the config for a specific node"""
+        plan = self.workflow.get("plan")
+        if plan is not None:
+            return plan.get_node_config(node_id)
         return next(node for node in self.workflow["nodes"] if node["id"] == node_id)
 
     def get_node_config_data(self, node_id: str) -> dict:
@@ -0,0 +1,457 @@
+"""
+LLM gateway: admission control in front of the LLM providers.
+
+Every model handed out by LLMProvider.get_model and LlmModelFactory is
+wrapped (see gateway_model.py) so that its calls go through the gateway of
+this process, which
+
+  - limits requests/min and tokens/min per provider and per tenant and
+    provider with token buckets, and the calls in flight per provider;
+  - admits waiting calls by priority (interactive chat before background
+    tone analysis before batch analyses, see llm_priority);
+  - shares one call between identical in-flight prompts;
+  - retries rate limited (429), overloaded and timed out calls with jittered
+    exponential backoff, holding back the whole provider meanwhile instead
+    of letting each caller hammer it on its own.
+
+Token usage is only known once a call returns: a call is admitted against
+an estimate of its prompt and the buckets are corrected afterwards.
+Statistics are exposed through get_stats() (/llm-providers/gateway/stats).
+"""
+
+import asyncio
+import copy
+import heapq
+import itertools
+import logging
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from enum import IntEnum
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterator, List, Optional, Tuple, TypeVar
+
+from app.core.config.settings import settings
+from app.core.tenant_scope import get_tenant_context
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Characters per token when estimating prompts
+CHARS_PER_TOKEN = 4
+
+
+class LLMPriority(IntEnum):
+    """Lower values are admitted first"""
+
+    INTERACTIVE = 0
+    BACKGROUND = 5
+    BATCH = 10
+
+
+_priority: ContextVar[LLMPriority] = ContextVar("llm_priority", default=LLMPriority.INTERACTIVE)
+
+
+def set_llm_priority(priority: LLMPriority) -> None:
+    """Priority of the LLM calls made from here on in the current context"""
+    _priority.set(priority)
+
+
+@contextmanager
+def llm_priority(priority: LLMPriority) -> Iterator[None]:
+    """Priority of the LLM calls made inside the block"""
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def estimate_tokens(text: str) -> int:
+    return max(1, len(text) // CHARS_PER_TOKEN)
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Rate limited, overloaded, server side or timed out calls"""
+    status = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    if status in (408, 409, 429, 529) or (isinstance(status, int) and status >= 500):
+        return True
+    name = type(error).__name__
+    return isinstance(error, asyncio.TimeoutError) or any(
+        marker in name for marker in ("RateLimit", "Overloaded", "Timeout", "APIConnection", "ServiceUnavailable")
+    )
+
+
+def retry_after(error: BaseException) -> Optional[float]:
+    """Delay asked for by the provider in a Retry-After header, if any"""
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    try:
+        return float(headers.get("retry-after")) if headers and headers.get("retry-after") else None
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """Refills per_minute units over a minute, holding at most a minute's worth"""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        if now > self.updated:
+            self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def delay(self, amount: float, now: float) -> float:
+        """Seconds until amount (at most the capacity) is available"""
+        self._refill(now)
+        missing = min(amount, self.capacity) - self.level
+        return max(0.0, missing / self.rate)
+
+    def take(self, amount: float, now: float) -> None:
+        """Consume amount, or give it back when negative, the level may drop below zero"""
+        self._refill(now)
+        self.level = min(self.capacity, self.level - amount)
+
+
+def _bucket(per_minute: int) -> Optional[TokenBucket]:
+    return TokenBucket(per_minute) if per_minute and per_minute > 0 else None
+
+
+@dataclass(order=True)
+class _Waiter:
+    priority: int
+    seq: int
+    tenant_id: str = field(compare=False)
+    tokens: int = field(compare=False)
+    future: asyncio.Future = field(compare=False)
+    enqueued_at: float = field(compare=False)
+    throttled: bool = field(default=False, compare=False)
+
+
+@dataclass
+class _SharedCall:
+    """A call run by the gateway for the identical in-flight requests awaiting it"""
+
+    task: asyncio.Task
+    callers: int = 0
+
+
+class _ProviderLimiter:
+    """Priority queue of the calls to one provider, admitted within its limits"""
+
+    def __init__(self, provider_key: str):
+        self.provider_key = provider_key
+        self.requests = _bucket(settings.LLM_GATEWAY_REQUESTS_PER_MINUTE)
+        self.tokens = _bucket(settings.LLM_GATEWAY_TOKENS_PER_MINUTE)
+        self.tenant_requests: Dict[str, Optional[TokenBucket]] = {}
+        self.tenant_tokens: Dict[str, Optional[TokenBucket]] = {}
+        self.waiters: List[_Waiter] = []
+        self.in_flight = 0
+        self.blocked_until = 0.0
+        self._changed: Optional[asyncio.Event] = None
+        self._pump: Optional[asyncio.Task] = None
+        self._seq = itertools.count()
+        # Statistics
+        self.calls = 0
+        self.throttled = 0
+        self.rate_limited = 0
+        self.retries = 0
+        self.failures = 0
+        self.deduplicated = 0
+        self.tokens_used = 0
+        self.wait_ms_total = 0.0
+        self.wait_ms_max = 0.0
+
+    def _tenant_buckets(self, tenant_id: str) -> Tuple[Optional[TokenBucket], Optional[TokenBucket]]:
+        if tenant_id not in self.tenant_requests:
+            self.tenant_requests[tenant_id] = _bucket(settings.LLM_GATEWAY_TENANT_REQUESTS_PER_MINUTE)
+            self.tenant_tokens[tenant_id] = _bucket(settings.LLM_GATEWAY_TENANT_TOKENS_PER_MINUTE)
+        return self.tenant_requests[tenant_id], self.tenant_tokens[tenant_id]
+
+    def _notify(self) -> None:
+        if self._changed is not None:
+            self._changed.set()
+
+    async def acquire(self, tokens: int, priority: LLMPriority) -> None:
+        """Wait until the call may be sent"""
+        loop = asyncio.get_running_loop()
+        waiter = _Waiter(
+            int(priority), next(self._seq), get_tenant_context(), tokens, loop.create_future(), time.monotonic()
+        )
+        heapq.heappush(self.waiters, waiter)
+        if self._changed is None:
+            self._changed = asyncio.Event()
+        if self._pump is None or self._pump.done():
+            self._pump = asyncio.create_task(self._admit_loop())
+        self._notify()
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # Admitted just before being cancelled
+                self.release(waiter.tenant_id, tokens, 0)
+            else:
+                waiter.future.cancel()
+            self._notify()
+            raise
+
+        wait_ms = (time.monotonic() - waiter.enqueued_at) * 1000
+        self.wait_ms_total += wait_ms
+        self.wait_ms_max = max(self.wait_ms_max, wait_ms)
+
+    def release(self, tenant_id: str, estimated_tokens: int, used_tokens: int) -> None:
+        """The call is done, correct the token buckets with its actual usage"""
+        self.in_flight -= 1
+        self.tokens_used += used_tokens
+        correction = used_tokens - estimated_tokens if used_tokens else 0
+        if correction:
+            now = time.monotonic()
+            for bucket in (self.tokens, self._tenant_buckets(tenant_id)[1]):
+                if bucket is not None:
+                    bucket.take(correction, now)
+        self._notify()
+
+    def hold_back(self, delay: float) -> None:
+        """Admit nothing for delay seconds, e.g. after a 429"""
+        self.blocked_until = max(self.blocked_until, time.monotonic() + delay)
+        self._notify()
+
+    def _delays(self, waiter: _Waiter, now: float) -> Tuple[float, float]:
+        """Seconds until the provider-wide and the tenant limits admit the waiter"""
+        provider_delay = max(self.blocked_until - now, 0.0)
+        if self.requests is not None:
+            provider_delay = max(provider_delay, self.requests.delay(1, now))
+        if self.tokens is not None:
+            provider_delay = max(provider_delay, self.tokens.delay(waiter.tokens, now))
+        tenant_requests, tenant_tokens = self._tenant_buckets(waiter.tenant_id)
+        tenant_delay = 0.0
+        if tenant_requests is not None:
+            tenant_delay = max(tenant_delay, tenant_requests.delay(1, now))
+        if tenant_tokens is not None:
+            tenant_delay = max(tenant_delay, tenant_tokens.delay(waiter.tokens, now))
+        return provider_delay, tenant_delay
+
+    def _admit(self, waiter: _Waiter, now: float) -> None:
+        tenant_requests, tenant_tokens = self._tenant_buckets(waiter.tenant_id)
+        for bucket, amount in (
+            (self.requests, 1), (self.tokens, waiter.tokens), (tenant_requests, 1), (tenant_tokens, waiter.tokens)
+        ):
+            if bucket is not None:
+                bucket.take(amount, now)
+        self.in_flight += 1
+        self.calls += 1
+        waiter.future.set_result(None)
+
+    async def _admit_loop(self) -> None:
+        while True:
+            self._changed.clear()
+            self.waiters = [waiter for waiter in self.waiters if not waiter.future.done()]
+            heapq.heapify(self.waiters)
+            if not self.waiters:
+                return
+
+            if self.in_flight >= settings.LLM_GATEWAY_MAX_CONCURRENCY:
+                await self._wait(None)
+                continue
+
+            now = time.monotonic()
+            sleep: Optional[float] = None
+            admitted = False
+            for waiter in sorted(self.waiters):
+                provider_delay, tenant_delay = self._delays(waiter, now)
+                delay = max(provider_delay, tenant_delay)
+                if delay <= 0:
+                    self.waiters.remove(waiter)
+                    self._admit(waiter, now)
+                    admitted = True
+                    break
+                if not waiter.throttled:
+                    waiter.throttled = True
+                    self.throttled += 1
+                sleep = delay if sleep is None else min(sleep, delay)
+                # Provider-wide limits are granted strictly by priority, only
+                # a tenant over its own limit lets the next waiter through
+                if provider_delay > 0:
+                    break
+            if not admitted:
+                await self._wait(sleep)
+
+    async def _wait(self, timeout: Optional[float]) -> None:
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queue_depth": sum(1 for waiter in self.waiters if not waiter.future.done()),
+            "in_flight": self.in_flight,
+            "calls": self.calls,
+            "deduplicated": self.deduplicated,
+            "throttled": self.throttled,
+            "rate_limited": self.rate_limited,
+            "retries": self.retries,
+            "failures": self.failures,
+            "tokens_used": self.tokens_used,
+            "queue_wait_ms_mean": self.wait_ms_total / self.calls if self.calls else 0.0,
+            "queue_wait_ms_max": self.wait_ms_max,
+            "held_back_seconds": max(0.0, self.blocked_until - time.monotonic()),
+        }
+
+
+class LLMGateway:
+    """Admission control, deduplication and retries of the LLM calls of this process"""
+
+    _instance: Optional["LLMGateway"] = None
+
+    def __init__(self):
+        self._limiters: Dict[str, _ProviderLimiter] = {}
+        self._in_flight: Dict[Hashable, _SharedCall] = {}
+
+    @classmethod
+    def get_instance(cls) -> "LLMGateway":
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    def limiter(self, provider_key: str) -> _ProviderLimiter:
+        limiter = self._limiters.get(provider_key)
+        if limiter is None:
+            limiter = self._limiters[provider_key] = _ProviderLimiter(provider_key)
+        return limiter
+
+    async def call(
+        self,
+        provider_key: str,
+        send: Callable[[], Awaitable[T]],
+        prompt_tokens: int,
+        usage: Callable[[T], int],
+        dedup_key: Optional[Hashable] = None,
+    ) -> T:
+        """
+        Send a call to the provider once admitted, retrying retryable failures.
+
+        Args:
+            provider_key: Provider the limits apply to
+            send: Makes the call, called again on every retry
+            prompt_tokens: Estimated tokens of the call, charged on admission
+            usage: Tokens actually used, read from the result
+            dedup_key: Identical in-flight calls (same key) share one call
+        """
+        limiter = self.limiter(provider_key)
+        if dedup_key is None:
+            return await self._call(limiter, send, prompt_tokens, usage)
+
+        key = (get_tenant_context(), provider_key, dedup_key)
+        shared = self._in_flight.get(key)
+        first = shared is None
+        if first:
+            # Run by the gateway rather than by the first caller, so that a
+            # caller going away only detaches it from the call
+            task = asyncio.create_task(self._call(limiter, send, prompt_tokens, usage))
+            shared = self._in_flight[key] = _SharedCall(task)
+            task.add_done_callback(lambda _: self._call_done(key, shared))
+        else:
+            limiter.deduplicated += 1
+        shared.callers += 1
+        try:
+            result = await asyncio.shield(shared.task)
+        finally:
+            shared.callers -= 1
+            if not shared.callers and not shared.task.done():
+                # Every caller went away, the next identical request starts over
+                self._forget(key, shared)
+                shared.task.cancel()
+        return result if first else copy.deepcopy(result)
+
+    async def open_stream(
+        self,
+        provider_key: str,
+        send: Callable[[], Awaitable[T]],
+        prompt_tokens: int,
+    ) -> Tuple[T, Callable[[int], None]]:
+        """
+        Admit a streamed call like call, send opening the stream (e.g. reading
+        its first chunk). The call keeps its slot until the returned function
+        is called with the tokens used, once the stream is over.
+        """
+        limiter = self.limiter(provider_key)
+        tenant_id = get_tenant_context()
+        result = await self._call(limiter, send, prompt_tokens, usage=lambda _: 0, hold=True)
+        return result, lambda used: limiter.release(tenant_id, prompt_tokens, used)
+
+    def _forget(self, key: Hashable, shared: _SharedCall) -> None:
+        if self._in_flight.get(key) is shared:
+            del self._in_flight[key]
+
+    def _call_done(self, key: Hashable, shared: _SharedCall) -> None:
+        self._forget(key, shared)
+        if not shared.task.cancelled():
+            # Retrieved here, so a failure nobody waited for is not logged as lost
+            shared.task.exception()
+
+    async def _call(
+        self,
+        limiter: _ProviderLimiter,
+        send: Callable[[], Awaitable[T]],
+        prompt_tokens: int,
+        usage: Callable[[T], int],
+        hold: bool = False,
+    ) -> T:
+        priority = _priority.get()
+        tenant_id = get_tenant_context()
+        for attempt in range(settings.LLM_GATEWAY_MAX_RETRIES + 1):
+            await limiter.acquire(prompt_tokens, priority)
+            used = 0
+            held = False
+            try:
+                result = await send()
+                # The caller releases the slot of a held call itself
+                held = hold
+                used = usage(result)
+                return result
+            except Exception as e:
+                if not is_retryable(e) or attempt == settings.LLM_GATEWAY_MAX_RETRIES:
+                    limiter.failures += 1
+                    raise
+                delay = self.backoff(attempt, retry_after(e))
+                if "RateLimit" in type(e).__name__ or getattr(e, "status_code", None) == 429:
+                    limiter.rate_limited += 1
+                    # Everyone waits, rather than each caller retrying on its own
+                    limiter.hold_back(delay)
+                limiter.retries += 1
+                logger.warning(
+                    f"LLM call to provider {limiter.provider_key} failed ({type(e).__name__}: {e}), "
+                    f"retrying in {delay:.1f}s"
+                )
+            finally:
+                if not held:
+                    limiter.release(tenant_id, prompt_tokens, used)
+            await asyncio.sleep(delay)
+        raise AssertionError("unreachable")
+
+    @staticmethod
+    def backoff(attempt: int, retry_after_seconds: Optional[float] = None) -> float:
+        """Full-jitter exponential backoff, at least what the provider asked for"""
+        delay = random.uniform(0, min(
+            settings.LLM_GATEWAY_BACKOFF_MAX_SECONDS,
+            settings.LLM_GATEWAY_BACKOFF_BASE_SECONDS * 2 ** attempt,
+        ))
+        return max(delay, retry_after_seconds or 0.0)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "providers": {key: limiter.stats() for key, limiter in self._limiters.items()},
+            "in_flight_shared": len(self._in_flight),
+        }
+
+
+def get_llm_gateway() -> LLMGateway:
+    """Get the LLM gateway of this process"""
+    return LLMGateway.get_instance()
@@ -0,0 +1,162 @@
+"""
+Chat model routing the calls of a LangChain chat model through the LLM gateway.
+"""
+
+import hashlib
+import logging
+from typing import Any, AsyncIterator, Iterator, List, Optional
+
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+from langchain_core.runnables import RunnableBinding
+
+from app.core.config.settings import settings
+from app.modules.workflow.llm.gateway import estimate_tokens, get_llm_gateway
+
+logger = logging.getLogger(__name__)
+
+
+def _message_text(message: BaseMessage) -> str:
+    return message.content if isinstance(message.content, str) else str(message.content)
+
+
+def _result_tokens(result: ChatResult) -> int:
+    tokens = 0
+    for generation in result.generations:
+        usage = getattr(generation.message, "usage_metadata", None)
+        if usage:
+            tokens += usage.get("total_tokens", 0)
+    return tokens
+
+
+class GatewayChatModel(BaseChatModel):
+    """
+    Wraps a chat model: generations and streams are admitted, deduplicated and
+    retried by the LLM gateway under the provider's key. Synchronous calls
+    (e.g. invoke from a thread) are sent directly.
+    """
+
+    inner: BaseChatModel
+    provider_key: str
+
+    @property
+    def _llm_type(self) -> str:
+        return f"gateway-{self.inner._llm_type}"
+
+    @property
+    def _identifying_params(self):
+        return {"provider_key": self.provider_key, **self.inner._identifying_params}
+
+    def __getattr__(self, name: str) -> Any:
+        # Model attributes (model_name, temperature...) of the wrapped model
+        try:
+            return super().__getattr__(name)
+        except AttributeError:
+            inner = self.__dict__.get("inner")
+            if inner is None:
+                raise
+            return getattr(inner, name)
+
+    def bind_tools(self, tools, **kwargs):
+        # Format the tools the wrapped model's way, but keep calls going through the gateway
+        binding = self.inner.bind_tools(tools, **kwargs)
+        return RunnableBinding(bound=self, kwargs=binding.kwargs, config=binding.config)
+
+    def _prompt_tokens(self, messages: List[BaseMessage]) -> int:
+        return estimate_tokens("".join(_message_text(message) for message in messages))
+
+    @staticmethod
+    def _dedup_key(messages: List[BaseMessage], stop: Optional[List[str]], kwargs: dict) -> str:
+        payload = repr((
+            [(message.type, message.content, message.additional_kwargs) for message in messages],
+            stop,
+            sorted(kwargs.items(), key=lambda item: item[0]),
+        ))
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        return self.inner._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        return self.inner._stream(messages, stop=stop, run_manager=run_manager, **kwargs)
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        async def send() -> ChatResult:
+            return await self.inner._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs)
+
+        return await get_llm_gateway().call(
+            self.provider_key,
+            send,
+            prompt_tokens=self._prompt_tokens(messages),
+            usage=_result_tokens,
+            dedup_key=self._dedup_key(messages, stop, kwargs) if settings.LLM_GATEWAY_DEDUPLICATE else None,
+        )
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        gateway = get_llm_gateway()
+        prompt_tokens = self._prompt_tokens(messages)
+        chunks = None
+
+        # Admission and retries cover the call up to its first chunk, a stream
+        # cannot be retried once the caller has seen part of it
+        async def first_chunk() -> ChatGenerationChunk:
+            nonlocal chunks
+            chunks = self.inner._astream(messages, stop=stop, run_manager=run_manager, **kwargs)
+            return await chunks.__anext__()
+
+        try:
+            first, done = await gateway.open_stream(self.provider_key, first_chunk, prompt_tokens)
+        except StopAsyncIteration:
+            return
+        # The call holds its slot until the stream is over, read or abandoned
+        text = ""
+        usage_tokens = 0
+        used = 0
+        chunk = first
+        try:
+            while True:
+                text += chunk.text
+                usage = getattr(chunk.message, "usage_metadata", None)
+                if usage:
+                    usage_tokens += usage.get("total_tokens", 0)
+                yield chunk
+                try:
+                    chunk = await chunks.__anext__()
+                except StopAsyncIteration:
+                    break
+            used = usage_tokens or prompt_tokens + estimate_tokens(text)
+        finally:
+            done(used)
+
+
+def with_gateway(model: BaseChatModel, provider_key: Any) -> BaseChatModel:
+    """The model, wrapped to go through the LLM gateway when LLM_GATEWAY_ENABLED"""
+    if not settings.LLM_GATEWAY_ENABLED or isinstance(model, GatewayChatModel):
+        return model
+    return GatewayChatModel(inner=model, provider_key=str(provider_key))
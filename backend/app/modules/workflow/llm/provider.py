@@ -9,6 +9,7 @@ from langchain_core.language_models import BaseChatModel
 
 from app.core.utils.encryption_utils import decrypt_key
 from app.core.utils.enums.open_ai_fine_tuning_enum import JobStatus
+from app.modules.workflow.llm.gateway_model import with_gateway
 from app.db.models.llm import LlmProvidersModel
 from app.services.llm_providers import LlmProviderService
 from app.schemas.dynamic_form_schemas import LLM_FORM_SCHEMAS_DICT
@@ -186,7 +187,7 @@ class LLMProvider:
                 # Initialize the model
                 llm = init_chat_model(**model_kwargs)
 
-                self.llm_instances[model_id] = llm
+                self.llm_instances[model_id] = with_gateway(llm, model_id)
                 logger.info(f"Created new LLM instance with ID: {model_id}")
             except Exception as e:
                 logger.error(f"Failed to initialize LLM instance: {str(e)}")
@@ -1,8 +1,12 @@
 """Registry for managing initialized agents"""
 
 import logging
-from typing import Union
+import time
+from typing import Any, AsyncIterator, Dict, Hashable, Union
 
+from app.cache.bounded_cache import BoundedCache
+from app.cache.redis_cache import on_invalidate
+from app.core.config.settings import settings
 from app.db.models import AgentModel
 from app.schemas.agent import AgentRead
 
@@ -34,26 +38,114 @@ class RegistryItem:
         from app.modules.workflow.engine.workflow_engine import WorkflowEngine
 
         self.workflow_engine = WorkflowEngine.get_instance()
+        self.workflow = None
 
         # Only build workflow if one exists
         if self.workflow_model is not None:
-            self.workflow_engine.build_workflow(self.workflow_model)
-            logger.info(f"Workflow model: {self.workflow_model}")
+            workflow_id = self.workflow_engine.build_workflow(self.workflow_model)
+            self.workflow = self.workflow_engine.get_workflow(workflow_id)
+            logger.debug(f"Workflow model: {self.workflow_model}")
         else:
             logger.warning(f"Agent {self.agent_name} ({self.agent_id}) has no workflow assigned")
 
-    async def execute(self, session_message: str, metadata: dict) -> dict:
-        """Execute a workflow"""
+    def _check_workflow(self) -> str:
+        """ID of this item's built workflow, raises when the agent has none"""
         if self.workflow_model is None:
             raise ValueError(
                 f"Cannot execute workflow for agent {self.agent_name} ({self.agent_id}): "
                 f"No workflow is assigned to this agent"
             )
+        return self.workflow_model["id"]
 
+    async def execute(self, session_message: str, metadata: dict) -> dict:
+        """Execute a workflow"""
+        workflow_id = self._check_workflow()
         thread_id = metadata.get("thread_id", None)
+        # Run this item's build, whatever the shared engine registers under the
+        # ID by now (another version, or nothing once the item was evicted)
         state = await self.workflow_engine.execute_from_node(
-            self.workflow_model["id"],
+            workflow_id,
             input_data={"message": session_message, **metadata},
             thread_id=thread_id,
+            workflow=self.workflow,
         )
-        return state.format_state_as_response()
\ No newline at end of file
+        return state.format_state_as_response()
+
+    async def stream(self, session_message: str, metadata: dict) -> AsyncIterator[Dict[str, Any]]:
+        """Execute a workflow, yielding its events and finally a "done" event with the response"""
+        workflow_id = self._check_workflow()
+        async for event in self.workflow_engine.stream_from_node(
+            workflow_id,
+            input_data={"message": session_message, **metadata},
+            thread_id=metadata.get("thread_id", None),
+            workflow=self.workflow,
+        ):
+            yield event
+
+    def release(self) -> None:
+        """
+        Remove the built workflow from the shared engine, unless it was rebuilt
+        since. Runs in flight keep going, they hold the workflow themselves.
+        """
+        if self.workflow is not None:
+            self.workflow_engine.remove_workflow(self.workflow_model["id"], self.workflow)
+
+
+# Built agents, by (agent id, workflow id, workflow updated_at) in the current tenant.
+# The version in the key makes other workers pick up saved workflows, invalidation
+# (on save, in this worker) frees the replaced entries right away.
+_compiled_agents: BoundedCache[RegistryItem] = BoundedCache(
+    "compiled_agents",
+    max_size=settings.COMPILED_AGENT_CACHE_SIZE,
+    max_size_per_tenant=settings.COMPILED_AGENT_CACHE_PER_TENANT,
+    on_evict=RegistryItem.release,
+)
+_build_stats: Dict[str, float] = {"builds": 0, "total_ms": 0.0, "max_ms": 0.0}
+
+
+def _agent_version(agent: Union[AgentModel, AgentRead]) -> Hashable:
+    if isinstance(agent, AgentRead):
+        workflow = agent.workflow or {}
+        return str(agent.id), str(workflow.get("id")), str(workflow.get("updated_at"))
+    workflow = agent.workflow
+    return (
+        str(agent.id),
+        str(workflow.id) if workflow else "None",
+        str(workflow.updated_at) if workflow else "None",
+    )
+
+
+def get_compiled_agent(agent: Union[AgentModel, AgentRead]) -> RegistryItem:
+    """RegistryItem of the agent with its workflow built, reused until the workflow changes"""
+    key = _agent_version(agent)
+    item = _compiled_agents.get(key)
+    if item is None:
+        start = time.perf_counter()
+        item = RegistryItem(agent)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        _build_stats["builds"] += 1
+        _build_stats["total_ms"] += elapsed_ms
+        _build_stats["max_ms"] = max(_build_stats["max_ms"], elapsed_ms)
+        logger.info(f"Built agent {item.agent_name} ({item.agent_id}) in {elapsed_ms:.1f} ms")
+        _compiled_agents.put(key, item)
+    return item
+
+
+def invalidate_compiled_agent(agent_id: Any) -> None:
+    """Drop the built versions of an agent in the current tenant"""
+    for key in _compiled_agents.keys():
+        if key[0] == str(agent_id):
+            _compiled_agents.pop(key)
+
+
+def get_compiled_agent_stats() -> Dict[str, Any]:
+    builds = _build_stats["builds"]
+    return {
+        **_compiled_agents.stats(),
+        "builds": builds,
+        "build_ms_mean": _build_stats["total_ms"] / builds if builds else 0.0,
+        "build_ms_max": _build_stats["max_ms"],
+    }
+
+
+on_invalidate("agents:get_by_id_full", invalidate_compiled_agent)
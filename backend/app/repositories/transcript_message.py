@@ -58,6 +58,20 @@ class TranscriptMessageRepository:
         return list(result.scalars().all())
 
 
+    async def get_latest_messages(
+            self,
+            conversation_id: UUID,
+            limit: int,
+            ) -> List[TranscriptMessageModel]:
+        """Get the last messages of a conversation, ordered by sequence"""
+        query = select(TranscriptMessageModel).where(
+                TranscriptMessageModel.conversation_id == conversation_id
+                ).order_by(TranscriptMessageModel.sequence_number.desc()).limit(limit)
+
+        result = await self.db.execute(query)
+        return list(reversed(result.scalars().all()))
+
+
     async def get_message_by_message_id(
             self,
             message_id: UUID,
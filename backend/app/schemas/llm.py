@@ -42,6 +42,7 @@ class LlmAnalystBase(BaseModel):
     llm_provider_id: UUID
     prompt: Optional[str]
     is_active: Optional[int]
+    cache_responses: Optional[int] = 1  # Reuse responses to identical prompts (LLM response cache)
 
     model_config = ConfigDict(
         from_attributes = True
@@ -68,4 +69,5 @@ class LlmAnalystUpdate(BaseModel):
     name: Optional[str] = None
     llm_provider_id: Optional[UUID] = None
     prompt: Optional[str] = None
-    is_active: Optional[int] = None
\ No newline at end of file
+    is_active: Optional[int] = None
+    cache_responses: Optional[int] = None
\ No newline at end of file
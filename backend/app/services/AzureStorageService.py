@@ -3,8 +3,9 @@
 ###############################################
 
 import os
-from typing import Optional, List
-from azure.storage.blob import BlobServiceClient, BlobClient, ContainerClient
+from typing import AsyncIterator, Dict, Optional, List, Tuple
+from azure.storage.blob import BlobProperties, BlobServiceClient, BlobClient, ContainerClient
+from azure.storage.blob.aio import BlobServiceClient as AsyncBlobServiceClient
 
 
 class AzureStorageService:
@@ -44,6 +45,8 @@ class AzureStorageService:
 
         # Initialize the service client
         self._service = BlobServiceClient.from_connection_string(self._conn_str)
+        # Async client for batch jobs, created on first use, see aclose()
+        self._async_service: Optional[AsyncBlobServiceClient] = None
 
     # ────────────────────────────────────────────────────────────────
     # Helper to get container
@@ -171,6 +174,71 @@ class AzureStorageService:
             print(f"XX - Error listing files: {e}")
             return []
 
+    # ────────────────────────────────────────────────────────────────
+    # 7. Async access, for batch jobs running on the event loop
+    def _get_async_container(self, container_name: Optional[str] = None):
+        name = container_name or self._container_name
+        if not name:
+            raise ValueError("No container name provided.")
+        if self._async_service is None:
+            self._async_service = AsyncBlobServiceClient.from_connection_string(self._conn_str)
+        return self._async_service.get_container_client(name)
+
+    async def list_blob_pages(
+        self,
+        prefix: Optional[str] = None,
+        page_size: int = 500,
+        continuation_token: Optional[str] = None,
+        include_metadata: bool = False,
+        container_name: Optional[str] = None,
+    ) -> AsyncIterator[Tuple[List[BlobProperties], Optional[str]]]:
+        """Yield the blobs page by page, with the token continuing after each page (None after the last)"""
+        container = self._get_async_container(container_name)
+        pages = container.list_blobs(
+            name_starts_with=prefix,
+            include=["metadata"] if include_metadata else None,
+            results_per_page=page_size,
+        ).by_page(continuation_token=continuation_token)
+        async for page in pages:
+            blobs = [blob async for blob in page]
+            yield blobs, pages.continuation_token
+
+    async def download_content_async(self, blob_name: str, container_name: Optional[str] = None) -> Optional[bytes]:
+        """Blob content, None when the blob does not exist"""
+        from azure.core.exceptions import ResourceNotFoundError
+
+        container = self._get_async_container(container_name)
+        try:
+            downloader = await container.download_blob(blob_name)
+        except ResourceNotFoundError:
+            return None
+        return await downloader.readall()
+
+    async def upload_content_async(
+        self,
+        blob_name: str,
+        content: bytes,
+        metadata: Optional[Dict[str, str]] = None,
+        container_name: Optional[str] = None,
+    ) -> None:
+        container = self._get_async_container(container_name)
+        await container.upload_blob(name=blob_name, data=content, metadata=metadata, overwrite=True)
+
+    async def delete_blob_async(self, blob_name: str, container_name: Optional[str] = None) -> None:
+        from azure.core.exceptions import ResourceNotFoundError
+
+        container = self._get_async_container(container_name)
+        try:
+            await container.delete_blob(blob_name)
+        except ResourceNotFoundError:
+            pass
+
+    async def aclose(self) -> None:
+        """Close the async client, its HTTP session is bound to the running event loop"""
+        if self._async_service is not None:
+            await self._async_service.close()
+            self._async_service = None
+
 #############################################
 ## Usage
 #############################################
@@ -1,13 +1,18 @@
+import asyncio
 import datetime
 import json
+import logging
 import shutil
 import uuid
+from contextvars import Context
 from pathlib import Path
+from typing import Optional
 from fastapi import UploadFile, Depends
 from fastapi_injector import Injected
 from injector import inject
 
 from app.core.config.settings import settings
+from app.core.tenant_scope import get_tenant_context, set_tenant_context
 from app.core.utils.enums.conversation_type_enum import ConversationType
 from app.db.models.llm import LlmAnalystModel
 from app.db.seed.seed_data_config import seed_test_data
@@ -26,11 +31,18 @@ from app.services.gpt_speaker_separator import SpeakerSeparator
 from app.services.llm_analysts import LlmAnalystService
 from app.services.operator_statistics import OperatorStatisticsService
 from app.services.operators import OperatorService
-from app.services.transcription import transcribe_audio_whisper
+from app.services.audio_chunking import merge_separated_windows, separation_windows, transcribe_recording
 from app.core.utils.bi_utils import allowed_file, calculate_duration_from_transcript, calculate_speaker_ratio_from_segments, extract_transcript_from_whisper_model
 from app.core.utils.transcript_utils import transcript_messages_to_json
 
 from app.services.GoogleTranscribeService import GoogleTranscribeService
+from app.modules.websockets.socket_connection_manager import SocketConnectionManager
+
+logger = logging.getLogger(__name__)
+
+# KPI analyses running after their recording's request returned, see _queue_kpi_analysis
+_background_analyses: set[asyncio.Task] = set()
+
 
 @inject
 class AudioService:
@@ -43,7 +55,8 @@ class AudioService:
                  speaker_separator_service: SpeakerSeparator,
                  gpt_kpi_analyzer_service: GptKpiAnalyzer,
                  gpt_question_answerer_service: QuestionAnswerer,
-                 llm_analyst_service: LlmAnalystService
+                 llm_analyst_service: LlmAnalystService,
+                 socket_connection_manager: SocketConnectionManager,
                  ):
         self.recording_repo = recording_repo
         self.conversation_service = conversation_service
@@ -54,6 +67,7 @@ class AudioService:
         self.gpt_question_answerer_service = gpt_question_answerer_service
         self.operator_service = operator_service
         self.llm_analyst_service = llm_analyst_service
+        self.socket_connection_manager = socket_connection_manager
 
     async def fetch_processed_recording(self, recording_id):
         return await self.recording_repo.find_by_id(recording_id)
@@ -99,14 +113,37 @@ class AudioService:
     async def fetch_and_calculate_metrics(self):
         return await self.recording_repo.get_metrics()
 
-    async def _separate_speakers_gpt(self, transcription_object, llm_analyst: LlmAnalystModel)-> list[dict]:
+    async def _separate_speakers_gpt(self, transcription_object, llm_analyst: LlmAnalystModel,
+                                     on_progress=None)-> list[dict]:
+        """Separate speakers on overlapping windows of the transcript, concurrently"""
         transcript_data = extract_transcript_from_whisper_model(transcription_object)
-        transcript_string = json.dumps(transcript_data)
-        return await self.speaker_separator_service.separate(transcript_string, llm_analyst)
+        windows = separation_windows(transcript_data, settings.AUDIO_SEPARATION_WINDOW_SEGMENTS,
+                                     settings.AUDIO_SEPARATION_OVERLAP_SEGMENTS)
+        semaphore = asyncio.Semaphore(settings.AUDIO_SEPARATION_CONCURRENCY)
+        done = 0
+
+        async def separate(window: list[dict]) -> list[dict]:
+            nonlocal done
+            async with semaphore:
+                separated = await self.speaker_separator_service.separate(json.dumps(window), llm_analyst)
+            done += 1
+            if on_progress:
+                await on_progress(done, len(windows))
+            return separated
+
+        outputs = await asyncio.gather(*(separate(window) for window, _ in windows))
+        return merge_separated_windows([(output, keep_from) for output, (_, keep_from) in zip(outputs, windows)])
 
     async def process_recording(
-            self, file: UploadFile, model: RecordingCreate
+            self, file: UploadFile, model: RecordingCreate, progress_id: Optional[uuid.UUID] = None
     ):
+        """
+        Transcribe, separate speakers and analyse a recording. Long recordings are
+        transcribed in concurrent chunks (see audio_chunking). The conversation is
+        saved as soon as its transcript is ready, and with AUDIO_KPI_ANALYSIS_BACKGROUND
+        the KPI analysis then runs in the background. Progress is broadcast to the
+        websocket room progress_id, topic "recording_progress".
+        """
         if not allowed_file(file.filename):
             raise AppException(error_key=ErrorKey.FILE_TYPE_NOT_ALLOWED, status_code=400)
 
@@ -116,9 +153,14 @@ class AudioService:
 
         model.original_filename=file.filename
         rec_path, saved_recording = await self._save_recording(file, model)
+        report_progress = self._progress_reporter(progress_id)
 
         # Transcribe audio
-        whisper_transcription_object = await transcribe_audio_whisper(rec_path, model.transcription_model_name)
+        async def on_transcribed(done: int, total: int):
+            await report_progress("transcribing", completed=done, total=total)
+
+        whisper_transcription_object = await transcribe_recording(
+                rec_path, model.transcription_model_name, on_progress=on_transcribed)
 
         # Separate speakers with GPT
         if not model.llm_analyst_speaker_separator_id:
@@ -126,8 +168,12 @@ class AudioService:
 
         llm_analyst_speaker_separator = await self.llm_analyst_service.get_by_id(model.llm_analyst_speaker_separator_id)
 
+        async def on_separated(done: int, total: int):
+            await report_progress("separating_speakers", completed=done, total=total)
+
         separated_speakers: list[dict] = await self._separate_speakers_gpt(whisper_transcription_object,
-                                                                           llm_analyst=llm_analyst_speaker_separator)
+                                                                           llm_analyst=llm_analyst_speaker_separator,
+                                                                           on_progress=on_separated)
 
         transcript_segments: list[TranscriptSegmentInput] = [TranscriptSegmentInput(**item) for item in separated_speakers]
 
@@ -155,25 +201,86 @@ class AudioService:
         saved_conversation = await self.conversation_service.save_conversation(conversation_data)
         await self.conversation_service.save_new_messages(saved_conversation.id,
                                                           transcript_segments, next_sequence=0)
+        await report_progress("transcript_saved", conversation_id=str(saved_conversation.id))
 
         # Run Kpi analysis with GPT
         if not model.llm_analyst_kpi_analyzer_id:
             model.llm_analyst_kpi_analyzer_id = seed_test_data.llm_analyst_kpi_analyzer_id
 
-        llm_analyst_kpi_analyzer = await self.llm_analyst_service.get_by_id(model.llm_analyst_kpi_analyzer_id)
+        # Celery tasks return before anything left running on their loop finishes
+        if settings.AUDIO_KPI_ANALYSIS_BACKGROUND and not settings.BACKGROUND_TASK:
+            self._queue_kpi_analysis(saved_conversation.id, separated_speakers_str, model.llm_analyst_kpi_analyzer_id,
+                                     model.operator_id, duration, progress_id)
+            return {"conversation_id": saved_conversation.id, "status": "analysis_queued"}
+
+        return await self._analyze_recording_conversation(saved_conversation.id, separated_speakers_str,
+                                                          model.llm_analyst_kpi_analyzer_id, model.operator_id,
+                                                          duration, progress_id)
+
+    async def _analyze_recording_conversation(self, conversation_id, separated_speakers_str: str,
+                                              llm_analyst_kpi_analyzer_id, operator_id, duration,
+                                              progress_id: Optional[uuid.UUID] = None):
+        report_progress = self._progress_reporter(progress_id)
+        await report_progress("analyzing", conversation_id=str(conversation_id))
+
+        llm_analyst_kpi_analyzer = await self.llm_analyst_service.get_by_id(llm_analyst_kpi_analyzer_id)
 
         gpt_analysis = await self.gpt_kpi_analyzer_service.analyze_transcript(separated_speakers_str, llm_analyst=llm_analyst_kpi_analyzer)
 
         saved_conversation_analysis = await self.conversation_analysis_service.create_conversation_analysis(
-                gpt_analysis, model.llm_analyst_kpi_analyzer_id,
-                                                                         saved_conversation.id)
+                gpt_analysis, llm_analyst_kpi_analyzer_id,
+                                                                         conversation_id)
 
         await self.operator_statistics_service.update_from_analysis(
                 saved_conversation_analysis,
-                model.operator_id, duration)
+                operator_id, duration)
 
+        await report_progress("completed", conversation_id=str(conversation_id))
         return saved_conversation_analysis
 
+    def _queue_kpi_analysis(self, conversation_id, separated_speakers_str: str, llm_analyst_kpi_analyzer_id,
+                            operator_id, duration, progress_id: Optional[uuid.UUID]):
+        tenant_id = get_tenant_context()
+
+        async def analyze():
+            from fastapi_injector import RequestScopeFactory
+            from app.dependencies.injector import injector
+
+            try:
+                # The request's scope and session are gone by now
+                async with injector.get(RequestScopeFactory).create_scope():
+                    set_tenant_context(tenant_id)
+                    await injector.get(AudioService)._analyze_recording_conversation(
+                            conversation_id, separated_speakers_str, llm_analyst_kpi_analyzer_id,
+                            operator_id, duration, progress_id)
+            except Exception as e:
+                logger.error(f"KPI analysis of recording conversation {conversation_id} failed: {e}")
+                await self._progress_reporter(progress_id)("failed", conversation_id=str(conversation_id))
+
+        task = Context().run(asyncio.create_task, analyze())
+        _background_analyses.add(task)
+        task.add_done_callback(_background_analyses.discard)
+
+    def _progress_reporter(self, progress_id: Optional[uuid.UUID]):
+        tenant_id = get_tenant_context()
+
+        async def report(stage: str, **payload):
+            if progress_id is None:
+                return
+            try:
+                await self.socket_connection_manager.broadcast(
+                        room_id=progress_id,
+                        msg_type="recording_progress",
+                        current_user_id=None,
+                        payload={"stage": stage, **payload},
+                        required_topic="recording_progress",
+                        tenant_id=tenant_id,
+                        )
+            except Exception as e:
+                logger.warning(f"Failed to report recording progress {stage}: {e}")
+
+        return report
+
 
     async def _save_recording(self, file, recording_create):
         # Save the file and get its path
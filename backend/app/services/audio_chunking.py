@@ -0,0 +1,212 @@
+"""
+Chunked transcription of long recordings.
+
+Recordings longer than AUDIO_CHUNK_SECONDS are cut into chunks at silences
+(or at speaker turns, with AUDIO_DIARIZATION_BOUNDARIES), the chunks are
+transcribed concurrently by the Whisper service and their transcriptions are
+stitched back together, shifting the timestamps by each chunk's offset.
+Speaker separation then runs on overlapping windows of the transcript.
+"""
+
+import asyncio
+import io
+import logging
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from starlette.datastructures import UploadFile
+
+from app.core.config.settings import settings
+from app.services.transcription import transcribe_audio_whisper
+
+logger = logging.getLogger(__name__)
+
+# Audio sent to Whisper for each chunk, what it resamples to anyway
+CHUNK_FRAME_RATE = 16000
+
+# Called with the chunks (or windows) done so far and their total
+ProgressCallback = Callable[[int, int], Awaitable[None]]
+
+
+def merge_ranges(ranges: List[Tuple[float, float]]) -> List[Tuple[float, float]]:
+    """Sorted, non-overlapping ranges, e.g. of overlapping speaker turns"""
+    merged: List[Tuple[float, float]] = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def plan_chunks(
+    speech_ranges: List[Tuple[float, float]], duration: float, max_chunk_seconds: float
+) -> List[Tuple[float, float]]:
+    """
+    Cut the speech in [0, duration] into chunks of at most max_chunk_seconds,
+    in the middle of the silences between speech ranges. Speech longer than a
+    chunk without any silence is cut where the chunk is full. Chunks keep at
+    most half a chunk of silence around their speech, so long silences and a
+    silent tail are left out rather than sent to Whisper on their own.
+    """
+    if not speech_ranges:
+        # Nothing detected, transcribe everything rather than nothing
+        speech_ranges = [(0.0, duration)]
+    padding = max_chunk_seconds / 2
+    chunks: List[Tuple[float, float]] = []
+    chunk_start = max(0.0, speech_ranges[0][0] - padding)
+    previous_end: Optional[float] = None
+    for start, end in speech_ranges:
+        if previous_end is not None and end - chunk_start > max_chunk_seconds:
+            margin = min((start - previous_end) / 2, padding, chunk_start + max_chunk_seconds - previous_end)
+            chunks.append((chunk_start, previous_end + margin))
+            chunk_start = start - margin
+        while end - chunk_start > max_chunk_seconds:
+            chunks.append((chunk_start, chunk_start + max_chunk_seconds))
+            chunk_start += max_chunk_seconds
+        previous_end = end
+
+    tail = min(padding, chunk_start + max_chunk_seconds - previous_end)
+    chunks.append((chunk_start, min(duration, previous_end + tail)))
+    return [(start, end) for start, end in chunks if end > start]
+
+
+def stitch_transcriptions(parts: List[Tuple[float, Dict]]) -> Dict:
+    """Join Whisper results of consecutive chunks, given with the chunk's offset in seconds"""
+    segments: List[Dict] = []
+    texts: List[str] = []
+    for offset, result in parts:
+        for segment in result.get("segments") or []:
+            shifted = {
+                **segment,
+                "id": len(segments),
+                "start": segment["start"] + offset,
+                "end": segment["end"] + offset,
+            }
+            if segment.get("words"):
+                shifted["words"] = [
+                    {**word, "start": word["start"] + offset, "end": word["end"] + offset}
+                    for word in segment["words"]
+                ]
+            segments.append(shifted)
+        if (result.get("text") or "").strip():
+            texts.append(result["text"].strip())
+
+    return {
+        "text": " ".join(texts),
+        "segments": segments,
+        "language": parts[0][1].get("language") if parts else None,
+    }
+
+
+def separation_windows(
+    transcript: List[Dict], window_size: int, overlap: int
+) -> List[Tuple[List[Dict], Optional[float]]]:
+    """
+    Split transcript segments into windows of at most window_size segments,
+    each starting with the last overlap segments of the previous window as
+    context. Returned with the start_time from which the window's output is
+    kept (None for the first), so overlapping segments are kept only once.
+    """
+    overlap = min(overlap, window_size - 1)
+    step = window_size - overlap
+    if not transcript:
+        return [([], None)]
+
+    windows = []
+    for index in range(0, len(transcript), step):
+        window = transcript[max(0, index - overlap):index + step]
+        windows.append((window, transcript[index]["start_time"] if index else None))
+    return windows
+
+
+def merge_separated_windows(outputs: List[Tuple[List[Dict], Optional[float]]]) -> List[Dict]:
+    """Concatenate the separated windows, dropping each window's repeated context"""
+    merged: List[Dict] = []
+    for items, keep_from in outputs:
+        for item in items:
+            if keep_from is None or float(item.get("start_time", 0)) >= keep_from - 1e-3:
+                merged.append(item)
+    return merged
+
+
+def _split_audio(file_path: str) -> List[Tuple[float, bytes]]:
+    """Chunks of a long recording as (offset, WAV bytes), blocking"""
+    from pydub import AudioSegment, silence
+
+    from app.services.audio_processing import slice_audio
+
+    audio = AudioSegment.from_file(file_path).set_channels(1).set_frame_rate(CHUNK_FRAME_RATE)
+    duration = len(audio) / 1000
+
+    if settings.AUDIO_DIARIZATION_BOUNDARIES:
+        from app.services.ml_diarization import diarize_audio
+
+        speech_ranges = merge_ranges([(turn["start"], turn["end"]) for turn in diarize_audio(file_path)])
+    else:
+        speech_ranges = [
+            (start / 1000, end / 1000)
+            for start, end in silence.detect_nonsilent(
+                audio,
+                min_silence_len=settings.AUDIO_MIN_SILENCE_MS,
+                silence_thresh=audio.dBFS - settings.AUDIO_SILENCE_THRESH_OFFSET_DB,
+                seek_step=10,
+            )
+        ]
+
+    chunks = plan_chunks(speech_ranges, duration, settings.AUDIO_CHUNK_SECONDS)
+    # One "speaker" per chunk, so slice_audio returns each chunk on its own
+    sliced = slice_audio(
+        audio, [{"speaker": index, "start": start, "end": end} for index, (start, end) in enumerate(chunks)]
+    )
+
+    exported = []
+    for index, (start, _) in enumerate(chunks):
+        buffer = io.BytesIO()
+        sliced[index][0].export(buffer, format="wav")
+        exported.append((start, buffer.getvalue()))
+    return exported
+
+
+def _recording_duration(file_path: str) -> Optional[float]:
+    """Duration read from the container by ffprobe, without decoding the audio"""
+    from pydub.utils import mediainfo
+
+    try:
+        return float(mediainfo(file_path)["duration"])
+    except Exception as e:
+        logger.warning(f"Could not read the duration of {file_path}: {e}")
+        return None
+
+
+async def transcribe_recording(
+    file_path: str,
+    whisper_model: Optional[str] = None,
+    on_progress: Optional[ProgressCallback] = None,
+) -> Dict:
+    """Whisper transcription of a recording, in concurrent chunks when it is long"""
+    duration = await asyncio.to_thread(_recording_duration, file_path)
+    if duration is not None and duration <= settings.AUDIO_CHUNK_SECONDS:
+        result = await transcribe_audio_whisper(file_path, whisper_model)
+        if on_progress:
+            await on_progress(1, 1)
+        return result
+
+    chunks = await asyncio.to_thread(_split_audio, file_path)
+    logger.info(f"Transcribing {file_path} in {len(chunks)} chunk(s)")
+    semaphore = asyncio.Semaphore(settings.AUDIO_TRANSCRIBE_CONCURRENCY)
+    done = 0
+
+    async def transcribe_chunk(index: int, content: bytes) -> Dict:
+        nonlocal done
+        async with semaphore:
+            upload = UploadFile(file=io.BytesIO(content), filename=f"chunk_{index}.wav")
+            result = await transcribe_audio_whisper(upload, whisper_model)
+        done += 1
+        if on_progress:
+            await on_progress(done, len(chunks))
+        return result
+
+    results = await asyncio.gather(
+        *(transcribe_chunk(index, content) for index, (_, content) in enumerate(chunks))
+    )
+    return stitch_transcriptions([(offset, result) for (offset, _), result in zip(chunks, results)])
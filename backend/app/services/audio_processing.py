@@ -1,7 +1,8 @@
 from pydub import AudioSegment
 
 def slice_audio(file_path, speaker_segments):
-    audio = AudioSegment.from_file(file_path)
+    # Also takes already loaded audio
+    audio = file_path if isinstance(file_path, AudioSegment) else AudioSegment.from_file(file_path)
     chunks = {}
 
     for segment in speaker_segments:
@@ -7,7 +7,10 @@ from typing import Dict, List, Optional, Tuple
 from fastapi import Depends
 from fastapi_injector import Injected
 from injector import inject
+from sqlalchemy.orm.attributes import set_committed_value
 from app.auth.utils import get_current_operator_id, get_current_user_id, is_current_user_supervisor_or_admin
+from app.cache.conversation_state import ConversationStateCache
+from app.core.config.settings import settings
 from app.core.exceptions.error_messages import ErrorKey
 from app.core.exceptions.exception_classes import AppException
 from app.core.utils.bi_utils import calculate_duration_from_transcript, calculate_incremental_word_counts, \
@@ -16,7 +19,8 @@ from app.core.utils.enums.conversation_status_enum import ConversationStatus
 from app.core.utils.enums.conversation_type_enum import ConversationType
 from app.core.utils.enums.message_feedback_enum import Feedback
 from app.core.utils.enums.transcript_message_type import TranscriptMessageType
-from app.core.utils.transcript_utils import schema_to_transcript_message, transcript_messages_to_json
+from app.core.utils.transcript_utils import schema_to_transcript_message, transcript_messages_to_json, \
+    transcript_messages_to_segments
 from app.db.models.conversation import ConversationAnalysisModel, ConversationModel
 from app.db.models.message_model import TranscriptMessageModel
 from app.db.seed.seed_data_config import seed_test_data
@@ -30,6 +34,7 @@ from app.schemas.conversation_transcript import (ConversationTranscriptCreate, I
 from app.schemas.filter import ConversationFilter
 from app.services.conversation_analysis import ConversationAnalysisService
 from app.services.gpt_kpi_analyzer import GptKpiAnalyzer
+from app.services.in_progress_analysis import InProgressAnalysisScheduler
 from app.services.llm_analysts import LlmAnalystService
 from app.services.operator_statistics import OperatorStatisticsService
 from app.services.zendesk import ZendeskClient
@@ -37,6 +42,9 @@ from app.services.zendesk import ZendeskClient
 
 logger = logging.getLogger(__name__)
 
+# Fields of the transcript sent for in-progress tone analysis
+IN_PROGRESS_TONE_EXCLUDE_FIELDS = {'feedback', 'type', 'sequence_number'}
+
 
 @inject
 class ConversationService:
@@ -45,13 +53,17 @@ class ConversationService:
                  conversation_repo: ConversationRepository, transcript_message_repo: TranscriptMessageRepository,
                  gpt_kpi_analyzer_service: GptKpiAnalyzer = Depends(),
                  conversation_analysis_service: ConversationAnalysisService = Depends(),
-                 llm_analyst_service: LlmAnalystService = Injected(LlmAnalystService)):
+                 llm_analyst_service: LlmAnalystService = Injected(LlmAnalystService),
+                 conversation_state: ConversationStateCache = Injected(ConversationStateCache),
+                 analysis_scheduler: InProgressAnalysisScheduler = Injected(InProgressAnalysisScheduler)):
         self.conversation_repo = conversation_repo
         self.gpt_kpi_analyzer_service = gpt_kpi_analyzer_service
         self.conversation_analysis_service = conversation_analysis_service
         self.operator_statistics_service = operator_statistics_service
         self.llm_analyst_service = llm_analyst_service
         self.transcript_message_repo = transcript_message_repo
+        self.conversation_state = conversation_state
+        self.analysis_scheduler = analysis_scheduler
 
     async def save_conversation(self, conversation: ConversationCreate):
         return await self.conversation_repo.save_conversation(conversation)
@@ -122,6 +134,13 @@ class ConversationService:
     ) -> ConversationModel:
         """
         Appends new transcript segments to an existing conversation
+
+        Works on the cached incremental state of the conversation (sequence counter and
+        a rolling window of recent messages), so the cost per update does not grow with
+        the conversation. The returned conversation carries only the appended messages.
+
+        The tone analysis is scheduled in the background (debounced per conversation)
+        unless IN_PROGRESS_ANALYSIS_BACKGROUND is off, then it runs before returning.
         """
         conversation = await self.conversation_repo.fetch_conversation_by_id(conversation_id)
         if not conversation:
@@ -131,8 +150,12 @@ class ConversationService:
         if conversation.status == ConversationStatus.FINALIZED.value:
             raise AppException(ErrorKey.CONVERSATION_FINALIZED)
 
-        # Get only the count for sequence numbering
-        next_sequence = await self.transcript_message_repo.get_message_count(conversation_id)
+        # Reserve sequence numbers from the running counter
+        next_sequence = await self.conversation_state.reserve_sequence(
+            conversation_id,
+            len(in_progress_conv_update.messages),
+            lambda: self.transcript_message_repo.get_message_count(conversation_id),
+        )
 
         # Save new messages
         new_messages = await self.save_new_messages(
@@ -172,32 +195,78 @@ class ConversationService:
             new_segment_inputs)
         conversation.duration = conversation.duration + incremental_duration
 
-        # Get all messages for transcript JSON (if needed for tone analysis)
-        all_messages = await self.transcript_message_repo.get_messages_by_conversation_id(
+        # Rolling window of the most recent messages for tone analysis
+        window = await self.conversation_state.append_window(
             conversation_id,
-        )
-        transcript_json = transcript_messages_to_json(
-            all_messages,
-            exclude_fields={'feedback', 'type', 'sequence_number'}
+            self._serialize_tone_segments(new_messages),
+            self._load_tone_window(conversation_id),
         )
 
         # Update conversation
         conversation.updated_by = get_current_user_id()
         conversation = await self.conversation_repo.update_conversation(conversation)
 
-        # Perform partial tone check
+        if settings.IN_PROGRESS_ANALYSIS_BACKGROUND:
+            self.analysis_scheduler.schedule(
+                conversation_id,
+                in_progress_conv_update.llm_analyst_id,
+                new_messages=len(new_messages),
+                user_id=conversation.updated_by,
+            )
+        else:
+            # Earlier messages are only represented by the previous score
+            truncated = next_sequence + len(new_messages) > len(window)
+            conversation = await self._analyze_in_progress_tone_and_mark(
+                conversation,
+                "[" + ", ".join(window) + "]",
+                llm_analyst_id=in_progress_conv_update.llm_analyst_id,
+                previous_score=conversation.in_progress_hostility_score if truncated else None,
+            )
+
+        null_unloaded_attributes(new_messages)
+        set_committed_value(conversation, "messages", new_messages)
+        null_unloaded_attributes(conversation)
+        return conversation
+
+    async def analyze_in_progress_tone(
+            self,
+            conversation_id: UUID,
+            llm_analyst_id: Optional[UUID] = None,
+    ) -> Optional[ConversationModel]:
+        """
+        Run the tone analysis of an in-progress conversation over its recent messages.
+        Returns None if the conversation is gone or finalized meanwhile.
+        """
+        conversation = await self.conversation_repo.fetch_conversation_by_id(conversation_id)
+        if not conversation or conversation.status == ConversationStatus.FINALIZED.value:
+            return None
+
+        window = await self.conversation_state.get_window(conversation_id, self._load_tone_window(conversation_id))
+        # A full window may not hold the whole conversation
+        truncated = len(window) >= self.conversation_state.window_size
         conversation = await self._analyze_in_progress_tone_and_mark(
             conversation,
-            transcript_json,
-            llm_analyst_id=in_progress_conv_update.llm_analyst_id
+            "[" + ", ".join(window) + "]",
+            llm_analyst_id=llm_analyst_id,
+            previous_score=conversation.in_progress_hostility_score if truncated else None,
         )
+        null_unloaded_attributes(conversation)
+        return conversation
 
-        full_conversation = await self.conversation_repo.fetch_conversation_by_id(
-            conversation.id,
-            include_messages=True
-        )
-        null_unloaded_attributes(full_conversation)
-        return full_conversation
+    @staticmethod
+    def _serialize_tone_segments(messages: list[TranscriptMessageModel]) -> list[str]:
+        """Messages as the JSON segments of the tone analysis transcript, one string each"""
+        return [
+            json.dumps(segment, ensure_ascii=False)
+            for segment in transcript_messages_to_segments(messages, exclude_fields=IN_PROGRESS_TONE_EXCLUDE_FIELDS)
+        ]
+
+    def _load_tone_window(self, conversation_id: UUID):
+        async def load(size: int) -> list[str]:
+            messages = await self.transcript_message_repo.get_latest_messages(conversation_id, size)
+            return self._serialize_tone_segments(messages)
+
+        return load
 
     async def save_new_messages(
             self,
@@ -241,6 +310,7 @@ class ConversationService:
         # Mark as finalized
         conversation.status = ConversationStatus.FINALIZED.value
         saved_conversation = await self.conversation_repo.update_conversation(conversation)
+        await self.conversation_state.clear(conversation_id)
 
         # Get messages for analysis
         messages = await self.transcript_message_repo.get_messages_by_type(
@@ -351,6 +421,7 @@ class ConversationService:
             conversation: ConversationModel,
             transcript: str,
             llm_analyst_id: Optional[UUID] = None,
+            previous_score: Optional[int] = None,
     ) -> ConversationModel:
 
         #  Run GPT analysis
@@ -360,7 +431,8 @@ class ConversationService:
         llm_analyst = await self.llm_analyst_service.get_by_id(llm_analyst_id, throw_not_found=False)
 
         if llm_analyst:
-            analysis_result = await self.gpt_kpi_analyzer_service.partial_hostility_analysis(transcript, llm_analyst=llm_analyst)
+            analysis_result = await self.gpt_kpi_analyzer_service.partial_hostility_analysis(
+                transcript, llm_analyst=llm_analyst, previous_score=previous_score)
         else:
             #TODO remove after fixing seed
             # Temporary solution to avoid seed missing llm_analyst
@@ -391,9 +463,18 @@ class ConversationService:
         )]
         transcript_update = InProgConvTranscrUpdate(messages=segments)
 
-        # Get only the count for sequence numbering
-        next_sequence = await self.transcript_message_repo.get_message_count(conversation_id)
-        await self.save_new_messages(conversation_id, transcript_update.messages, next_sequence)
+        # Number and cache the takeover message like any other update
+        next_sequence = await self.conversation_state.reserve_sequence(
+            conversation_id,
+            len(transcript_update.messages),
+            lambda: self.transcript_message_repo.get_message_count(conversation_id),
+        )
+        new_messages = await self.save_new_messages(conversation_id, transcript_update.messages, next_sequence)
+        await self.conversation_state.append_window(
+            conversation_id,
+            self._serialize_tone_segments(new_messages),
+            self._load_tone_window(conversation_id),
+        )
         conversation.supervisor_id = get_current_user_id()
         conversation.status = ConversationStatus.TAKE_OVER.value
         conversation = await self.conversation_repo.update_conversation(conversation)
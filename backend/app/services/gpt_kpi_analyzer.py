@@ -1,16 +1,17 @@
 import json
 import logging
-from typing import List
-import asyncio
+from typing import List, Optional
 
 from langchain_core.messages import HumanMessage, SystemMessage
 
+from app.cache.llm_response_cache import analyst_cache_key, get_llm_response_cache
 from app.core.utils.enums.conversation_topic_enum import ConversationTopic
 from app.core.utils.enums.negative_conversation_reason import NegativeConversationReason
 from app.schemas.conversation_analysis import AnalysisResult
 from app.schemas.conversation_transcript import TranscriptSegment
 from app.schemas.llm import LlmAnalyst
 from app.core.utils.bi_utils import clean_gpt_json_response
+from app.modules.workflow.llm.gateway import LLMPriority, llm_priority
 from app.services.llm_model_factory import LlmModelFactory
 
 
@@ -47,14 +48,15 @@ class GptKpiAnalyzer:
                     user_prompt = self._create_user_prompt(transcript, error_hint=last_error_msg,
                                                            attempt=attempt)
 
-                system_msg = SystemMessage(content=llm_analyst.prompt)
-                user_msg = HumanMessage(content=user_prompt)
-
-                response = await asyncio.to_thread(
-                    self.llm.invoke,
-                    [system_msg, user_msg]
-                )
-                response_text = response.content.strip()
+                messages = [SystemMessage(content=llm_analyst.prompt), HumanMessage(content=user_prompt)]
+                cache_key = analyst_cache_key(llm_analyst, messages)
+                response_text = await get_llm_response_cache().lookup(cache_key)
+                cached = response_text is not None
+                if not cached:
+                    # Post-conversation analysis, admitted after live chats
+                    with llm_priority(LLMPriority.BATCH):
+                        response = await self.llm.ainvoke(messages)
+                    response_text = response.content.strip()
                 last_response = response_text
 
                 summary_data = self._extract_summary_and_title(response_text)
@@ -64,6 +66,8 @@ class GptKpiAnalyzer:
                 metrics = self._extract_metrics(response_text)
 
                 if summary and title and customer_speaker and isinstance(metrics, dict) and metrics:
+                    if not cached:
+                        await get_llm_response_cache().store(cache_key, response_text)
                     return AnalysisResult(
                             summary=summary,
                             title=title,
@@ -146,10 +150,19 @@ class GptKpiAnalyzer:
         self,
         transcript_segments: str,
         llm_analyst: LlmAnalyst,
+        previous_score: Optional[int] = None,
     ) -> dict:
 
         self.llm = LlmModelFactory.switch_model(llm_analyst)
 
+        # The transcript may be only the most recent window of a long conversation
+        earlier_context = ""
+        if previous_score is not None:
+            earlier_context = (
+                f"The transcript below contains only the latest messages. The earlier part of the "
+                f"conversation was scored {previous_score}; let it weigh in when hostility was sustained.\n\n        "
+            )
+
         # Create a short prompt for hostility detection
         # We'll ask for a JSON response with "sentiment" and "hostile_score"
         system_msg = SystemMessage(
@@ -205,16 +218,19 @@ class GptKpiAnalyzer:
             "negative_reason": "Bad Communication"
         }}
 
-        Transcript:
+        {earlier_context}Transcript:
         {transcript_segments}
         """
         logger.debug(f"User prompt for hostility:{user_prompt}")
         user_msg = HumanMessage(content=user_prompt)
+        cache_key = analyst_cache_key(llm_analyst, [system_msg, user_msg])
 
         try:
-            # Call the LLM synchronously in a background thread
-            response = await asyncio.to_thread(self.llm.invoke, [system_msg, user_msg])
-            response_text = response.content.strip()
+            response_text = await get_llm_response_cache().lookup(cache_key)
+            cached = response_text is not None
+            if not cached:
+                response = await self.llm.ainvoke([system_msg, user_msg])
+                response_text = response.content.strip()
 
             # Remove json ticks
             response_text = clean_gpt_json_response(response_text)
@@ -230,6 +246,8 @@ class GptKpiAnalyzer:
                 and "negative_reason" in analysis_data
                 and isinstance(analysis_data["hostile_score"], int)
             ):
+                if not cached:
+                    await get_llm_response_cache().store(cache_key, response_text)
                 return analysis_data
 
             # If the JSON doesn't match the expected structure
@@ -2,6 +2,7 @@ import logging
 
 from langchain_core.messages import HumanMessage, SystemMessage
 from langchain_openai import ChatOpenAI
+from app.cache.llm_response_cache import LlmCacheKey, get_llm_response_cache, model_namespace, prompt_text
 from app.core.exceptions.error_messages import ErrorKey
 from app.core.exceptions.exception_classes import AppException
 from app.core.config.settings import settings
@@ -49,12 +50,19 @@ class QuestionAnswerer:
         Answer:
         """
 
+        messages = [SystemMessage(content="You are a helpful assistant."), HumanMessage(content=prompt)]
+        cache_key = None
+        if settings.LLM_RESPONSE_CACHE_ENABLED:
+            cache_key = LlmCacheKey(model_namespace("openai", self.llm_model), prompt_text(messages), self.temperature)
+        cached = get_llm_response_cache().lookup_sync(cache_key)
+        if cached is not None:
+            return cached
+
         try:
-            response = self.llm.invoke([
-                SystemMessage(content="You are a helpful assistant."),
-                HumanMessage(content=prompt)
-            ])
-            return response.content.strip()
+            response = self.llm.invoke(messages)
+            answer = response.content.strip()
+            get_llm_response_cache().store_sync(cache_key, answer)
+            return answer
         except Exception as e:
             logger.error(f"Error while calling ChatGPT for question answering: {e}")
             raise AppException(error_key=ErrorKey.GPT_TRANSCRIPT_QUESTION_ERROR)
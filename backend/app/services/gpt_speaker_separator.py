@@ -1,13 +1,14 @@
 import json
 import logging
-import asyncio
 
 from langchain_core.messages import HumanMessage, SystemMessage
 
+from app.cache.llm_response_cache import analyst_cache_key, get_llm_response_cache
 from app.core.exceptions.error_messages import ErrorKey
 from app.core.exceptions.exception_classes import AppException
 from app.schemas.llm import LlmAnalyst
 from app.core.utils.bi_utils import clean_gpt_json_response
+from app.modules.workflow.llm.gateway import LLMPriority, llm_priority
 from app.services.llm_model_factory import LlmModelFactory
 
 
@@ -51,15 +52,21 @@ class SpeakerSeparator:
         for attempt in range(1, max_retries + 1):
             user_prompt = self._build_user_prompt(transcribed_text, attempt=attempt, error_hint=last_error_msg)
 
+            messages = [SystemMessage(content=llm_analyst.prompt), HumanMessage(content=user_prompt)]
+            cache_key = analyst_cache_key(llm_analyst, messages)
+
             try:
-                response = await asyncio.to_thread(
-                    self.llm.invoke,
-                    [SystemMessage(content=llm_analyst.prompt), HumanMessage(content=user_prompt)]
-                )
-                response_text = clean_gpt_json_response(response.content)
+                response_text = await get_llm_response_cache().lookup(cache_key)
+                cached = response_text is not None
+                if not cached:
+                    with llm_priority(LLMPriority.BATCH):
+                        response = await self.llm.ainvoke(messages)
+                    response_text = clean_gpt_json_response(response.content)
                 structured_conversation = json.loads(response_text)
 
                 if isinstance(structured_conversation, list) and all(isinstance(item, dict) for item in structured_conversation):
+                    if not cached:
+                        await get_llm_response_cache().store(cache_key, response_text)
                     return structured_conversation
                 else:
                     logger.warning(f"Attempt {attempt}: Unexpected JSON structure.")
@@ -0,0 +1,166 @@
+"""
+Background tone (hostility) analysis of in-progress conversations.
+
+Updates only schedule an analysis. Per conversation, requests are debounced
+and coalesced: one analysis runs once IN_PROGRESS_ANALYSIS_MAX_MESSAGES new
+messages are pending or IN_PROGRESS_ANALYSIS_DEBOUNCE_SECONDS after the first
+pending one, covering everything received until then. Messages received
+while it runs are batched for the next one. Results are pushed to the
+dashboard and conversation rooms through the SocketConnectionManager.
+
+Debouncing is per process; updates of one conversation spread over several
+workers are debounced separately.
+"""
+
+import asyncio
+import logging
+from contextvars import Context
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional, Tuple
+from uuid import UUID
+
+from injector import inject
+
+from app.core.config.settings import settings
+from app.core.tenant_scope import get_tenant_context, set_tenant_context
+from app.modules.workflow.llm.gateway import LLMPriority, set_llm_priority
+from app.modules.websockets.socket_connection_manager import SocketConnectionManager
+from app.modules.websockets.socket_room_enum import SocketRoomType
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _PendingAnalysis:
+    llm_analyst_id: Optional[UUID]
+    user_id: Optional[UUID]
+    messages: int = 0
+    requests: int = 0
+    # Set once enough messages are pending to skip the rest of the debounce delay
+    due: asyncio.Event = field(default_factory=asyncio.Event)
+
+
+@inject
+class InProgressAnalysisScheduler:
+    """Debounced, coalesced background tone analysis per in-progress conversation"""
+
+    def __init__(self, socket_connection_manager: SocketConnectionManager):
+        self.socket_connection_manager = socket_connection_manager
+        self._pending: Dict[Tuple[str, UUID], _PendingAnalysis] = {}
+        self._tasks: Dict[Tuple[str, UUID], asyncio.Task] = {}
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.running = 0
+        self.requests = 0
+        self.llm_calls = 0
+        self.llm_calls_saved = 0
+        self.failures = 0
+
+    def schedule(
+        self,
+        conversation_id: UUID,
+        llm_analyst_id: Optional[UUID] = None,
+        new_messages: int = 1,
+        user_id: Optional[UUID] = None,
+    ) -> None:
+        """Request an analysis of the conversation, in the current tenant, without waiting for it"""
+        key = (get_tenant_context(), conversation_id)
+        pending = self._pending.get(key)
+        if pending is None:
+            pending = self._pending[key] = _PendingAnalysis(llm_analyst_id, user_id)
+        # The latest request decides the analyst
+        pending.llm_analyst_id = llm_analyst_id or pending.llm_analyst_id
+        pending.user_id = user_id or pending.user_id
+        pending.messages += new_messages
+        pending.requests += 1
+        self.requests += 1
+        if pending.messages >= settings.IN_PROGRESS_ANALYSIS_MAX_MESSAGES:
+            pending.due.set()
+
+        task = self._tasks.get(key)
+        if task is None or task.done():
+            # Detached from the request context, the analysis opens its own scope
+            self._tasks[key] = Context().run(asyncio.create_task, self._run(key))
+
+    async def _run(self, key: Tuple[str, UUID]) -> None:
+        """Analyse the conversation batch after batch, until nothing is pending"""
+        # Live chats are admitted first by the LLM gateway
+        set_llm_priority(LLMPriority.BACKGROUND)
+        try:
+            while key in self._pending:
+                pending = self._pending[key]
+                try:
+                    await asyncio.wait_for(pending.due.wait(), settings.IN_PROGRESS_ANALYSIS_DEBOUNCE_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+                # Requests from here on start the next batch
+                del self._pending[key]
+                self.llm_calls_saved += pending.requests - 1
+
+                async with self._get_semaphore():
+                    self.running += 1
+                    try:
+                        await self._analyze(key, pending)
+                    finally:
+                        self.running -= 1
+        finally:
+            if self._tasks.get(key) is asyncio.current_task():
+                del self._tasks[key]
+
+    async def _analyze(self, key: Tuple[str, UUID], pending: _PendingAnalysis) -> None:
+        from fastapi_injector import RequestScopeFactory
+        from app.dependencies.injector import injector
+        from app.services.conversations import ConversationService
+
+        tenant_id, conversation_id = key
+        self.llm_calls += 1
+        try:
+            request_scope_factory = injector.get(RequestScopeFactory)
+            async with request_scope_factory.create_scope():
+                set_tenant_context(tenant_id)
+                service = injector.get(ConversationService)
+                conversation = await service.analyze_in_progress_tone(conversation_id, pending.llm_analyst_id)
+                if conversation is None:
+                    return
+
+                payload = {
+                    "conversation_id": conversation.id,
+                    "in_progress_hostility_score": conversation.in_progress_hostility_score,
+                    "negative_reason": conversation.negative_reason,
+                    "topic": conversation.topic,
+                }
+                # Notify dashboard and conversation viewers of the new score
+                await self.socket_connection_manager.broadcast(
+                    msg_type="update",
+                    payload=dict(payload),
+                    room_id=SocketRoomType.DASHBOARD,
+                    current_user_id=pending.user_id,
+                    required_topic="hostile",
+                    tenant_id=tenant_id,
+                )
+                await self.socket_connection_manager.broadcast(
+                    msg_type="statistics",
+                    payload=dict(payload),
+                    room_id=conversation_id,
+                    current_user_id=pending.user_id,
+                    required_topic="statistics",
+                    tenant_id=tenant_id,
+                )
+        except Exception as e:
+            self.failures += 1
+            logger.error(f"In-progress analysis of conversation {conversation_id} failed: {e}")
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(settings.IN_PROGRESS_ANALYSIS_CONCURRENCY)
+        return self._semaphore
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queue_depth": len(self._pending),
+            "pending_messages": sum(pending.messages for pending in self._pending.values()),
+            "running": self.running,
+            "requests": self.requests,
+            "llm_calls": self.llm_calls,
+            "llm_calls_saved": self.llm_calls_saved,
+            "failures": self.failures,
+        }
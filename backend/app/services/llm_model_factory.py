@@ -6,6 +6,7 @@ from langchain_core.language_models import BaseChatModel
 from app.core.exceptions.exception_classes import AppException
 from app.core.exceptions.error_messages import ErrorKey
 from app.core.utils.encryption_utils import decrypt_key
+from app.modules.workflow.llm.gateway_model import with_gateway
 from app.schemas.llm import LlmAnalyst
 import logging
 
@@ -19,6 +20,10 @@ class LlmModelFactory:
         """
         Given an LlmAnalyst, return the appropriate LangChain Chat model.
         """
+        return with_gateway(LlmModelFactory._create_model(llm_analyst), llm_analyst.llm_provider.id)
+
+    @staticmethod
+    def _create_model(llm_analyst: LlmAnalyst) -> BaseChatModel:
         logger.info(
             f"Using LLM {llm_analyst.llm_provider.llm_model_provider} model: {llm_analyst.llm_provider.llm_model}")
 
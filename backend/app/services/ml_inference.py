@@ -0,0 +1,246 @@
+"""
+ML Model Inference Executor - micro-batched predictions off the event loop
+
+Concurrent prediction requests for the same model are merged into a single
+vectorized predict/predict_proba call: requests arriving within
+ML_INFERENCE_BATCH_WAIT_MS of each other (or while all of the model's
+ML_INFERENCE_MODEL_CONCURRENCY batches are running) are stacked, predicted
+together in a thread pool (or a process pool, which loads the model from its
+pickle file in each worker) and the results are split back per request.
+Latency and batch size histograms are kept per model.
+"""
+
+import asyncio
+import bisect
+import logging
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS_MS = [1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000]
+BATCH_SIZE_BUCKETS = [1, 2, 4, 8, 16, 32, 64, 128, 256, 512]
+
+# Models loaded by process pool workers, keyed by pickle file and version
+_process_models: Dict[Tuple[str, str], Any] = {}
+
+
+def _predict_batch(model: Any, input_data: np.ndarray) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """predict and, for classifiers, predict_proba of a batch, blocking"""
+    predictions = model.predict(input_data)
+    probabilities = None
+    if hasattr(model, 'predict_proba'):
+        try:
+            probabilities = model.predict_proba(input_data)
+        except Exception as prob_error:
+            logger.warning(f"Could not get prediction probabilities: {prob_error}")
+    return predictions, probabilities
+
+
+def _predict_batch_in_process(pkl_file: str, version: str, input_data: np.ndarray):
+    """Process pool variant of _predict_batch, loading the model once per worker and version"""
+    from app.services.ml_model_manager import _load_pickle_sync
+
+    key = (pkl_file, version)
+    if key not in _process_models:
+        for stale in [k for k in _process_models if k[0] == pkl_file]:
+            del _process_models[stale]
+        _process_models[key] = _load_pickle_sync(pkl_file)
+    return _predict_batch(_process_models[key], input_data)
+
+
+class Histogram:
+    """Counts of observations per bucket, the last bucket counts values above all bounds"""
+
+    def __init__(self, bounds: List[float]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.total += value
+        self.count += 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        labels = [f"<={bound}" for bound in self.bounds] + [f">{self.bounds[-1]}"]
+        return {
+            "buckets": dict(zip(labels, self.counts)),
+            "count": self.count,
+            "mean": self.total / self.count if self.count else 0.0,
+        }
+
+
+@dataclass
+class _Request:
+    input_data: np.ndarray
+    future: asyncio.Future
+    enqueued_at: float
+
+
+class _ModelBatcher:
+    """Pending requests and running batches of one loaded model"""
+
+    def __init__(self, executor: "InferenceExecutor", model: Any, pkl_file: Optional[str], version: str):
+        self.executor = executor
+        self.model = model
+        self.pkl_file = pkl_file
+        self.version = version
+        self.pending: List[_Request] = []
+        self.drainer: Optional[asyncio.Task] = None
+        self.semaphore = asyncio.Semaphore(settings.ML_INFERENCE_MODEL_CONCURRENCY)
+        self.running = 0
+        self.latency_ms = Histogram(LATENCY_BUCKETS_MS)
+        self.batch_rows = Histogram(BATCH_SIZE_BUCKETS)
+        self.requests_per_batch = Histogram(BATCH_SIZE_BUCKETS)
+
+    async def submit(self, input_data: np.ndarray) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        future = asyncio.get_running_loop().create_future()
+        self.pending.append(_Request(input_data, future, time.perf_counter()))
+        if self.drainer is None or self.drainer.done():
+            self.drainer = asyncio.create_task(self._drain())
+        return await future
+
+    async def _drain(self) -> None:
+        # Wait for concurrent requests to join the batch
+        await asyncio.sleep(settings.ML_INFERENCE_BATCH_WAIT_MS / 1000)
+        while self.pending:
+            # Requests keep piling up while every slot of the model is busy
+            await self.semaphore.acquire()
+            batch, rows = [], 0
+            while self.pending and (not batch or rows + len(self.pending[0].input_data) <= settings.ML_INFERENCE_MAX_BATCH_ROWS):
+                request = self.pending.pop(0)
+                batch.append(request)
+                rows += len(request.input_data)
+            asyncio.create_task(self._run(batch))
+
+    async def _run(self, batch: List[_Request]) -> None:
+        self.running += 1
+        try:
+            try:
+                results = await self._predict(np.vstack([request.input_data for request in batch]))
+                predictions, probabilities = results
+                offset = 0
+                for request in batch:
+                    end = offset + len(request.input_data)
+                    self._resolve(request, (predictions[offset:end], None if probabilities is None else probabilities[offset:end]))
+                    offset = end
+                self.batch_rows.observe(offset)
+                self.requests_per_batch.observe(len(batch))
+            except Exception as e:
+                if len(batch) == 1:
+                    self._resolve(batch[0], error=e)
+                    return
+                # One request's rows may break the batch, predict each request on its own
+                logger.warning(f"Batched prediction of {len(batch)} requests failed, retrying them separately: {e}")
+                for request in batch:
+                    try:
+                        self._resolve(request, await self._predict(request.input_data))
+                    except Exception as request_error:
+                        self._resolve(request, error=request_error)
+        finally:
+            self.running -= 1
+            self.semaphore.release()
+
+    async def _predict(self, input_data: np.ndarray):
+        loop = asyncio.get_running_loop()
+        pool = self.executor.get_pool()
+        if isinstance(pool, ProcessPoolExecutor) and self.pkl_file:
+            return await loop.run_in_executor(pool, _predict_batch_in_process, self.pkl_file, self.version, input_data)
+        return await loop.run_in_executor(pool, _predict_batch, self.model, input_data)
+
+    def _resolve(self, request: _Request, result: Any = None, error: Optional[BaseException] = None) -> None:
+        self.latency_ms.observe((time.perf_counter() - request.enqueued_at) * 1000)
+        if request.future.done():
+            return
+        if error is not None:
+            request.future.set_exception(error)
+        else:
+            request.future.set_result(result)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "version": self.version,
+            "pending_requests": len(self.pending),
+            "running_batches": self.running,
+            "latency_ms": self.latency_ms.to_dict(),
+            "batch_rows": self.batch_rows.to_dict(),
+            "requests_per_batch": self.requests_per_batch.to_dict(),
+        }
+
+
+class InferenceExecutor:
+    """
+    Singleton executor of ML model predictions, one micro-batcher per model.
+    A reloaded model (new updated_at) gets a new batcher, requests to the old
+    one finish on the old model.
+    """
+
+    _instance: Optional['InferenceExecutor'] = None
+
+    def __init__(self):
+        self._batchers: Dict[str, _ModelBatcher] = {}
+        self._pool: Optional[Executor] = None
+
+    @classmethod
+    def get_instance(cls) -> 'InferenceExecutor':
+        """Get the singleton instance"""
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    def get_pool(self) -> Executor:
+        if self._pool is None:
+            if settings.ML_INFERENCE_EXECUTOR == "process":
+                self._pool = ProcessPoolExecutor(max_workers=settings.ML_INFERENCE_WORKERS)
+            else:
+                self._pool = ThreadPoolExecutor(
+                    max_workers=settings.ML_INFERENCE_WORKERS,
+                    thread_name_prefix="ml_model_inference"
+                )
+        return self._pool
+
+    async def predict(
+        self,
+        model_id: Any,
+        model: Any,
+        input_data: np.ndarray,
+        pkl_file: Optional[str] = None,
+        updated_at: Optional[datetime] = None,
+    ) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        """
+        Predictions and (when the model has predict_proba) class probabilities for
+        the rows of input_data, computed in a batch with concurrent requests.
+        """
+        key = str(model_id)
+        version = updated_at.isoformat() if updated_at else str(id(model))
+        batcher = self._batchers.get(key)
+        if batcher is None or batcher.model is not model:
+            batcher = self._batchers[key] = _ModelBatcher(self, model, pkl_file, version)
+        return await batcher.submit(input_data)
+
+    def invalidate_model(self, model_id: Any) -> None:
+        self._batchers.pop(str(model_id), None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "executor": settings.ML_INFERENCE_EXECUTOR,
+            "workers": settings.ML_INFERENCE_WORKERS,
+            "batch_wait_ms": settings.ML_INFERENCE_BATCH_WAIT_MS,
+            "max_batch_rows": settings.ML_INFERENCE_MAX_BATCH_ROWS,
+            "models": {model_id: batcher.stats() for model_id, batcher in self._batchers.items()},
+        }
+
+
+# Global instance getter for easy access
+def get_inference_executor() -> InferenceExecutor:
+    """Get the global ML model inference executor"""
+    return InferenceExecutor.get_instance()
@@ -16,6 +16,8 @@ from uuid import UUID
 
 from injector import inject
 
+from app.services.ml_inference import get_inference_executor
+
 logger = logging.getLogger(__name__)
 
 # Shared thread pool for blocking I/O operations (pickle loading)
@@ -273,6 +275,7 @@ class MLModelManager:
         if model_id_str in self._cached_models:
             del self._cached_models[model_id_str]
             logger.info(f"Invalidated cached model {model_id_str}")
+        get_inference_executor().invalidate_model(model_id)
 
     def clear_cache(self) -> None:
         """Clear all cached models"""
@@ -304,7 +307,8 @@ class MLModelManager:
                 }
                 for cached in self._cached_models.values()
             ],
-            "thread_pool": executor_stats
+            "thread_pool": executor_stats,
+            "inference": get_inference_executor().get_stats()
         }
 
 
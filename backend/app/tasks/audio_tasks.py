@@ -1,4 +1,3 @@
-import asyncio
 import logging
 from datetime import datetime, timezone
 from typing import Optional
@@ -12,6 +11,7 @@ from app.services.audio import AudioService
 from app.db.seed.seed_data_config import SeedTestData
 from app.schemas.recording import RecordingCreate
 from app.tasks.base import run_task_for_all_tenants
+from app.tasks.runner import run_async
 
 from fastapi import UploadFile
 
@@ -27,8 +27,7 @@ def transcribe_audio_files_from_s3():
     """
     Celery task that Transcribes Audio files from S3 bucket into recordings.
     """
-    loop = asyncio.get_event_loop()
-    return loop.run_until_complete(transcribe_audio_files_async_with_scope())
+    return run_async(transcribe_audio_files_async_with_scope())
 
 
 async def transcribe_audio_files_async_with_scope(ds_id: Optional[str] = None):
@@ -37,11 +36,13 @@ async def transcribe_audio_files_async_with_scope(ds_id: Optional[str] = None):
         logger.info("Starting S3 audio transcription task for all tenants...")
         request_scope_factory = injector.get(RequestScopeFactory)
 
-        async def run_with_scope():
+        async def run_with_scope(ds_id: Optional[str] = None):
             async with request_scope_factory.create_scope():
                 return await transcribe_audio_files_async(ds_id)
 
-        results = await run_task_for_all_tenants(run_with_scope, ds_id=ds_id)
+        results = await run_task_for_all_tenants(
+            run_with_scope, subtask=transcribe_audio_files_async, ds_id=ds_id
+        )
 
         logger.info(f"Transcription completed for {len(results)} tenant(s)")
         return {"status": "success", "results": results}
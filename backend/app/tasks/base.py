@@ -1,11 +1,18 @@
-from celery import Task, shared_task
-from datetime import datetime
+import asyncio
+import importlib
 import logging
-from typing import Callable, List
+import time
+import uuid
+from collections import deque
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from celery import Task, chord, shared_task
 
 from app.services.tenant import TenantService
 from app.core.tenant_scope import set_tenant_context, clear_tenant_context
 from app.core.config.settings import settings
+from app.tasks.runner import run_async
 
 logger = logging.getLogger(__name__)
 
@@ -45,108 +52,193 @@ def long_running_task(duration: int = 60):
     return {"status": "completed", "duration": duration}
 
 
-async def run_task_for_all_tenants(task_func: Callable, **kwargs) -> List[dict]:
+MASTER_TENANT = {
+    "tenant_id": "master",
+    "tenant_name": "Master Database",
+    "tenant_slug": "master",
+}
+
+# Where the next run of each task starts in the tenant list, see _rotate
+_next_start: Dict[str, int] = {}
+
+
+async def _get_tenants() -> List[dict]:
+    """Active tenants, as the identifying fields reported with each result"""
+    from app.db.multi_tenant_session import multi_tenant_manager
+    from app.repositories.tenant import TenantRepository
+
+    session_factory = multi_tenant_manager.get_tenant_session_factory("master")
+    async with session_factory() as session:
+        tenant_service = TenantService(repository=TenantRepository(session))
+        tenants = await tenant_service.get_all_tenants()
+    return [
+        {
+            "tenant_id": str(tenant.id),
+            "tenant_name": tenant.name,
+            "tenant_slug": tenant.slug,
+        }
+        for tenant in tenants
+    ]
+
+
+def _rotate(task_name: str, tenants: List[dict]) -> List[dict]:
+    """
+    Start every run one tenant further down the list, so the tenants last in
+    line, the ones cut off when a run overruns, change from run to run.
     """
-    Helper to run a task function for all active tenants and master database.
+    if not tenants:
+        return tenants
+    start = _next_start.get(task_name, 0) % len(tenants)
+    _next_start[task_name] = start + 1
+    return tenants[start:] + tenants[:start]
+
+
+async def _run_for_tenant(
+    tenant: dict, task_func: Callable, timeout: Optional[float], kwargs: dict
+) -> dict:
+    """Run the task in the tenant's context, reporting its outcome and latency"""
+    report = dict(tenant)
+    started = time.perf_counter()
+    try:
+        if tenant["tenant_slug"] == "master":
+            clear_tenant_context()
+        else:
+            set_tenant_context(str(tenant["tenant_slug"]))
+        logger.info(f"Running task for tenant: {tenant['tenant_name']} ({tenant['tenant_slug']})")
+
+        report["result"] = await asyncio.wait_for(task_func(**kwargs), timeout)
+        report["status"] = "success"
+    except asyncio.TimeoutError:
+        logger.error(f"Task for tenant {tenant['tenant_name']} timed out after {timeout}s")
+        report["status"] = "timeout"
+        report["error"] = f"Timed out after {timeout}s"
+    except Exception as e:
+        logger.error(f"Error running task for tenant {tenant['tenant_name']}: {e}", exc_info=True)
+        report["status"] = "error"
+        report["error"] = str(e)
+    finally:
+        clear_tenant_context()
+    report["duration_ms"] = round((time.perf_counter() - started) * 1000)
+    return report
+
+
+async def run_task_for_all_tenants(
+    task_func: Callable,
+    subtask: Optional[Callable] = None,
+    **kwargs,
+) -> List[dict]:
+    """
+    Helper to run a task function for the master database and all active tenants.
+
+    Tenants run concurrently, at most TENANT_TASK_CONCURRENCY at once, each
+    limited to TENANT_TASK_TIMEOUT_SECONDS. Workers take the next tenant in
+    line as soon as they are free, so a slow tenant holds up only its own slot.
+    With TENANT_TASK_FAN_OUT, each tenant instead runs as its own Celery
+    subtask, see fan_out_to_tenants.
 
     Args:
         task_func: Async function that runs the task logic
+        subtask: Module-level async function run by the tenant subtasks when
+            fanning out, task_func runs in-process when it is not given
         **kwargs: Arguments to pass to the task function
 
     Returns:
-        List of results for each tenant and master
+        Per tenant and master: the result or error, status and duration_ms
     """
-    results = []
     settings.BACKGROUND_TASK = True
+    task_name = getattr(subtask or task_func, "__qualname__", repr(task_func))
 
     try:
-        from app.db.multi_tenant_session import multi_tenant_manager
-        from app.repositories.tenant import TenantRepository
-
-        session_factory = multi_tenant_manager.get_tenant_session_factory("master")
-        async with session_factory() as session:
-            repository = TenantRepository(session)
-            tenant_service = TenantService(repository=repository)
-            tenants = await tenant_service.get_all_tenants()
-
-            # First, run for master database (no tenant context)
-            try:
-                logger.info("Running task for master database")
-                clear_tenant_context()  # Ensure no tenant context
-
-                result = await task_func(**kwargs)
-                if result:
-                    results.append(
-                        {
-                            "tenant_id": "master",
-                            "tenant_name": "Master Database",
-                            "tenant_slug": "master",
-                            "result": result,
-                        }
-                    )
-            except Exception as e:
-                logger.error(
-                    f"Error running task for master database: {e}", exc_info=True
-                )
-                results.append(
-                    {
-                        "tenant_id": "master",
-                        "tenant_name": "Master Database",
-                        "tenant_slug": "master",
-                        "error": str(e),
-                    }
-                )
-
-            if not tenants:
-                logger.info("No active tenants found")
-                if not settings.MULTI_TENANT_ENABLED:
-                    # In single-tenant mode, we only run for master (already done)
-                    return results
-                return results
-
-            logger.info(f"Running task for {len(tenants)} tenant(s)")
-
-            for tenant in tenants:
-                try:
-                    # Set tenant context for this tenant
-                    set_tenant_context(str(tenant.slug))
-                    logger.info(
-                        f"Running task for tenant: {tenant.name} ({tenant.slug})"
-                    )
-
-                    # Run the task function with tenant context
-                    result = await task_func(**kwargs)
-                    if result:
-                        results.append(
-                            {
-                                "tenant_id": str(tenant.id),
-                                "tenant_name": tenant.name,
-                                "tenant_slug": tenant.slug,
-                                "result": result,
-                            }
-                        )
-
-                except Exception as e:
-                    logger.error(
-                        f"Error running task for tenant {tenant.name}: {e}",
-                        exc_info=True,
-                    )
-                    results.append(
-                        {
-                            "tenant_id": str(tenant.id),
-                            "tenant_name": tenant.name,
-                            "tenant_slug": tenant.slug,
-                            "error": str(e),
-                        }
-                    )
-                finally:
-                    # Clear tenant context after each tenant
-                    clear_tenant_context()
-
+        tenants = _rotate(task_name, await _get_tenants())
     except Exception as e:
         logger.error(f"Error in run_task_for_all_tenants: {e}", exc_info=True)
+        tenants = []
+    if not tenants:
+        logger.info("No active tenants found")
+
+    if settings.TENANT_TASK_FAN_OUT and subtask is not None:
+        return fan_out_to_tenants(subtask, [MASTER_TENANT, *tenants], **kwargs)
+
+    # The master database goes first, as it did when tenants ran one by one
+    queue = deque([MASTER_TENANT, *tenants])
+    timeout = settings.TENANT_TASK_TIMEOUT_SECONDS
+    results: List[dict] = []
+
+    async def worker():
+        # Each worker runs in its own copy of the context, so tenant contexts do not leak
+        while queue:
+            results.append(await _run_for_tenant(queue.popleft(), task_func, timeout, kwargs))
+
+    logger.info(f"Running task {task_name} for master and {len(tenants)} tenant(s)")
+    started = time.perf_counter()
+    workers = max(1, min(settings.TENANT_TASK_CONCURRENCY, len(queue)))
+    try:
+        await asyncio.gather(*(asyncio.create_task(worker()) for _ in range(workers)))
     finally:
-        # Ensure context is cleared
         clear_tenant_context()
 
+    failed = [r["tenant_slug"] for r in results if r["status"] != "success"]
+    slowest = max(results, key=lambda r: r["duration_ms"])
+    logger.info(
+        f"Task {task_name} ran for {len(results)} tenant(s) in "
+        f"{round((time.perf_counter() - started) * 1000)}ms, slowest {slowest['tenant_slug']} "
+        f"({slowest['duration_ms']}ms), failed: {failed or 'none'}"
+    )
     return results
+
+
+def fan_out_to_tenants(subtask: Callable, tenants: List[dict], **kwargs) -> List[dict]:
+    """
+    Run subtask for each tenant as a separate run_tenant_task Celery task. A
+    chord collects their reports in report_tenant_results once all finished.
+    Returns the queued task per tenant.
+    """
+    if "<locals>" in subtask.__qualname__:
+        raise ValueError(f"Tenant subtasks must be module-level functions, got {subtask.__qualname__}")
+    path = f"{subtask.__module__}:{subtask.__qualname__}"
+
+    queued, signatures = [], []
+    for tenant in tenants:
+        task_id = str(uuid.uuid4())
+        signatures.append(run_tenant_task.s(path, tenant, kwargs).set(task_id=task_id))
+        queued.append({**tenant, "status": "queued", "task_id": task_id})
+    chord(signatures)(report_tenant_results.s(path))
+
+    logger.info(f"Fanned out {path} to {len(tenants)} tenant subtask(s)")
+    return queued
+
+
+def _import_subtask(path: str) -> Callable:
+    module_name, _, name = path.partition(":")
+    return getattr(importlib.import_module(module_name), name)
+
+
+@shared_task
+def run_tenant_task(path: str, tenant: dict, kwargs: Dict[str, Any]) -> dict:
+    """Celery task running one tenant's share of a task fanned out by run_task_for_all_tenants"""
+    from fastapi_injector import RequestScopeFactory
+    from app.dependencies.injector import injector
+
+    settings.BACKGROUND_TASK = True
+    subtask = _import_subtask(path)
+    request_scope_factory = injector.get(RequestScopeFactory)
+
+    async def run_with_scope(**task_kwargs):
+        async with request_scope_factory.create_scope():
+            return await subtask(**task_kwargs)
+
+    return run_async(
+        _run_for_tenant(tenant, run_with_scope, settings.TENANT_TASK_TIMEOUT_SECONDS, kwargs)
+    )
+
+
+@shared_task
+def report_tenant_results(results: List[dict], path: str) -> dict:
+    """Chord callback logging the outcome of a fanned out task"""
+    failed = [r["tenant_slug"] for r in results if r["status"] != "success"]
+    durations = [r["duration_ms"] for r in results]
+    logger.info(
+        f"Task {path} finished for {len(results)} tenant(s), slowest {max(durations, default=0)}ms, "
+        f"failed: {failed or 'none'}"
+    )
+    return {"task": path, "failed": failed, "results": results}
@@ -1,4 +1,3 @@
-import asyncio
 import json
 from celery import Task, shared_task
 from app.dependencies.injector import injector
@@ -7,6 +6,7 @@ import logging
 from app.services.conversations import ConversationService
 from app.db.seed.seed_data_config import seed_test_data
 from app.tasks.base import BaseTaskWithLogging, run_task_for_all_tenants
+from app.tasks.runner import run_async
 
 from fastapi_injector import RequestScopeFactory
 
@@ -15,8 +15,7 @@ logger = logging.getLogger(__name__)
 
 @shared_task
 def cleanup_stale_conversations():
-    loop = asyncio.get_event_loop()
-    return loop.run_until_complete(cleanup_stale_conversations_async_with_scope())
+    return run_async(cleanup_stale_conversations_async_with_scope())
 
 
 async def cleanup_stale_conversations_async_with_scope():
@@ -29,7 +28,9 @@ async def cleanup_stale_conversations_async_with_scope():
             async with request_scope_factory.create_scope():
                 return await cleanup_stale_conversations_async()
 
-        results = await run_task_for_all_tenants(run_with_scope)
+        results = await run_task_for_all_tenants(
+            run_with_scope, subtask=cleanup_stale_conversations_async
+        )
 
         logger.info(f"Cleanup completed for {len(results)} tenant(s)")
         return {
@@ -8,6 +8,7 @@ from app.dependencies.injector import injector
 from app.services.open_ai_fine_tuning import OpenAIFineTuningService
 from app.core.utils.enums.open_ai_fine_tuning_enum import JobStatus
 from app.tasks.base import run_task_for_all_tenants
+from app.tasks.runner import run_async
 from fastapi_injector import RequestScopeFactory
 
 
@@ -17,8 +18,7 @@ logger = logging.getLogger(__name__)
 @shared_task
 def sync_active_fine_tuning_jobs():
     """Celery task entry point for syncing active fine-tuning jobs"""
-    loop = asyncio.get_event_loop()
-    return loop.run_until_complete(sync_active_fine_tuning_jobs_async_with_scope())
+    return run_async(sync_active_fine_tuning_jobs_async_with_scope())
 
 
 async def sync_active_fine_tuning_jobs_async_with_scope():
@@ -33,7 +33,7 @@ async def sync_active_fine_tuning_jobs_async_with_scope():
                 return await sync_active_fine_tuning_jobs_async()
 
 
-        results = await run_task_for_all_tenants(run_with_scope)
+        results = await run_task_for_all_tenants(run_with_scope, subtask=sync_active_fine_tuning_jobs_async)
 
         logger.info(f"Sync completed for {len(results)} tenant(s)")
         return {
@@ -130,8 +130,7 @@ async def sync_active_fine_tuning_jobs_async():
 @shared_task
 def sync_all_fine_tuning_jobs():
     """Celery task to sync ALL fine-tuning jobs (not just active ones)"""
-    loop = asyncio.get_event_loop()
-    return loop.run_until_complete(sync_all_fine_tuning_jobs_async_with_scope())
+    return run_async(sync_all_fine_tuning_jobs_async_with_scope())
 
 
 async def sync_all_fine_tuning_jobs_async_with_scope():
@@ -146,7 +145,7 @@ async def sync_all_fine_tuning_jobs_async_with_scope():
                 return await sync_all_fine_tuning_jobs_async()
 
 
-        results = await run_task_for_all_tenants(run_with_scope)
+        results = await run_task_for_all_tenants(run_with_scope, subtask=sync_all_fine_tuning_jobs_async)
 
         logger.info(f"Full sync completed for {len(results)} tenant(s)")
         return {
@@ -1,15 +1,18 @@
 import asyncio
+import json
 import logging
-from datetime import datetime
-from io import BytesIO
-from typing import Optional
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Callable, Deque, Dict, Optional
 
 from celery import shared_task
+from app.tasks.runner import run_async
 from fastapi_injector import RequestScopeFactory
 
+from app.core.config.settings import settings
 from app.dependencies.injector import injector
 from app.services.datasources import DataSourceService
-from app.services.app_settings import AppSettingsService
 from app.services.llm_analysts import LlmAnalystService
 from app.services.AzureStorageService import AzureStorageService
 
@@ -22,8 +25,7 @@ def batch_process_files_kb(ds_id: Optional[str] = None):
     Celery task entry point.
     Runs async summary pipeline for Azure blob files.
     """
-    loop = asyncio.get_event_loop()
-    return loop.run_until_complete(batch_process_files_kb_async_with_scope(ds_id))
+    return run_async(batch_process_files_kb_async_with_scope(ds_id))
 
 
 async def batch_process_files_kb_async_with_scope(ds_id: Optional[str] = None):
@@ -43,7 +45,6 @@ async def batch_process_files_kb_async_with_scope(ds_id: Optional[str] = None):
 
 async def batch_process_files_kb_async(ds_id: Optional[str] = None):
     dsService = injector.get(DataSourceService)
-    settingsService = injector.get(AppSettingsService)
     llmService = injector.get(LlmAnalystService)
 
     # Load Azure credentials from settings or datasource config
@@ -54,8 +55,7 @@ async def batch_process_files_kb_async(ds_id: Optional[str] = None):
         datasources = await dsService.get_by_type("azure_blob", True)
 
     count_datasource = 0
-    count_success = 0
-    count_fail = 0
+    totals = {"processed": 0, "failed": 0, "skipped": 0}
     processed = []
 
     for ds_item in datasources:
@@ -64,58 +64,189 @@ async def batch_process_files_kb_async(ds_id: Optional[str] = None):
 
         count_datasource += 1
         conn = ds_item.connection_data
-        logger.info(f"Processing Azure Blob Datasource: {conn}")
+        logger.info(f"Processing Azure Blob Datasource: {ds_item.id}")
 
         # Required Azure details stored in datasource connection_data
-        container = conn.get("container_name")
-        prefix = conn.get("input_prefix", "incoming")
-        summary_prefix = conn.get("summary_prefix", "summary")
-
         azure = AzureStorageService(
             connection_string=conn.get("connection_string"),
-            container_name=container
+            container_name=conn.get("container_name"),
         )
-
-        # List files to summarize
-        files = azure.file_list(prefix=prefix)
-        if not files:
-            logger.info(f"No files found in container: {container}/{prefix}")
+        try:
+            result = await summarize_blobs(
+                azure,
+                llmService.generate_summary,
+                prefix=conn.get("input_prefix", "incoming"),
+                summary_prefix=conn.get("summary_prefix", "summary"),
+            )
+        except Exception as e:
+            logger.error(f"Failed to summarize datasource {ds_item.id}: {str(e)}")
+            totals["failed"] += 1
             continue
+        finally:
+            await azure.aclose()
 
-        for blob_path in files:
-            filename = blob_path.replace(prefix + "/", "")  # Clean file name
+        for key in totals:
+            totals[key] += result[key]
+        processed.extend(result["files"])
 
-            try:
-                logger.info(f"Reading blob: {blob_path}")
-                container_client = azure._get_container()
-                blob_client = container_client.get_blob_client(blob_path)
+    return {
+        "datasources": count_datasource,
+        **totals,
+        "files": processed
+    }
+
+
+CHECKPOINT_NAME = "_checkpoint.json"
+
+
+@dataclass
+class _Page:
+    """A page of listed blobs, done once none of its blobs is pending"""
+    next_token: Optional[str]
+    pending: int
+    failed: bool = False
+
+
+def _etag(etag: Optional[str]) -> str:
+    return (etag or "").strip('"')
 
-                content_bytes = blob_client.download_blob().readall()
-                content = content_bytes.decode("utf-8", errors="ignore")
 
+async def summarize_blobs(
+    azure: AzureStorageService,
+    summarize: Callable,
+    prefix: str,
+    summary_prefix: str,
+) -> Dict:
+    """
+    Summarize the blobs under prefix into {summary_prefix}/{name}.summary.txt.
+
+    Listing, downloads (KB_BATCH_DOWNLOAD_CONCURRENCY) and LLM summaries
+    (KB_BATCH_SUMMARY_CONCURRENCY) run as a pipeline of bounded queues. Each
+    summary records the ETag of its source blob in its metadata, and blobs whose
+    summary has a matching ETag are skipped, so only new or changed blobs are
+    summarized again. A checkpoint blob holds the listing position up to which
+    every blob is done, a crashed run resumes listing there. It is removed once
+    a run completes without failures.
+    """
+    checkpoint_name = f"{summary_prefix}/{CHECKPOINT_NAME}"
+    summarized: Dict[str, str] = {}
+    async for blobs, _ in azure.list_blob_pages(
+        summary_prefix + "/", settings.KB_BATCH_PAGE_SIZE, include_metadata=True
+    ):
+        for blob in blobs:
+            summarized[blob.name] = (blob.metadata or {}).get("source_etag")
+
+    continuation_token = None
+    checkpoint = await azure.download_content_async(checkpoint_name)
+    if checkpoint:
+        state = json.loads(checkpoint)
+        if state.get("prefix") == prefix:
+            continuation_token = state.get("continuation_token")
+            logger.info(f"Resuming summaries of {prefix} from checkpoint of {state.get('updated_at')}")
+
+    stats = {"processed": 0, "failed": 0, "skipped": 0, "files": []}
+    pages: Deque[_Page] = deque()
+    checkpoint_lock = asyncio.Lock()
+    queue_size = settings.KB_BATCH_DOWNLOAD_CONCURRENCY + settings.KB_BATCH_SUMMARY_CONCURRENCY
+    downloads: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+    summaries: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+
+    async def save_checkpoint():
+        # Pages are done out of order, the checkpoint only moves past leading done pages
+        async with checkpoint_lock:
+            token = None
+            while pages and pages[0].pending == 0 and not pages[0].failed:
+                token = pages.popleft().next_token
+            if token is None:
+                return
+            state = {
+                "prefix": prefix,
+                "continuation_token": token,
+                "updated_at": datetime.now(timezone.utc).isoformat(),
+            }
+            await azure.upload_content_async(checkpoint_name, json.dumps(state).encode("utf-8"))
+
+    async def finish(page: _Page, failed: bool = False):
+        page.pending -= 1
+        page.failed = page.failed or failed
+        if page.pending == 0:
+            await save_checkpoint()
+
+    async def list_blobs():
+        async for blobs, next_token in azure.list_blob_pages(
+            prefix, settings.KB_BATCH_PAGE_SIZE, continuation_token=continuation_token
+        ):
+            todo = []
+            for blob in blobs:
+                filename = blob.name.replace(prefix + "/", "")  # Clean file name
+                summary_name = f"{summary_prefix}/{filename}.summary.txt"
+                if blob.name == checkpoint_name or blob.name in summarized:
+                    continue
+                if summarized.get(summary_name) == _etag(blob.etag):
+                    stats["skipped"] += 1
+                    continue
+                todo.append((blob, filename, summary_name))
+
+            page = _Page(next_token, len(todo))
+            pages.append(page)
+            if not todo:
+                await save_checkpoint()
+            for item in todo:
+                await downloads.put((page, *item))
+
+    async def download():
+        while True:
+            page, blob, filename, summary_name = await downloads.get()
+            try:
+                content_bytes = await azure.download_content_async(blob.name)
+                if content_bytes is None:
+                    raise FileNotFoundError(blob.name)
+                content = content_bytes.decode("utf-8", errors="ignore")
+                await summaries.put((page, blob, filename, summary_name, content))
+            except Exception as e:
+                stats["failed"] += 1
+                logger.error(f"Failed to read {filename}: {str(e)}")
+                await finish(page, failed=True)
+            finally:
+                downloads.task_done()
+
+    async def summarize_and_upload():
+        while True:
+            page, blob, filename, summary_name, content = await summaries.get()
+            try:
                 # Generate Summary via LLM
                 logger.info(f"Summarizing {filename}...")
-                summary_text = await llmService.generate_summary(content)
-
-                # Save summary file in summary folder
-                summary_filename = f"{filename}.summary.txt"
-                azure.file_upload_content(
-                    local_file_content=summary_text.encode("utf-8"),
-                    local_file_name=summary_filename,
-                    destination_name=summary_filename,
-                    prefix=summary_prefix
+                summary_text = await summarize(content)
+                await azure.upload_content_async(
+                    summary_name,
+                    summary_text.encode("utf-8"),
+                    metadata={"source_etag": _etag(blob.etag)},
                 )
-
-                processed.append({"file": filename, "summary": summary_filename})
-                count_success += 1
-
+                stats["processed"] += 1
+                stats["files"].append({"file": filename, "summary": f"{filename}.summary.txt"})
+                await finish(page)
             except Exception as e:
-                count_fail += 1
+                stats["failed"] += 1
                 logger.error(f"Failed to summarize {filename}: {str(e)}")
+                await finish(page, failed=True)
+            finally:
+                summaries.task_done()
 
-    return {
-        "datasources": count_datasource,
-        "processed": count_success,
-        "failed": count_fail,
-        "files": processed
-    }
+    workers = [asyncio.create_task(download()) for _ in range(settings.KB_BATCH_DOWNLOAD_CONCURRENCY)]
+    workers += [asyncio.create_task(summarize_and_upload()) for _ in range(settings.KB_BATCH_SUMMARY_CONCURRENCY)]
+    try:
+        await list_blobs()
+        await downloads.join()
+        await summaries.join()
+    finally:
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+    if not stats["failed"]:
+        await azure.delete_blob_async(checkpoint_name)
+    logger.info(
+        f"Summarized {prefix}: {stats['processed']} processed, {stats['skipped']} unchanged, "
+        f"{stats['failed']} failed"
+    )
+    return stats
@@ -2,7 +2,6 @@
 Celery tasks for ML model pipeline execution.
 """
 
-import asyncio
 import logging
 import os
 from uuid import UUID
@@ -25,6 +24,7 @@ from app.repositories.ml_models import MLModelsRepository
 from app.core.project_path import DATA_VOLUME
 from app.schemas.ml_model_pipeline import MLModelPipelineArtifactCreate
 from app.tasks.base import run_task_for_all_tenants
+from app.tasks.runner import run_async
 
 logger = logging.getLogger(__name__)
 
@@ -219,12 +219,7 @@ def execute_pipeline_run_task(run_id: str):
 
     try:
         # Run the async function
-        loop = asyncio.get_event_loop()
-        if loop.is_closed():
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-
-        loop.run_until_complete(execute_pipeline_run_async_with_scope(UUID(run_id)))
+        run_async(execute_pipeline_run_async_with_scope(UUID(run_id)))
 
     except Exception as e:
         logger.error(f"Error in pipeline run task {run_id}: {str(e)}", exc_info=True)
@@ -350,7 +345,9 @@ async def check_and_execute_scheduled_pipelines_async_with_scope():
             async with request_scope_factory.create_scope():
                 return await check_and_execute_scheduled_pipelines_async()
 
-        results = await run_task_for_all_tenants(run_with_scope)
+        results = await run_task_for_all_tenants(
+            run_with_scope, subtask=check_and_execute_scheduled_pipelines_async
+        )
 
         logger.info(f"Scheduled pipeline check completed for {len(results)} tenant(s)")
         return {
@@ -375,12 +372,7 @@ def check_scheduled_pipeline_runs_task():
     This should run every minute.
     """
     try:
-        loop = asyncio.get_event_loop()
-        if loop.is_closed():
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-
-        loop.run_until_complete(
+        run_async(
             check_and_execute_scheduled_pipelines_async_with_scope()
         )
     except Exception as e:
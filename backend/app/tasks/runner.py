@@ -0,0 +1,74 @@
+"""
+Runs the async side of Celery tasks.
+
+Each worker process keeps one event loop for its whole life, instead of one
+per task, so the per-tenant database engines (and their pooled connections)
+created by the tasks stay usable from one task to the next. Engines inherited
+from the parent on fork are dropped, and the process' engines are disposed
+when it shuts down.
+"""
+
+import asyncio
+import logging
+import os
+from typing import Any, Coroutine, Optional, TypeVar
+
+from celery.signals import worker_process_init, worker_process_shutdown, worker_shutdown
+
+from app.modules.workflow.llm.gateway import LLMPriority, set_llm_priority
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_pid: Optional[int] = None
+
+
+def get_worker_loop() -> asyncio.AbstractEventLoop:
+    """The event loop of this worker process, created on first use"""
+    global _loop, _loop_pid
+    if _loop is None or _loop.is_closed() or _loop_pid != os.getpid():
+        _loop = asyncio.new_event_loop()
+        _loop_pid = os.getpid()
+        asyncio.set_event_loop(_loop)
+        logger.info(f"Created event loop for worker process {_loop_pid}")
+    return _loop
+
+
+async def _as_batch(coro: Coroutine[Any, Any, T]) -> T:
+    # LLM calls of tasks wait behind interactive ones in the LLM gateway
+    set_llm_priority(LLMPriority.BATCH)
+    return await coro
+
+
+def run_async(coro: Coroutine[Any, Any, T]) -> T:
+    """Run a coroutine to completion on the worker's event loop, for use in Celery tasks"""
+    return get_worker_loop().run_until_complete(_as_batch(coro))
+
+
+@worker_process_init.connect
+def _init_worker_process(**kwargs):
+    from app.db.multi_tenant_session import multi_tenant_manager
+
+    multi_tenant_manager.reset_after_fork()
+    get_worker_loop()
+
+
+@worker_process_shutdown.connect
+@worker_shutdown.connect
+def _shutdown_worker_process(**kwargs):
+    global _loop
+    if _loop is None or _loop.is_closed() or _loop_pid != os.getpid():
+        return
+
+    from app.db.multi_tenant_session import multi_tenant_manager
+
+    try:
+        _loop.run_until_complete(multi_tenant_manager.close_all())
+        _loop.run_until_complete(_loop.shutdown_asyncgens())
+    except Exception as e:
+        logger.error(f"Error disposing worker database engines: {e}")
+    finally:
+        _loop.close()
+        _loop = None
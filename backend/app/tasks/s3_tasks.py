@@ -1,20 +1,22 @@
-import asyncio
 import json
 import logging
 from datetime import datetime
+from functools import partial
 from typing import Optional
 from uuid import UUID
 from croniter import croniter
 from app.dependencies.injector import injector
 from app.core.utils.s3_utils import S3Client
+from app.modules.data import IngestDocument
 from app.modules.data.manager import AgentRAGServiceManager
-from app.modules.data.utils import FileTextExtractor
+from app.modules.data.utils import get_extraction_service
 from app.schemas.agent_knowledge import KBCreate
 from app.services.agent_knowledge import KnowledgeBaseService
 from app.services.datasources import DataSourceService
 from celery import shared_task
 from fastapi_injector import RequestScopeFactory
 from app.tasks.base import run_task_for_all_tenants
+from app.tasks.runner import run_async
 
 
 logger = logging.getLogger(__name__)
@@ -23,6 +25,13 @@ logger = logging.getLogger(__name__)
 # Helper function removed - now using simplified manager
 
 
+def _extract_s3_file(s3_client: S3Client, key: str) -> str:
+    """Download and extract an S3 file, runs in an ingestion extraction thread"""
+    logger.info(f"Extracting text from {key}...")
+    file_content = s3_client.get_file_content(key)
+    return get_extraction_service().extract_sync(filename=key, content=file_content)
+
+
 @shared_task
 def import_s3_files_to_kb():
     """
@@ -34,8 +43,7 @@ def import_s3_files_to_kb():
         max_files: Maximum number of files to process
         embeddings_model: Model to use for embeddings
     """
-    loop = asyncio.get_event_loop()
-    return loop.run_until_complete(import_s3_files_to_kb_async_with_scope())
+    return run_async(import_s3_files_to_kb_async_with_scope())
 
 
 async def import_s3_files_to_kb_async_with_scope():
@@ -48,7 +56,7 @@ async def import_s3_files_to_kb_async_with_scope():
             async with request_scope_factory.create_scope():
                 return await import_s3_files_to_kb_async()
 
-        results = await run_task_for_all_tenants(run_with_scope)
+        results = await run_task_for_all_tenants(run_with_scope, subtask=import_s3_files_to_kb_async)
 
         logger.info(f"S3 import completed for {len(results)} tenant(s)")
         return {
@@ -214,49 +222,36 @@ async def import_s3_files_to_kb_async(kb_id: Optional[UUID] = None):
                     kb_errors.append(error_msg)
                     continue
 
-        current_file = 0
-        # add new files to RAG
+        # add new files to RAG, downloads and extraction run in the ingestion pipeline
+        documents = []
         for file_info in s3_new_files:
-            try:
-                current_file += 1
-                logger.info(f"Processing file {current_file} of {len(result['files'])}")
-
-                # Download file content
-                file_content = s3_client.get_file_content(file_info["key"])
-                logger.info(f"Extracting text from {file_info}...")
-                extracted_text = FileTextExtractor().extract(
-                    filename=file_info["key"], content=file_content
-                )
-
-                # Create knowledge base item
-                last_file_date = datetime.strptime(
-                    file_info["last_modified"], "%Y-%m-%dT%H:%M:%S%z"
-                )
-                if not kb.last_file_date or last_file_date > kb.last_file_date:
-                    last_file_date = datetime.now()
-
-                # add doc to RAG
-                doc_id = "KB:" + str(kb.id) + "#" + file_info["key"]
-                file_name = file_info["key"].split("/")[-1]
-
-                metadata = {
-                    "name": file_name,
-                    "description": f"File in {kb.name} from S3 source {ds.name}",  # type: ignore
-                    "kb_id": str(kb.id),
-                }
-
-                # Add to knowledge base using simplified manager
-                res = await rag_manager.add_document(
-                    kb, doc_id, extracted_text, metadata
-                )
-                logger.info(f"Document {file_name} processed with result: {res}")
-                files_added += 1
-
-            except Exception as e:
-                error_msg = f"Error processing file {file_info['key']}: {str(e)}"
-                logger.error(error_msg)
-                kb_errors.append(error_msg)
-                continue
+            # Create knowledge base item
+            last_file_date = datetime.strptime(
+                file_info["last_modified"], "%Y-%m-%dT%H:%M:%S%z"
+            )
+            if not kb.last_file_date or last_file_date > kb.last_file_date:
+                last_file_date = datetime.now()
+
+            doc_id = "KB:" + str(kb.id) + "#" + file_info["key"]
+            file_name = file_info["key"].split("/")[-1]
+
+            metadata = {
+                "name": file_name,
+                "description": f"File in {kb.name} from S3 source {ds.name}",  # type: ignore
+                "kb_id": str(kb.id),
+            }
+            documents.append(IngestDocument(
+                doc_id=doc_id,
+                metadata=metadata,
+                extract=partial(_extract_s3_file, s3_client, file_info["key"]),
+            ))
+
+        if documents:
+            logger.info(f"Adding {len(documents)} files to RAG...")
+            res = await rag_manager.add_documents(kb, documents)
+            logger.info(f"S3 files processed with stats: {res.get('stats')}")
+            files_added += res.get("successful", 0)
+            kb_errors.extend(res.get("errors", []))
 
         # Check final status
         existing_files = await rag_manager.get_document_ids(kb)
@@ -1,9 +1,9 @@
-import asyncio
 import logging
 from datetime import datetime, timezone
 from typing import Optional
 
 from celery import shared_task
+from app.tasks.runner import run_async
 from fastapi_injector import RequestScopeFactory
 from io import BytesIO
 
@@ -26,8 +26,7 @@ def transcribe_audio_files_from_smb():
     """
     Celery task to process audio files from SMB share.
     """
-    loop = asyncio.get_event_loop()
-    return loop.run_until_complete(transcribe_audio_files_async_with_scope())
+    return run_async(transcribe_audio_files_async_with_scope())
 
 
 async def transcribe_audio_files_async_with_scope(ds_id: Optional[str] = None):
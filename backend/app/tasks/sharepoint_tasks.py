@@ -1,14 +1,15 @@
-import asyncio
 import json
 import logging
 from datetime import datetime, timezone
-from typing import Optional
+from functools import partial
+from typing import Any, Dict, Optional
 from uuid import UUID
 from croniter import croniter, CroniterBadCronError
 from celery import shared_task
 from fastapi_injector import RequestScopeFactory
-from app.modules.data.utils import FileTextExtractor
+from app.modules.data.utils import get_extraction_service
 from app.dependencies.injector import injector
+from app.modules.data import IngestDocument
 from app.modules.data.manager import AgentRAGServiceManager
 from app.schemas.agent_knowledge import KBCreate
 from app.services.agent_knowledge import KnowledgeBaseService
@@ -17,6 +18,7 @@ from app.modules.integration.office365_connector import Office365Connector
 from app.services.app_settings import AppSettingsService
 from app.core.utils.encryption_utils import decrypt_key
 from app.tasks.base import run_task_for_all_tenants
+from app.tasks.runner import run_async
 
 logger = logging.getLogger(__name__)
 
@@ -25,6 +27,21 @@ logger = logging.getLogger(__name__)
 
 
 # ------------------------------ Helpers --------------------------------- #
+def _extract_sharepoint_file(sp_client: Office365Connector, file_info: Dict[str, Any]) -> str:
+    """Download and extract a SharePoint file, runs in an ingestion extraction thread"""
+    file_content = sp_client.get_file_content(file_info["download_url"])
+    if len(file_content) == 0:
+        logger.warning(
+            f"File {file_info.get('name', '')} has no content, skipping...")
+        return ""
+
+    # Use the filename's suffix to indentify the type (e.g., .docx)
+    return get_extraction_service().extract_sync(
+        filename=file_info.get("name", ""),
+        content=file_content,
+    )
+
+
 def _compute_next_run(cron_expr: Optional[str], last_synced: Optional[datetime]) -> Optional[datetime]:
     """
     Validate cron expression and compute the next run as a datetime.
@@ -50,8 +67,7 @@ def _compute_next_run(cron_expr: Optional[str], last_synced: Optional[datetime])
 
 @shared_task
 def import_sharepoint_files_to_kb():
-    loop = asyncio.get_event_loop()
-    return loop.run_until_complete(import_sharepoint_files_to_kb_async_with_scope())
+    return run_async(import_sharepoint_files_to_kb_async_with_scope())
 
 
 async def import_sharepoint_files_to_kb_async_with_scope():
@@ -64,7 +80,9 @@ async def import_sharepoint_files_to_kb_async_with_scope():
             async with request_scope_factory.create_scope():
                 return await import_sharepoint_files_to_kb_async()
 
-        results = await run_task_for_all_tenants(run_with_scope)
+        results = await run_task_for_all_tenants(
+            run_with_scope, subtask=import_sharepoint_files_to_kb_async
+        )
 
         logger.info(
             f"SharePoint import completed for {len(results)} tenant(s)")
@@ -195,38 +213,23 @@ async def import_sharepoint_files_to_kb_async(kb_id: Optional[UUID] = None):
                     errors.append(f"Delete failed {filename}: {str(e)}")
 
             # ---- add new files ----
-            for file_info in new_files:
-                try:
-                    file_content = sp_client.get_file_content(
-                        file_info["download_url"])
-                    if len(file_content) == 0:
-                        logger.warning(
-                            f"File {file_info.get('name', '')} has no content, skipping...")
-                        continue
-
-                    # Use the filename's suffix to indentify the type (e.g., .docx)
-                    extracted_text = FileTextExtractor().extract_from_bytes(
-                        filename=file_info.get("name", ""),
-                        content=file_content,
-                    )
-
-                    # add doc to RAG
-                    doc_id = f"KB:{kb.id}#{file_info['path']}"
-                    metadata = {
+            documents = [
+                IngestDocument(
+                    doc_id=f"KB:{kb.id}#{file_info['path']}",
+                    metadata={
                         "name": file_info.get("name", ""),
                         "description": f"Imported from SharePoint: {file_info.get('path', '')}",
                         "kb_id": str(kb.id),
-                    }
-
-                    # Add to knowledge base using simplified manager
-                    await rag_manager.add_document(kb, doc_id, extracted_text, metadata)
-                    files_added_tot += 1
-
-                except Exception as e:
-                    logger.error(
-                        f"Error processing {file_info.get('path', '<unknown>')}: {e}")
-                    errors.append(
-                        f"Error processing {file_info.get('path', '<unknown>')}: {str(e)}")
+                    },
+                    extract=partial(_extract_sharepoint_file, sp_client, file_info),
+                )
+                for file_info in new_files
+            ]
+            if documents:
+                # Add to knowledge base through the ingestion pipeline
+                res = await rag_manager.add_documents(kb, documents)
+                files_added_tot += res.get("successful", 0)
+                errors.extend(res.get("errors", []))
 
             # ---- update KB sync timestamps ----
             kb_update = json.loads(kb.model_dump_json())
@@ -1,4 +1,3 @@
-import asyncio
 import logging
 from uuid import UUID
 from datetime import datetime
@@ -34,14 +33,14 @@ from app.dependencies.injector import injector
 from celery import shared_task
 from fastapi_injector import RequestScopeFactory
 from app.tasks.base import run_task_for_all_tenants
+from app.tasks.runner import run_async
 
 logger = logging.getLogger(__name__)
 
 
 @shared_task
 def analyze_zendesk_tickets_task():
-    loop = asyncio.get_event_loop()
-    return loop.run_until_complete(analyze_zendesk_tickets_async_with_scope())
+    return run_async(analyze_zendesk_tickets_async_with_scope())
 
 
 async def analyze_zendesk_tickets_async_with_scope():
@@ -54,7 +53,7 @@ async def analyze_zendesk_tickets_async_with_scope():
             async with request_scope_factory.create_scope():
                 return await process_zendesk_tickets()
 
-        results = await run_task_for_all_tenants(run_with_scope)
+        results = await run_task_for_all_tenants(run_with_scope, subtask=process_zendesk_tickets)
         
         logger.info(f"Zendesk analysis completed for {len(results)} tenant(s)")
         return {
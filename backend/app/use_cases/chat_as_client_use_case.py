@@ -1,8 +1,10 @@
 import asyncio
 from datetime import datetime, timezone
 from uuid import UUID
+from fastapi import HTTPException
 from app.dependencies.injector import injector
-from app.api.v1.routes.agents import run_query_agent_logic
+from app.api.v1.routes.agents import run_query_agent_logic, stream_query_agent_logic
+from app.core.config.settings import settings
 from app.core.exceptions.error_messages import ErrorKey
 from app.core.exceptions.exception_classes import AppException
 from app.core.utils.enums.conversation_status_enum import ConversationStatus
@@ -90,12 +92,24 @@ async def process_conversation_update_with_agent(
             model.metadata = {}
         model.metadata["thread_id"] = str(conversation_id)
 
-        agent_response = await run_query_agent_logic(
-            agent_service,
-            str(agent.id),
-            session_message=model.messages[-1].text,
-            metadata=model.metadata,
-        )
+        agent_message_id = generate_sequential_uuid()
+        if settings.IN_PROGRESS_STREAM_AGENT_TOKENS:
+            agent_response = await _stream_agent_answer(
+                agent_service,
+                str(agent.id),
+                model,
+                agent_message_id,
+                conversation_id=conversation_id,
+                current_user_id=current_user_id,
+                tenant_id=tenant_id,
+            )
+        else:
+            agent_response = await run_query_agent_logic(
+                agent_service,
+                str(agent.id),
+                session_message=model.messages[-1].text,
+                metadata=model.metadata,
+            )
 
         agent_answer = agent_response.get("response", "No answer found")
 
@@ -105,7 +119,7 @@ async def process_conversation_update_with_agent(
         elapsed_seconds = (now - conversation.created_at).total_seconds()
 
         transcript_object = TranscriptSegmentInput(
-            id=generate_sequential_uuid(),  # Generate ID upfront
+            id=agent_message_id,  # Generated upfront, deltas were broadcast with it
             create_time=now,
             start_time=elapsed_seconds,
             end_time=elapsed_seconds,
@@ -203,3 +217,45 @@ async def get_or_create_conversation(
         )
 
     return open_conversation
+
+
+async def _stream_agent_answer(
+    agent_service: AgentConfigService,
+    agent_id: str,
+    model: InProgConvTranscrUpdate,
+    message_id: UUID,
+    conversation_id: UUID,
+    current_user_id: UUID,
+    tenant_id: str,
+) -> dict:
+    """
+    Query the agent, broadcasting its answer to the conversation room as
+    "message_delta" events while it is generated. Each delta carries the text
+    so far, so a client that misses (or coalesces) some still shows it all.
+    Returns the query response, as run_query_agent_logic does.
+    """
+    socket_connection_manager = injector.get(SocketConnectionManager)
+    text = ""
+    done = None
+    async for event in stream_query_agent_logic(
+        agent_service,
+        agent_id,
+        session_message=model.messages[-1].text,
+        metadata=model.metadata,
+    ):
+        if event["type"] == "done":
+            done = event
+        elif event["type"] == "token":
+            text += event["text"]
+            await socket_connection_manager.broadcast(
+                msg_type="message_delta",
+                payload={"id": str(message_id), "speaker": "agent", "delta": event["text"], "text": text},
+                room_id=conversation_id,
+                current_user_id=current_user_id,
+                required_topic="message",
+                tenant_id=tenant_id,
+            )
+
+    if done["response"].get("status") == "error":
+        raise HTTPException(status_code=400, detail=done.get("message"))
+    return done["response"]
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark: legacy ``replace_config_vars`` vs precompiled ``ConfigTemplate``.
+
+Renders node configs of roughly 1 KB, 100 KB and 1 MB (a prompt template, a
+python code node and an OpenAPI-like spec with a handful of placeholders) and
+reports the mean time per execution for both paths.
+
+Usage:
+    python scripts/benchmarks/bench_config_templates.py [--repeat N]
+"""
+
+import argparse
+import json
+import os
+import sys
+import timeit
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from app.modules.workflow.engine.config_template import ConfigTemplate
+from app.modules.workflow.engine.utils import get_nested_value, replace_config_vars
+
+
+class BenchState:
+    """Minimal stand-in for WorkflowState, only variable lookups are needed."""
+
+    def __init__(self, values: dict):
+        self.values = values
+
+    def get_value(self, key_path: str, default=None):
+        result = get_nested_value(self.values, key_path)
+        return result if result is not None else default
+
+
+def build_config(target_size: int) -> dict:
+    """Build a node config of about ``target_size`` bytes of JSON."""
+    paragraph = "Answer politely and cite the knowledge base when relevant. " * 8
+    operation = {
+        "summary": "Get a resource",
+        "parameters": [{"name": "id", "in": "path", "required": True}],
+        "responses": {"200": {"description": "OK"}},
+    }
+    config = {
+        "id": "node-1",
+        "type": "llmModelNode",
+        "data": {
+            "name": "Benchmark node",
+            "systemPrompt": "You talk to {{session.customer.name}}. " + paragraph,
+            "userPrompt": "{{source.message}}",
+            "code": "def run(params):\n    return {{source}}\n",
+            "spec": {"paths": {}},
+        },
+    }
+    size = len(str(config))
+    index = 0
+    while size < target_size:
+        config["data"]["spec"]["paths"][f"/resource/{index}"] = {"get": operation}
+        config["data"]["systemPrompt"] += paragraph
+        size += len(str(operation)) + len(paragraph) + 30
+        index += 1
+    # Parse it back like a stored workflow, so no subtree is shared
+    return json.loads(json.dumps(config))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    state = BenchState({"session": {"customer": {"name": "Ada"}}})
+    source_output = {"message": "Where is my order?", "order": {"id": 42, "items": [1, 2]}}
+
+    print(f"{'size':>8} {'legacy (ms)':>12} {'compiled (ms)':>14} {'speedup':>8}")
+    for label, size in (("1KB", 1_000), ("100KB", 100_000), ("1MB", 1_000_000)):
+        config = build_config(size)
+        template = ConfigTemplate(config)
+        assert template.render(state, source_output) == replace_config_vars(config, state, source_output)
+
+        legacy = timeit.timeit(
+            lambda: replace_config_vars(config, state, source_output), number=args.repeat
+        ) / args.repeat
+        compiled = timeit.timeit(
+            lambda: template.render(state, source_output), number=args.repeat
+        ) / args.repeat
+        print(f"{label:>8} {legacy * 1000:12.3f} {compiled * 1000:14.3f} {legacy / compiled:7.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Benchmark: document extraction throughput of the extraction service.
+
+Extracts a mixed corpus (PDF, Word, HTML, text, ...) with a growing number
+of pool workers and reports, per worker count:
+
+  - documents and pages per second,
+  - pages per second per core (workers capped at the CPU count),
+  - how many PDFs were split into page ranges,
+
+then replays the corpus against the warm cache to show the cost of a hit.
+
+The corpus is the extractor test files unless --corpus points to a
+directory. Every file is submitted --copies times; PDFs and text files get
+a distinct trailer per copy so each copy is a cache miss. Pages are counted
+with pypdf for PDFs and as 3000 characters of extracted text otherwise.
+
+Usage:
+    python scripts/benchmarks/bench_extraction_service.py [--corpus DIR] [--copies 4]
+        [--workers 1,2,4] [--pages-per-task 20]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+from typing import List, Tuple
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from app.modules.data.utils.extraction_service import ExtractionService, _pdf_page_count  # noqa: E402
+
+DEFAULT_CORPUS = Path(__file__).resolve().parents[2] / "tests" / "unit" / "file_extract_tests" / "test_files"
+TEXT_SUFFIXES = {".txt", ".md", ".csv", ".json", ".html", ".htm", ".xml"}
+CHARS_PER_PAGE = 3000
+
+
+def load_corpus(directory: Path, copies: int) -> List[Tuple[str, bytes]]:
+    documents = []
+    for path in sorted(p for p in directory.iterdir() if p.is_file()):
+        content = path.read_bytes()
+        suffix = path.suffix.lower()
+        if suffix == ".pdf":
+            variants = [content + f"\n%copy {i}\n".encode() for i in range(copies)]
+        elif suffix in TEXT_SUFFIXES:
+            variants = [content + f"\n{i}\n".encode() for i in range(copies)]
+        else:
+            # Appending bytes could corrupt binary formats, extract them once
+            variants = [content]
+        documents.extend((path.name, variant) for variant in variants)
+    return documents
+
+
+def count_pages(filename: str, content: bytes, text: str) -> int:
+    if filename.lower().endswith(".pdf"):
+        import tempfile
+
+        with tempfile.NamedTemporaryFile(suffix=".pdf") as tmp:
+            tmp.write(content)
+            tmp.flush()
+            pages = _pdf_page_count(tmp.name)
+        if pages:
+            return pages
+    return max(1, len(text) // CHARS_PER_PAGE)
+
+
+async def extract_all(service: ExtractionService, documents: List[Tuple[str, bytes]]) -> List[str]:
+    results = await asyncio.gather(
+        *(service.extract(filename=name, content=content) for name, content in documents),
+        return_exceptions=True,
+    )
+    return [r if isinstance(r, str) else "" for r in results]
+
+
+async def run(documents: List[Tuple[str, bytes]], workers: int, pages_per_task: int) -> dict:
+    service = ExtractionService(workers=workers, pdf_pages_per_task=pages_per_task, cache_max_bytes=512 * 1024 * 1024)
+    # Start the pool outside the timed section
+    service._get_pool()
+
+    started = time.perf_counter()
+    texts = await extract_all(service, documents)
+    cold = time.perf_counter() - started
+
+    started = time.perf_counter()
+    await extract_all(service, documents)
+    warm = time.perf_counter() - started
+
+    stats = service.stats()
+    service._reset_pool()
+    pages = sum(count_pages(name, content, text) for (name, content), text in zip(documents, texts) if text)
+    cores = max(1, min(workers, os.cpu_count() or 1))
+    return {
+        "workers": workers,
+        "docs_per_sec": len(documents) / cold,
+        "pages": pages,
+        "pages_per_sec": pages / cold,
+        "pages_per_sec_per_core": pages / cold / cores,
+        "split": stats["split_documents"],
+        "failures": sum(1 for text in texts if not text),
+        "cold_s": cold,
+        "hit_ms": warm / len(documents) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the document extraction service")
+    parser.add_argument("--corpus", type=Path, default=DEFAULT_CORPUS, help="Directory of documents")
+    parser.add_argument("--copies", type=int, default=4, help="Submissions of each PDF/text file")
+    parser.add_argument(
+        "--workers",
+        default=f"1,2,{os.cpu_count() or 1}",
+        help="Comma-separated pool sizes to compare",
+    )
+    parser.add_argument("--pages-per-task", type=int, default=20, help="PDF pages per worker task")
+    args = parser.parse_args()
+
+    documents = load_corpus(args.corpus, args.copies)
+    if not documents:
+        sys.exit(f"No documents in {args.corpus}")
+    print(f"Corpus: {len(documents)} documents, {sum(len(c) for _, c in documents) / 1e6:.1f} MB from {args.corpus}")
+    print(f"CPUs: {os.cpu_count()}, pages per task: {args.pages_per_task}\n")
+
+    header = f"{'workers':>7} {'docs/s':>8} {'pages':>6} {'pages/s':>8} {'pages/s/core':>12} {'split':>5} {'failed':>6} {'cold s':>7} {'hit ms':>7}"
+    print(header)
+    print("-" * len(header))
+    for workers in sorted({int(w) for w in args.workers.split(",") if w.strip()}):
+        r = asyncio.run(run(documents, workers, args.pages_per_task))
+        print(
+            f"{r['workers']:>7} {r['docs_per_sec']:>8.1f} {r['pages']:>6} {r['pages_per_sec']:>8.1f} "
+            f"{r['pages_per_sec_per_core']:>12.1f} {r['split']:>5} {r['failures']:>6} {r['cold_s']:>7.2f} {r['hit_ms']:>7.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
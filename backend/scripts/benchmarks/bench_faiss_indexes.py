@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Benchmark: approximate FAISS index types against the exact flat index.
+
+Builds the indexes ``FaissVectorDB`` creates for ``flat``, ``hnsw``,
+``ivf_flat`` and ``ivf_pq`` on synthetic clustered corpora (normalized, as
+for cosine similarity) and reports, per index and search parameter:
+
+  - recall@k against the flat index,
+  - p50 / p99 single-query latency,
+  - memory per vector (serialized index size / vectors).
+
+The SQLite sidecar and WAL are bypassed, only the indexes are measured. A 5M
+corpus at 384 dimensions needs about 8 GB of RAM for the raw vectors alone.
+
+Usage:
+    python scripts/benchmarks/bench_faiss_indexes.py [--sizes 100000 1000000 5000000]
+        [--dim 384] [--queries 1000] [--k 10]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import faiss  # noqa: E402
+
+from app.modules.data.providers.vector.db.base import VectorDBConfig  # noqa: E402
+from app.modules.data.providers.vector.db.faiss import (  # noqa: E402
+    ADD_BATCH_SIZE,
+    FaissVectorDB,
+)
+
+NPROBE_SWEEP = (8, 16, 64)
+EF_SEARCH_SWEEP = (32, 100, 256)
+
+
+def make_corpus(size: int, dim: int, rng: np.random.Generator) -> np.ndarray:
+    """Gaussian mixture, close enough to sentence embeddings for index behaviour."""
+    centers = rng.normal(size=(max(size // 1000, 16), dim)).astype(np.float32)
+    corpus = np.empty((size, dim), dtype=np.float32)
+    for start in range(0, size, ADD_BATCH_SIZE):
+        end = min(start + ADD_BATCH_SIZE, size)
+        assignment = rng.integers(0, len(centers), end - start)
+        corpus[start:end] = centers[assignment] + 0.5 * rng.normal(size=(end - start, dim))
+    faiss.normalize_L2(corpus)
+    return corpus
+
+
+def make_queries(corpus: np.ndarray, count: int, rng: np.random.Generator) -> np.ndarray:
+    rows = rng.choice(len(corpus), count, replace=False)
+    queries = corpus[rows] + 0.1 * rng.normal(size=(count, corpus.shape[1])).astype(np.float32)
+    faiss.normalize_L2(queries)
+    return queries
+
+
+def build_index(index_type: str, corpus: np.ndarray):
+    db = FaissVectorDB(VectorDBConfig(type="faiss", index_type=index_type))
+    db.faiss = faiss
+    dim = corpus.shape[1]
+    start = time.perf_counter()
+    if index_type.startswith("ivf"):
+        rng = np.random.default_rng(0)
+        index = db._new_ivf_index(
+            dim, len(corpus), lambda size: corpus[np.sort(rng.choice(len(corpus), size, replace=False))])
+    else:
+        index = db._new_index(dim)
+    for offset in range(0, len(corpus), ADD_BATCH_SIZE):
+        batch = corpus[offset:offset + ADD_BATCH_SIZE]
+        index.add_with_ids(batch, np.arange(offset, offset + len(batch), dtype=np.int64))
+    return db, index, time.perf_counter() - start
+
+
+def search_params(index_type: str, value):
+    if index_type.startswith("ivf"):
+        return faiss.SearchParametersIVF(nprobe=value)
+    if index_type == "hnsw":
+        return faiss.SearchParametersHNSW(efSearch=value)
+    return None
+
+
+def measure(index, queries: np.ndarray, k: int, params, truth: np.ndarray):
+    latencies = np.empty(len(queries))
+    found = np.empty((len(queries), k), dtype=np.int64)
+    for i, query in enumerate(queries):
+        start = time.perf_counter()
+        _, ids = index.search(query[None, :], k, params=params)
+        latencies[i] = time.perf_counter() - start
+        found[i] = ids[0]
+    recall = np.mean([len(np.intersect1d(f, t)) / k for f, t in zip(found, truth)])
+    return recall, np.percentile(latencies, 50) * 1000, np.percentile(latencies, 99) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000, 5_000_000])
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--types", nargs="+", default=["flat", "hnsw", "ivf_flat", "ivf_pq"])
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    print(f"{'size':>9} {'index':>9} {'param':>10} {'recall@k':>9} {'p50 ms':>8} {'p99 ms':>8} "
+          f"{'B/vector':>9} {'build s':>8}")
+    for size in args.sizes:
+        corpus = make_corpus(size, args.dim, rng)
+        queries = make_queries(corpus, args.queries, rng)
+
+        flat = faiss.IndexFlatIP(args.dim)
+        flat.add(corpus)
+        _, truth = flat.search(queries, args.k)
+        del flat
+
+        for index_type in args.types:
+            db, index, build_seconds = build_index(index_type, corpus)
+            bytes_per_vector = faiss.serialize_index(index).nbytes / index.ntotal
+            if index_type.startswith("ivf"):
+                sweep = [("nprobe", value) for value in NPROBE_SWEEP]
+            elif index_type == "hnsw":
+                sweep = [("efSearch", value) for value in EF_SEARCH_SWEEP]
+            else:
+                sweep = [("-", None)]
+            for name, value in sweep:
+                recall, p50, p99 = measure(
+                    index, queries, args.k, search_params(index_type, value), truth)
+                param = f"{name}={value}" if value is not None else name
+                print(f"{size:>9} {index_type:>9} {param:>10} {recall:>9.3f} {p50:>8.3f} {p99:>8.3f} "
+                      f"{bytes_per_vector:>9.1f} {build_seconds:>8.1f}", flush=True)
+            del index, db
+        del corpus
+
+
+if __name__ == "__main__":
+    main()
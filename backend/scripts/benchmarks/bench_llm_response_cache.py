@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Benchmark: hit rates of the LLM response cache on a replayed transcript set.
+
+Replays the analysis calls of a transcript set the way production sends
+them: every transcript is analysed (KPI analysis and speaker separation),
+part of them again (retried jobs, Zendesk re-syncs, reprocessing), and
+short in-progress hostility prompts arrive with small differences in
+punctuation, casing or whitespace. The LLM is simulated, the report gives,
+for the exact level alone and with the semantic level:
+
+  - hit rate per level,
+  - wrong hits: semantic hits answered with the response of a prompt that
+    differs in more than punctuation, casing or whitespace,
+  - LLM calls and (estimated) prompt tokens saved,
+  - wall time of the replay, lookup and embedding overhead included.
+
+Transcripts are synthetic unless --transcripts points to a directory of
+JSON files (lists of {"speaker", "text"} segments). The semantic level uses
+a hashing embedder unless --embedder huggingface is given, which loads the
+default embedding model of the vector providers.
+
+Usage:
+    python scripts/benchmarks/bench_llm_response_cache.py [--transcripts DIR] [--count 200]
+        [--replay 0.6] [--embedder hashing|huggingface] [--similarity 0.97] [--semantic-max-chars 500]
+"""
+
+import argparse
+import asyncio
+import glob
+import json
+import os
+import random
+import sys
+import time
+from typing import List, Tuple
+
+import numpy as np
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from app.cache.llm_response_cache import LlmCacheKey, LlmResponseCache, model_namespace  # noqa: E402
+from app.modules.workflow.llm.gateway import estimate_tokens  # noqa: E402
+
+NAMESPACE = model_namespace("openai", "gpt-4o")
+PHRASES = [
+    "I was charged twice for my last order",
+    "the package arrived late and damaged",
+    "can you reset my password please",
+    "I want to cancel my subscription",
+    "your agent hung up on me yesterday",
+    "the app keeps crashing when I pay",
+    "thanks, that solved my problem",
+]
+
+
+class HashingEmbedder:
+    """Character trigram hashing, enough to tell near-duplicate prompts apart"""
+
+    def __init__(self, dim: int = 512):
+        self.dim = dim
+
+    async def embed_query(self, text: str) -> List[float]:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        text = normalize(text)
+        for i in range(len(text) - 2):
+            vector[hash(text[i:i + 3]) % self.dim] += 1.0
+        return vector.tolist()
+
+
+def synthetic_transcripts(count: int, rng: random.Random) -> List[str]:
+    transcripts = []
+    for _ in range(count):
+        segments = [
+            {"speaker": f"SPEAKER_0{turn % 2}", "text": f"{rng.choice(PHRASES)} (ref {rng.randint(1000, 9999)})"}
+            for turn in range(rng.randint(6, 30))
+        ]
+        transcripts.append(json.dumps(segments))
+    return transcripts
+
+
+def load_transcripts(directory: str) -> List[str]:
+    transcripts = []
+    for path in sorted(glob.glob(os.path.join(directory, "*.json"))):
+        with open(path) as f:
+            transcripts.append(json.dumps(json.load(f)))
+    return transcripts
+
+
+def normalize(text: str) -> str:
+    return " ".join("".join(c if c.isalnum() else " " for c in text.lower()).split())
+
+
+def perturb(text: str, rng: random.Random) -> str:
+    """The same question, typed again"""
+    choice = rng.randrange(3)
+    if choice == 0:
+        return text.upper()[0] + text[1:] + "!"
+    if choice == 1:
+        return "  ".join(text.split())
+    return text.rstrip(".") + "."
+
+
+def replay_calls(transcripts: List[str], replay: float, rng: random.Random) -> List[str]:
+    """Prompts of the analysis calls, in the order they are sent"""
+    calls = []
+    for transcript in transcripts:
+        calls.append(f"system: Analyse the KPIs\nhuman: {transcript}")
+        calls.append(f"system: Separate the speakers\nhuman: {transcript}")
+    # Retries, re-syncs and reprocessing jobs
+    for transcript in rng.sample(transcripts, int(len(transcripts) * replay)):
+        calls.append(f"system: Analyse the KPIs\nhuman: {transcript}")
+    # Short in-progress hostility prompts, partly re-typed
+    questions = [f"system: Rate the hostility\nhuman: {phrase}" for phrase in PHRASES]
+    for _ in range(len(transcripts)):
+        question = rng.choice(questions)
+        calls.append(perturb(question, rng) if rng.random() < 0.5 else question)
+    rng.shuffle(calls)
+    return calls
+
+
+async def run(calls: List[str], cache: LlmResponseCache) -> Tuple[int, int, int, float]:
+    """Replays the calls, returns the LLM calls made, their prompt tokens, the wrong hits and the wall time"""
+    llm_calls = tokens = wrong = 0
+    start = time.perf_counter()
+    for prompt in calls:
+        key = LlmCacheKey(NAMESPACE, prompt)
+        # The simulated response names its prompt
+        response = await cache.lookup(key)
+        if response is None:
+            llm_calls += 1
+            tokens += estimate_tokens(prompt)
+            await cache.store(key, normalize(prompt))
+        elif response != normalize(prompt):
+            wrong += 1
+    return llm_calls, tokens, wrong, time.perf_counter() - start
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--transcripts", help="Directory of JSON transcripts")
+    parser.add_argument("--count", type=int, default=200, help="Synthetic transcripts")
+    parser.add_argument("--replay", type=float, default=0.6, help="Share of transcripts analysed again")
+    parser.add_argument("--embedder", choices=("hashing", "huggingface"), default="hashing")
+    parser.add_argument("--similarity", type=float, default=0.97)
+    parser.add_argument("--semantic-max-chars", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    transcripts = load_transcripts(args.transcripts) if args.transcripts else synthetic_transcripts(args.count, rng)
+    calls = replay_calls(transcripts, args.replay, rng)
+    total_tokens = sum(estimate_tokens(prompt) for prompt in calls)
+
+    embedder = HashingEmbedder()
+    if args.embedder == "huggingface":
+        from app.modules.data.providers.vector.embedding import EmbeddingConfig
+
+        embedder = EmbeddingConfig().get()
+        await embedder.initialize()
+
+    print(f"{len(transcripts)} transcripts, {len(calls)} calls, {total_tokens} prompt tokens")
+    print(
+        f"{'cache':>16} {'exact':>7} {'semantic':>9} {'wrong':>6} {'hit rate':>9} {'LLM calls':>10} "
+        f"{'tokens saved':>13} {'time (ms)':>10}"
+    )
+    for label, semantic in (("exact", False), ("exact+semantic", True)):
+        cache = LlmResponseCache(
+            ttl_seconds=3600,
+            max_entries=len(calls),
+            semantic_enabled=semantic,
+            similarity=args.similarity,
+            semantic_max_chars=args.semantic_max_chars,
+            embedder=embedder,
+        )
+        llm_calls, tokens, wrong, elapsed = await run(calls, cache)
+        stats = cache.stats()
+        print(
+            f"{label:>16} {stats['memory_hits']:7d} {stats['semantic_hits']:9d} {wrong:6d} {stats['hit_rate']:9.1%} "
+            f"{llm_calls:10d} {1 - tokens / total_tokens:13.1%} {elapsed * 1000:10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Benchmark: local WebSocket fan-out of ``SocketConnectionManager``.
+
+Connects N fake clients to one room (a fraction of them slow) and
+broadcasts a series of messages locally, every --interval seconds, reporting per connection count:
+
+  - broadcast call latency (p50 / p99), i.e. how long the publisher waits,
+  - delivery latency to the fast clients (p50 / p99), from the broadcast
+    call to their ``send_text``,
+  - messages dropped or coalesced for the slow clients.
+
+The same run with sequential awaited sends, as before per-connection send
+queues, is reported as a baseline.
+
+Usage:
+    python scripts/benchmarks/bench_websocket_fanout.py [--connections 1000 10000]
+        [--messages 20] [--interval 0.05] [--slow-fraction 0.01] [--slow-delay 0.01]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+import uuid
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from app.modules.websockets.socket_connection_manager import SocketConnectionManager  # noqa: E402
+
+ROOM_ID = "bench"
+
+
+class FakeWebSocket:
+    """Records when each message arrives, optionally taking send_delay per send."""
+
+    def __init__(self, send_delay: float = 0.0):
+        self.send_delay = send_delay
+        self.received = []
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, message: str):
+        if self.send_delay:
+            await asyncio.sleep(self.send_delay)
+        # Messages to fast clients are never dropped, so arrive in sequence order
+        self.received.append(time.perf_counter())
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * q), len(ordered) - 1)] * 1000 if ordered else 0.0
+
+
+async def make_clients(manager, connections, slow_fraction, slow_delay):
+    slow_every = int(1 / slow_fraction) if slow_fraction else 0
+    clients = []
+    for index in range(connections):
+        slow = slow_every and index % slow_every == 0
+        websocket = FakeWebSocket(slow_delay if slow else 0.0)
+        await manager.connect(websocket, ROOM_ID, uuid.uuid4(), ["*"])
+        clients.append((websocket, slow))
+    return clients
+
+
+async def run_queued(connections, messages, interval, slow_fraction, slow_delay):
+    manager = SocketConnectionManager()
+    clients = await make_clients(manager, connections, slow_fraction, slow_delay)
+    fast = [websocket for websocket, slow in clients if not slow]
+    broadcast_latency, sent_at = [], {}
+
+    for seq in range(messages):
+        sent_at[seq] = start = time.perf_counter()
+        await manager.broadcast(ROOM_ID, "update", uuid.uuid4(), {"seq": seq})
+        broadcast_latency.append(time.perf_counter() - start)
+        await asyncio.sleep(interval)
+
+    # Wait for the fast clients to drain
+    while any(len(websocket.received) < messages for websocket in fast):
+        await asyncio.sleep(0.01)
+    delivery = [received - sent_at[seq] for websocket in fast for seq, received in enumerate(websocket.received)]
+    stats = await manager.get_connection_stats()
+    await manager.cleanup()
+    return broadcast_latency, delivery, stats["dropped_messages"], stats["coalesced_messages"]
+
+
+async def run_sequential(connections, messages, interval, slow_fraction, slow_delay):
+    manager = SocketConnectionManager()
+    clients = await make_clients(manager, connections, slow_fraction, slow_delay)
+    await manager.cleanup()
+    fast = [websocket for websocket, slow in clients if not slow]
+    broadcast_latency, sent_at = [], {}
+
+    for seq in range(messages):
+        sent_at[seq] = start = time.perf_counter()
+        message = json.dumps({"type": "update", "payload": {"seq": seq}})
+        for websocket, _ in clients:
+            await websocket.send_text(message)
+        broadcast_latency.append(time.perf_counter() - start)
+        await asyncio.sleep(interval)
+    delivery = [received - sent_at[seq] for websocket in fast for seq, received in enumerate(websocket.received)]
+    return broadcast_latency, delivery, 0, 0
+
+
+def report(label, connections, result):
+    broadcast_latency, delivery, dropped, coalesced = result
+    print(
+        f"{label:<12} {connections:>7} "
+        f"{percentile(broadcast_latency, 0.5):>10.2f} {percentile(broadcast_latency, 0.99):>10.2f} "
+        f"{percentile(delivery, 0.5):>10.2f} {percentile(delivery, 0.99):>10.2f} "
+        f"{dropped:>8} {coalesced:>9}"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--connections", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--messages", type=int, default=20)
+    parser.add_argument("--interval", type=float, default=0.05, help="Seconds between broadcasts")
+    parser.add_argument("--slow-fraction", type=float, default=0.01)
+    parser.add_argument("--slow-delay", type=float, default=0.01, help="Seconds per send for slow clients")
+    args = parser.parse_args()
+
+    print(f"{'mode':<12} {'conns':>7} {'bcast p50':>10} {'bcast p99':>10} "
+          f"{'dlvr p50':>10} {'dlvr p99':>10} {'dropped':>8} {'coalesced':>9}  (ms)")
+    for connections in args.connections:
+        report("queued", connections,
+               await run_queued(connections, args.messages, args.interval, args.slow_fraction, args.slow_delay))
+        report("sequential", connections,
+               await run_sequential(connections, args.messages, args.interval, args.slow_fraction, args.slow_delay))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
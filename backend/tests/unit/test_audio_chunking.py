@@ -0,0 +1,63 @@
+from app.services.audio_chunking import (
+    merge_ranges,
+    merge_separated_windows,
+    plan_chunks,
+    separation_windows,
+    stitch_transcriptions,
+)
+
+
+def test_chunks_are_cut_in_silences():
+    speech = merge_ranges([(0, 200), (150, 280), (300, 550), (560, 900), (910, 1000)])
+    assert speech == [(0, 280), (300, 550), (560, 900), (910, 1000)]
+
+    # Cut between 280 and 300, then between 550 and 560
+    assert plan_chunks(speech, 1010, 400) == [(0.0, 290.0), (290.0, 555.0), (555.0, 905.0), (905.0, 1010)]
+    # Speech without silences is cut where the chunk is full
+    assert plan_chunks([(0, 250)], 250, 100) == [(0.0, 100.0), (100.0, 200.0), (200.0, 250)]
+    assert plan_chunks([(5, 50)], 60, 100) == [(0.0, 60)]
+
+
+
+def test_long_silences_are_not_sent_as_chunks():
+    # Half a chunk of silence is kept around the speech, the rest is skipped
+    assert plan_chunks([(0, 10), (3000, 3010)], 3600, 300) == [(0.0, 160), (2850, 3150)]
+    assert plan_chunks([(0, 10)], 3600, 300) == [(0.0, 160)]
+    assert plan_chunks([(1000, 1900)], 3600, 300) == [(850, 1150), (1150, 1450), (1450, 1750), (1750, 2050)]
+    for chunks in (
+        plan_chunks([(0, 10), (3000, 3010)], 3600, 300),
+        plan_chunks([(0, 100), (390, 400), (1200, 1210)], 1500, 300),
+    ):
+        assert all(end - start <= 300 for start, end in chunks)
+    # No speech detected, the whole recording is still transcribed
+    assert plan_chunks([], 700, 300) == [(0.0, 300.0), (300.0, 600.0), (600.0, 700)]
+
+def test_timestamps_are_stitched_by_chunk_offset():
+    first = {"text": " Hello.", "language": "en", "segments": [{"id": 0, "start": 0.0, "end": 2.0, "text": "Hello."}]}
+    second = {
+        "text": " Bye.",
+        "segments": [{"id": 0, "start": 1.0, "end": 3.0, "text": "Bye.", "words": [{"word": "Bye.", "start": 1.0, "end": 3.0}]}],
+    }
+
+    stitched = stitch_transcriptions([(0.0, first), (290.0, second)])
+
+    assert stitched["text"] == "Hello. Bye."
+    assert stitched["language"] == "en"
+    assert [(s["id"], s["start"], s["end"]) for s in stitched["segments"]] == [(0, 0.0, 2.0), (1, 291.0, 293.0)]
+    assert stitched["segments"][1]["words"][0]["start"] == 291.0
+
+
+def test_overlapping_separation_windows_keep_each_segment_once():
+    transcript = [{"start_time": float(index), "end_time": index + 1.0, "text": str(index)} for index in range(10)]
+
+    windows = separation_windows(transcript, window_size=4, overlap=1)
+
+    assert [[s["text"] for s in window] for window, _ in windows] == [
+        ["0", "1", "2"], ["2", "3", "4", "5"], ["5", "6", "7", "8"], ["8", "9"]
+    ]
+    assert [keep_from for _, keep_from in windows] == [None, 3.0, 6.0, 9.0]
+
+    separated = [[{**s, "speaker": "Agent"} for s in window] for window, _ in windows]
+    merged = merge_separated_windows([(output, keep_from) for output, (_, keep_from) in zip(separated, windows)])
+    assert [s["text"] for s in merged] == [str(index) for index in range(10)]
+    assert separation_windows([], 4, 1) == [([], None)]
@@ -0,0 +1,79 @@
+import asyncio
+import time
+
+import pytest
+
+from app.cache.bounded_cache import BoundedCache, get_cache_stats
+from app.core.tenant_scope import clear_tenant_context, set_tenant_context
+
+
+@pytest.fixture
+def tenant_context():
+    yield set_tenant_context
+    clear_tenant_context()
+
+
+def test_lru_and_per_tenant_limits(tenant_context):
+    closed = []
+    cache = BoundedCache("test_limits", max_size=3, max_size_per_tenant=2, on_evict=closed.append)
+
+    tenant_context("a")
+    cache.put("x", 1)
+    cache.put("y", 2)
+    cache.get("x")
+    cache.put("z", 3)  # tenant a is full, its least recently used entry goes
+
+    assert cache.keys() == ["x", "z"]
+    assert closed == [2]
+
+    tenant_context("b")
+    assert cache.get("x") is None
+    cache.put("x", 10)
+    cache.put("w", 20)  # the whole cache is full, tenant a's oldest goes
+
+    assert cache.get("x") == 10
+    assert closed == [2, 1]
+    stats = get_cache_stats()["test_limits"]
+    assert stats["tenants"] == {"a": 1, "b": 2}
+    assert stats["evictions"] == {"lru": 1, "tenant": 1, "ttl": 0}
+
+
+def test_idle_entries_expire():
+    closed = []
+    cache = BoundedCache("test_ttl", max_size=10, ttl_seconds=0.05, on_evict=closed.append)
+    cache.put("old", 1)
+    cache.put("fresh", 2)
+
+    for _ in range(3):
+        time.sleep(0.02)
+        cache.get("fresh")
+
+    assert "old" not in cache
+    assert cache.get("fresh") == 2
+    assert closed == [1]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_creation_runs_factory_once():
+    closed = []
+
+    async def close(value):
+        closed.append(value)
+
+    cache = BoundedCache("test_single_flight", max_size=1, on_evict=close)
+    calls = 0
+
+    async def create():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return object()
+
+    values = await asyncio.gather(*(cache.get_or_create_async("key", create) for _ in range(5)))
+
+    assert calls == 1
+    assert all(value is values[0] for value in values)
+
+    cache.put("other", object())
+    await asyncio.sleep(0)
+    assert closed == [values[0]]
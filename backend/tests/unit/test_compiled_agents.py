@@ -0,0 +1,101 @@
+import asyncio
+import uuid
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from app.cache import redis_cache
+from app.modules.workflow import registry
+from app.modules.workflow.engine.base_node import BaseNode
+from app.modules.workflow.engine.workflow_engine import WorkflowEngine
+
+
+def _agent(agent_id, workflow_id, updated_at, middle=None):
+    nodes = ["in", *([middle] if middle else []), "out"]
+    config = {
+        "id": workflow_id,
+        "updated_at": updated_at,
+        "nodes": [
+            {"id": "in", "type": "chatInputNode", "data": {}},
+            *([{"id": middle, "type": "pausingNode", "data": {}}] if middle else []),
+            {"id": "out", "type": "chatOutputNode", "data": {}},
+        ],
+        "edges": [{"source": source, "target": target} for source, target in zip(nodes, nodes[1:])],
+    }
+    workflow = SimpleNamespace(id=workflow_id, updated_at=updated_at, to_dict=lambda: config)
+    return SimpleNamespace(id=agent_id, name="Agent", workflow=workflow)
+
+
+@pytest.fixture
+def compiled_agents(monkeypatch):
+    registry._compiled_agents.clear()
+    monkeypatch.setattr(registry, "_build_stats", {"builds": 0, "total_ms": 0.0, "max_ms": 0.0})
+    yield registry
+    registry._compiled_agents.clear()
+
+
+def test_agents_are_built_once_per_workflow_version(compiled_agents):
+    agent_id, workflow_id = uuid.uuid4(), str(uuid.uuid4())
+    first = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+    item = compiled_agents.get_compiled_agent(_agent(agent_id, workflow_id, first))
+    assert compiled_agents.get_compiled_agent(_agent(agent_id, workflow_id, first)) is item
+    assert WorkflowEngine.get_instance().get_workflow(workflow_id) is item.workflow
+
+    saved = compiled_agents.get_compiled_agent(_agent(agent_id, workflow_id, datetime.now(timezone.utc)))
+    assert saved is not item
+
+    stats = compiled_agents.get_compiled_agent_stats()
+    assert stats["builds"] == 2
+    assert stats["hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_invalidating_the_agent_drops_its_built_workflow(compiled_agents):
+    agent_id, workflow_id = uuid.uuid4(), str(uuid.uuid4())
+    item = compiled_agents.get_compiled_agent(_agent(agent_id, workflow_id, datetime.now(timezone.utc)))
+
+    await redis_cache.invalidate_cache("agents:get_by_id_full", agent_id)
+
+    assert compiled_agents._compiled_agents.keys() == []
+    assert WorkflowEngine.get_instance().get_workflow(workflow_id) is None
+    assert compiled_agents.get_compiled_agent(
+        _agent(agent_id, workflow_id, datetime.now(timezone.utc))
+    ) is not item
+
+
+class PausingNode(BaseNode):
+    """Waits for the test, then looks up the next node like tool nodes do"""
+
+    entered: asyncio.Event
+    release: asyncio.Event
+
+    async def process(self, config):
+        PausingNode.entered.set()
+        await PausingNode.release.wait()
+        state = self.get_state()
+        return WorkflowEngine.get_instance().executable_node("out", state, state.workflow_id).get_type()
+
+
+@pytest.mark.asyncio
+async def test_runs_survive_eviction_and_new_versions(compiled_agents, monkeypatch):
+    monkeypatch.setitem(WorkflowEngine.get_instance().node_registry, "pausingNode", PausingNode)
+    PausingNode.entered, PausingNode.release = asyncio.Event(), asyncio.Event()
+    agent_id, workflow_id = uuid.uuid4(), str(uuid.uuid4())
+    item = compiled_agents.get_compiled_agent(_agent(agent_id, workflow_id, datetime.now(timezone.utc), "wait"))
+
+    run = asyncio.create_task(item.execute("hello", {"thread_id": str(uuid.uuid4())}))
+    await asyncio.wait_for(PausingNode.entered.wait(), timeout=5)
+    # Saved without the pausing node, then the old version is dropped
+    saved = _agent(agent_id, workflow_id, datetime.now(timezone.utc), "other")
+    compiled_agents.get_compiled_agent(saved)
+    compiled_agents.invalidate_compiled_agent(agent_id)
+    assert WorkflowEngine.get_instance().get_workflow(workflow_id) is None
+    PausingNode.release.set()
+
+    response = await asyncio.wait_for(run, timeout=5)
+    # The run finished on the version it started with
+    assert response["state"]["errors"] == []
+    assert sorted(response["state"]["nodeExecutionStatus"]) == ["in", "out", "wait"]
+    assert response["state"]["nodeExecutionStatus"]["wait"]["output"] == "chatOutputNode"
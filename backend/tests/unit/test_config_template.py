@@ -0,0 +1,59 @@
+import pytest
+
+from app.modules.workflow.engine.config_template import ConfigTemplate
+from app.modules.workflow.engine.utils import get_nested_value, replace_config_vars
+
+
+class _State:
+    def __init__(self, values: dict):
+        self.values = values
+
+    def get_value(self, key_path: str, default=None):
+        result = get_nested_value(self.values, key_path)
+        return result if result is not None else default
+
+
+@pytest.fixture
+def state():
+    return _State({
+        "message": 'hi "there"\n',
+        "session": {"customer": {"name": "Ada", "tags": ["vip", "new"]}, "count": 3},
+    })
+
+
+@pytest.mark.parametrize("config", [
+    {"data": {"prompt": "Hello {{session.customer.name}}!"}},
+    {"data": {"prompt": "{{message}}", "count": "{{session.count}}"}},
+    {"data": {"payload": "{{session.customer}}", "items": ["{{source.items}}", 1, None]}},
+    {"data": {"code": "x = {{source}}\nprint(x)", "other": "{{source}}"}},
+    {"data": {"{{session.customer.name}}": "key placeholder", "missing": "{{nope}}"}},
+    {"data": {"query": "{{direct_input.query}} / {{direct_input}}"}},
+])
+def test_render_matches_replace_config_vars(state, config):
+    source_output = {"items": ["a", "b\nc"], "text": 'quoted "value"'}
+    direct_input = {"query": "orders"}
+
+    expected = replace_config_vars(config, state, source_output, direct_input)
+    assert ConfigTemplate(config).render(state, source_output, direct_input) == expected
+
+
+def test_render_without_placeholders_returns_a_copy(state):
+    config = {"data": {"prompt": "static"}}
+
+    resolved, replacements = ConfigTemplate(config).render(state, None)
+
+    assert resolved == config
+    assert resolved is not config and resolved["data"] is not config["data"]
+    assert replacements == {}
+
+
+def test_mutating_a_rendered_config_leaves_the_template_intact(state):
+    config = {"data": {"prompt": "{{message}}", "headers": {"accept": "json"}, "tags": ["a"]}}
+    template = ConfigTemplate(config)
+
+    resolved, _ = template.render(state, None)
+    resolved["data"]["headers"]["accept"] = "xml"
+    resolved["data"]["tags"].append("b")
+
+    assert config["data"]["headers"] == {"accept": "json"} and config["data"]["tags"] == ["a"]
+    assert template.render(state, None)[0]["data"]["headers"] == {"accept": "json"}
@@ -0,0 +1,116 @@
+import pytest
+
+from app.modules.workflow.agents.memory import InMemoryConversationMemory, RedisConversationMemory
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def __getattr__(self, name):
+        def queue(*args, **kwargs):
+            self.commands.append((name, args, kwargs))
+        return queue
+
+    async def execute(self):
+        self.redis.round_trips += 1
+        return [await getattr(self.redis, name)(*args, **kwargs) for name, args, kwargs in self.commands]
+
+
+class FakeRedis:
+    """Just the commands used by RedisConversationMemory"""
+
+    def __init__(self):
+        self.data = {}
+        self.round_trips = 0
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    async def hsetnx(self, key, field, value):
+        self.data.setdefault(key, {}).setdefault(field, str(value))
+
+    async def hset(self, key, field=None, value=None, mapping=None):
+        values = self.data.setdefault(key, {})
+        values.update({k: str(v) for k, v in (mapping or {field: value}).items()})
+
+    async def hincrby(self, key, field, amount):
+        values = self.data.setdefault(key, {})
+        values[field] = str(int(values.get(field, 0)) + amount)
+
+    async def hmget(self, key, fields):
+        return [self.data.get(key, {}).get(field) for field in fields]
+
+    async def hget(self, key, field):
+        return self.data.get(key, {}).get(field)
+
+    async def lpush(self, key, *values):
+        self.data[key] = list(reversed(values)) + self.data.get(key, [])
+
+    async def ltrim(self, key, start, end):
+        self.data[key] = self.data[key][start:end + 1]
+
+    async def lrange(self, key, start, end):
+        return self.data.get(key, [])[start:end + 1]
+
+    async def expire(self, key, seconds):
+        pass
+
+
+@pytest.mark.asyncio
+async def test_budgeted_history_folds_old_turns_into_summary():
+    memory = InMemoryConversationMemory("thread")
+    for turn in range(6):
+        await memory.add_input_output(f"question {turn} " + "x" * 40, f"answer {turn} " + "y" * 40)
+
+    folded = []
+
+    async def summarize(summary, messages, max_tokens):
+        folded.extend(message["content"] for message in messages)
+        return f"{summary} +{len(messages)}".strip()
+
+    history = await memory.get_chat_history(as_string=True, max_messages=20, token_budget=60, summarize=summarize)
+
+    assert history.startswith("Summary of the earlier conversation: +")
+    assert history.endswith("answer 5 " + "y" * 40)
+    assert "question 0" not in history
+    recent = history.count("\n")
+    assert memory._summarized_count == 12 - recent
+
+    # Only turns that left the window since are folded in on the next call
+    await memory.add_input_output("question 6 " + "x" * 40, "answer 6 " + "y" * 40)
+    await memory.get_chat_history(as_string=True, max_messages=20, token_budget=60, summarize=summarize)
+
+    assert len(folded) == len(set(folded)) == memory._summarized_count == 14 - recent
+
+
+@pytest.mark.asyncio
+async def test_redis_writes_are_single_round_trips_and_trimmed(monkeypatch):
+    from app.modules.workflow.agents import memory as memory_module
+
+    monkeypatch.setattr(memory_module.settings, "CONVERSATION_REDIS_MAX_MESSAGES", 4)
+    monkeypatch.setattr(memory_module.settings, "CONVERSATION_REDIS_EXPIRY_DAYS", 1)
+    monkeypatch.setattr(memory_module.settings, "CONVERSATION_SUMMARY_MAX_TOKENS", 100)
+    redis = FakeRedis()
+    memory = RedisConversationMemory("thread")
+    memory.redis_client = redis
+
+    for turn in range(3):
+        await memory.add_input_output(f"question {turn}", f"answer {turn}")
+
+    assert redis.round_trips == 3
+    assert redis.data[memory._conversation_key]["message_count"] == "6"
+    messages = await memory.get_messages(max_messages=10)
+    assert [message["content"] for message in messages] == ["question 1", "answer 1", "question 2", "answer 2"]
+
+    history = await memory.get_chat_history(max_messages=10, token_budget=12)
+    assert history[0]["message_type"] == "summary"
+    assert history[-1]["content"] == "answer 2"
+    assert redis.data[memory._summary_key]["summarized_count"] == str(6 - (len(history) - 1))
@@ -0,0 +1,152 @@
+import uuid
+
+import pytest
+
+from app.cache import conversation_state
+from app.cache.conversation_state import ConversationStateCache
+
+
+class FakeRedis:
+    """Runs the two state scripts in Python"""
+
+    def __init__(self):
+        self.data = {}
+        self.evals = 0
+
+    async def eval(self, script, numkeys, key, *args):
+        self.evals += 1
+        if key not in self.data:
+            return None
+        if script == conversation_state._RESERVE_SEQUENCE:
+            self.data[key] += int(args[0])
+            return self.data[key]
+        size, _, *values = args
+        self.data[key] = (self.data[key] + list(values))[-size:]
+        return list(self.data[key])
+
+    async def lrange(self, key, start, end):
+        return list(self.data.get(key, []))
+
+    async def set(self, key, value, nx=False, ex=None):
+        if not (nx and key in self.data):
+            self.data[key] = value
+
+    def pipeline(self, transaction=True):
+        redis = self
+
+        class Pipeline:
+            async def __aenter__(self):
+                return self
+
+            async def __aexit__(self, *exc):
+                return False
+
+            def delete(self, key):
+                redis.data.pop(key, None)
+
+            def rpush(self, key, *values):
+                redis.data.setdefault(key, []).extend(values)
+
+            def expire(self, key, ttl):
+                pass
+
+            async def execute(self):
+                pass
+
+        return Pipeline()
+
+
+class FakeRedisManager:
+    def __init__(self, redis):
+        self.redis = redis
+
+    async def get_redis(self):
+        if self.redis is None:
+            raise ConnectionError("redis down")
+        return self.redis
+
+
+@pytest.mark.asyncio
+async def test_sequence_and_window_are_loaded_once_then_incremental(monkeypatch):
+    monkeypatch.setattr(conversation_state.settings, "IN_PROGRESS_TRANSCRIPT_WINDOW", 3)
+    monkeypatch.setattr(conversation_state.settings, "IN_PROGRESS_STATE_TTL_SECONDS", 60)
+    redis = FakeRedis()
+    state = ConversationStateCache(FakeRedisManager(redis))
+    conversation_id = uuid.uuid4()
+    stored = [f"m{index}" for index in range(5)]
+    loads = []
+
+    async def count():
+        loads.append("count")
+        return len(stored)
+
+    async def load_window(size):
+        loads.append("window")
+        return stored[-size:]
+
+    assert await state.reserve_sequence(conversation_id, 2, count) == 5
+    stored.extend(["m5", "m6"])
+    assert await state.append_window(conversation_id, ["m5", "m6"], load_window) == ["m4", "m5", "m6"]
+
+    assert await state.reserve_sequence(conversation_id, 1, count) == 7
+    assert await state.append_window(conversation_id, ["m7"], load_window) == ["m5", "m6", "m7"]
+    assert loads == ["count", "window"]
+
+
+@pytest.mark.asyncio
+async def test_falls_back_to_database_without_redis(monkeypatch):
+    monkeypatch.setattr(conversation_state.settings, "IN_PROGRESS_TRANSCRIPT_WINDOW", 2)
+    state = ConversationStateCache(FakeRedisManager(None))
+
+    async def count():
+        return 4
+
+    async def load_window(size):
+        return ["m2", "m3"][-size:]
+
+    assert await state.reserve_sequence(uuid.uuid4(), 1, count) == 4
+    assert await state.append_window(uuid.uuid4(), ["m3"], load_window) == ["m2", "m3"]
+
+
+@pytest.mark.asyncio
+async def test_takeover_message_advances_the_sequence_and_window(monkeypatch):
+    from types import SimpleNamespace
+    from unittest.mock import AsyncMock
+
+    from app.core.utils.enums.conversation_status_enum import ConversationStatus
+    from app.services import conversations
+    from app.services.conversations import ConversationService
+
+    monkeypatch.setattr(conversation_state.settings, "IN_PROGRESS_TRANSCRIPT_WINDOW", 3)
+    monkeypatch.setattr(conversation_state.settings, "IN_PROGRESS_STATE_TTL_SECONDS", 60)
+    monkeypatch.setattr(conversations, "get_current_user_id", lambda: uuid.uuid4())
+    monkeypatch.setattr(conversations, "null_unloaded_attributes", lambda model: None)
+    monkeypatch.setattr(
+        conversations,
+        "schema_to_transcript_message",
+        lambda segment, conversation_id, sequence: SimpleNamespace(sequence_number=sequence, type=segment.type),
+    )
+    conversation = SimpleNamespace(status=ConversationStatus.IN_PROGRESS.value)
+
+    service = ConversationService.__new__(ConversationService)
+    service.conversation_repo = SimpleNamespace(
+        fetch_conversation_by_id=AsyncMock(return_value=conversation),
+        update_conversation=AsyncMock(side_effect=lambda model: model),
+    )
+    service.transcript_message_repo = SimpleNamespace(
+        get_message_count=AsyncMock(return_value=4),
+        get_latest_messages=AsyncMock(return_value=[]),
+        save_messages=AsyncMock(),
+    )
+    service.conversation_state = ConversationStateCache(FakeRedisManager(FakeRedis()))
+    service._serialize_tone_segments = lambda messages: [f"m{m.sequence_number}" for m in messages]
+    conversation_id = uuid.uuid4()
+
+    assert await service.conversation_state.reserve_sequence(conversation_id, 1, AsyncMock(return_value=3)) == 3
+    await service.conversation_state.append_window(conversation_id, ["m3"], AsyncMock(return_value=["m3"]))
+    await service.supervisor_takeover_conversation(conversation_id)
+
+    saved = service.transcript_message_repo.save_messages.await_args.args[0]
+    assert [(m.sequence_number, m.type) for m in saved] == [(4, "takeover")]
+    assert await service.conversation_state.reserve_sequence(conversation_id, 1, AsyncMock()) == 5
+    assert await service.conversation_state.get_window(conversation_id, AsyncMock()) == ["m3", "m4"]
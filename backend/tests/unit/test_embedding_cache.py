@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from app.cache.embedding_cache import EmbeddingCache
+
+
+class _CountingEmbedder:
+    def __init__(self):
+        self.calls = []
+
+    async def embed(self, texts):
+        self.calls.append(list(texts))
+        return [[float(len(text)), 1.0] for text in texts]
+
+
+@pytest.mark.asyncio
+async def test_only_uncached_distinct_texts_are_embedded():
+    cache = EmbeddingCache(max_bytes=1024 * 1024)
+    embedder = _CountingEmbedder()
+
+    first = await cache.embed("model", ["a", "bb", "a"], embedder.embed)
+    second = await cache.embed("model", ["bb", "ccc"], embedder.embed)
+
+    assert first == [[1.0, 1.0], [2.0, 1.0], [1.0, 1.0]]
+    assert second == [[2.0, 1.0], [3.0, 1.0]]
+    assert embedder.calls == [["a", "bb"], ["ccc"]]
+    # Namespaces (model, normalization, ...) do not share entries
+    await cache.embed("other-model", ["a"], embedder.embed)
+    assert embedder.calls[-1] == ["a"]
+    assert cache.stats()["memory_hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_failed_embeddings_are_not_cached():
+    cache = EmbeddingCache(max_bytes=1024 * 1024)
+
+    async def failing(texts):
+        return []
+
+    assert await cache.embed("model", ["a"], failing) == []
+    assert cache.stats()["entries"] == 0
+
+
+def test_lru_is_bounded_by_bytes():
+    cache = EmbeddingCache(max_bytes=3 * 8)  # three 2-dim float32 vectors
+
+    def encode(texts):
+        return np.ones((len(texts), 2))
+
+    cache.encode_sync("model", ["a", "b", "c"], encode)
+    cache.encode_sync("model", ["a"], encode)  # refresh "a"
+    cache.encode_sync("model", ["d"], encode)
+
+    keys = [cache.make_key("model", text) for text in "abcd"]
+    assert [vector is not None for vector in cache.get_local(keys)] == [True, False, True, True]
+    assert cache.stats()["evictions"] == 1
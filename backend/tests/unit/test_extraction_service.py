@@ -0,0 +1,105 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.modules.data.utils import extraction_service
+from app.modules.data.utils.extraction_service import ExtractionService, page_ranges
+from app.modules.data.utils.file_extractor import ExtractorOptions
+
+
+def _service(workers=0):
+    return ExtractionService(workers=workers, pdf_pages_per_task=20, cache_max_bytes=1024 * 1024)
+
+
+@pytest.mark.asyncio
+async def test_results_are_cached_by_content_type_and_options():
+    service = _service()
+
+    assert await service.extract(filename="notes.txt", content=b"hello world") == "hello world"
+    assert await service.extract(filename="copy-of-notes.txt", content=b"hello world") == "hello world"
+    assert service.stats()["memory_hits"] == 1
+
+    # Same bytes read differently
+    await service.extract(filename="notes.csv", content=b"hello world")
+    await service.extract(
+        filename="notes.txt", content=b"hello world", options=ExtractorOptions(enable_generic_fallback=False)
+    )
+    assert service.stats()["misses"] == 3
+    assert service.extract_sync(filename="notes.txt", content=b"hello world") == "hello world"
+    assert service.stats()["memory_hits"] == 2
+
+
+@pytest.mark.asyncio
+async def test_extraction_runs_in_the_process_pool(tmp_path):
+    service = _service(workers=1)
+    path = tmp_path / "spec.json"
+    path.write_text('{"openapi": "3.0.0"}')
+    try:
+        texts = await asyncio.gather(service.extract(path=path), asyncio.to_thread(service.extract_sync, path=path))
+    finally:
+        service._reset_pool()
+
+    assert texts[0] == '{\n  "openapi": "3.0.0"\n}'
+    assert texts[1] == texts[0]
+    assert service.stats()["documents"] >= 1
+
+
+@pytest.mark.asyncio
+async def test_long_pdfs_are_split_into_page_ranges(monkeypatch):
+    service = _service()
+    pool = ThreadPoolExecutor(max_workers=3)
+    monkeypatch.setattr(service, "_get_pool", lambda: pool)
+    monkeypatch.setattr(extraction_service, "_pdf_page_count", lambda path: 45)
+    monkeypatch.setattr(
+        extraction_service, "_extract_file", lambda path, options, pages=None: f"pages {pages[0]}-{pages[1]}"
+    )
+
+    text = await service.extract(filename="manual.pdf", content=b"%PDF-1.7 ...")
+    pool.shutdown()
+
+    assert text == "pages 1-20\npages 21-40\npages 41-45"
+    stats = service.stats()
+    assert (stats["pdf_pages"], stats["split_documents"]) == (45, 1)
+
+
+@pytest.mark.asyncio
+async def test_files_named_pdf_without_a_pdf_header_are_decoded_as_text():
+    assert await _service().extract(filename="fake.pdf", content=b"plain text") == "plain text"
+
+
+class DecodingRedis:
+    """Stores bytes and decodes replies as UTF-8, like the shared client (decode_responses=True)"""
+
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key):
+        value = self.data.get(key)
+        return None if value is None else value.decode("utf-8")
+
+    async def set(self, key, value, ex=None):
+        self.data[key] = value.encode("utf-8") if isinstance(value, str) else value
+
+
+@pytest.mark.asyncio
+async def test_redis_tier_round_trips_through_a_decoding_client():
+    redis = DecodingRedis()
+    text = "Überblick \u2013 " + "page text " * 200
+    writer = ExtractionService(workers=0, pdf_pages_per_task=20, cache_max_bytes=1024 * 1024, redis_enabled=True)
+    writer._redis = redis
+    await writer.extract(filename="notes.txt", content=text.encode("utf-8"))
+    assert len(redis.data) == 1
+
+    reader = ExtractionService(workers=0, pdf_pages_per_task=20, cache_max_bytes=1024 * 1024, redis_enabled=True)
+    reader._redis = redis
+    assert await reader.extract(filename="notes.txt", content=text.encode("utf-8")) == text
+    stats = reader.stats()
+    assert (stats["redis_hits"], stats["misses"]) == (1, 0)
+    assert reader._redis is redis
+
+
+def test_page_ranges():
+    assert page_ranges(45, 20) == [(1, 20), (21, 40), (41, 45)]
+    assert page_ranges(20, 20) == [(1, 20)]
+    assert page_ranges(0, 20) == []
@@ -0,0 +1,158 @@
+import pickle
+import sqlite3
+
+import numpy as np
+import pytest
+
+pytest.importorskip("faiss")
+
+from app.modules.data.providers.vector.db import FaissVectorDB, VectorDBConfig
+
+
+def _config(tmp_path, index_type: str = "flat", **kwargs) -> VectorDBConfig:
+    return VectorDBConfig(
+        type="faiss",
+        collection_name="test",
+        persist_directory=str(tmp_path),
+        index_type=index_type,
+        **kwargs,
+    )
+
+
+async def _open(config: VectorDBConfig, dimension: int = 8) -> FaissVectorDB:
+    db = FaissVectorDB(config)
+    assert await db.initialize()
+    assert await db.create_collection(dimension)
+    return db
+
+
+@pytest.mark.asyncio
+async def test_delete_and_replace_use_stable_ids(tmp_path):
+    vectors = np.random.default_rng(0).normal(size=(20, 8))
+    db = await _open(_config(tmp_path))
+    ids = [f"chunk_{i}" for i in range(20)]
+    await db.add_vectors(ids, vectors.tolist(), [{"kb_id": "kb"}] * 20, ["text"] * 20)
+
+    assert await db.delete_vectors(ids[:5])
+    await db.add_vectors(["chunk_5"], [vectors[0].tolist()], [{"kb_id": "kb"}], ["replaced"])
+
+    assert db.index.ntotal == 15
+    assert await db.count() == 15
+    results = await db.search(vectors[0].tolist(), limit=1)
+    assert results[0].id == "chunk_5"
+    assert results[0].content == "replaced"
+
+
+@pytest.mark.asyncio
+async def test_wal_is_replayed_after_restart(tmp_path):
+    vectors = np.random.default_rng(1).normal(size=(10, 8))
+    config = _config(tmp_path, checkpoint_interval=4)
+    db = await _open(config)
+    for i in range(10):
+        await db.add_vectors([f"chunk_{i}"], [vectors[i].tolist()], [{"kb_id": "kb"}], [str(i)])
+    await db.delete_vectors(["chunk_9"])
+
+    # No close(): writes after the last checkpoint only exist in the WAL
+    reopened = await _open(config)
+
+    assert reopened.index.ntotal == 9
+    assert await reopened.get_all_ids({"kb_id": "kb"}) == [f"chunk_{i}" for i in range(9)]
+    results = await reopened.search(vectors[8].tolist(), limit=1)
+    assert results[0].id == "chunk_8"
+
+
+@pytest.mark.asyncio
+async def test_ivf_index_is_trained_in_background(tmp_path):
+    vectors = np.random.default_rng(2).normal(size=(400, 8)).astype(np.float32)
+    config = _config(tmp_path, "ivf_flat", ivf_train_min_vectors=200, ivf_nlist=4)
+    db = await _open(config)
+    ids = [f"chunk_{i}" for i in range(400)]
+    await db.add_vectors(ids[:250], vectors[:250], [{"kb_id": "kb"}] * 250, ["text"] * 250)
+    db._build_thread.join()
+    await db.add_vectors(ids[250:], vectors[250:], [{"kb_id": "kb"}] * 150, ["text"] * 150)
+
+    assert isinstance(db.index, db.faiss.IndexIVFFlat)
+    assert db.index.ntotal == 400
+    results = await db.search(vectors[300].tolist(), limit=1, nprobe=4)
+    assert results[0].id == "chunk_300"
+
+
+@pytest.mark.asyncio
+async def test_ivf_build_reads_a_sample_and_batches(tmp_path, monkeypatch):
+    from app.modules.data.providers.vector.db import faiss as faiss_db
+
+    monkeypatch.setattr(faiss_db, "ADD_BATCH_SIZE", 300)
+    vectors = np.random.default_rng(4).normal(size=(2000, 8)).astype(np.float32)
+    db = await _open(_config(tmp_path, "ivf_flat", ivf_train_min_vectors=2000, ivf_nlist=4))
+    reads = []
+    read = db.vectors.read
+    monkeypatch.setattr(db.vectors, "read", lambda int_ids: reads.append(len(int_ids)) or read(int_ids))
+
+    ids = [f"chunk_{i}" for i in range(2000)]
+    await db.add_vectors(ids, vectors, [{"kb_id": "kb"}] * 2000, ["text"] * 2000)
+    db._build_thread.join()
+
+    # 4 lists are trained on 4 * 64 vectors, then the index is filled 300 at a time
+    assert reads[0] == 256 and max(reads) == 300 and sum(reads[1:]) == 2000
+    assert isinstance(db.index, db.faiss.IndexIVFFlat) and db.index.ntotal == 2000
+    results = await db.search(vectors[1234].tolist(), limit=1, nprobe=4)
+    assert results[0].id == "chunk_1234"
+
+
+@pytest.mark.asyncio
+async def test_selective_filter_returns_full_top_k(tmp_path):
+    vectors = np.random.default_rng(3).normal(size=(3000, 8)).astype(np.float32)
+    db = await _open(_config(tmp_path, "hnsw", subindex_max_vectors=100))
+    metadatas = [
+        {"kb_id": "large" if i < 2900 else "small", "tag": "rare" if i % 50 == 0 else "common"}
+        for i in range(3000)
+    ]
+    await db.add_vectors([f"chunk_{i}" for i in range(3000)], vectors, metadatas, ["text"] * 3000)
+
+    rare = await db.search(vectors[0].tolist(), limit=10, filter_dict={"kb_id": "large", "tag": "rare"})
+    small = await db.search(vectors[0].tolist(), limit=10, filter_dict={"kb_id": "small"})
+
+    assert len(rare) == 10
+    assert all(result.metadata["tag"] == "rare" for result in rare)
+    assert rare[0].id == "chunk_0"
+    assert len(small) == 10
+    assert all(result.metadata["kb_id"] == "small" for result in small)
+    assert await db.count({"kb_id": "small"}) == 100
+
+
+@pytest.mark.asyncio
+async def test_failed_legacy_migration_is_retried(tmp_path, monkeypatch):
+    import faiss
+
+    from app.modules.data.providers.vector.db import faiss_store
+
+    name = FaissVectorDB(_config(tmp_path)).config.collection_name
+    vectors = np.random.default_rng(3).normal(size=(6, 8)).astype(np.float32)
+    legacy_index = faiss.IndexFlatL2(8)
+    legacy_index.add(vectors)
+    faiss.write_index(legacy_index, str(tmp_path / f"{name}.index"))
+    doc_ids = [f"chunk_{i}" for i in range(6)]
+    with open(tmp_path / f"{name}_metadata.pkl", "wb") as f:
+        pickle.dump({
+            "dimension": 8,
+            "id_map": dict(enumerate(doc_ids)),
+            "content_map": {doc_id: doc_id.upper() for doc_id in doc_ids},
+            "metadata_map": {doc_id: {"kb_id": "kb"} for doc_id in doc_ids},
+        }, f)
+
+    def fail(*args, **kwargs):
+        raise sqlite3.OperationalError("disk I/O error")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(faiss_store.ChunkStore, "insert", fail)
+        assert not await FaissVectorDB(_config(tmp_path)).initialize()
+
+    # No sidecar is left behind, the legacy files are kept for the next start
+    assert sorted(p.name for p in tmp_path.iterdir() if not p.name.endswith(".wal")) == [
+        f"{name}.index", f"{name}_metadata.pkl"]
+
+    db = await _open(_config(tmp_path))
+    assert await db.count() == 6
+    assert not (tmp_path / f"{name}_metadata.pkl").exists()
+    results = await db.search(vectors[4].tolist(), limit=1)
+    assert (results[0].id, results[0].content) == ("chunk_4", "CHUNK_4")
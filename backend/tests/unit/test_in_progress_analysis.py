@@ -0,0 +1,58 @@
+import asyncio
+import uuid
+
+import pytest
+
+from app.services import in_progress_analysis
+from app.services.in_progress_analysis import InProgressAnalysisScheduler
+
+
+@pytest.fixture
+def scheduler(monkeypatch):
+    monkeypatch.setattr(in_progress_analysis.settings, "IN_PROGRESS_ANALYSIS_DEBOUNCE_SECONDS", 0.05)
+    monkeypatch.setattr(in_progress_analysis.settings, "IN_PROGRESS_ANALYSIS_MAX_MESSAGES", 4)
+    monkeypatch.setattr(in_progress_analysis.settings, "IN_PROGRESS_ANALYSIS_CONCURRENCY", 2)
+    scheduler = InProgressAnalysisScheduler(socket_connection_manager=None)
+    scheduler.analyzed = []
+
+    async def analyze(key, pending):
+        scheduler.llm_calls += 1
+        scheduler.analyzed.append((key[1], pending.messages))
+
+    monkeypatch.setattr(scheduler, "_analyze", analyze)
+    return scheduler
+
+
+@pytest.mark.asyncio
+async def test_requests_are_debounced_and_coalesced(scheduler):
+    conversation_id = uuid.uuid4()
+    for _ in range(3):
+        scheduler.schedule(conversation_id)
+    assert scheduler.stats()["queue_depth"] == 1
+
+    await asyncio.sleep(0.1)
+
+    assert scheduler.analyzed == [(conversation_id, 3)]
+    assert scheduler.stats() == {
+        "queue_depth": 0,
+        "pending_messages": 0,
+        "running": 0,
+        "requests": 3,
+        "llm_calls": 1,
+        "llm_calls_saved": 2,
+        "failures": 0,
+    }
+
+
+@pytest.mark.asyncio
+async def test_enough_new_messages_skip_the_debounce_delay(scheduler):
+    conversation_id = uuid.uuid4()
+    scheduler.schedule(conversation_id, new_messages=2)
+    scheduler.schedule(conversation_id, new_messages=2)
+    await asyncio.sleep(0.01)
+    assert scheduler.analyzed == [(conversation_id, 4)]
+
+    # Messages after a run start the next batch
+    scheduler.schedule(conversation_id)
+    await asyncio.sleep(0.1)
+    assert scheduler.analyzed == [(conversation_id, 4), (conversation_id, 1)]
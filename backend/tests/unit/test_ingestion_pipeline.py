@@ -0,0 +1,131 @@
+from typing import List
+
+import pytest
+
+from app.modules.data import AgentRAGConfig, AgentRAGService, IngestDocument, IngestionPipeline, VectorProvider
+from app.modules.data.providers.vector.chunking.base import BaseChunker, ChunkConfig
+from app.modules.data.providers.vector.config import VectorConfig
+from app.modules.data.providers.vector.embedding.base import EmbeddingConfig
+
+
+class PipeChunker(BaseChunker):
+    """One chunk per "|" separated part"""
+
+    def chunk_text(self, text, metadata=None):
+        start, chunks = 0, []
+        for index, part in enumerate(text.split("|")):
+            chunks.append(self._create_chunk(part, index, start, metadata))
+            start += len(part) + 1
+        return chunks
+
+
+class RecordingEmbedder:
+    def __init__(self, batch_size: int, fail_on: str = None):
+        self.config = EmbeddingConfig(batch_size=batch_size)
+        self.fail_on = fail_on
+        self.batches: List[List[str]] = []
+
+    async def embed_texts(self, texts):
+        self.batches.append(texts)
+        if self.fail_on in texts:
+            return []
+        return [[float(len(text)), 1.0] for text in texts]
+
+
+class RecordingVectorDB:
+    def __init__(self):
+        self.rows = {}
+        self.add_calls = 0
+
+    async def add_vectors(self, ids, vectors, metadatas, contents):
+        self.add_calls += 1
+        self.rows.update({id_: (vector, metadata, content)
+                          for id_, vector, metadata, content in zip(ids, vectors, metadatas, contents)})
+        return True
+
+    async def get_all_ids(self, filter_dict=None):
+        return [id_ for id_, (_, metadata, _) in self.rows.items() if metadata["doc_id"] == filter_dict["doc_id"]]
+
+    async def delete_vectors(self, ids):
+        for id_ in ids:
+            self.rows.pop(id_, None)
+        return True
+
+
+def _service(embedder: RecordingEmbedder) -> AgentRAGService:
+    provider = VectorProvider(VectorConfig(enabled=True), "kb")
+    provider.embedder = embedder
+    provider.vector_db = RecordingVectorDB()
+    provider.chunker = PipeChunker(ChunkConfig())
+    provider._initialized = True
+    service = AgentRAGService(AgentRAGConfig(knowledge_base_id="kb"))
+    service.data_provider = [provider]
+    service._initialized = True
+    return service
+
+
+@pytest.mark.asyncio
+async def test_chunks_are_batched_across_documents():
+    embedder = RecordingEmbedder(batch_size=8)
+    service = _service(embedder)
+    documents = [IngestDocument(f"doc_{i}", content=f"a{i}|b{i}|c{i}") for i in range(10)]
+
+    summary = await IngestionPipeline(service, chunk_workers=0).run(documents)
+
+    assert summary["successful"] == 10
+    assert [len(batch) for batch in embedder.batches] == [8, 8, 8, 6]
+    rows = service.data_provider[0].vector_db.rows
+    assert len(rows) == 30
+    assert rows["doc_3_chunk_1"][1]["doc_id"] == "doc_3"
+    assert summary["stats"]["embed"]["items"] == 30
+    assert summary["stats"]["upsert"]["items"] == 30
+
+
+@pytest.mark.asyncio
+async def test_failures_are_reported_per_document():
+    embedder = RecordingEmbedder(batch_size=2, fail_on="bad")
+    service = _service(embedder)
+
+    def broken_extractor():
+        raise IOError("unreadable")
+
+    documents = [
+        IngestDocument("ok", extract=lambda: "one|two"),
+        IngestDocument("broken", extract=broken_extractor),
+        IngestDocument("empty", content="  "),
+        IngestDocument("failing", content="bad|worse"),
+    ]
+
+    summary = await IngestionPipeline(service, chunk_workers=0, flush_ms=0).run(documents)
+
+    results = {document["id"]: document for document in summary["documents"]}
+    assert results["ok"]["result"] == {"vector": True}
+    assert "unreadable" in results["broken"]["error"]
+    assert results["failing"]["result"] == {"vector": False}
+    assert (summary["successful"], summary["failed"], summary["skipped"]) == (1, 2, 1)
+    assert sorted(service.data_provider[0].vector_db.rows) == ["ok_chunk_0", "ok_chunk_1"]
+
+
+@pytest.mark.asyncio
+async def test_document_text_is_released_after_chunking():
+    service = _service(RecordingEmbedder(batch_size=4))
+    pipeline = IngestionPipeline(service, chunk_workers=0, flush_ms=0)
+    summarize = pipeline._summarize
+    summarized = []
+
+    async def capture(states, legra_finalize):
+        summarized.extend(states)
+        return await summarize(states, legra_finalize)
+
+    pipeline._summarize = capture
+    documents = [IngestDocument("a", content="one|two"), IngestDocument("b", extract=lambda: "three|four")]
+
+    summary = await pipeline.run(documents)
+
+    assert summary["successful"] == 2
+    assert [(state.content, state.document.content, state.document.extract) for state in summarized] == [
+        ("", None, None),
+        ("", None, None),
+    ]
+    # The caller's documents are left untouched
+    assert documents[0].content == "one|two"
@@ -0,0 +1,81 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from app.tasks import kb_batch_tasks
+from app.tasks.kb_batch_tasks import summarize_blobs
+
+
+class FakeAzureStorage:
+    """In-memory stand-in for the async side of AzureStorageService"""
+
+    def __init__(self):
+        self.blobs = {}
+        self.versions = 0
+
+    def put(self, name, content, metadata=None):
+        self.versions += 1
+        self.blobs[name] = (content, f'"0x{self.versions}"', metadata or {})
+
+    async def list_blob_pages(self, prefix=None, page_size=500, continuation_token=None, include_metadata=False):
+        names = sorted(name for name in self.blobs if name.startswith(prefix or ""))
+        start = int(continuation_token or 0)
+        while start < len(names):
+            end = start + page_size
+            blobs = [
+                SimpleNamespace(name=name, etag=self.blobs[name][1], metadata=self.blobs[name][2])
+                for name in names[start:end]
+            ]
+            yield blobs, str(end) if end < len(names) else None
+            start = end
+
+    async def download_content_async(self, blob_name):
+        blob = self.blobs.get(blob_name)
+        return blob[0] if blob else None
+
+    async def upload_content_async(self, blob_name, content, metadata=None):
+        self.put(blob_name, content, metadata)
+
+    async def delete_blob_async(self, blob_name):
+        self.blobs.pop(blob_name, None)
+
+
+@pytest.mark.asyncio
+async def test_unchanged_blobs_are_skipped_and_failed_runs_resume(monkeypatch):
+    monkeypatch.setattr(kb_batch_tasks.settings, "KB_BATCH_PAGE_SIZE", 2)
+    monkeypatch.setattr(kb_batch_tasks.settings, "KB_BATCH_DOWNLOAD_CONCURRENCY", 2)
+    monkeypatch.setattr(kb_batch_tasks.settings, "KB_BATCH_SUMMARY_CONCURRENCY", 2)
+    azure = FakeAzureStorage()
+    for index in range(5):
+        azure.put(f"incoming/{index}.txt", f"text {index}".encode())
+    summarized = []
+
+    async def summarize(content):
+        if content == "text 3":
+            raise RuntimeError("LLM unavailable")
+        summarized.append(content)
+        return content.upper()
+
+    stats = await summarize_blobs(azure, summarize, "incoming", "summary")
+    assert (stats["processed"], stats["failed"], stats["skipped"]) == (4, 1, 0)
+    assert azure.blobs["summary/0.txt.summary.txt"][0] == b"TEXT 0"
+    # The page of 2.txt and 3.txt failed, the next run resumes listing there
+    checkpoint = json.loads(azure.blobs["summary/_checkpoint.json"][0])
+    assert checkpoint["continuation_token"] == "2"
+
+    summarized.clear()
+    azure.put("incoming/2.txt", b"text 2 edited")
+
+    async def summarize_all(content):
+        summarized.append(content)
+        return content.upper()
+
+    stats = await summarize_blobs(azure, summarize_all, "incoming", "summary")
+    assert sorted(summarized) == ["text 2 edited", "text 3"]
+    assert (stats["processed"], stats["failed"], stats["skipped"]) == (2, 0, 1)
+    assert "summary/_checkpoint.json" not in azure.blobs
+
+    summarized.clear()
+    stats = await summarize_blobs(azure, summarize_all, "incoming", "summary")
+    assert summarized == [] and stats["skipped"] == 5
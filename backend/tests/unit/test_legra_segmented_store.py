@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+from app.modules.data.providers.legra.storage import SegmentedStore
+
+
+def _chunks(doc_id: str, count: int, value: float):
+    metas = [{"doc_id": doc_id, "chunk": f"{doc_id}-{i}"} for i in range(count)]
+    return metas, np.full((count, 4), value, dtype="float32")
+
+
+@pytest.fixture
+def store(tmp_path):
+    return SegmentedStore(tmp_path / "kb", dim=4)
+
+
+def test_append_merges_segments_logarithmically(store):
+    for i in range(16):
+        store.append(*_chunks(f"doc{i}", 2, i))
+
+    assert store.num_rows == 32
+    # Equal-sized tail segments are merged like a binary counter
+    assert store.num_segments == 1
+    assert store.embeddings().shape == (32, 4)
+    assert [m["doc_id"] for m in store.docs_meta()][:2] == ["doc0", "doc0"]
+
+
+def test_delete_is_visible_after_reload_and_compaction(store, tmp_path):
+    store.append(*_chunks("a", 3, 1.0))
+    store.append(*_chunks("b", 2, 2.0))
+
+    assert store.delete_document("a") == 3
+    assert store.delete_document("missing") == 0
+
+    reloaded = SegmentedStore(tmp_path / "kb")
+    assert reloaded.num_rows == 2
+    assert not reloaded.has_document("a")
+    assert reloaded.has_document("b")
+    assert np.allclose(reloaded.embeddings(), 2.0)
+
+    reloaded.compact()
+    assert reloaded.num_segments == 1
+    assert [m["chunk"] for m in reloaded.docs_meta()] == ["b-0", "b-1"]
+
+
+def test_communities_are_dropped_when_rows_change(store, tmp_path):
+    store.append(*_chunks("a", 2, 1.0))
+    store.write_communities([0, 1])
+    assert SegmentedStore(tmp_path / "kb").read_communities() == [0, 1]
+
+    store.append(*_chunks("b", 1, 2.0))
+    assert store.read_communities() is None
@@ -0,0 +1,158 @@
+import asyncio
+
+import pytest
+
+from app.core.tenant_scope import set_tenant_context
+from app.modules.workflow.llm import gateway
+from app.modules.workflow.llm.gateway import LLMGateway, LLMPriority, llm_priority
+
+
+class RateLimitError(Exception):
+    status_code = 429
+
+
+@pytest.fixture
+def llm_gateway(monkeypatch):
+    monkeypatch.setattr(gateway.settings, "LLM_GATEWAY_REQUESTS_PER_MINUTE", 0)
+    monkeypatch.setattr(gateway.settings, "LLM_GATEWAY_TOKENS_PER_MINUTE", 0)
+    monkeypatch.setattr(gateway.settings, "LLM_GATEWAY_TENANT_REQUESTS_PER_MINUTE", 0)
+    monkeypatch.setattr(gateway.settings, "LLM_GATEWAY_TENANT_TOKENS_PER_MINUTE", 0)
+    monkeypatch.setattr(gateway.settings, "LLM_GATEWAY_MAX_CONCURRENCY", 1)
+    monkeypatch.setattr(gateway.settings, "LLM_GATEWAY_MAX_RETRIES", 2)
+    monkeypatch.setattr(gateway.settings, "LLM_GATEWAY_BACKOFF_BASE_SECONDS", 0.01)
+    monkeypatch.setattr(gateway.settings, "LLM_GATEWAY_BACKOFF_MAX_SECONDS", 0.01)
+    return LLMGateway()
+
+
+def _call(llm_gateway, result, calls, dedup_key=None, priority=LLMPriority.INTERACTIVE, delay=0.0):
+    async def send():
+        calls.append(result)
+        await asyncio.sleep(delay)
+        return {"text": result}
+
+    async def run():
+        with llm_priority(priority):
+            return await llm_gateway.call("openai", send, 10, usage=lambda _: 25, dedup_key=dedup_key)
+
+    return asyncio.create_task(run())
+
+
+@pytest.mark.asyncio
+async def test_interactive_calls_are_admitted_before_batch_calls(llm_gateway):
+    calls = []
+    first = _call(llm_gateway, "running", calls, delay=0.05)
+    await asyncio.sleep(0.01)
+    batch = _call(llm_gateway, "batch", calls, priority=LLMPriority.BATCH)
+    await asyncio.sleep(0.01)
+    interactive = _call(llm_gateway, "interactive", calls)
+
+    await asyncio.gather(first, batch, interactive)
+
+    assert calls == ["running", "interactive", "batch"]
+    stats = llm_gateway.get_stats()["providers"]["openai"]
+    assert stats["calls"] == 3
+    assert stats["tokens_used"] == 75
+    assert stats["queue_depth"] == 0
+    assert stats["queue_wait_ms_max"] > 0
+
+
+@pytest.mark.asyncio
+async def test_identical_in_flight_prompts_share_one_call(llm_gateway):
+    calls = []
+    tasks = [_call(llm_gateway, "answer", calls, dedup_key="same", delay=0.02) for _ in range(3)]
+
+    results = await asyncio.gather(*tasks)
+
+    assert calls == ["answer"]
+    assert results == [{"text": "answer"}] * 3
+    assert results[0] is not results[1]
+    assert llm_gateway.get_stats()["providers"]["openai"]["deduplicated"] == 2
+    assert llm_gateway.get_stats()["in_flight_shared"] == 0
+
+
+
+@pytest.mark.asyncio
+async def test_cancelling_the_first_caller_does_not_cancel_a_shared_call(llm_gateway):
+    calls = []
+    owner = _call(llm_gateway, "answer", calls, dedup_key="same", delay=0.05)
+    await asyncio.sleep(0.01)
+    waiter = _call(llm_gateway, "answer", calls, dedup_key="same")
+    await asyncio.sleep(0.01)
+
+    owner.cancel()
+
+    assert await waiter == {"text": "answer"}
+    assert owner.cancelled()
+    assert calls == ["answer"]
+
+    # Once every caller went away the call is cancelled, the next one starts over
+    abandoned = _call(llm_gateway, "abandoned", calls, dedup_key="other", delay=0.05)
+    await asyncio.sleep(0.01)
+    abandoned.cancel()
+    await asyncio.sleep(0)
+    assert llm_gateway.get_stats()["in_flight_shared"] == 0
+    assert await _call(llm_gateway, "again", calls, dedup_key="other") == {"text": "again"}
+    assert llm_gateway.get_stats()["providers"]["openai"]["in_flight"] == 0
+
+
+@pytest.mark.asyncio
+async def test_a_stream_holds_its_slot_until_it_is_over(llm_gateway):
+    calls = []
+
+    async def first_chunk():
+        return "first chunk"
+
+    chunk, done = await llm_gateway.open_stream("openai", first_chunk, 10)
+    assert chunk == "first chunk"
+    # MAX_CONCURRENCY is 1, the next call waits for the end of the stream
+    waiting = _call(llm_gateway, "next", calls)
+    await asyncio.sleep(0.02)
+    assert calls == [] and not waiting.done()
+
+    done(40)
+
+    assert await waiting == {"text": "next"}
+    assert llm_gateway.get_stats()["providers"]["openai"]["tokens_used"] == 65
+
+@pytest.mark.asyncio
+async def test_rate_limited_calls_hold_back_the_provider_and_retry(llm_gateway):
+    attempts = []
+
+    async def send():
+        attempts.append(len(attempts))
+        if len(attempts) == 1:
+            raise RateLimitError("slow down")
+        return "ok"
+
+    assert await llm_gateway.call("anthropic", send, 10, usage=lambda _: 0) == "ok"
+    stats = llm_gateway.get_stats()["providers"]["anthropic"]
+    assert (stats["rate_limited"], stats["retries"], stats["failures"], stats["calls"]) == (1, 1, 0, 2)
+
+    async def bad_request():
+        raise ValueError("invalid prompt")
+
+    with pytest.raises(ValueError):
+        await llm_gateway.call("anthropic", bad_request, 10, usage=lambda _: 0)
+    assert llm_gateway.get_stats()["providers"]["anthropic"]["failures"] == 1
+    assert llm_gateway.get_stats()["providers"]["anthropic"]["in_flight"] == 0
+
+
+@pytest.mark.asyncio
+async def test_a_tenant_over_its_limit_does_not_block_other_tenants(llm_gateway, monkeypatch):
+    monkeypatch.setattr(gateway.settings, "LLM_GATEWAY_MAX_CONCURRENCY", 4)
+    monkeypatch.setattr(gateway.settings, "LLM_GATEWAY_TENANT_REQUESTS_PER_MINUTE", 1)
+    calls = []
+
+    async def as_tenant(tenant_id, result):
+        set_tenant_context(tenant_id)
+        return await _call(llm_gateway, result, calls)
+
+    await as_tenant("acme", "first")
+    throttled = asyncio.create_task(as_tenant("acme", "second"))
+    other = await asyncio.wait_for(as_tenant("globex", "other"), 1)
+
+    assert other == {"text": "other"}
+    assert not throttled.done()
+    assert llm_gateway.get_stats()["providers"]["openai"]["throttled"] == 1
+    assert llm_gateway.get_stats()["providers"]["openai"]["queue_depth"] == 1
+    throttled.cancel()
@@ -0,0 +1,93 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from app.cache import llm_response_cache
+from app.cache.llm_response_cache import LlmCacheKey, LlmResponseCache, analyst_cache_key
+from app.core.tenant_scope import set_tenant_context
+
+
+class _WordEmbedder:
+    """Bag of words over a tiny vocabulary"""
+
+    vocabulary = ["refund", "order", "late", "password", "reset", "please", "thanks"]
+
+    def __init__(self):
+        self.calls = 0
+
+    async def embed_query(self, text):
+        self.calls += 1
+        words = "".join(char if char.isalnum() else " " for char in text.lower()).split()
+        return [float(words.count(word)) for word in self.vocabulary]
+
+
+def _key(prompt, namespace="gpt-4o", temperature=0.0):
+    return LlmCacheKey(namespace, prompt, temperature)
+
+
+def _analyst(cache_responses=1, temperature=0):
+    provider = SimpleNamespace(
+        llm_model_provider="openai",
+        llm_model="gpt-4o",
+        connection_data={"api_key": "secret", "temperature": temperature},
+    )
+    return SimpleNamespace(prompt="Analyse", llm_provider=provider, cache_responses=cache_responses)
+
+
+@pytest.mark.asyncio
+async def test_exact_level_is_keyed_by_model_prompt_and_temperature():
+    cache = LlmResponseCache(ttl_seconds=60, max_entries=10)
+    await cache.store(_key("transcript"), "analysis")
+
+    assert await cache.lookup(_key("transcript")) == "analysis"
+    assert await cache.lookup(_key("transcript", namespace="claude")) is None
+    assert await cache.lookup(_key("transcript", temperature=0.7)) is None
+    assert await cache.lookup(None) is None
+    stats = cache.stats()
+    assert (stats["memory_hits"], stats["misses"], stats["stores"]) == (1, 2, 1)
+
+
+@pytest.mark.asyncio
+async def test_entries_expire_and_stay_within_their_tenant():
+    cache = LlmResponseCache(ttl_seconds=60, max_entries=10)
+    set_tenant_context("acme")
+    await cache.store(_key("transcript"), "analysis")
+
+    set_tenant_context("globex")
+    assert await cache.lookup(_key("transcript")) is None
+
+    set_tenant_context("acme")
+    assert await cache.lookup(_key("transcript")) == "analysis"
+    cache.put_local(_key("transcript"), "analysis", stored_at=time.time() - 61)
+    assert await cache.lookup(_key("transcript")) is None
+
+
+@pytest.mark.asyncio
+async def test_semantic_level_serves_near_duplicate_short_prompts():
+    embedder = _WordEmbedder()
+    cache = LlmResponseCache(
+        ttl_seconds=60, max_entries=10, semantic_enabled=True, similarity=0.9, semantic_max_chars=100,
+        embedder=embedder,
+    )
+    await cache.store(_key("My order is late, refund please"), "refund policy")
+
+    assert await cache.lookup(_key("My order is late! Refund please.")) == "refund policy"
+    assert await cache.lookup(_key("Password reset please")) is None
+    assert await cache.lookup(_key("My order is late, refund please", namespace="claude")) is None
+    # Too long for the embedding model to see all of it, exact matches only
+    calls = embedder.calls
+    assert await cache.lookup(_key("My order is late, refund please " + "x" * 100)) is None
+    assert embedder.calls == calls
+    assert cache.stats()["semantic_hits"] == 1
+
+
+def test_analysts_can_opt_out(monkeypatch):
+    monkeypatch.setattr(llm_response_cache.settings, "LLM_RESPONSE_CACHE_ENABLED", True)
+
+    key = analyst_cache_key(_analyst(), ["Analyse", "transcript"])
+    assert key == analyst_cache_key(_analyst(), ["Analyse", "transcript"])
+    assert key.temperature == 0.0
+    assert "secret" not in key.namespace
+    assert analyst_cache_key(_analyst(temperature=0.5), ["Analyse", "transcript"]).digest != key.digest
+    assert analyst_cache_key(_analyst(cache_responses=0), ["Analyse", "transcript"]) is None
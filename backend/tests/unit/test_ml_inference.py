@@ -0,0 +1,72 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from app.services import ml_inference
+from app.services.ml_inference import InferenceExecutor
+
+
+class ThresholdModel:
+    classes_ = np.array([0, 1])
+
+    def __init__(self):
+        self.batches = []
+
+    def predict(self, X):
+        self.batches.append(len(X))
+        return (X[:, 0] > 0.5).astype(int)
+
+    def predict_proba(self, X):
+        p = np.clip(X[:, 0].astype(float), 0, 1)
+        return np.column_stack([1 - p, p])
+
+
+@pytest.fixture
+def executor(monkeypatch):
+    monkeypatch.setattr(ml_inference.settings, "ML_INFERENCE_EXECUTOR", "thread")
+    monkeypatch.setattr(ml_inference.settings, "ML_INFERENCE_WORKERS", 2)
+    monkeypatch.setattr(ml_inference.settings, "ML_INFERENCE_BATCH_WAIT_MS", 20)
+    monkeypatch.setattr(ml_inference.settings, "ML_INFERENCE_MAX_BATCH_ROWS", 4)
+    monkeypatch.setattr(ml_inference.settings, "ML_INFERENCE_MODEL_CONCURRENCY", 1)
+    return InferenceExecutor()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_are_batched_and_split(executor):
+    model = ThresholdModel()
+    inputs = [np.array([[0.9]]), np.array([[0.1], [0.7]]), np.array([[0.2]]), np.array([[0.6]])]
+
+    results = await asyncio.gather(*(executor.predict("m", model, data) for data in inputs))
+
+    # At most 4 rows per batch
+    assert model.batches == [4, 1]
+    assert [list(predictions) for predictions, _ in results] == [[1], [0, 1], [0], [1]]
+    assert np.allclose(results[1][1], [[0.9, 0.1], [0.3, 0.7]])
+
+    stats = executor.get_stats()["models"]["m"]
+    assert stats["requests_per_batch"]["count"] == 2
+    assert stats["latency_ms"]["count"] == 4
+
+
+@pytest.mark.asyncio
+async def test_a_failing_request_does_not_fail_the_batch(executor):
+    model = ThresholdModel()
+    good = executor.predict("m", model, np.array([[0.9]]))
+    bad = executor.predict("m", model, np.array([["not a number"]], dtype=object))
+
+    results = await asyncio.gather(good, bad, return_exceptions=True)
+
+    assert list(results[0][0]) == [1]
+    assert isinstance(results[1], Exception)
+
+
+@pytest.mark.asyncio
+async def test_a_reloaded_model_gets_its_own_batcher(executor):
+    old, new = ThresholdModel(), ThresholdModel()
+    await executor.predict("m", old, np.array([[0.9]]))
+    await executor.predict("m", new, np.array([[0.9]]))
+
+    assert old.batches == [1] and new.batches == [1]
+    executor.invalidate_model("m")
+    assert executor.get_stats()["models"] == {}
@@ -0,0 +1,177 @@
+import asyncio
+import json
+import uuid
+
+import pytest
+
+from app.modules.websockets.socket_connection_manager import SendQueue, SocketConnectionManager
+
+
+class FakeWebSocket:
+    def __init__(self, blocked: bool = False):
+        self.sent = []
+        self.unblocked = asyncio.Event()
+        if not blocked:
+            self.unblocked.set()
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, message: str):
+        await self.unblocked.wait()
+        self.sent.append(message)
+
+
+def test_send_queue_policies():
+    queue = SendQueue(max_size=2, policy="drop_oldest")
+    for message in ("a1", "b1", "a2"):
+        queue.put(message[0], message)
+    assert list(queue._items) == [("b", "b1"), ("a", "a2")]
+    assert queue.dropped == 1
+
+    queue = SendQueue(max_size=2, policy="coalesce")
+    for message in ("a1", "b1", "b2", "c1"):
+        queue.put(message[0], message)
+    # b2 replaces the queued b1, c1 has nothing to replace and drops a1
+    assert list(queue._items) == [("b", "b2"), ("c", "c1")]
+    assert queue.coalesced == 1 and queue.dropped == 1
+
+    queue = SendQueue(max_size=1, policy="disconnect")
+    assert queue.put("a", "a1")
+    assert not queue.put("a", "a2")
+
+
+@pytest.mark.asyncio
+async def test_slow_client_does_not_delay_others():
+    manager = SocketConnectionManager()
+    slow, fast = FakeWebSocket(blocked=True), FakeWebSocket()
+    await manager.connect(slow, "room", uuid.uuid4(), [])
+    await manager.connect(fast, "room", uuid.uuid4(), [])
+
+    for index in range(3):
+        await manager.broadcast("room", "update", uuid.uuid4(), {"index": index})
+    await asyncio.sleep(0.01)
+
+    assert len(fast.sent) == 3
+    assert slow.sent == []
+    assert fast.sent[0] == '{"type": "update", "payload": {"index": 0}}'
+
+    slow.unblocked.set()
+    await asyncio.sleep(0.01)
+    assert slow.sent == fast.sent
+
+    await manager.disconnect(fast, "room")
+    stats = await manager.get_connection_stats()
+    assert stats["total_connections"] == 1
+    await manager.cleanup()
+
+
+class FakePubSub:
+    def __init__(self):
+        self.channels = set()
+
+    @property
+    def subscribed(self):
+        return bool(self.channels)
+
+    async def subscribe(self, channel):
+        self.channels.add(channel)
+
+    async def unsubscribe(self, channel=None):
+        self.channels.discard(channel)
+
+
+class FakeRedisPipeline:
+    def __init__(self, published, unblocked):
+        self.published = published
+        self.unblocked = unblocked
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def publish(self, channel, data):
+        self.published.append((channel, data))
+
+    async def execute(self):
+        await self.unblocked.wait()
+
+
+class FakeRedisManager:
+    def __init__(self, blocked: bool = False):
+        self.pubsub = FakePubSub()
+        self.published = []
+        self.unblocked = asyncio.Event()
+        if not blocked:
+            self.unblocked.set()
+
+    async def get_redis(self):
+        return self
+
+    def pipeline(self, transaction=True):
+        return FakeRedisPipeline(self.published, self.unblocked)
+
+
+@pytest.mark.asyncio
+async def test_topic_routing_and_disconnect_without_room():
+    manager = SocketConnectionManager()
+    messages, status = FakeWebSocket(), FakeWebSocket()
+    await manager.connect(messages, "room", uuid.uuid4(), [], tenant_id="t1", topics=["message"])
+    await manager.connect(status, "room", uuid.uuid4(), [], tenant_id="t1", topics=["status"])
+
+    await manager.broadcast("room", "message", uuid.uuid4(), {}, required_topic="message", tenant_id="t1")
+    await manager.broadcast("room", "message", uuid.uuid4(), {}, required_topic="message", tenant_id="t2")
+    await asyncio.sleep(0.01)
+    assert len(messages.sent) == 1 and status.sent == []
+
+    await manager.disconnect(messages)
+    assert manager._topic_index["t1:room"] == {"status": manager._rooms["t1:room"]}
+    await manager.disconnect(status, "room", "t1")
+    assert manager._rooms == {} and manager._topic_index == {} and manager._connections == {}
+
+
+@pytest.mark.asyncio
+async def test_redis_subscriptions_follow_local_rooms_and_publishes_are_batched():
+    redis_manager = FakeRedisManager()
+    manager = SocketConnectionManager(redis_manager=redis_manager)
+    manager._pubsub = redis_manager.pubsub
+    websocket = FakeWebSocket()
+
+    await manager.connect(websocket, "room", uuid.uuid4(), [], tenant_id="t1")
+    assert redis_manager.pubsub.channels == {"websocket:t1:room"}
+
+    for index in range(3):
+        await manager.broadcast("room", "update", uuid.uuid4(), {"index": index}, tenant_id="t1")
+    await manager.broadcast("other", "update", uuid.uuid4(), {}, tenant_id="t1")
+    await manager._flush_task
+
+    assert [channel for channel, _ in redis_manager.published] == ["websocket:t1:room", "websocket:t1:other"]
+    # Redis only delivers the channels this node subscribed to
+    for channel, data in redis_manager.published:
+        if channel in redis_manager.pubsub.channels:
+            await manager._handle_redis_message({"type": "message", "channel": channel, "data": data})
+    await asyncio.sleep(0.01)
+    assert len(websocket.sent) == 3
+
+    await manager.disconnect(websocket)
+    assert redis_manager.pubsub.channels == set()
+    await manager.cleanup()
+
+
+@pytest.mark.asyncio
+async def test_broadcast_during_an_in_flight_flush_is_published():
+    redis_manager = FakeRedisManager(blocked=True)
+    manager = SocketConnectionManager(redis_manager=redis_manager)
+
+    await manager.broadcast("room", "update", uuid.uuid4(), {"index": 0}, tenant_id="t1")
+    while not redis_manager.published:
+        await asyncio.sleep(0.001)
+    # The first batch is waiting on Redis, the flush task is still running
+    await manager.broadcast("room", "update", uuid.uuid4(), {"index": 1}, tenant_id="t1")
+    redis_manager.unblocked.set()
+    await manager._flush_task
+
+    assert manager._publish_buffer == []
+    assert [json.loads(data)[0]["payload"]["index"] for _, data in redis_manager.published] == [0, 1]
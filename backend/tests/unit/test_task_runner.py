@@ -0,0 +1,19 @@
+import asyncio
+
+from app.tasks import runner
+
+
+def test_tasks_share_the_worker_event_loop(monkeypatch):
+    monkeypatch.setattr(runner, "_loop", None)
+
+    async def running_loop():
+        return asyncio.get_running_loop()
+
+    loop = runner.run_async(running_loop())
+    assert runner.run_async(running_loop()) is loop
+
+    # A forked child process gets its own loop
+    monkeypatch.setattr(runner, "_loop_pid", -1)
+    assert runner.run_async(running_loop()) is not loop
+    loop.close()
+    runner._loop.close()
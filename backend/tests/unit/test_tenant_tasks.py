@@ -0,0 +1,58 @@
+import asyncio
+
+import pytest
+
+from app.core.tenant_scope import get_tenant_context
+from app.tasks import base
+
+
+def tenants(count):
+    return [
+        {"tenant_id": str(index), "tenant_name": f"Tenant {index}", "tenant_slug": f"t{index}"}
+        for index in range(count)
+    ]
+
+
+@pytest.mark.asyncio
+async def test_tenants_run_concurrently_with_timeouts(monkeypatch):
+    monkeypatch.setattr(base.settings, "TENANT_TASK_CONCURRENCY", 3)
+    monkeypatch.setattr(base.settings, "TENANT_TASK_TIMEOUT_SECONDS", 0.05)
+    monkeypatch.setattr(base.settings, "TENANT_TASK_FAN_OUT", False)
+
+    async def get_tenants():
+        return tenants(5)
+
+    monkeypatch.setattr(base, "_get_tenants", get_tenants)
+    monkeypatch.setattr(base, "_next_start", {})
+    running, peak = 0, 0
+
+    async def task():
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        try:
+            tenant = get_tenant_context()
+            if tenant == "t1":
+                raise ValueError("broken")
+            await asyncio.sleep(1 if tenant == "t2" else 0.01)
+            return {"tenant": tenant}
+        finally:
+            running -= 1
+
+    results = await base.run_task_for_all_tenants(task)
+
+    assert peak == 3
+    by_slug = {result["tenant_slug"]: result for result in results}
+    assert by_slug["master"]["result"] == {"tenant": "master"}
+    assert by_slug["t0"]["result"] == {"tenant": "t0"}
+    assert by_slug["t1"]["status"] == "error" and by_slug["t1"]["error"] == "broken"
+    assert by_slug["t2"]["status"] == "timeout"
+    assert all("duration_ms" in result for result in results)
+    assert get_tenant_context() == "master"
+
+
+def test_each_run_starts_with_the_next_tenant(monkeypatch):
+    monkeypatch.setattr(base, "_next_start", {})
+    assert [t["tenant_slug"] for t in base._rotate("task", tenants(3))] == ["t0", "t1", "t2"]
+    assert [t["tenant_slug"] for t in base._rotate("task", tenants(3))] == ["t1", "t2", "t0"]
+    assert [t["tenant_slug"] for t in base._rotate("other", tenants(3))] == ["t0", "t1", "t2"]
@@ -0,0 +1,115 @@
+import importlib.util
+import sys
+import threading
+import time
+import types
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+WHISPER_EXT = Path(__file__).resolve().parents[2] / "whisper_ext"
+
+
+@pytest.fixture
+def service(monkeypatch):
+    # The Whisper service has its own image, the model library is only needed there
+    if importlib.util.find_spec("whisper") is None:
+        monkeypatch.setitem(sys.modules, "whisper", types.ModuleType("whisper"))
+    monkeypatch.syspath_prepend(str(WHISPER_EXT))
+    import whisper_transcribe
+
+    return whisper_transcribe
+
+
+@pytest.fixture
+def loads(service, monkeypatch):
+    loads = []
+
+    def load_model(name):
+        loads.append(name)
+        return SimpleNamespace(name=name)
+
+    monkeypatch.setattr(service.whisper, "load_model", load_model, raising=False)
+    return loads
+
+
+def _job(service, model_name, index):
+    return service.TranscriptionJob(
+        model_name=model_name,
+        audio=b"",
+        suffix=".wav",
+        options={},
+        loop=None,
+        future=None,
+        enqueued_at=float(index),
+    )
+
+
+def test_jobs_are_grouped_by_model(service):
+    queue = service.JobQueue()
+    for index, name in enumerate(["a", "b", "a", "a"]):
+        queue.put(_job(service, name, index))
+
+    taken = [queue.get(), queue.get("a"), queue.get("a"), queue.get("a")]
+
+    assert [(job.model_name, job.enqueued_at) for job in taken] == [("a", 0), ("a", 2), ("a", 3), ("b", 1)]
+    assert queue.depth() == {}
+    queue.close()
+    assert queue.get() is None
+
+
+@pytest.mark.parametrize("max_group, expected", [
+    (8, ["a0", "a2", "a3", "a4", "b1"]),
+    # After two jobs for "a" the worker takes the oldest job, so "b" does not starve
+    (2, ["a0", "a2", "b1", "a3", "a4"]),
+])
+def test_worker_caps_consecutive_jobs_per_model(service, monkeypatch, max_group, expected):
+    queue = service.JobQueue()
+    for index, name in enumerate(["a", "b", "a", "a", "a"]):
+        job = _job(service, name, index)
+        job.loop = SimpleNamespace(call_soon_threadsafe=lambda *args: None)
+        queue.put(job)
+    queue.close()
+    processed = []
+    monkeypatch.setattr(service, "WHISPER_MAX_GROUP", max_group)
+    monkeypatch.setattr(service, "jobs", queue)
+    monkeypatch.setattr(service, "models", SimpleNamespace(acquire=lambda name: name, release=lambda name, model: None))
+    monkeypatch.setattr(
+        service, "_transcribe_job", lambda model, job: processed.append(f"{job.model_name}{int(job.enqueued_at)}")
+    )
+
+    service._worker()
+
+    assert processed == expected
+
+
+def test_model_cache_reuses_and_evicts_least_recently_used(service, loads):
+    cache = service.ModelCache(max_models=2)
+
+    for name in ["a", "b", "a"]:
+        cache.release(name, cache.acquire(name))
+    assert loads == ["a", "b"]
+
+    # "b" is the least recently used idle model
+    model = cache.acquire("c")
+    assert loads == ["a", "b", "c"]
+    assert cache.loaded_models() == ["a"]
+    cache.release("c", model)
+    assert cache.loaded_models() == ["a", "c"]
+
+
+def test_model_cache_does_not_evict_a_model_in_use(service, loads):
+    cache = service.ModelCache(max_models=1)
+    model = cache.acquire("a")
+    acquired = []
+
+    thread = threading.Thread(target=lambda: acquired.append(cache.acquire("b")))
+    thread.start()
+    time.sleep(0.05)
+    assert thread.is_alive() and loads == ["a"]
+
+    cache.release("a", model)
+    thread.join(timeout=1)
+    assert [m.name for m in acquired] == ["b"]
+    assert loads == ["a", "b"]
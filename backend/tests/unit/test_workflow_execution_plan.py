@@ -0,0 +1,157 @@
+import asyncio
+
+import pytest
+
+from app.modules.workflow.engine.execution_plan import compile_execution_plan
+
+
+class _AgentNode:
+    pass
+
+
+def _node(node_id: str, node_type: str = "agentNode") -> dict:
+    return {"id": node_id, "type": node_type, "data": {}}
+
+
+def _edges(*pairs) -> list:
+    return [{"source": source, "target": target} for source, target in pairs]
+
+
+def test_plan_indexes_nodes_and_resolves_classes():
+    plan = compile_execution_plan(
+        "wf",
+        [_node("a"), _node("b", "unknownNode")],
+        _edges(("a", "b"), ("a", "b")),
+        {"agentNode": _AgentNode},
+    )
+
+    assert plan.get_node_config("a")["type"] == "agentNode"
+    assert plan.get_node_class("a") is _AgentNode
+    assert plan.get_node_class("b") is None
+    # Duplicate edges between the same pair of nodes collapse to one dependency
+    assert plan.successors["a"] == ("b",)
+    assert plan.predecessors["b"] == ("a",)
+
+
+def test_schedule_counts_only_reachable_dependencies():
+    plan = compile_execution_plan(
+        "wf",
+        [_node("in"), _node("left"), _node("right"), _node("join"), _node("tool")],
+        _edges(("in", "left"), ("in", "right"), ("left", "join"),
+               ("right", "join"), ("tool", "join")),
+        {"agentNode": _AgentNode},
+    )
+
+    schedule = plan.schedule_for("in")
+
+    assert schedule.reachable == {"in", "left", "right", "join"}
+    assert schedule.in_degree["in"] == 0
+    # The tool node is not on the execution path, so it does not hold back the join
+    assert schedule.in_degree["join"] == 2
+    assert plan.schedule_for("in") is schedule
+
+
+def test_schedule_drops_edges_closing_a_cycle():
+    plan = compile_execution_plan(
+        "wf",
+        [_node("in"), _node("a"), _node("b")],
+        _edges(("in", "a"), ("a", "b"), ("b", "a")),
+        {"agentNode": _AgentNode},
+    )
+
+    schedule = plan.schedule_for("in")
+
+    assert schedule.in_degree["a"] == 1
+    assert schedule.successors["b"] == ()
+
+
+class _Scheduler:
+    """Runs _execute_plan with scripted nodes instead of real ones"""
+
+    def __init__(self, edges, behaviors=None, max_concurrency=4):
+        from app.modules.workflow.engine.workflow_engine import WorkflowEngine
+
+        node_ids = {node_id for pair in edges for node_id in pair}
+        self.plan = compile_execution_plan(
+            "wf", [_node(node_id) for node_id in sorted(node_ids)], _edges(*edges), {"agentNode": _AgentNode}
+        )
+        self.behaviors = behaviors or {}
+        self.log = []
+        self.running = 0
+        self.peak = 0
+        self.engine = WorkflowEngine.__new__(WorkflowEngine)
+        self.engine.max_concurrency = max_concurrency
+        self.engine._execute_scheduled_node = self._execute
+
+    async def _execute(self, node_id, state, workflow_id, isolated, tenant_id):
+        self.running += 1
+        self.peak = max(self.peak, self.running)
+        self.log.append(("start", node_id))
+        try:
+            delay, output = self.behaviors.get(node_id, (0, None))
+            await asyncio.sleep(delay)
+            if isinstance(output, Exception):
+                raise output
+            return output
+        finally:
+            self.running -= 1
+            self.log.append(("end", node_id))
+
+    async def run(self, start="in"):
+        await self.engine._execute_plan(self.plan, start, state=None)
+        return [node_id for event, node_id in self.log if event == "start"]
+
+
+@pytest.mark.asyncio
+async def test_scheduler_skips_branches_a_router_did_not_take():
+    scheduler = _Scheduler(
+        [("in", "router"), ("router", "a"), ("router", "b"), ("a", "out"), ("b", "out"), ("b", "after_b")],
+        {"router": (0, {"next_nodes": ["a"]})},
+    )
+
+    assert await scheduler.run() == ["in", "router", "a", "out"]
+
+
+@pytest.mark.asyncio
+async def test_scheduler_starts_a_join_after_every_reachable_parent():
+    scheduler = _Scheduler(
+        [("in", "left"), ("in", "right"), ("left", "join"), ("right", "join"), ("tool", "join")],
+        {"left": (0.03, None), "right": (0, None)},
+    )
+
+    started = await scheduler.run()
+
+    # The unreachable tool node does not hold the join back
+    assert started == ["in", "left", "right", "join"]
+    assert scheduler.log.index(("start", "join")) > scheduler.log.index(("end", "left"))
+
+
+@pytest.mark.asyncio
+async def test_scheduler_skips_nodes_downstream_of_a_failure():
+    scheduler = _Scheduler(
+        [("in", "failing"), ("failing", "after"), ("in", "other"), ("other", "join"), ("after", "join")],
+        {"failing": (0, RuntimeError("boom"))},
+    )
+
+    # The join still has an active parent
+    assert await scheduler.run() == ["in", "failing", "other", "join"]
+
+
+@pytest.mark.asyncio
+async def test_scheduler_respects_max_concurrency():
+    fan_out = [("in", f"n{index}") for index in range(6)]
+    scheduler = _Scheduler(fan_out, {f"n{index}": (0.01, None) for index in range(6)}, max_concurrency=2)
+
+    started = await scheduler.run()
+
+    assert sorted(started) == ["in"] + [f"n{index}" for index in range(6)]
+    assert scheduler.peak == 2
+
+
+@pytest.mark.asyncio
+async def test_scheduler_reraises_a_start_node_error():
+    scheduler = _Scheduler([("in", "a")], {"in": (0, ValueError("bad input"))})
+
+    with pytest.raises(ValueError, match="bad input"):
+        await scheduler.run()
+    assert ("start", "a") not in scheduler.log
@@ -0,0 +1,66 @@
+import asyncio
+
+import pytest
+
+from app.modules.workflow.engine.base_node import BaseNode
+from app.modules.workflow.engine.workflow_engine import WorkflowEngine
+
+
+class _TokenNode(BaseNode):
+    async def process(self, config):
+        for text in ("Hel", "lo"):
+            self.emit_event("token", text=text)
+            await asyncio.sleep(0)
+        return "Hello"
+
+
+def _workflow(workflow_id):
+    return {
+        "id": workflow_id,
+        "nodes": [
+            {"id": "in", "type": "chatInputNode", "data": {}},
+            {"id": "draft", "type": "tokenNode", "data": {}},
+            {"id": "answer", "type": "tokenNode", "data": {}},
+            {"id": "out", "type": "chatOutputNode", "data": {}},
+        ],
+        "edges": [
+            {"source": "in", "target": "draft"},
+            {"source": "draft", "target": "answer"},
+            {"source": "answer", "target": "out", "targetHandle": "input"},
+        ],
+    }
+
+
+@pytest.fixture
+def engine():
+    engine = WorkflowEngine(max_concurrency=1)
+    engine.register_node_type("tokenNode", _TokenNode)
+    engine.build_workflow(_workflow("streamed"))
+    return engine
+
+
+@pytest.mark.asyncio
+async def test_only_the_node_feeding_the_output_is_streamed(engine):
+    assert engine.get_plan("streamed").output_sources == {"answer"}
+
+    events = [
+        event async for event in engine.stream_from_node(
+            "streamed", input_data={"message": "hi"}, persist=False
+        )
+    ]
+
+    assert [(event["type"], event.get("text")) for event in events[:-1]] == [
+        ("token", "Hel"), ("token", "lo")
+    ]
+    assert all(event["node_id"] == "answer" for event in events[:-1])
+    assert events[-1]["type"] == "done"
+    assert events[-1]["response"]["output"] == "Hello"
+
+
+@pytest.mark.asyncio
+async def test_execution_without_a_reader_emits_nothing(engine):
+    state = await engine.execute_from_node("streamed", input_data={"message": "hi"}, persist=False)
+
+    assert state.events is None
+    assert not state.is_streaming("answer")
+    assert state.format_state_as_response()["output"] == "Hello"
@@ -1,20 +1,286 @@
-from pathlib import Path
-import aiofiles
-from fastapi import FastAPI, Form, UploadFile, File
-from typing import Literal, Optional, Tuple, Union
-import whisper
 import os
 import logging
 import asyncio
+import subprocess
+import tempfile
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Literal, Optional, Tuple, Union
+
+import numpy as np
+import whisper
+from fastapi import FastAPI, Form, UploadFile, File
 from pydantic import BaseModel, Field
 logger = logging.getLogger(__name__)
 DEFAULT_WHISPER_MODEL = os.getenv('DEFAULT_WHISPER_MODEL', 'base.en') #load default whisper model from environment or
 
-# Initialize the default model
-current_model_name = DEFAULT_WHISPER_MODEL
-model = whisper.load_model(current_model_name)  # Default model
+# Loaded models kept in memory, an instance transcribes one request at a time
+WHISPER_MODEL_CACHE_SIZE = int(os.getenv('WHISPER_MODEL_CACHE_SIZE', '2'))
+# Inference worker threads
+WHISPER_WORKERS = int(os.getenv('WHISPER_WORKERS', '1'))
+# Consecutive jobs a worker takes for the model it just used while other models wait
+WHISPER_MAX_GROUP = int(os.getenv('WHISPER_MAX_GROUP', '8'))
+
+@dataclass
+class TranscriptionJob:
+    model_name: str
+    audio: bytes
+    suffix: str
+    options: Dict[str, Any]
+    loop: asyncio.AbstractEventLoop
+    future: asyncio.Future
+    enqueued_at: float = field(default_factory=time.perf_counter)
+
+
+class JobQueue:
+    """
+    Pending jobs grouped by model. A worker gets the next job for the model it
+    last used, so consecutive jobs reuse the loaded model, but after
+    WHISPER_MAX_GROUP of them it takes the oldest job of any model so others do
+    not starve.
+    """
+
+    def __init__(self):
+        self._jobs: Dict[str, Deque[TranscriptionJob]] = {}
+        self._condition = threading.Condition()
+        self._closed = False
+
+    def put(self, job: TranscriptionJob):
+        with self._condition:
+            self._jobs.setdefault(job.model_name, deque()).append(job)
+            self._condition.notify()
+
+    def get(self, preferred: Optional[str] = None) -> Optional[TranscriptionJob]:
+        """The next job, None once closed"""
+        with self._condition:
+            while not self._jobs and not self._closed:
+                self._condition.wait()
+            if not self._jobs:
+                return None
+            if preferred not in self._jobs:
+                preferred = min(self._jobs, key=lambda name: self._jobs[name][0].enqueued_at)
+            jobs = self._jobs[preferred]
+            job = jobs.popleft()
+            if not jobs:
+                del self._jobs[preferred]
+            return job
+
+    def depth(self) -> Dict[str, int]:
+        with self._condition:
+            return {name: len(jobs) for name, jobs in self._jobs.items()}
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+
+class ModelCache:
+    """
+    Bounded LRU cache of loaded models keyed by name. Whisper models are not
+    safe to share between concurrent transcriptions, so workers check an
+    instance out and back in. Several instances of a model are loaded when
+    workers need it at the same time and there is room, the least recently
+    used idle instance is evicted to make room.
+    """
+
+    def __init__(self, max_models: int):
+        self.max_models = max(1, max_models)
+        self._idle: "OrderedDict[int, Tuple[str, Any]]" = OrderedDict()
+        self._loaded = 0
+        self._condition = threading.Condition()
+
+    def acquire(self, model_name: str) -> Any:
+        with self._condition:
+            while True:
+                for key, (name, model) in reversed(self._idle.items()):
+                    if name == model_name:
+                        del self._idle[key]
+                        return model
+                if self._loaded < self.max_models:
+                    self._loaded += 1
+                    break
+                if self._idle:
+                    _, (name, _) = self._idle.popitem(last=False)
+                    self._loaded -= 1
+                    logger.info(f"Evicted Whisper model {name}")
+                    continue
+                self._condition.wait()
+
+        # Load outside the lock, other workers keep using their models meanwhile
+        started = time.perf_counter()
+        try:
+            model = whisper.load_model(model_name)
+        except Exception:
+            with self._condition:
+                self._loaded -= 1
+                self._condition.notify()
+            raise
+        load_seconds = time.perf_counter() - started
+        metrics.record_model_load(model_name, load_seconds)
+        logger.info(f"Loaded Whisper model {model_name} in {load_seconds:.1f}s")
+        return model
+
+    def release(self, model_name: str, model: Any):
+        with self._condition:
+            self._idle[id(model)] = (model_name, model)
+            self._condition.notify()
+
+    def loaded_models(self) -> List[str]:
+        with self._condition:
+            return [name for name, _ in self._idle.values()]
+
+    def any_model(self) -> Optional[Any]:
+        with self._condition:
+            return next((model for _, model in reversed(self._idle.values())), None)
+
+
+class Metrics:
+    """Counters reported by /metrics"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.jobs = 0
+        self.failures = 0
+        self.queue_wait_seconds = 0.0
+        self.max_queue_wait_seconds = 0.0
+        self.audio_seconds = 0.0
+        self.processing_seconds = 0.0
+        self.model_loads: Dict[str, Dict[str, float]] = {}
+
+    def record_job(self, queue_wait: float, audio_seconds: float, processing_seconds: float):
+        with self._lock:
+            self.jobs += 1
+            self.queue_wait_seconds += queue_wait
+            self.max_queue_wait_seconds = max(self.max_queue_wait_seconds, queue_wait)
+            self.audio_seconds += audio_seconds
+            self.processing_seconds += processing_seconds
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+
+    def record_model_load(self, model_name: str, seconds: float):
+        with self._lock:
+            loads = self.model_loads.setdefault(model_name, {"loads": 0, "total_seconds": 0.0})
+            loads["loads"] += 1
+            loads["total_seconds"] += seconds
+            loads["last_seconds"] = seconds
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "jobs": self.jobs,
+                "failures": self.failures,
+                "avg_queue_wait_seconds": self.queue_wait_seconds / self.jobs if self.jobs else 0.0,
+                "max_queue_wait_seconds": self.max_queue_wait_seconds,
+                "audio_seconds": self.audio_seconds,
+                "processing_seconds": self.processing_seconds,
+                # Processing time per second of audio, below 1 is faster than real time
+                "real_time_factor": self.processing_seconds / self.audio_seconds if self.audio_seconds else None,
+                "model_loads": {name: dict(loads) for name, loads in self.model_loads.items()},
+            }
+
+
+metrics = Metrics()
+jobs = JobQueue()
+models = ModelCache(WHISPER_MODEL_CACHE_SIZE)
+
 
-app = FastAPI()
+def decode_audio(data: bytes, suffix: str) -> np.ndarray:
+    """
+    Decode audio to 16 kHz mono float32, as whisper.load_audio does, but
+    piping the bytes through ffmpeg instead of reading a file. Containers that
+    need seeking (e.g. MP4 with the index at the end) fall back to a temp file.
+    """
+    cmd = ["ffmpeg", "-nostdin", "-threads", "0", "-i", "pipe:0",
+           "-f", "s16le", "-ac", "1", "-acodec", "pcm_s16le", "-ar", str(whisper.audio.SAMPLE_RATE), "-"]
+    process = subprocess.run(cmd, input=data, capture_output=True)
+    if process.returncode == 0 and process.stdout:
+        return np.frombuffer(process.stdout, np.int16).flatten().astype(np.float32) / 32768.0
+
+    logger.debug(f"Decoding from memory failed, using a temp file: {process.stderr.decode(errors='ignore')[-200:]}")
+    with tempfile.NamedTemporaryFile(suffix=suffix) as temp_file:
+        temp_file.write(data)
+        temp_file.flush()
+        return whisper.load_audio(temp_file.name)
+
+
+def _transcribe_job(model: Any, job: TranscriptionJob) -> Dict[str, Any]:
+    started = time.perf_counter()
+    audio = decode_audio(job.audio, job.suffix)
+    result = model.transcribe(audio, **job.options)
+    metrics.record_job(
+        queue_wait=started - job.enqueued_at,
+        audio_seconds=len(audio) / whisper.audio.SAMPLE_RATE,
+        processing_seconds=time.perf_counter() - started,
+    )
+    return result
+
+
+def _set_result(future: asyncio.Future, result: Any, error: Optional[BaseException]):
+    if future.cancelled():
+        return
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
+
+
+def _worker():
+    """Inference worker thread: takes jobs, preferring the model it last used"""
+    last_model, group = None, 0
+    while True:
+        job = jobs.get(last_model if group < WHISPER_MAX_GROUP else None)
+        if job is None:
+            return
+        group = group + 1 if job.model_name == last_model else 1
+        last_model = job.model_name
+
+        result, error = None, None
+        try:
+            model = models.acquire(job.model_name)
+            try:
+                result = _transcribe_job(model, job)
+            finally:
+                models.release(job.model_name, model)
+        except Exception as e:
+            metrics.record_failure()
+            error = e
+        job.loop.call_soon_threadsafe(_set_result, job.future, result, error)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load the default model up front, as the first requests would wait for it
+    model = await asyncio.to_thread(models.acquire, DEFAULT_WHISPER_MODEL)
+    models.release(DEFAULT_WHISPER_MODEL, model)
+
+    if WHISPER_WORKERS > 1 and not torch_cuda_available():
+        # Share the cores between workers instead of oversubscribing them
+        import torch
+        torch.set_num_threads(max(1, (os.cpu_count() or 1) // WHISPER_WORKERS))
+
+    threads = [threading.Thread(target=_worker, name=f"whisper-worker-{index}", daemon=True)
+               for index in range(WHISPER_WORKERS)]
+    for thread in threads:
+        thread.start()
+    try:
+        yield
+    finally:
+        jobs.close()
+
+
+def torch_cuda_available() -> bool:
+    import torch
+    return torch.cuda.is_available()
+
+
+app = FastAPI(lifespan=lifespan)
 
 
 class WhisperOptions(BaseModel):
@@ -80,57 +346,50 @@ class WhisperOptions(BaseModel):
 async def transcribe(file: UploadFile = File(...),
                      whisper_options: Optional[str] = Form(None),
                      model_name: Optional[str] = DEFAULT_WHISPER_MODEL,
+                     model: Optional[str] = Form(None),
 ):
-
-    return await transcribe_audio_whisper_no_save(file, whisper_options, model_name)
-
-
-def set_whisper_model(model_name: str):
-    """
-    Loads a new Whisper model if different from the currently loaded one.
-    """
-    global model, current_model_name
-    if model_name != current_model_name:
-        logger.debug(f"Switching Whisper model from {current_model_name} to {model_name}")
-        model = whisper.load_model(model_name)
-        current_model_name = model_name
-    logger.debug(f"Transcribing audio file with {current_model_name}")
+    # The backend sends the model as the "model" form field
+    return await transcribe_audio_whisper_no_save(file, whisper_options, model or model_name)
 
 
 async def transcribe_audio_whisper_no_save(file: UploadFile, whisper_options: str, model_name: str):
-    temp_file_path = None
     try:
+        options_dict = {}
         if whisper_options:
             options = WhisperOptions.model_validate_json(whisper_options)
             options_dict = options.model_dump(exclude_none=True)
 
-        set_whisper_model(model_name)
-
-        # Read file asynchronously
+        # Transcribed from memory by an inference worker, see _worker
         file_bytes = await file.read()
         suffix = Path(file.filename).suffix if file.filename else ".tmp"
 
-        # Use async temporary file
-        async with aiofiles.tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as temp_file:
-            await temp_file.write(file_bytes)
-            temp_file_path = temp_file.name
-
-        if whisper_options:
-            result = await asyncio.to_thread(model.transcribe, temp_file_path, **options_dict)
-        else:
-            result = await asyncio.to_thread(model.transcribe, temp_file_path)
-
-        return result
+        loop = asyncio.get_running_loop()
+        job = TranscriptionJob(
+            model_name=model_name or DEFAULT_WHISPER_MODEL,
+            audio=file_bytes,
+            suffix=suffix,
+            options=options_dict,
+            loop=loop,
+            future=loop.create_future(),
+        )
+        jobs.put(job)
+        logger.debug(f"Queued transcription with {job.model_name}")
+        return await job.future
 
     except Exception as e:
         return {"error": str(e)}
-    finally:
-        # Clean up temp file asynchronously
-        if temp_file_path:
-            try:
-                await aiofiles.os.remove(temp_file_path)
-            except Exception as cleanup_error:
-                logger.warning(f"Failed to remove temporary file {temp_file_path}: {cleanup_error}")
+
+
+@app.get("/metrics")
+async def get_metrics():
+    """Queue wait, model load times and real-time factor of the transcriptions"""
+    return {
+        **metrics.snapshot(),
+        "queue_depth": jobs.depth(),
+        "loaded_models": models.loaded_models(),
+        "workers": WHISPER_WORKERS,
+        "model_cache_size": WHISPER_MODEL_CACHE_SIZE,
+    }
 
 
 @app.get("/cuda-status")
@@ -142,7 +401,8 @@ async def cuda_status():
         "cuda_available": torch.cuda.is_available(),
         "cuda_device_count": torch.cuda.device_count(),
         "pytorch_version": torch.__version__,
-        "whisper_model_name": current_model_name,
+        "whisper_model_name": DEFAULT_WHISPER_MODEL,
+        "loaded_models": models.loaded_models(),
         }
 
     if torch.cuda.is_available():
@@ -151,7 +411,8 @@ async def cuda_status():
         status["gpu_memory_allocated_mb"] = round(torch.cuda.memory_allocated(0) / 1024 ** 2, 1)
         status["gpu_memory_reserved_mb"] = round(torch.cuda.memory_reserved(0) / 1024 ** 2, 1)
 
-        # Check if current Whisper model is on GPU
+        # Check if the loaded Whisper models are on GPU
+        model = models.any_model()
         if model is not None:
             model_device = str(next(model.parameters()).device)
             status["whisper_model_device"] = model_device